@@ -33,7 +33,6 @@ hiddenimports = [
 # Exclude unnecessary modules to reduce size
 excludes = [
     'pandas',
-    'numpy',
     'matplotlib',
     'scipy',
     'sklearn',
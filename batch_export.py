@@ -0,0 +1,63 @@
+#!/usr/bin/env python3
+"""
+SnapTrace - headless batch export
+Renders annotated screenshots without opening any window.
+
+Usage:
+    python batch_export.py report/*.snaptrace -o out/
+    python batch_export.py specs.json --workers 8
+    python batch_export.py --annotations marks.json shots/*.png -o out/
+"""
+
+import sys
+import os
+import time
+import argparse
+
+# Add the current directory to Python path for imports
+if getattr(sys, 'frozen', False):
+    current_dir = os.path.dirname(sys.executable)
+else:
+    current_dir = os.path.dirname(os.path.abspath(__file__))
+
+sys.path.insert(0, current_dir)
+
+from src.core.batch_export import BatchExporter, jobs_from_paths
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Render SnapTrace annotations headlessly")
+    parser.add_argument("inputs", nargs="+",
+                        help=".snaptrace projects, JSON annotation specs or screenshots")
+    parser.add_argument("-a", "--annotations", metavar="SPEC",
+                        help="annotation spec applied to every screenshot given")
+    parser.add_argument("-o", "--output-dir", metavar="DIR",
+                        help="where to write images (default: next to each input)")
+    parser.add_argument("-j", "--workers", type=int, default=None,
+                        help="worker processes (default: one per CPU core)")
+    args = parser.parse_args(argv)
+
+    try:
+        jobs = jobs_from_paths(args.inputs, args.annotations, args.output_dir)
+    except (OSError, ValueError, KeyError) as e:
+        print(f"Error reading inputs: {e}")
+        return 2
+
+    failures = 0
+    start = time.perf_counter()
+    with BatchExporter(args.workers) as exporter:
+        for result in exporter.export(jobs):
+            if result.ok:
+                print(f"  {result.output}")
+            else:
+                failures += 1
+                print(f"  FAILED {result.output}: {result.error}")
+    elapsed = time.perf_counter() - start
+
+    print(f"Exported {len(jobs) - failures}/{len(jobs)} images in {elapsed:.2f} s "
+          f"({len(jobs) / elapsed if elapsed else 0:.1f} images/s, {exporter.workers} workers)")
+    return 1 if failures else 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,4 @@
+"""
+SnapTrace Benchmarks
+Headless performance benchmarks for the editor hot paths
+"""
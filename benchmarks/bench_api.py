@@ -0,0 +1,61 @@
+"""
+Annotation API benchmark for SnapTrace
+
+Times snaptrace.annotate() on a typical test-run screenshot, allocating a new
+image per call and rendering into a reused target buffer.
+
+Usage (from the project root):
+    python -m benchmarks.bench_api
+    python -m benchmarks.bench_api --compare local
+"""
+
+import argparse
+
+from . import harness
+from .synthetic import make_screenshot
+
+SUITE = "api"
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Benchmark the SnapTrace annotation API")
+    parser.add_argument("--calls", type=int, default=200, help="calls per repetition")
+    parser.add_argument("--repeat", type=int, default=5, help="repetitions per benchmark")
+    harness.add_baseline_arguments(parser)
+    args = parser.parse_args(argv)
+
+    harness.ensure_app()
+    from PyQt5.QtGui import QImage
+    from src.api import annotate, Arrow, Counter, Rect, Text
+
+    screenshot = make_screenshot(1280, 720).toImage()
+    items = [
+        Rect(40, 60, 220, 48),
+        Rect(400, 300, 160, 90, color="#00c000", size=3),
+        Arrow(700, 40, 560, 290, color="#0000ff"),
+        Counter(1, 30, 50),
+        Counter(2, 390, 290),
+        Text("Label clipped\non narrow screens", 40, 140, font_size=16),
+    ]
+    target = QImage(screenshot.size(), QImage.Format_ARGB32_Premultiplied)
+
+    results = harness.BenchmarkResults(SUITE)
+    print(f"\nannotate() with {len(items)} items on 1280x720, {args.calls} calls")
+
+    def allocate():
+        for _ in range(args.calls):
+            annotate(screenshot, items)
+
+    def reuse():
+        for _ in range(args.calls):
+            annotate(screenshot, items, target=target)
+
+    for name, func in (("new_image", allocate), ("target_buffer", reuse)):
+        samples = [s / args.calls for s in harness.time_call(func, repeat=args.repeat)]
+        results.add_timing(f"annotate/{name}", samples)
+        results.add_metric(f"annotate/{name}_per_s", 1 / min(samples), "calls/s")
+    return harness.finish(results, args)
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
@@ -0,0 +1,105 @@
+"""
+Batch export throughput benchmark for SnapTrace
+
+Renders the same annotated job set with 1, 2, 4, ... worker processes (up to
+the number of cores) and reports images/second and scaling efficiency.
+Worker start-up is excluded: each pool renders a warm-up round first.
+
+Usage (from the project root):
+    python -m benchmarks.bench_batch_export
+    python -m benchmarks.bench_batch_export --images 400 --annotations 100 --save-baseline local
+"""
+
+import os
+import json
+import time
+import argparse
+import tempfile
+
+from . import harness
+from .synthetic import build_area, make_image_bytes, make_screenshot
+
+SUITE = "batch"
+
+
+def write_inputs(directory, screenshots, annotations, width, height):
+    """Write screenshots and one shared spec; returns (screenshot paths, spec path)"""
+    from src.core.project import serialize_document
+
+    paths = []
+    for index in range(screenshots):
+        path = os.path.join(directory, f"shot_{index}.png")
+        make_screenshot(width, height).save(path, "PNG")
+        paths.append(path)
+    with open(os.path.join(directory, "logo.png"), 'wb') as f:
+        f.write(make_image_bytes(seed=7))
+
+    per_kind = max(1, annotations // 5)
+    area = build_area(rectangles=per_kind, shapes=per_kind, pencils=per_kind,
+                      counters=per_kind, texts=per_kind, images=0)
+    spec = serialize_document(area.drawings, area.text_items, area.counter_items,
+                              area.counter_value)
+    spec['drawings'].append({"type": "image", "points": [40, 40, 200, 140], "path": "logo.png"})
+    area.deleteLater()
+    spec_path = os.path.join(directory, "annotations.json")
+    with open(spec_path, 'w', encoding='utf-8') as f:
+        json.dump(spec, f)
+    return paths, spec_path
+
+
+def worker_counts(maximum):
+    counts = [1]
+    while counts[-1] * 2 <= maximum:
+        counts.append(counts[-1] * 2)
+    if counts[-1] != maximum:
+        counts.append(maximum)
+    return counts
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Benchmark SnapTrace batch export")
+    parser.add_argument("--images", type=int, default=200, help="images per run (default 200)")
+    parser.add_argument("--annotations", type=int, default=50,
+                        help="annotations per image (default 50)")
+    parser.add_argument("--size", default="1280x720", help="screenshot size (default 1280x720)")
+    parser.add_argument("--max-workers", type=int, default=os.cpu_count() or 1,
+                        help="largest pool to try (default: CPU count)")
+    harness.add_baseline_arguments(parser)
+    args = parser.parse_args(argv)
+
+    from src.core.batch_export import BatchExporter, jobs_from_paths
+
+    harness.ensure_app()
+    width, height = (int(value) for value in args.size.split("x"))
+    results = harness.BenchmarkResults(SUITE)
+    with tempfile.TemporaryDirectory() as directory:
+        screenshots, spec_path = write_inputs(directory, 8, args.annotations, width, height)
+        inputs = [screenshots[i % len(screenshots)] for i in range(args.images)]
+        output_dir = os.path.join(directory, "out")
+        # Distinct outputs so workers don't write the same file
+        jobs = jobs_from_paths(inputs, spec_path, output_dir)
+        for index, job in enumerate(jobs):
+            job.output = os.path.join(output_dir, f"out_{index}.png")
+
+        print(f"\n{args.images} images of {args.size}, ~{args.annotations} annotations each")
+        single_rate = None
+        for workers in worker_counts(args.max_workers):
+            with BatchExporter(workers) as exporter:
+                list(exporter.export(jobs[:workers * 2]))  # Warm up every worker
+                start = time.perf_counter()
+                failures = [result for result in exporter.export(jobs) if not result.ok]
+                elapsed = time.perf_counter() - start
+            if failures:
+                print(f"  {len(failures)} job(s) failed, first: {failures[0].error}")
+                return 1
+            rate = args.images / elapsed
+            single_rate = single_rate or rate
+            results.add_timing(f"w{workers}/per_image", [elapsed / args.images])
+            results.add_metric(f"w{workers}/images_per_s", rate, "images/s")
+            results.add_metric(f"w{workers}/scaling_efficiency_pct",
+                               rate / (single_rate * workers) * 100, "%")
+    return harness.finish(results, args)
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
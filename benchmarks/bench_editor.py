@@ -0,0 +1,156 @@
+"""
+Editor hot-path benchmarks for SnapTrace
+
+Builds synthetic documents in DrawingArea under the offscreen Qt platform and
+times repaint, hit-testing, the eraser, undo/redo, PNG export and project
+save/load.
+
+Usage (from the project root):
+    python -m benchmarks.bench_editor
+    python -m benchmarks.bench_editor --save-baseline local
+    python -m benchmarks.bench_editor --compare local --fail-on-regression
+"""
+
+import os
+import random
+import argparse
+import tempfile
+import tracemalloc
+
+from . import harness
+from .synthetic import build_area, mixed_counts
+
+SUITE = "editor"
+
+
+def bench_document(results, size, repeat):
+    from PyQt5.QtCore import QBuffer, QByteArray, QIODevice, QPoint
+    from PyQt5.QtGui import QImage, QPainter, QPixmap
+
+    prefix = f"n{size}"
+    print(f"\nDocument with ~{size} annotations")
+
+    tracemalloc.start()
+    area = build_area(**mixed_counts(size))
+    _, python_peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    harness.wait_for_workers()
+    area.grab()  # Warm-up paint, also requests image decodes
+    harness.wait_for_workers()
+
+    # Repaint of the whole document
+    target = QPixmap(area.size())
+
+    def repaint():
+        painter = QPainter(target)
+        area.render(painter)
+        painter.end()
+    results.add_timing(f"{prefix}/repaint", harness.time_call(repaint, repeat=repeat))
+
+    # Selection hit-test (right click) over random positions
+    rng = random.Random(size)
+    width, height = area.screenshot.width(), area.screenshot.height()
+    points = [QPoint(rng.randrange(width), rng.randrange(height)) for _ in range(100)]
+    area.current_tool = "rectangle"
+
+    def hit_test():
+        for point in points:
+            area.handle_right_click(point)
+    results.add_timing(f"{prefix}/hit_test",
+                       [s / len(points) for s in harness.time_call(hit_test, repeat=repeat)])
+    area.clear_all_selections()
+
+    # Eraser pass that touches nothing (full scan of every item)
+    miss = QPoint(-10000, -10000)
+    results.add_timing(f"{prefix}/eraser_miss",
+                       harness.time_call(lambda: area.handle_eraser(miss), repeat=repeat, number=10))
+
+    # Eraser that removes an item and snapshots the document
+    snapshot = (list(area.drawings), list(area.text_items), list(area.counter_items))
+    first_counter = area.counter_items[0][1]
+
+    def restore():
+        area.drawings, area.text_items, area.counter_items = (list(items) for items in snapshot)
+    results.add_timing(f"{prefix}/eraser_hit",
+                       harness.time_call(lambda: area.handle_eraser(first_counter),
+                                         repeat=repeat, setup=restore))
+    restore()
+
+    # Undo snapshot, then undo/redo round trips
+    results.add_timing(f"{prefix}/undo_snapshot",
+                       harness.time_call(area.add_to_undo_stack, repeat=repeat, number=10))
+
+    def undo_redo():
+        area.undo()
+        area.redo()
+    results.add_timing(f"{prefix}/undo_redo", harness.time_call(undo_redo, repeat=repeat, number=10))
+
+    # Render and encode as PNG, like saving
+    def encode():
+        image = QImage(area.size(), QImage.Format_ARGB32_Premultiplied)
+        painter = QPainter(image)
+        area.exporting = True
+        area.render(painter)
+        area.exporting = False
+        painter.end()
+        data = QByteArray()
+        buffer = QBuffer(data)
+        buffer.open(QIODevice.WriteOnly)
+        image.save(buffer, "PNG")
+    results.add_timing(f"{prefix}/save_encode", harness.time_call(encode, repeat=max(3, repeat // 2)))
+
+    # Project save/load with an already encoded capture (as when re-saving)
+    from src.core.project import Project
+    capture_blob = Project.from_drawing_area(area).capture_blob
+    with tempfile.TemporaryDirectory() as directory:
+        path = os.path.join(directory, "bench.snaptrace")
+
+        def save_project():
+            Project.from_drawing_area(area, capture_blob).save(path)
+        results.add_timing(f"{prefix}/project_save", harness.time_call(save_project, repeat=repeat))
+        results.add_timing(f"{prefix}/project_load",
+                           harness.time_call(lambda: Project.load(path), repeat=repeat))
+
+    # Autosave journal cost on the UI thread for a one-item edit
+    from src.core.autosave import AutosaveJournal
+    with tempfile.TemporaryDirectory() as directory:
+        journal = AutosaveJournal(root=directory)
+        journal.begin(area)
+        counter = area.counter_items[0]
+
+        def journal_edit():
+            number, pos, color, size = area.counter_items[0]
+            area.counter_items[0] = (number, pos + QPoint(1, 0), color, size)
+            journal.record(area)
+        results.add_timing(f"{prefix}/autosave_record",
+                           harness.time_call(journal_edit, repeat=repeat, number=10))
+        journal.close()
+        area.counter_items[0] = counter
+
+    results.add_metric(f"{prefix}/python_peak_kb", python_peak / 1024, "KB")
+    results.add_metric(f"{prefix}/image_store_kb", area.image_store.memory_usage() / 1024, "KB")
+    area.deleteLater()
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Benchmark SnapTrace editor hot paths")
+    parser.add_argument("--sizes", default="100,1000",
+                        help="comma separated annotation counts (default 100,1000)")
+    parser.add_argument("--repeat", type=int, default=7, help="repetitions per benchmark")
+    harness.add_baseline_arguments(parser)
+    args = parser.parse_args(argv)
+
+    app = harness.ensure_app()
+    results = harness.BenchmarkResults(SUITE)
+    for size in (int(value) for value in args.sizes.split(",") if value):
+        bench_document(results, size, args.repeat)
+        app.processEvents()
+
+    peak = harness.peak_rss_bytes()
+    if peak is not None:
+        results.add_metric("process_peak_rss_mb", peak / (1024 * 1024), "MB")
+    return harness.finish(results, args)
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
@@ -0,0 +1,70 @@
+"""
+Pixel diff benchmark for SnapTrace
+
+Compares 4K capture pairs with diff_images, as the editor's Compare button
+does: a pair with a few changed widgets, a pair that differs everywhere, and a
+pair with thousands of scattered small changes (the slowest case for grouping
+changed areas). Reports the time per comparison and the areas found.
+
+Usage (from the project root):
+    python -m benchmarks.bench_pixel_diff
+    python -m benchmarks.bench_pixel_diff --width 1920 --height 1080 --compare local
+"""
+
+import argparse
+
+from . import harness
+from .synthetic import make_screenshot
+
+SUITE = "pixel_diff"
+
+
+def make_pairs(width, height):
+    """(name, before, after) capture pairs"""
+    from PyQt5.QtGui import QColor, QPainter
+    before = make_screenshot(width, height).toImage()
+
+    widgets = before.copy()
+    painter = QPainter(widgets)
+    painter.fillRect(width // 10, height // 10, 240, 32, QColor(0, 120, 212))
+    painter.fillRect(width // 2, height // 2, 400, 300, QColor(38, 38, 38))
+    painter.drawText(width // 3, height - 40, "Build 1.2.4 (changed)")
+    painter.end()
+
+    everywhere = before.copy()
+    everywhere.invertPixels()
+
+    scattered = before.copy()
+    painter = QPainter(scattered)
+    for x in range(0, width, 48):
+        for y in range(0, height, 48):
+            painter.fillRect(x, y, 3, 3, QColor(255, 0, 255))
+    painter.end()
+    return [("widgets", before, widgets), ("everywhere", before, everywhere),
+            ("scattered", before, scattered)]
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Benchmark comparing two captures")
+    parser.add_argument("--width", type=int, default=3840, help="capture width")
+    parser.add_argument("--height", type=int, default=2160, help="capture height")
+    harness.add_baseline_arguments(parser)
+    args = parser.parse_args(argv)
+
+    harness.ensure_app()
+    from src.core.constants import DIFF_TOLERANCE
+    from src.core.pixel_diff import diff_images
+
+    results = harness.BenchmarkResults(SUITE)
+    print(f"\n{args.width}x{args.height} capture pairs")
+    for name, before, after in make_pairs(args.width, args.height):
+        diff = diff_images(before, after, DIFF_TOLERANCE)
+        print(f"{name}: {diff.summary()}")
+        results.add_timing(f"diff/{name}",
+                           harness.time_call(lambda: diff_images(before, after, DIFF_TOLERANCE),
+                                             repeat=5))
+    return harness.finish(results, args)
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
@@ -0,0 +1,155 @@
+"""
+Region recording benchmark for SnapTrace
+
+Records a synthetic, mostly static UI (a blinking caret, a small spinner and a
+notification that slides in and out) through the recorder's encoder thread,
+with frames timestamped as if grabbed at the recording rate. Times handing
+each frame to the encoder, which is all the grabbing side pays, and encoding
+each frame on the encoder thread; reports the APNG's size next to an estimate for storing
+every frame in full, and decodes the APNG to check its last frame.
+
+Usage (from the project root):
+    python -m benchmarks.bench_recording
+    python -m benchmarks.bench_recording --seconds 30 --fps 10 --compare local
+"""
+
+import os
+import time
+import queue
+import struct
+import zlib
+import argparse
+import tempfile
+import threading
+
+from . import harness
+from .synthetic import make_screenshot
+
+SUITE = "recording"
+
+
+def make_frames(width, height, count):
+    """Frames of a mostly static UI with a few small moving parts"""
+    from PyQt5.QtCore import QRect
+    from PyQt5.QtGui import QColor, QImage, QPainter
+    base = make_screenshot(width, height).toImage().convertToFormat(QImage.Format_RGB32)
+    toast = QRect(width - 340, height - 120, 320, 80)
+    frames = []
+    for index in range(count):
+        frame = base.copy()
+        painter = QPainter(frame)
+        if index // 5 % 2 == 0:
+            painter.fillRect(200, 120, 2, 16, QColor(255, 255, 255))
+        painter.fillRect(width - 40, 20, 20, 20, QColor(40, 40, 40))
+        painter.fillRect(width - 40 + index % 4 * 5, 20, 5, 20, QColor(0, 120, 212))
+        if count // 3 <= index < count // 2:
+            painter.fillRect(toast.translated(0, max(0, 10 * (count // 3 + 8 - index))),
+                             QColor(38, 38, 38))
+        painter.end()
+        frames.append(frame)
+    return frames
+
+
+def decode_last_frame(path, width, height):
+    """Replay the APNG's frames onto a canvas with QPainter; returns its RGB888 bytes"""
+    from PyQt5.QtGui import QImage, QPainter
+    with open(path, 'rb') as f:
+        data = f.read()
+    canvas = QImage(width, height, QImage.Format_RGBA8888)
+    painter = QPainter(canvas)
+    offset, control = 8, None
+    while offset < len(data):
+        length, kind = struct.unpack('>I4s', data[offset:offset + 8])
+        body = data[offset + 8:offset + 8 + length]
+        offset += 12 + length
+        if kind == b'fcTL':
+            control = struct.unpack('>IIIIIHHBB', body)
+        elif kind in (b'IDAT', b'fdAT'):
+            _, w, h, x, y, _, _, _, blend = control
+            rows = zlib.decompress(body if kind == b'IDAT' else body[4:])
+            pixels = b''.join(rows[row * (w * 4 + 1) + 1:(row + 1) * (w * 4 + 1)]
+                              for row in range(h))
+            frame = QImage(pixels, w, h, w * 4, QImage.Format_RGBA8888)
+            painter.setCompositionMode(QPainter.CompositionMode_SourceOver if blend
+                                       else QPainter.CompositionMode_Source)
+            painter.drawImage(x, y, frame)
+    painter.end()
+    return rgb_bytes(canvas)
+
+
+def rgb_bytes(image):
+    from PyQt5.QtGui import QImage
+    image = image.convertToFormat(QImage.Format_RGB888)
+    bits = image.constBits()
+    bits.setsize(image.sizeInBytes())
+    stride, row_bytes = image.bytesPerLine(), image.width() * 3
+    return b''.join(bytes(bits[row * stride:row * stride + row_bytes])
+                    for row in range(image.height()))
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Benchmark region recording")
+    parser.add_argument("--width", type=int, default=1280, help="region width")
+    parser.add_argument("--height", type=int, default=800, help="region height")
+    parser.add_argument("--seconds", type=int, default=30, help="recording length")
+    parser.add_argument("--fps", type=int, default=10, help="frames per second")
+    harness.add_baseline_arguments(parser)
+    args = parser.parse_args(argv)
+
+    harness.ensure_app()
+    from src.core.constants import RECORD_QUEUE_FRAMES
+    from src.core.recording import APNG_COMPRESSION, RecordingSignals, _FrameEncoder
+
+    count = args.seconds * args.fps
+    frames = make_frames(args.width, args.height, count)
+    results = harness.BenchmarkResults(SUITE)
+    print(f"\n{count} frames of {args.width}x{args.height} at {args.fps} fps")
+
+    handle, path = tempfile.mkstemp(suffix=".png")
+    os.close(handle)
+    commands = queue.Queue(maxsize=RECORD_QUEUE_FRAMES)
+    encoder = _FrameEncoder(commands, path, RecordingSignals())
+    encode_samples = []
+    encode = encoder._encode
+
+    def timed_encode(timestamp, frame):
+        encode_start = time.perf_counter()
+        encode(timestamp, frame)
+        encode_samples.append(time.perf_counter() - encode_start)
+
+    encoder._encode = timed_encode
+    thread = threading.Thread(target=encoder.run)
+    start = time.perf_counter()
+    thread.start()
+    samples = []
+    dropped = 0
+    for index, frame in enumerate(frames):
+        # Frames come no faster than the recording rate
+        time.sleep(max(0.0, start + index / args.fps - time.perf_counter()))
+        put_start = time.perf_counter()
+        try:
+            commands.put_nowait(("frame", index / args.fps, frame))
+        except queue.Full:
+            dropped += 1
+        samples.append(time.perf_counter() - put_start)
+    commands.put(("stop", count / args.fps))
+    thread.join()
+
+    results.add_timing("record/hand_off", samples)
+    results.add_timing("record/encode_frame", encode_samples)
+    results.add_metric("record/dropped", dropped)
+    results.add_metric("record/stored_frames", encoder.writer.frames)
+    size = os.path.getsize(path)
+    first_frame = len(zlib.compress(rgb_bytes(frames[0]), APNG_COMPRESSION))
+    results.add_metric("size/apng_mb", size / 2 ** 20, "MB")
+    results.add_metric("size/all_full_frames_mb", first_frame * count / 2 ** 20, "MB")
+
+    matches = decode_last_frame(path, args.width, args.height) == rgb_bytes(frames[-1])
+    print(f"{encoder.writer.frames} frames stored, {dropped} dropped, {size / 1024:.0f} KB "
+          f"(last frame {'matches' if matches else 'DIFFERS FROM'} the recording)")
+    os.remove(path)
+    return harness.finish(results, args)
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
@@ -0,0 +1,60 @@
+"""
+Redaction benchmark for SnapTrace
+
+Pixelates and blurs regions of a 4K capture as the editor does when a
+redaction is drawn, moved or resized: a password field, a panel and the whole
+capture, at a small and a large strength. Times filtering each region with an
+empty cache, then drawing it again from the cache as repaints do.
+
+Usage (from the project root):
+    python -m benchmarks.bench_redaction
+    python -m benchmarks.bench_redaction --width 1920 --height 1080 --compare local
+"""
+
+import argparse
+
+from . import harness
+from .synthetic import make_screenshot
+
+SUITE = "redaction"
+
+SIZES = (2, 8)
+
+
+def regions(width, height):
+    """(name, QRect) regions to redact"""
+    from PyQt5.QtCore import QRect
+    return [("field", QRect(width // 4, height // 3, 320, 32)),
+            ("panel", QRect(width // 8, height // 8, width // 3, height // 3)),
+            ("full", QRect(0, 0, width, height))]
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Benchmark pixelate and blur redactions")
+    parser.add_argument("--width", type=int, default=3840, help="capture width")
+    parser.add_argument("--height", type=int, default=2160, help="capture height")
+    harness.add_baseline_arguments(parser)
+    args = parser.parse_args(argv)
+
+    harness.ensure_app()
+    from src.core.redaction import NUMPY_AVAILABLE, RedactionCache
+
+    screenshot = make_screenshot(args.width, args.height)
+    cache = RedactionCache.instance()
+    results = harness.BenchmarkResults(SUITE)
+    print(f"\n{args.width}x{args.height} capture, NumPy {'on' if NUMPY_AVAILABLE else 'off'}")
+    for tool in ("pixelate", "blur"):
+        for size in SIZES:
+            for name, rect in regions(args.width, args.height):
+                results.add_timing(f"{tool}/{name}/size{size}",
+                                   harness.time_call(
+                                       lambda: cache.region(screenshot, tool, rect, size),
+                                       repeat=3, setup=cache.clear))
+            results.add_timing(f"{tool}/cached/size{size}",
+                               harness.time_call(lambda: cache.region(screenshot, tool, rect, size),
+                                                 repeat=20))
+    return harness.finish(results, args)
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
@@ -0,0 +1,111 @@
+"""
+Scrolling capture benchmark for SnapTrace
+
+Shows a tall synthetic log page in a QScrollArea, scrolls it with synthetic
+wheel events of random size and feeds a grab of the viewport after each one to
+ScrollStitcher, as the scrolling-capture panel does with screen grabs. Times
+stitching per frame and the final image assembly, checks the stitched image
+against the page, and reports the stitched buffer's size next to what keeping
+every frame would take.
+
+Usage (from the project root):
+    python -m benchmarks.bench_scroll_capture
+    python -m benchmarks.bench_scroll_capture --page-height 30000 --compare local
+"""
+
+import time
+import random
+import argparse
+
+from . import harness
+
+SUITE = "scroll_capture"
+
+
+def make_page(width, height):
+    """A tall log-like page; every line differs so no two rows look alike"""
+    from PyQt5.QtGui import QColor, QFont, QImage, QPainter
+    image = QImage(width, height, QImage.Format_RGB32)
+    image.fill(QColor(250, 250, 250))
+    painter = QPainter(image)
+    painter.setFont(QFont("Arial", 10))
+    painter.setPen(QColor(20, 20, 20))
+    for row in range(0, height, 18):
+        painter.drawText(8, row + 14, f"{row:06d} INFO request handled in {row % 97} ms "
+                                      f"{'.' * (row % 60)}")
+    painter.end()
+    return image
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Benchmark scrolling capture stitching")
+    parser.add_argument("--width", type=int, default=1280, help="page and viewport width")
+    parser.add_argument("--viewport", type=int, default=800, help="viewport height")
+    parser.add_argument("--page-height", type=int, default=20000, help="page height")
+    parser.add_argument("--max-notches", type=int, default=8,
+                        help="most wheel notches between two frames")
+    harness.add_baseline_arguments(parser)
+    args = parser.parse_args(argv)
+
+    app = harness.ensure_app()
+    from PyQt5.QtCore import Qt, QPoint, QPointF
+    from PyQt5.QtGui import QPixmap, QWheelEvent
+    from PyQt5.QtWidgets import QLabel, QScrollArea
+    from src.core.scroll_capture import ScrollStitcher, SCROLLBAR_MARGIN
+
+    page = make_page(args.width, args.page_height)
+    label = QLabel()
+    label.setPixmap(QPixmap.fromImage(page))
+    view = QScrollArea()
+    view.setWidget(label)
+    view.setHorizontalScrollBarPolicy(Qt.ScrollBarAlwaysOff)
+    view.setVerticalScrollBarPolicy(Qt.ScrollBarAlwaysOff)
+    view.setFrameShape(QScrollArea.NoFrame)
+    view.resize(args.width, args.viewport)
+    view.show()
+    app.processEvents()
+    viewport = view.viewport()
+    scrollbar = view.verticalScrollBar()
+
+    results = harness.BenchmarkResults(SUITE)
+    print(f"\n{args.width}x{args.page_height} page through a {args.viewport} px viewport")
+
+    rng = random.Random(0)
+    stitcher = ScrollStitcher()
+    samples = []
+    frames = 0
+    while True:
+        frame = viewport.grab().toImage()
+        start = time.perf_counter()
+        stitcher.add_frame(frame)
+        samples.append(time.perf_counter() - start)
+        frames += 1
+        if scrollbar.value() == scrollbar.maximum():
+            break
+        notches = rng.randint(1, args.max_notches)
+        center = QPointF(viewport.width() / 2, viewport.height() / 2)
+        event = QWheelEvent(center, QPointF(viewport.mapToGlobal(center.toPoint())), QPoint(),
+                            QPoint(0, -120 * notches), Qt.NoButton, Qt.NoModifier,
+                            Qt.NoScrollPhase, False)
+        app.sendEvent(viewport, event)
+        app.processEvents()
+
+    results.add_timing("stitch/frame", samples)
+    tiles_bytes = stitcher.height * args.width * 4
+    start = time.perf_counter()
+    image = stitcher.take_image()
+    results.add_timing("stitch/take_image", [time.perf_counter() - start])
+
+    width = args.width - SCROLLBAR_MARGIN
+    matches = image.copy(0, 0, width, image.height()) == page.copy(0, 0, width, page.height())
+    print(f"{frames} frames, {stitcher.missed} missed, stitched {image.height()} rows "
+          f"({'matches' if matches else 'DIFFERS FROM'} the page)")
+    results.add_metric("stitch/frames", frames)
+    results.add_metric("memory/stitched_mb", tiles_bytes / 2 ** 20, "MB")
+    results.add_metric("memory/all_frames_mb", frames * args.width * args.viewport * 4 / 2 ** 20,
+                       "MB")
+    return harness.finish(results, args)
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
@@ -0,0 +1,95 @@
+"""
+Quick Commands search benchmark for SnapTrace
+
+Builds the search index over a synthetic feedback catalog and replays typing
+sessions one keystroke at a time: exact filtering (SearchIndex.search), the
+fuzzy ranking the panel shows (SearchIndex.rank_result narrowing the previous
+keystroke's matches, with some phrases carrying a usage boost) and a linear
+scan of every phrase (the filter the panel used before the index).
+
+Usage (from the project root):
+    python -m benchmarks.bench_search
+    python -m benchmarks.bench_search --phrases 100000 --compare local
+"""
+
+import time
+import random
+import argparse
+
+from . import harness
+from .synthetic import make_phrases
+
+SUITE = "search"
+
+
+def typing_sessions(texts, count, seed=0):
+    """Queries typed character by character, built from words in the catalog"""
+    rng = random.Random(seed)
+    sessions = []
+    for _ in range(count):
+        words = rng.choice(texts).split()
+        query = " ".join(rng.sample(words, min(2, len(words))))
+        sessions.append([query[:end] for end in range(1, len(query) + 1)])
+    return sessions
+
+
+def linear_scan(texts, query):
+    terms = query.lower().split()
+    return [row for row, text in enumerate(texts) if all(term in text for term in terms)]
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Benchmark Quick Commands search")
+    parser.add_argument("--phrases", type=int, default=100000, help="catalog size (default 100000)")
+    parser.add_argument("--sessions", type=int, default=20, help="typing sessions to replay")
+    harness.add_baseline_arguments(parser)
+    args = parser.parse_args(argv)
+
+    from src.core.feedback_catalog import display_text
+    from src.core.search_index import SearchIndex
+
+    entries = make_phrases(args.phrases)
+    texts = [display_text(*entry) for entry in entries]
+    results = harness.BenchmarkResults(SUITE)
+    print(f"\n{args.phrases} phrases, {args.sessions} typing sessions")
+
+    start = time.perf_counter()
+    index = SearchIndex(texts, [category for category, _feedback in entries])
+    results.add_timing("index/build", [time.perf_counter() - start])
+
+    sessions = typing_sessions(texts, args.sessions)
+    keystrokes = []
+    for session in sessions:
+        previous = None
+        for query in session:
+            start = time.perf_counter()
+            previous = index.search(query, previous)
+            keystrokes.append(time.perf_counter() - start)
+    results.add_timing("index/keystroke", keystrokes)
+    results.add_metric("index/keystroke_max_ms", max(keystrokes) * 1000, "ms")
+
+    rng = random.Random(1)
+    boosts = {rng.randrange(len(texts)): rng.random() * 0.5 for _ in range(500)}
+    ranked = []
+    for session in sessions:
+        previous = None
+        for query in session:
+            start = time.perf_counter()
+            previous = index.rank_result(query, 200, boosts, previous)
+            ranked.append(time.perf_counter() - start)
+    results.add_timing("rank/keystroke", ranked)
+    results.add_metric("rank/keystroke_max_ms", max(ranked) * 1000, "ms")
+
+    lowered = [text.lower() for text in texts]
+    scans = []
+    for session in sessions[:3]:
+        for query in session:
+            start = time.perf_counter()
+            linear_scan(lowered, query)
+            scans.append(time.perf_counter() - start)
+    results.add_timing("linear_scan/keystroke", scans)
+    return harness.finish(results, args)
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
@@ -0,0 +1,109 @@
+"""
+Similar-capture search benchmark for SnapTrace
+
+Fills a hash index with synthetic perceptual hashes (screens captured several
+times with small differences, like a real archive) and times loading the
+in-memory index from SQLite, nearest-neighbour queries through
+SimilarityIndex and a linear scan over every hash for comparison.
+
+Usage (from the project root):
+    python -m benchmarks.bench_similarity
+    python -m benchmarks.bench_similarity --images 100000 --compare local
+"""
+
+import os
+import time
+import random
+import shutil
+import argparse
+import tempfile
+
+from . import harness
+
+SUITE = "similarity"
+CAPTURES_PER_SCREEN = 5
+
+
+def flip_bits(value, count, rng):
+    for bit in rng.sample(range(64), count):
+        value ^= 1 << bit
+    return value
+
+
+def make_hashes(count, seed=0):
+    """count hashes: screens of CAPTURES_PER_SCREEN captures a few bits apart"""
+    rng = random.Random(seed)
+    hashes = []
+    while len(hashes) < count:
+        screen = rng.getrandbits(64)
+        for _ in range(min(CAPTURES_PER_SCREEN, count - len(hashes))):
+            hashes.append(flip_bits(screen, rng.randint(0, 8), rng))
+    return hashes
+
+
+def linear_nearest(hashes, query, limit):
+    return sorted(((query ^ value).bit_count(), row) for row, value in enumerate(hashes))[:limit]
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Benchmark similar-capture search")
+    parser.add_argument("--images", type=int, default=100000, help="indexed images (default 100000)")
+    parser.add_argument("--queries", type=int, default=200, help="searches to time")
+    harness.add_baseline_arguments(parser)
+    args = parser.parse_args(argv)
+
+    harness.ensure_app()
+    from src.core.image_hash import (ImageHashIndex, SimilarityIndex, SIMILAR_RESULT_LIMIT,
+                                     _store, bands, _signed)
+
+    hashes = make_hashes(args.images)
+    paths = [os.path.join("/archive", f"folder_{row // 1000}", f"capture_{row}.png")
+             for row in range(len(hashes))]
+    results = harness.BenchmarkResults(SUITE)
+    print(f"\n{len(hashes)} indexed images, {args.queries} searches")
+
+    temp_dir = tempfile.mkdtemp(prefix="snaptrace_hashes_")
+    try:
+        index = ImageHashIndex(os.path.join(temp_dir, "hashes.sqlite3"))
+        _store(index.connection, [(path, os.path.dirname(path), 0, 0, _signed(value), *bands(value))
+                                  for path, value in zip(paths, hashes)])
+        start = time.perf_counter()
+        index.similarity_index()
+        results.add_timing("load/from_sqlite", [time.perf_counter() - start])
+        index.connection.close()
+    finally:
+        shutil.rmtree(temp_dir, ignore_errors=True)
+
+    similarity = SimilarityIndex()
+    for path, value in zip(paths, hashes):
+        similarity.set(path, value)
+
+    rng = random.Random(1)
+    queries = [flip_bits(rng.choice(hashes), rng.randint(0, 4), rng) for _ in range(args.queries)]
+    samples = []
+    for query in queries:
+        start = time.perf_counter()
+        similarity.nearest(query, SIMILAR_RESULT_LIMIT)
+        samples.append(time.perf_counter() - start)
+    results.add_timing("search/archive_capture", samples)
+    results.add_metric("search/archive_capture_max_ms", max(samples) * 1000, "ms")
+
+    unrelated = [rng.getrandbits(64) for _ in range(min(args.queries, 50))]
+    samples = []
+    for query in unrelated:
+        start = time.perf_counter()
+        similarity.nearest(query, SIMILAR_RESULT_LIMIT)
+        samples.append(time.perf_counter() - start)
+    results.add_timing("search/new_screen", samples)
+
+    samples = []
+    for query in queries[:20]:
+        start = time.perf_counter()
+        linear_nearest(hashes, query, SIMILAR_RESULT_LIMIT)
+        samples.append(time.perf_counter() - start)
+    results.add_timing("linear_scan/search", samples)
+    return harness.finish(results, args)
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
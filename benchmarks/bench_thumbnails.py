@@ -0,0 +1,106 @@
+"""
+Thumbnail benchmark for SnapTrace
+
+Fills a folder with saved-capture-like PNGs and requests a thumbnail of every
+file through ThumbnailService, three times: cold (empty disk cache, every file
+decoded), warm (new service, thumbnails read from the disk cache) and from
+memory (same service again). Reports the time until the last thumbnail arrived
+and thumbnails/second.
+
+The folder is reused between runs when --directory is given, since writing
+10,000 captures takes a while; files share a few distinct images, which does
+not change the decode cost.
+
+Usage (from the project root):
+    python -m benchmarks.bench_thumbnails
+    python -m benchmarks.bench_thumbnails --files 10000 --directory /tmp/captures
+"""
+
+import os
+import time
+import shutil
+import argparse
+import tempfile
+
+from . import harness
+from .synthetic import make_screenshot
+
+SUITE = "thumbnails"
+DISTINCT_IMAGES = 8
+
+
+def write_captures(directory, count, width, height):
+    """Ensure directory holds count capture PNGs; returns their paths"""
+    os.makedirs(directory, exist_ok=True)
+    paths = [os.path.join(directory, f"capture_{index:05d}.png") for index in range(count)]
+    missing = [path for path in paths if not os.path.exists(path)]
+    if missing:
+        print(f"Writing {len(missing)} captures to {directory}...")
+        from src.core.project import encode_png
+        blobs = [encode_png(make_screenshot(width + index, height))
+                 for index in range(DISTINCT_IMAGES)]
+        for index, path in enumerate(missing):
+            with open(path, 'wb') as f:
+                f.write(blobs[index % len(blobs)])
+    return paths
+
+
+def request_all(service, paths):
+    """Request every thumbnail and wait for all of them; returns seconds"""
+    app = harness.ensure_app()
+    remaining = set()
+    service.thumbnail_ready.connect(lambda path, _image: remaining.discard(path))
+    start = time.perf_counter()
+    for path in paths:
+        if service.request(path) is None:
+            remaining.add(path)
+    while remaining:
+        app.processEvents()
+        time.sleep(0.001)
+    elapsed = time.perf_counter() - start
+    service.thumbnail_ready.disconnect()
+    return elapsed
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Benchmark thumbnail generation and caching")
+    parser.add_argument("--files", type=int, default=10000, help="captures in the folder (default 10000)")
+    parser.add_argument("--width", type=int, default=1280, help="capture width")
+    parser.add_argument("--height", type=int, default=720, help="capture height")
+    parser.add_argument("--directory", help="capture folder to create or reuse (default: temporary)")
+    harness.add_baseline_arguments(parser)
+    args = parser.parse_args(argv)
+
+    harness.ensure_app()
+    from src.core.thumbnails import ThumbnailService
+
+    capture_dir = args.directory or tempfile.mkdtemp(prefix="snaptrace_captures_")
+    cache_dir = tempfile.mkdtemp(prefix="snaptrace_thumbnails_")
+    try:
+        paths = write_captures(capture_dir, args.files, args.width, args.height)
+        results = harness.BenchmarkResults(SUITE)
+        print(f"\n{len(paths)} captures of {args.width}x{args.height}")
+
+        cold = ThumbnailService(cache_dir=cache_dir)
+        elapsed = request_all(cold, paths)
+        results.add_timing("cold/folder", [elapsed])
+        results.add_metric("cold/thumbnails_per_s", len(paths) / elapsed, "/s")
+
+        warm = ThumbnailService(cache_dir=cache_dir)
+        elapsed = request_all(warm, paths)
+        results.add_timing("warm/folder", [elapsed])
+        results.add_metric("warm/thumbnails_per_s", len(paths) / elapsed, "/s")
+
+        start = time.perf_counter()
+        for path in paths[-500:]:
+            warm.request(path)
+        results.add_timing("memory/500_requests", [time.perf_counter() - start])
+    finally:
+        shutil.rmtree(cache_dir, ignore_errors=True)
+        if not args.directory:
+            shutil.rmtree(capture_dir, ignore_errors=True)
+    return harness.finish(results, args)
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
@@ -0,0 +1,225 @@
+"""
+Benchmark harness for SnapTrace
+Timing helpers, headless Qt setup and baseline storage/comparison
+"""
+
+import os
+import sys
+import json
+import time
+import platform
+import statistics
+import subprocess
+
+# Benchmarks never open real windows
+os.environ.setdefault("QT_QPA_PLATFORM", "offscreen")
+
+BASELINE_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "baselines")
+DEFAULT_THRESHOLD = 0.15  # Report slowdowns above 15% as regressions
+# Baseline metadata that must match the current run for timings to be comparable
+SAME_MACHINE_KEYS = ("host", "machine", "python", "qt")
+
+_app = None  # Keeps the QApplication alive for the whole run
+
+
+def ensure_app():
+    """Return the QApplication, creating a headless one if needed"""
+    global _app
+    from PyQt5.QtWidgets import QApplication
+    if QApplication.instance() is None:
+        _app = QApplication(sys.argv[:1])
+    return QApplication.instance()
+
+
+def wait_for_workers():
+    """Let background decodes finish and deliver their results"""
+    from PyQt5.QtCore import QThreadPool
+    app = ensure_app()
+    QThreadPool.globalInstance().waitForDone()
+    app.processEvents()
+
+
+def time_call(func, repeat=7, number=1, setup=None):
+    """Time func, returning per-call seconds for each repetition.
+
+    setup (if given) runs before every repetition and is not timed.
+    """
+    samples = []
+    for _ in range(repeat):
+        if setup is not None:
+            setup()
+        start = time.perf_counter()
+        for _ in range(number):
+            func()
+        samples.append((time.perf_counter() - start) / number)
+    return samples
+
+
+def peak_rss_bytes():
+    """Peak resident set size of this process, or None where unsupported"""
+    try:
+        import resource
+    except ImportError:
+        return None  # Windows
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # Linux reports kilobytes, macOS bytes
+    return peak if sys.platform == "darwin" else peak * 1024
+
+
+class BenchmarkResults:
+    """Named measurements from one benchmark run"""
+
+    def __init__(self, suite):
+        self.suite = suite
+        self.timings = {}   # name -> {"min": s, "median": s}
+        self.metrics = {}   # name -> value (memory, throughput, ...)
+
+    def add_timing(self, name, samples):
+        self.timings[name] = {
+            "min": min(samples),
+            "median": statistics.median(samples),
+        }
+        print(f"  {name:<44}{self.timings[name]['median'] * 1000:>10.3f} ms")
+
+    def add_metric(self, name, value, unit=""):
+        self.metrics[name] = value
+        print(f"  {name:<44}{value:>10.1f} {unit}")
+
+    def to_dict(self):
+        return {
+            "suite": self.suite,
+            "metadata": run_metadata(),
+            "timings": self.timings,
+            "metrics": self.metrics,
+        }
+
+    def save(self, name):
+        os.makedirs(BASELINE_DIR, exist_ok=True)
+        path = baseline_path(self.suite, name)
+        with open(path, "w", encoding="utf-8") as f:
+            json.dump(self.to_dict(), f, indent=2, sort_keys=True)
+        print(f"Baseline written to {path}")
+        return path
+
+
+def run_metadata():
+    """Commit and environment the numbers were measured on"""
+    from PyQt5.QtCore import QT_VERSION_STR, PYQT_VERSION_STR
+    commit = None
+    try:
+        commit = subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"], capture_output=True, text=True,
+            cwd=os.path.dirname(BASELINE_DIR), timeout=5
+        ).stdout.strip() or None
+    except (OSError, subprocess.SubprocessError):
+        pass
+    return {
+        "commit": commit,
+        "python": platform.python_version(),
+        "qt": QT_VERSION_STR,
+        "pyqt": PYQT_VERSION_STR,
+        "platform": platform.platform(),
+        "machine": platform.machine(),
+        "host": platform.node(),
+        "timestamp": time.strftime("%Y-%m-%dT%H:%M:%S"),
+    }
+
+
+def baseline_path(suite, name):
+    return os.path.join(BASELINE_DIR, f"{suite}-{name}.json")
+
+
+def load_baseline(suite, name):
+    path = baseline_path(suite, name)
+    if not os.path.exists(path):
+        return None
+    with open(path, "r", encoding="utf-8") as f:
+        return json.load(f)
+
+
+def informational_reason(baseline, metadata):
+    """Why a baseline's timings can't flag regressions for this run, or None.
+
+    Baselines marked "informational" (the reference numbers stored in the
+    repository) and baselines measured on another machine or Python/Qt build
+    are only shown for orientation.
+    """
+    base = baseline.get("metadata", {})
+    if base.get("informational"):
+        return "stored reference numbers"
+    differing = [key for key in SAME_MACHINE_KEYS if base.get(key) != metadata.get(key)]
+    if differing:
+        return f"measured with a different {', '.join(differing)}"
+    return None
+
+
+def compare(results, baseline, threshold=DEFAULT_THRESHOLD):
+    """Print a comparison report and return the names that regressed.
+
+    Timings are compared on their median; lower is better. Nothing counts as
+    a regression against an informational baseline (see informational_reason).
+    """
+    current = results.to_dict()
+    base_commit = baseline.get("metadata", {}).get("commit")
+    informational = informational_reason(baseline, current["metadata"])
+    print(f"\nComparison against baseline ({base_commit or 'unknown commit'}), "
+          f"threshold {threshold:.0%}:")
+    if informational:
+        print(f"  Informational only ({informational}); "
+              f"save a baseline on this machine to check for regressions")
+    print(f"  {'Benchmark':<44}{'Baseline':>12}{'Current':>12}{'Change':>10}")
+    regressions = []
+    for name, timing in sorted(current["timings"].items()):
+        base = baseline.get("timings", {}).get(name)
+        if base is None:
+            print(f"  {name:<44}{'-':>12}{timing['median'] * 1000:>10.3f}ms{'new':>10}")
+            continue
+        change = (timing["median"] - base["median"]) / base["median"] if base["median"] else 0.0
+        flag = ""
+        if change > threshold and informational:
+            flag = "  slower"
+        elif change > threshold:
+            regressions.append(name)
+            flag = "  REGRESSION"
+        elif change < -threshold:
+            flag = "  improved"
+        print(f"  {name:<44}{base['median'] * 1000:>10.3f}ms"
+              f"{timing['median'] * 1000:>10.3f}ms{change:>+10.1%}{flag}")
+    for name, value in sorted(current["metrics"].items()):
+        base = baseline.get("metrics", {}).get(name)
+        base_text = f"{base:>12.1f}" if base is not None else f"{'-':>12}"
+        print(f"  {name:<44}{base_text}{value:>12.1f}")
+    if regressions:
+        print(f"\n{len(regressions)} regression(s): {', '.join(regressions)}")
+    elif informational:
+        print("\nNot checked for regressions.")
+    else:
+        print("\nNo regressions.")
+    return regressions
+
+
+def add_baseline_arguments(parser):
+    """Common --save-baseline/--compare options for benchmark scripts"""
+    parser.add_argument("--save-baseline", metavar="NAME",
+                        help="store the results as baseline NAME")
+    parser.add_argument("--compare", metavar="NAME",
+                        help="compare the results against baseline NAME")
+    parser.add_argument("--threshold", type=float, default=DEFAULT_THRESHOLD,
+                        help="relative slowdown reported as a regression (default 0.15)")
+    parser.add_argument("--fail-on-regression", action="store_true",
+                        help="exit with status 1 if any benchmark regressed")
+
+
+def finish(results, args):
+    """Save and/or compare results as requested on the command line; returns exit code"""
+    if args.save_baseline:
+        results.save(args.save_baseline)
+    if args.compare:
+        baseline = load_baseline(results.suite, args.compare)
+        if baseline is None:
+            print(f"No baseline named '{args.compare}' for suite '{results.suite}'")
+            return 2
+        regressions = compare(results, baseline, args.threshold)
+        if regressions and args.fail_on_regression:
+            return 1
+    return 0
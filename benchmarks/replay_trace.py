@@ -0,0 +1,91 @@
+"""
+Replay recorded input traces as benchmarks
+
+Traces are recorded by running SnapTrace with SNAPTRACE_RECORD_TRACES set to a
+directory. Copy interesting ones into benchmarks/traces/ to make them part of
+the regression run.
+
+Usage (from the project root):
+    python -m benchmarks.replay_trace                       # every trace in benchmarks/traces
+    python -m benchmarks.replay_trace my_trace.sntrace --speed original
+    python -m benchmarks.replay_trace --document 500 --compare local
+"""
+
+import os
+import glob
+import argparse
+
+from . import harness
+from .synthetic import make_screenshot, mixed_counts, populate
+
+SUITE = "replay"
+TRACES_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "traces")
+
+
+def build_target(trace, document_size):
+    """Create the widget a trace was recorded on, restored to the recorded view"""
+    from PyQt5.QtCore import QPoint
+
+    metadata = trace.get("metadata", {})
+    widget_name = metadata.get("widget", "DrawingArea")
+    width, height = metadata.get("size", [1280, 720])
+
+    if widget_name == "ScreenshotSelector":
+        from src.ui.screenshot_selector import ScreenshotSelector
+        selector = ScreenshotSelector()
+        selector.capture_screen()
+        selector.resize(width, height)
+        return selector, selector
+
+    from src.ui.main_window import ScreenshotTool
+    shot_width, shot_height = metadata.get("screenshot_size", [width, height])
+    window = ScreenshotTool(make_screenshot(shot_width, shot_height))
+    window.show()
+    area = window.drawing_area
+    area.resize(width, height)
+    if document_size:
+        populate(area, **mixed_counts(document_size))
+    area.zoom_level = metadata.get("zoom", 1.0)
+    area.viewport_offset = QPoint(*metadata.get("offset", [0, 0]))
+    window.set_tool(metadata.get("tool", "rectangle"), None)
+    area.pen_size = metadata.get("pen_size", area.pen_size)
+    harness.wait_for_workers()
+    return area, window
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Replay SnapTrace input traces")
+    parser.add_argument("traces", nargs="*", help="trace files (default: benchmarks/traces/*)")
+    parser.add_argument("--speed", default="max",
+                        help="'max' (as fast as possible), 'original' or a speed factor")
+    parser.add_argument("--document", type=int, default=0,
+                        help="pre-populate the editor with about N synthetic annotations")
+    harness.add_baseline_arguments(parser)
+    args = parser.parse_args(argv)
+
+    from src.core.input_trace import InputReplayer, load_trace, TRACE_EXTENSION
+
+    paths = args.traces or sorted(glob.glob(os.path.join(TRACES_DIR, f"*{TRACE_EXTENSION}")))
+    if not paths:
+        print(f"No traces given and none found in {TRACES_DIR}")
+        return 2
+    speed = None if args.speed == "max" else 1.0 if args.speed == "original" else float(args.speed)
+
+    harness.ensure_app()
+    results = harness.BenchmarkResults(SUITE)
+    for path in paths:
+        trace = load_trace(path)
+        name = os.path.splitext(os.path.basename(path))[0]
+        print(f"\n{name}: {len(trace['events'])} events")
+        target, owner = build_target(trace, args.document)
+        result = InputReplayer(target).replay(trace, speed=speed)
+        print(result.summary())
+        for kind, latencies in sorted(result.latencies.items()):
+            results.add_timing(f"{name}/{kind}", latencies)
+        owner.close()
+        owner.deleteLater()
+    return harness.finish(results, args)
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
@@ -0,0 +1,140 @@
+"""
+Synthetic documents for SnapTrace benchmarks
+Builds reproducible screenshots and annotation sets of a given size
+"""
+
+import random
+
+from PyQt5.QtCore import Qt, QPoint, QBuffer, QByteArray, QIODevice
+from PyQt5.QtGui import QColor, QFont, QImage, QLinearGradient, QPainter, QPixmap
+
+COLORS = [QColor(Qt.red), QColor(Qt.green), QColor(Qt.blue), QColor(255, 127, 0), QColor(128, 0, 255)]
+SHAPE_TOOLS = ["rectangle", "circle", "arrow", "line"]
+FEEDBACK_CATEGORIES = ["UI", "Layout", "Text", "Texture", "Mesh", "Audio", "Performance"]
+
+
+def make_screenshot(width=1920, height=1080):
+    """A capture-like pixmap with gradients and text so encoders have real work"""
+    image = QImage(width, height, QImage.Format_RGB32)
+    painter = QPainter(image)
+    gradient = QLinearGradient(0, 0, width, height)
+    gradient.setColorAt(0.0, QColor(30, 30, 40))
+    gradient.setColorAt(1.0, QColor(90, 110, 140))
+    painter.fillRect(image.rect(), gradient)
+    painter.setPen(QColor(230, 230, 230))
+    painter.setFont(QFont("Arial", 10))
+    for row in range(0, height, 18):
+        painter.drawText(8, row + 14, f"{row:05d} INFO synthetic log line for benchmark rendering " * 3)
+    painter.end()
+    return QPixmap.fromImage(image)
+
+
+def make_image_bytes(width=320, height=200, seed=0):
+    """PNG bytes of a small generated image, for image annotations"""
+    rng = random.Random(seed)
+    image = QImage(width, height, QImage.Format_ARGB32)
+    image.fill(QColor(rng.randrange(256), rng.randrange(256), rng.randrange(256)))
+    painter = QPainter(image)
+    for _ in range(20):
+        painter.fillRect(rng.randrange(width), rng.randrange(height), 30, 30,
+                         QColor(rng.randrange(256), rng.randrange(256), rng.randrange(256)))
+    painter.end()
+    data = QByteArray()
+    buffer = QBuffer(data)
+    buffer.open(QIODevice.WriteOnly)
+    image.save(buffer, "PNG")
+    return bytes(data)
+
+
+def make_phrases(count, vocabulary=3000, seed=0):
+    """Feedback-catalog-like (category, feedback) rows drawn from a fixed vocabulary"""
+    rng = random.Random(seed)
+    letters = "abcdefghijklmnopqrstuvwxyz"
+    words = ["".join(rng.choice(letters) for _ in range(rng.randint(3, 10)))
+             for _ in range(vocabulary)]
+    return [(rng.choice(FEEDBACK_CATEGORIES),
+             " ".join(rng.choice(words) for _ in range(rng.randint(4, 10))))
+            for _ in range(count)]
+
+
+def populate(area, rectangles=0, shapes=0, pencils=0, counters=0, texts=0, images=0,
+             pencil_points=60, seed=1234):
+    """Add synthetic annotations to a DrawingArea.
+
+    Items are added straight to the model lists with one undo snapshot at
+    the end, so building large documents does not itself dominate the run.
+    """
+    rng = random.Random(seed)
+    width = area.screenshot.width()
+    height = area.screenshot.height()
+
+    def point():
+        return QPoint(rng.randrange(width), rng.randrange(height))
+
+    for _ in range(rectangles):
+        start = point()
+        end = start + QPoint(rng.randrange(20, 300), rng.randrange(20, 200))
+        area.drawings.append(("rectangle", rng.choice(COLORS), [start, end], rng.randrange(1, 6)))
+
+    for _ in range(shapes):
+        area.drawings.append((rng.choice(SHAPE_TOOLS), rng.choice(COLORS), [point(), point()],
+                              rng.randrange(1, 6)))
+
+    for _ in range(pencils):
+        current = point()
+        stroke = [current]
+        for _ in range(pencil_points - 1):
+            current = current + QPoint(rng.randrange(-6, 7), rng.randrange(-6, 7))
+            stroke.append(current)
+        area.drawings.append(("pencil", rng.choice(COLORS), stroke, rng.randrange(1, 6)))
+
+    for number in range(counters):
+        area.counter_items.append((number + 1, point(), rng.choice(COLORS), rng.randrange(1, 6)))
+    area.counter_value = counters + 1
+
+    for index in range(texts):
+        text = f"Defect {index}: element misaligned"
+        if index % 5 == 0:
+            text += "\nsecond line of the note"
+        area.text_items.append({
+            'text': text,
+            'pos': point(),
+            'color': rng.choice(COLORS),
+            'font': QFont("Arial", rng.randrange(10, 20)),
+        })
+
+    if images:
+        # A few distinct images placed repeatedly, like a pasted logo
+        blobs = [make_image_bytes(seed=seed + i) for i in range(min(images, 4))]
+        for index in range(images):
+            handle = area.image_store.import_bytes(blobs[index % len(blobs)])
+            top_left = point()
+            size = handle.display_size
+            area.drawings.append(("image", None,
+                                  [top_left, top_left + QPoint(size.width(), size.height())],
+                                  None, handle))
+
+    area.add_to_undo_stack()
+    return area
+
+
+def build_area(width=1920, height=1080, **counts):
+    """Create a DrawingArea over a synthetic screenshot, sized to show it at 100%"""
+    from src.ui.drawing_area import DrawingArea
+    area = DrawingArea(make_screenshot(width, height))
+    area.resize(width, height)
+    populate(area, **counts)
+    return area
+
+
+def mixed_counts(total):
+    """Split total items across every annotation type"""
+    share = max(1, total // 6)
+    return {
+        "rectangles": share,
+        "shapes": share,
+        "pencils": share,
+        "counters": share,
+        "texts": share,
+        "images": max(1, share // 10),
+    }
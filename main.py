@@ -53,6 +53,10 @@ def main():
     # Initialize system tray manager
     try:
         tray_manager = SystemTrayManager(app)
+        # Projects passed on the command line (e.g. via file association)
+        for path in sys.argv[1:]:
+            if path.endswith(".snaptrace") and os.path.exists(path):
+                tray_manager.open_project(path)
         print("SnapTrace started successfully!")
         print("The application is now running in the system tray.")
         print("Press Ctrl+Alt+S to take a screenshot from anywhere!")
@@ -0,0 +1,20 @@
+"""
+SnapTrace annotation API
+
+Lets test code in (or with this folder on) the Python path write:
+
+    import snaptrace
+    snaptrace.annotate("shot.png", [snaptrace.Rect(10, 10, 120, 40)]).save("out.png")
+
+See src/api.py for the full documentation.
+"""
+
+import os
+import sys
+
+_here = os.path.dirname(os.path.abspath(__file__))
+if _here not in sys.path:
+    sys.path.insert(0, _here)
+
+from src.api import *  # noqa: E402,F401,F403
+from src.api import __all__  # noqa: E402,F401
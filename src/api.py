@@ -0,0 +1,294 @@
+"""
+SnapTrace annotation API
+Annotate images from Python (e.g. automated UI tests) with the same drawing
+code as the editor, without a tray, selector or main window:
+
+    import snaptrace
+    from snaptrace import Rect, Arrow, Counter, Text
+
+    snaptrace.annotate("login.png", [
+        Rect(40, 60, 220, 48),
+        Arrow(400, 20, 270, 80, color="#00c000"),
+        Counter(1, 30, 50),
+        Text("Label clipped", 40, 140, font_size=16),
+        Blur(300, 200, 180, 24),
+    ]).save("login_annotated.png")
+
+annotate() accepts a file path, encoded bytes, QImage or QPixmap. Pass
+target= to render into a QImage you own (same size as the screenshot) and
+avoid allocating a new one per call. Pens and fonts are cached between calls.
+A headless QGuiApplication is created if the process has none.
+"""
+
+import os
+import sys
+from functools import lru_cache
+
+from PyQt5.QtCore import QPoint, QRect, QBuffer, QByteArray, QIODevice
+from PyQt5.QtGui import QColor, QFont, QImage, QPainter, QPixmap, QGuiApplication
+
+from .core.constants import DEFAULT_PEN_SIZE, DEFAULT_FONT_SIZE
+from .core.renderer import AnnotationRenderer
+from .core.redaction import REDACTION_TOOLS
+
+__all__ = ["annotate", "AnnotatedImage", "Rect", "Circle", "Line", "Arrow", "Pencil",
+           "Pixelate", "Blur", "Redact", "Counter", "Text", "Image"]
+
+DEFAULT_COLOR = "#FF0000"
+
+_app = None
+_renderer = None
+
+
+def _ensure_gui():
+    """Painting text needs a QGuiApplication; start a headless one if missing"""
+    global _app, _renderer
+    if QGuiApplication.instance() is None:
+        os.environ.setdefault("QT_QPA_PLATFORM", "offscreen")
+        _app = QGuiApplication(sys.argv[:1])
+    if _renderer is None:
+        _renderer = AnnotationRenderer()
+    return _renderer
+
+
+@lru_cache(maxsize=64)
+def _color(value):
+    return QColor(value)
+
+
+def _to_color(value):
+    if isinstance(value, QColor):
+        return value
+    if isinstance(value, tuple):
+        return QColor(*value)
+    return _color(value)
+
+
+@lru_cache(maxsize=64)
+def _font(family, size, bold):
+    return QFont(family, size, QFont.Bold if bold else QFont.Normal)
+
+
+@lru_cache(maxsize=32)
+def _load_picture(path, mtime):
+    image = QImage(path)
+    if image.isNull():
+        raise ValueError(f"Could not read image {path}")
+    return image
+
+
+def _box_points(x, y, width, height):
+    # The editor stores shapes as two inclusive corner points
+    return [QPoint(x, y), QPoint(x + width - 1, y + height - 1)]
+
+
+class _Shape:
+    tool = None
+
+    def __init__(self, points, color, size):
+        self.points = points
+        self.color = color
+        self.size = size
+
+    def draw(self, renderer, painter):
+        renderer.arrow_pen_size = self.size
+        renderer.draw_drawing(painter, (self.tool, _to_color(self.color), self.points, self.size))
+
+
+class Rect(_Shape):
+    """Rectangle outline at x, y of width x height"""
+    tool = "rectangle"
+
+    def __init__(self, x, y, width, height, color=DEFAULT_COLOR, size=DEFAULT_PEN_SIZE):
+        super().__init__(_box_points(x, y, width, height), color, size)
+
+
+class Circle(_Shape):
+    """Ellipse outline inscribed in the box at x, y of width x height"""
+    tool = "circle"
+
+    def __init__(self, x, y, width, height, color=DEFAULT_COLOR, size=DEFAULT_PEN_SIZE):
+        super().__init__(_box_points(x, y, width, height), color, size)
+
+
+class Line(_Shape):
+    tool = "line"
+
+    def __init__(self, x1, y1, x2, y2, color=DEFAULT_COLOR, size=DEFAULT_PEN_SIZE):
+        super().__init__([QPoint(x1, y1), QPoint(x2, y2)], color, size)
+
+
+class Arrow(_Shape):
+    """Line from x1, y1 with its head at x2, y2"""
+    tool = "arrow"
+
+    def __init__(self, x1, y1, x2, y2, color=DEFAULT_COLOR, size=DEFAULT_PEN_SIZE):
+        super().__init__([QPoint(x1, y1), QPoint(x2, y2)], color, size)
+
+
+class Pencil(_Shape):
+    """Freehand path through a sequence of (x, y) points"""
+    tool = "pencil"
+
+    def __init__(self, points, color=DEFAULT_COLOR, size=DEFAULT_PEN_SIZE):
+        super().__init__([point if isinstance(point, QPoint) else QPoint(*point)
+                          for point in points], color, size)
+
+
+class Pixelate(_Shape):
+    """Pixelate the screenshot in the box at x, y of width x height; larger
+    sizes give larger blocks"""
+    tool = "pixelate"
+
+    def __init__(self, x, y, width, height, size=DEFAULT_PEN_SIZE):
+        super().__init__(_box_points(x, y, width, height), DEFAULT_COLOR, size)
+
+
+class Blur(_Shape):
+    """Blur the screenshot in the box at x, y of width x height; larger sizes
+    blur more"""
+    tool = "blur"
+
+    def __init__(self, x, y, width, height, size=DEFAULT_PEN_SIZE):
+        super().__init__(_box_points(x, y, width, height), DEFAULT_COLOR, size)
+
+
+class Redact(_Shape):
+    """Opaque box at x, y of width x height"""
+    tool = "redact"
+
+    def __init__(self, x, y, width, height, color="#000000"):
+        super().__init__(_box_points(x, y, width, height), color, DEFAULT_PEN_SIZE)
+
+
+class Counter:
+    """Numbered marker centred on x, y"""
+
+    def __init__(self, number, x, y, color=DEFAULT_COLOR, size=DEFAULT_PEN_SIZE):
+        self.number = number
+        self.pos = QPoint(x, y)
+        self.color = color
+        self.size = size
+
+    def draw(self, renderer, painter):
+        renderer.draw_counter(painter, (self.number, self.pos, _to_color(self.color), self.size))
+
+
+class Text:
+    """Text with its first baseline starting at x, y; newlines start new lines"""
+
+    def __init__(self, text, x, y, color=DEFAULT_COLOR, font_size=DEFAULT_FONT_SIZE,
+                 font_family="Arial", bold=False):
+        self.text = text
+        self.pos = QPoint(x, y)
+        self.color = color
+        self.font_size = font_size
+        self.font_family = font_family
+        self.bold = bold
+
+    def draw(self, renderer, painter):
+        renderer.draw_text(painter, {
+            'text': self.text,
+            'pos': self.pos,
+            'color': _to_color(self.color),
+            'font': _font(self.font_family, self.font_size, self.bold),
+        })
+
+
+class Image:
+    """Picture (path, QImage or QPixmap) placed at x, y.
+
+    Width and height default to the picture's own size. Pictures given by
+    path are loaded once and reused while the file is unchanged.
+    """
+
+    def __init__(self, source, x, y, width=None, height=None):
+        self.source = source
+        self.x = x
+        self.y = y
+        self.width = width
+        self.height = height
+
+    def picture(self):
+        if isinstance(self.source, (QImage, QPixmap)):
+            return self.source
+        path = os.path.abspath(self.source)
+        return _load_picture(path, os.path.getmtime(path))
+
+    def draw(self, renderer, painter):
+        picture = self.picture()
+        width = self.width or picture.width()
+        height = self.height or picture.height()
+        renderer.draw_drawing(painter, ("image", None, _box_points(self.x, self.y, width, height),
+                                        None, picture))
+
+
+class AnnotatedImage:
+    """Result of annotate(); .image is the rendered QImage"""
+
+    def __init__(self, image):
+        self.image = image
+
+    def save(self, path, format=None, quality=-1):
+        """Write the image; the format follows the file extension unless given"""
+        if not self.image.save(path, format, quality):
+            raise OSError(f"Could not save annotated image to {path}")
+        return path
+
+    def to_bytes(self, format="PNG", quality=-1):
+        data = QByteArray()
+        buffer = QBuffer(data)
+        buffer.open(QIODevice.WriteOnly)
+        self.image.save(buffer, format, quality)
+        return bytes(data)
+
+
+def _load_screenshot(image):
+    if isinstance(image, QImage):
+        return image
+    if isinstance(image, QPixmap):
+        return image.toImage()
+    if isinstance(image, (bytes, bytearray)):
+        loaded = QImage.fromData(bytes(image))
+        if loaded.isNull():
+            raise ValueError("Could not decode screenshot bytes")
+        return loaded
+    loaded = QImage(os.fspath(image))
+    if loaded.isNull():
+        raise ValueError(f"Could not read screenshot {image}")
+    return loaded
+
+
+def annotate(image, items, target=None):
+    """Draw items over image and return an AnnotatedImage.
+
+    Items are drawn in the order given. target, if given, must be a QImage
+    the size of the screenshot; it is drawn into and returned as the result
+    (pass the screenshot itself as target to annotate it in place).
+    """
+    renderer = _ensure_gui()
+    screenshot = _load_screenshot(image)
+
+    if target is None:
+        target = QImage(screenshot.size(), QImage.Format_ARGB32_Premultiplied)
+    elif target.size() != screenshot.size():
+        raise ValueError(f"target is {target.width()}x{target.height()}, "
+                         f"screenshot is {screenshot.width()}x{screenshot.height()}")
+
+    # Redactions filter the screenshot's own pixels; when annotating in place
+    # they must not see items drawn before them
+    redacts = any(getattr(item, "tool", None) in REDACTION_TOOLS for item in items)
+    renderer.screenshot = screenshot.copy() if redacts and target is screenshot else screenshot
+
+    painter = QPainter(target)
+    try:
+        painter.setRenderHint(QPainter.Antialiasing)
+        if target is not screenshot:
+            painter.setCompositionMode(QPainter.CompositionMode_Source)
+            painter.drawImage(QRect(QPoint(0, 0), screenshot.size()), screenshot)
+            painter.setCompositionMode(QPainter.CompositionMode_SourceOver)
+        for item in items:
+            item.draw(renderer, painter)
+    finally:
+        painter.end()
+    return AnnotatedImage(target)
@@ -0,0 +1,477 @@
+"""
+Crash-safe autosave for SnapTrace
+Every document mutation is appended to a journal from a background thread, so
+an editor session can be recovered after a crash.
+
+A session is a directory under autosave_root():
+    capture.png     the capture being annotated
+    snapshot.json   the document as of journal record 'seq' (compaction)
+    journal.jsonl   one delta record per line, applied on top of the snapshot
+    images/<key>    embedded image blobs referenced by the document
+
+Delta records are splices: for each item list, the unchanged prefix and suffix
+are skipped and only the replaced run is written. The UI thread only finds
+the changed run and serializes it; JSON encoding, image blob reads and writes,
+fsyncs and compaction all happen on the journal thread. An image still being
+imported has no content key yet, so changes that add one are journaled once
+the image store has hashed it. Writes are flushed to the OS
+straight away (surviving an application crash) and fsync'd at most once per
+AUTOSAVE_FSYNC_INTERVAL (surviving a system crash).
+"""
+
+import os
+import sys
+import json
+import time
+import queue
+import shutil
+import threading
+from datetime import datetime
+
+from PyQt5.QtCore import QStandardPaths
+from PyQt5.QtGui import QImage
+
+from .constants import APP_NAME, AUTOSAVE_COMPACT_RECORDS, AUTOSAVE_FSYNC_INTERVAL
+from .project import (Project, encode_png, serialize_document, serialize_drawing,
+                      serialize_text, serialize_counter, document_image_handles)
+
+AUTOSAVE_DIR_ENV_VAR = "SNAPTRACE_AUTOSAVE_DIR"
+
+CAPTURE_FILE = "capture.png"
+SNAPSHOT_FILE = "snapshot.json"
+JOURNAL_FILE = "journal.jsonl"
+IMAGES_DIR = "images"
+OWNER_FILE = "owner.pid"
+
+_LISTS = (
+    ('drawings', serialize_drawing),
+    ('text_items', serialize_text),
+    ('counters', serialize_counter),
+)
+
+
+def autosave_root():
+    """Directory holding autosave sessions"""
+    root = os.environ.get(AUTOSAVE_DIR_ENV_VAR)
+    if not root:
+        base = QStandardPaths.writableLocation(QStandardPaths.AppLocalDataLocation)
+        root = os.path.join(base or os.path.expanduser(f"~/.{APP_NAME.lower()}"), "autosave")
+    return root
+
+
+def _pending_image(drawing):
+    """Whether a drawing is an image whose import is still being hashed"""
+    if len(drawing) != 5 or not hasattr(drawing[4], 'key'):
+        return False
+    return drawing[4].key is None and not drawing[4].entry.failed
+
+
+def _area_lists(area):
+    return {
+        'drawings': area.drawings,
+        'text_items': area.text_items,
+        'counters': area.counter_items,
+    }
+
+
+def _text_fingerprint(text_item):
+    # Text dicts are edited and moved in place, so compare them by value
+    if isinstance(text_item, dict):
+        pos, font = text_item['pos'], text_item.get('font')
+        return (text_item['text'], pos.x(), pos.y(), text_item['color'].rgba(),
+                font.key() if font is not None else None)
+    text, pos, color = text_item
+    return (text, pos.x(), pos.y(), color.rgba(), None)
+
+
+def _splice(old, new, same):
+    """(start, deleted count, inserted run) turning old into new"""
+    old_len, new_len = len(old), len(new)
+    limit = min(old_len, new_len)
+    start = 0
+    while start < limit and same(old[start], new[start]):
+        start += 1
+    end = 0
+    while end < limit - start and same(old[old_len - 1 - end], new[new_len - 1 - end]):
+        end += 1
+    return start, old_len - start - end, new[start:new_len - end]
+
+
+def _fsync_file(path):
+    with open(path, 'rb') as f:
+        os.fsync(f.fileno())
+
+
+def _write_atomic(path, data):
+    temp_path = path + ".tmp"
+    with open(temp_path, 'wb') as f:
+        f.write(data)
+        f.flush()
+        os.fsync(f.fileno())
+    os.replace(temp_path, path)
+
+
+class AutosaveJournal:
+    """Journals one editor's document to an autosave session.
+
+    begin() starts a new session for the area's current capture, record() is
+    called after every mutation, close() ends the session (deleting it unless
+    told to keep it).
+    """
+
+    def __init__(self, root=None):
+        self.root = root or autosave_root()
+        self.session_dir = None
+        self._queue = queue.Queue()
+        self._thread = None
+        self._last = None            # item lists as of the previous record
+        self._last_texts = None      # text fingerprints as of the previous record
+        self._last_counters = None   # (counter_value, counter_start)
+        self._written_keys = set()   # image blobs already handed to the writer
+        self._seq = 0
+        self._deferred = None        # area waiting for an image import to be hashed
+        self._stores = set()         # image stores whose import_finished we listen to
+
+    # UI thread side
+
+    def begin(self, area):
+        """Start a new session for the area's capture, ending any previous one"""
+        if self.session_dir is not None:
+            self._queue.put(("discard", self.session_dir))
+        if area.screenshot is None or area.screenshot.isNull():
+            self.session_dir = None
+            return
+        self._ensure_thread()
+        stamp = datetime.now().strftime("%Y%m%d_%H%M%S")
+        self.session_dir = os.path.join(self.root, f"{stamp}_{os.getpid()}_{id(self) & 0xffff:04x}")
+        self._seq = 0
+        self._written_keys = set()
+        self._deferred = None
+        # Images still being imported are left out and journaled once hashed
+        drawings = [drawing for drawing in area.drawings if not _pending_image(drawing)]
+        if len(drawings) != len(area.drawings):
+            self._defer(area)
+        self._remember(area, drawings=drawings)
+        document = serialize_document(drawings, area.text_items, area.counter_items,
+                                      area.counter_value, area.counter_start)
+        blobs = self._new_blobs(document_image_handles(drawings).values())
+        # QImage (unlike QPixmap) may be encoded off the UI thread
+        self._queue.put(("begin", self.session_dir, area.screenshot.toImage(), document, blobs))
+
+    def record(self, area):
+        """Journal the changes since the previous record"""
+        if self.session_dir is None:
+            return
+        current = _area_lists(area)
+        texts = [_text_fingerprint(item) for item in current['text_items']]
+        splices = []
+        for name, serialize in _LISTS:
+            if name == 'text_items':
+                start, deleted, _ = _splice(self._last_texts, texts, lambda a, b: a == b)
+                inserted = current[name][start:start + len(texts) - len(self._last_texts) + deleted]
+            else:
+                start, deleted, inserted = _splice(self._last[name], current[name],
+                                                   lambda a, b: a is b)
+            if deleted or inserted:
+                splices.append((name, serialize, start, deleted, inserted))
+        counters = (area.counter_value, area.counter_start)
+        if not splices and counters == self._last_counters:
+            return
+
+        handles = [drawing[4] for name, _, _, _, inserted in splices if name == 'drawings'
+                   for drawing in inserted if len(drawing) == 5]
+        if any(_pending_image(drawing) for name, _, _, _, inserted in splices
+               if name == 'drawings' for drawing in inserted):
+            # Nothing is remembered, so the retry journals these changes too
+            self._defer(area)
+            return
+        changes = [[name, start, deleted, [serialize(item) for item in inserted]]
+                   for name, serialize, start, deleted, inserted in splices]
+        blobs = self._new_blobs(handles)
+        self._remember(area, texts)
+        self._seq += 1
+        record = {
+            'seq': self._seq,
+            'changes': changes,
+            'counter_value': counters[0],
+            'counter_start': counters[1],
+        }
+        self._queue.put(("record", self.session_dir, record, blobs))
+
+    def flush(self, timeout=None):
+        """Wait until everything queued so far is written and fsync'd"""
+        if self._thread is None:
+            return True
+        done = threading.Event()
+        self._queue.put(("flush", done))
+        return done.wait(timeout)
+
+    def close(self, discard=True, timeout=5.0):
+        """End the session; it is deleted unless discard is False"""
+        if self._thread is None:
+            return
+        if self.session_dir is not None and discard:
+            self._queue.put(("discard", self.session_dir))
+        self.session_dir = None
+        self._deferred = None
+        for store in self._stores:
+            store.import_finished.disconnect(self._import_finished)
+        self._stores = set()
+        self._queue.put(("stop",))
+        self._thread.join(timeout)
+        self._thread = None
+
+    def _defer(self, area):
+        """Record the area again once its pending image imports are hashed"""
+        self._deferred = area
+        for drawing in area.drawings:
+            if _pending_image(drawing) and drawing[4].store not in self._stores:
+                self._stores.add(drawing[4].store)
+                drawing[4].store.import_finished.connect(self._import_finished)
+
+    def _import_finished(self):
+        area, self._deferred = self._deferred, None
+        if area is not None:
+            self.record(area)
+
+    def _remember(self, area, texts=None, drawings=None):
+        current = _area_lists(area)
+        if drawings is not None:
+            current['drawings'] = drawings
+        self._last = {name: list(items) for name, items in current.items()}
+        self._last_texts = texts if texts is not None else [
+            _text_fingerprint(item) for item in current['text_items']]
+        self._last_counters = (area.counter_value, area.counter_start)
+
+    def _new_blobs(self, handles):
+        """Handles of images not yet handed to the writer, by key; the writer reads their blobs"""
+        blobs = {}
+        for handle in handles:
+            if not hasattr(handle, 'key') or handle.key is None \
+                    or handle.key in self._written_keys:
+                continue
+            blobs[handle.key] = handle
+            self._written_keys.add(handle.key)
+        return blobs
+
+    def _ensure_thread(self):
+        if self._thread is None:
+            writer = _JournalWriter(self._queue)
+            self._thread = threading.Thread(target=writer.run, name="autosave-journal",
+                                            daemon=True)
+            self._thread.start()
+
+
+class _JournalWriter:
+    """Journal thread: owns every file of the active session"""
+
+    def __init__(self, commands):
+        self.commands = commands
+        self.session_dir = None
+        self.journal = None
+        self.document = None
+        self.seq = 0
+        self.records_since_snapshot = 0
+        self.unsynced = False
+        self.last_sync = time.monotonic()
+
+    def run(self):
+        running = True
+        while running:
+            timeout = None
+            if self.unsynced:
+                timeout = max(0.0, self.last_sync + AUTOSAVE_FSYNC_INTERVAL - time.monotonic())
+            try:
+                command = self.commands.get(timeout=timeout)
+            except queue.Empty:
+                self._sync()
+                continue
+            # Handle everything already queued before paying for a flush
+            batch = [command]
+            while True:
+                try:
+                    batch.append(self.commands.get_nowait())
+                except queue.Empty:
+                    break
+            for command in batch:
+                try:
+                    running = self._handle(command) and running
+                except Exception as e:
+                    # One bad record must not stop journaling for the rest of the session
+                    print(f"Autosave failed: {e}")
+            if self.journal is not None:
+                self.journal.flush()
+            if self.unsynced and time.monotonic() - self.last_sync >= AUTOSAVE_FSYNC_INTERVAL:
+                self._sync()
+        self._close_session()
+
+    def _handle(self, command):
+        kind = command[0]
+        if kind == "record":
+            _, session_dir, record, blobs = command
+            if session_dir == self.session_dir:
+                self._write_blobs(blobs)
+                self._apply(record)
+                self.journal.write(json.dumps(record, separators=(",", ":")) + "\n")
+                self.unsynced = True
+                self.records_since_snapshot += 1
+                if self.records_since_snapshot >= AUTOSAVE_COMPACT_RECORDS:
+                    self._compact()
+        elif kind == "begin":
+            _, session_dir, capture, document, blobs = command
+            self._close_session()
+            os.makedirs(os.path.join(session_dir, IMAGES_DIR), exist_ok=True)
+            with open(os.path.join(session_dir, OWNER_FILE), 'w') as f:
+                f.write(str(os.getpid()))
+            _write_atomic(os.path.join(session_dir, CAPTURE_FILE), encode_png(capture))
+            self.session_dir = session_dir
+            self.document = document
+            self.seq = 0
+            self._write_blobs(blobs)
+            self._compact()
+        elif kind == "discard":
+            _, session_dir = command
+            if session_dir == self.session_dir:
+                self._close_session()
+            discard_session(session_dir)
+        elif kind == "flush":
+            try:
+                if self.journal is not None:
+                    self.journal.flush()
+                self._sync()
+            finally:
+                command[1].set()
+        elif kind == "stop":
+            return False
+        return True
+
+    def _apply(self, record):
+        for name, start, deleted, items in record['changes']:
+            self.document[name][start:start + deleted] = items
+        self.document['counter_value'] = record['counter_value']
+        self.document['counter_start'] = record['counter_start']
+        self.seq = record['seq']
+
+    def _write_blobs(self, blobs):
+        for key, handle in blobs.items():
+            path = os.path.join(self.session_dir, IMAGES_DIR, key)
+            if not os.path.exists(path):
+                blob = handle.blob()
+                if blob is not None:
+                    _write_atomic(path, blob)
+
+    def _compact(self):
+        """Write the current document as the snapshot and start an empty journal"""
+        snapshot = json.dumps({'seq': self.seq, 'document': self.document},
+                              separators=(",", ":")).encode("utf-8")
+        _write_atomic(os.path.join(self.session_dir, SNAPSHOT_FILE), snapshot)
+        # A crash before the truncation is harmless: recovery skips records
+        # already covered by the snapshot's seq
+        if self.journal is not None:
+            self.journal.close()
+        self.journal = open(os.path.join(self.session_dir, JOURNAL_FILE), 'w', encoding='utf-8')
+        self.records_since_snapshot = 0
+        self.unsynced = True
+
+    def _sync(self):
+        if self.journal is not None and self.unsynced:
+            try:
+                os.fsync(self.journal.fileno())
+            except OSError as e:
+                print(f"Autosave fsync failed: {e}")
+        self.unsynced = False
+        self.last_sync = time.monotonic()
+
+    def _close_session(self):
+        if self.journal is not None:
+            self.journal.flush()
+            self._sync()
+            self.journal.close()
+        self.journal = None
+        self.session_dir = None
+        self.document = None
+
+
+# Recovery
+
+def _owner_alive(session_dir):
+    """Whether the process that wrote a session is still running (POSIX only)"""
+    if sys.platform == "win32":
+        return False  # os.kill would terminate the process on Windows
+    try:
+        with open(os.path.join(session_dir, OWNER_FILE)) as f:
+            pid = int(f.read().strip())
+    except (OSError, ValueError):
+        return False
+    if pid == os.getpid():
+        return True
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return False
+    except OSError:
+        return True  # Exists, owned by someone else
+    return True
+
+
+def find_sessions(root=None):
+    """Left-over sessions from crashed runs, newest first"""
+    root = root or autosave_root()
+    if not os.path.isdir(root):
+        return []
+    sessions = []
+    for name in os.listdir(root):
+        session_dir = os.path.join(root, name)
+        if os.path.isfile(os.path.join(session_dir, CAPTURE_FILE)) \
+                and not _owner_alive(session_dir):
+            sessions.append(session_dir)
+    sessions.sort(key=os.path.getmtime, reverse=True)
+    return sessions
+
+
+def recover_session(session_dir):
+    """Rebuild the last journaled state of a session as a Project"""
+    with open(os.path.join(session_dir, CAPTURE_FILE), 'rb') as f:
+        capture_blob = f.read()
+    capture_size = QImage.fromData(capture_blob, "PNG").size()
+
+    document = serialize_document([], [], [], 1)
+    seq = 0
+    snapshot_path = os.path.join(session_dir, SNAPSHOT_FILE)
+    if os.path.exists(snapshot_path):
+        with open(snapshot_path, 'r', encoding='utf-8') as f:
+            snapshot = json.load(f)
+        document, seq = snapshot['document'], snapshot['seq']
+
+    journal_path = os.path.join(session_dir, JOURNAL_FILE)
+    if os.path.exists(journal_path):
+        with open(journal_path, 'r', encoding='utf-8') as f:
+            for line in f:
+                try:
+                    record = json.loads(line)
+                except ValueError:
+                    break  # Torn final write
+                if record['seq'] <= seq:
+                    continue
+                for name, start, deleted, items in record['changes']:
+                    document[name][start:start + deleted] = items
+                document['counter_value'] = record['counter_value']
+                document['counter_start'] = record['counter_start']
+                seq = record['seq']
+
+    image_blobs = {}
+    for item in document['drawings']:
+        key = item.get('image')
+        if key and key not in image_blobs:
+            path = os.path.join(session_dir, IMAGES_DIR, key)
+            if os.path.exists(path):
+                with open(path, 'rb') as f:
+                    image_blobs[key] = f.read()
+    # Drop images whose blob never made it to disk rather than failing the recovery
+    document['drawings'] = [item for item in document['drawings']
+                            if 'image' not in item or item['image'] in image_blobs]
+    return Project(capture_blob, capture_size, document, image_blobs)
+
+
+def discard_session(session_dir):
+    shutil.rmtree(session_dir, ignore_errors=True)
@@ -0,0 +1,222 @@
+"""
+Headless batch export for SnapTrace
+Renders screenshots with annotations to PNG without opening any window, using
+the same AnnotationRenderer as the editor. Jobs are spread over a process
+pool; each worker runs its own QGuiApplication on the offscreen platform.
+
+A job is either a .snaptrace project or a screenshot plus an annotation spec.
+Specs use the project's annotations.json layout, with defaults filled in:
+
+    {
+      "screenshot": "login.png",
+      "drawings": [
+        {"type": "rectangle", "points": [10, 10, 200, 120], "color": "#ff0000", "size": 3},
+        {"type": "arrow", "points": [300, 40, 220, 90]},
+        {"type": "image", "points": [400, 20, 460, 80], "path": "logo.png"}
+      ],
+      "text_items": [{"text": "Wrong label", "pos": [20, 150], "font": "Arial,16"}],
+      "counters": [{"number": 1, "pos": [60, 60]}]
+    }
+
+Paths in a spec are relative to the spec file.
+"""
+
+import os
+import sys
+import json
+import time
+import multiprocessing
+from concurrent.futures import ProcessPoolExecutor
+
+from .constants import DEFAULT_PEN_SIZE
+from .project import PROJECT_EXTENSION
+
+DEFAULT_COLOR = "#ffff0000"  # Red, like the editor
+DEFAULT_FONT = "Arial,12"
+OUTPUT_SUFFIX = "_annotated"
+
+_app = None  # Worker process QGuiApplication
+
+
+class BatchJob:
+    """One image to render; plain data so it can be sent to worker processes"""
+
+    def __init__(self, output, project=None, screenshot=None, document=None, image_paths=None):
+        self.output = output
+        self.project = project          # .snaptrace path, or
+        self.screenshot = screenshot    # screenshot path with
+        self.document = document        # a normalized spec document
+        self.image_paths = image_paths or {}  # image key -> file path
+
+
+class BatchResult:
+    def __init__(self, output, error=None, seconds=0.0):
+        self.output = output
+        self.error = error
+        self.seconds = seconds
+
+    @property
+    def ok(self):
+        return self.error is None
+
+
+def normalize_spec(spec, base_dir):
+    """Fill in spec defaults; returns (document, image key -> absolute path)"""
+    image_paths = {}
+    drawings = []
+    for item in spec.get('drawings', []):
+        item = dict(item)
+        if item['type'] == "image":
+            if 'path' in item:
+                path = os.path.join(base_dir, item.pop('path'))
+                item['image'] = path
+                image_paths[path] = path
+        else:
+            item.setdefault('color', DEFAULT_COLOR)
+            item.setdefault('size', DEFAULT_PEN_SIZE)
+        drawings.append(item)
+
+    text_items = []
+    for item in spec.get('text_items', []):
+        item = dict(item)
+        item.setdefault('color', DEFAULT_COLOR)
+        item.setdefault('font', DEFAULT_FONT)
+        text_items.append(item)
+
+    counters = []
+    for number, item in enumerate(spec.get('counters', []), start=1):
+        item = dict(item)
+        item.setdefault('number', number)
+        item.setdefault('color', DEFAULT_COLOR)
+        item.setdefault('size', DEFAULT_PEN_SIZE)
+        counters.append(item)
+
+    document = {
+        'drawings': drawings,
+        'text_items': text_items,
+        'counters': counters,
+    }
+    return document, image_paths
+
+
+def default_output(source, output_dir=None):
+    stem = os.path.splitext(os.path.basename(source))[0]
+    return os.path.join(output_dir or os.path.dirname(os.path.abspath(source)),
+                        f"{stem}{OUTPUT_SUFFIX}.png")
+
+
+def jobs_from_paths(paths, annotations=None, output_dir=None):
+    """Build jobs from command line inputs.
+
+    paths may be .snaptrace projects, JSON spec files (a spec, a list of specs
+    or {"jobs": [...]}) or screenshots, which get the annotations spec file
+    applied.
+    """
+    shared = None
+    if annotations:
+        with open(annotations, 'r', encoding='utf-8') as f:
+            shared = normalize_spec(json.load(f), os.path.dirname(os.path.abspath(annotations)))
+
+    jobs = []
+    for path in paths:
+        if path.endswith(PROJECT_EXTENSION):
+            jobs.append(BatchJob(default_output(path, output_dir), project=path))
+        elif path.endswith(".json"):
+            with open(path, 'r', encoding='utf-8') as f:
+                data = json.load(f)
+            specs = data.get('jobs', [data]) if isinstance(data, dict) else data
+            base_dir = os.path.dirname(os.path.abspath(path))
+            for spec in specs:
+                screenshot = os.path.join(base_dir, spec['screenshot'])
+                document, image_paths = normalize_spec(spec, base_dir)
+                output = spec.get('output')
+                output = os.path.join(output_dir or base_dir, output) if output \
+                    else default_output(screenshot, output_dir)
+                jobs.append(BatchJob(output, screenshot=screenshot, document=document,
+                                     image_paths=image_paths))
+        else:
+            if shared is None:
+                raise ValueError(f"{path}: screenshots need an --annotations spec")
+            document, image_paths = shared
+            jobs.append(BatchJob(default_output(path, output_dir), screenshot=path,
+                                 document=document, image_paths=image_paths))
+    return jobs
+
+
+def init_worker():
+    """Process pool initializer: one headless QGuiApplication per worker"""
+    global _app
+    os.environ.setdefault("QT_QPA_PLATFORM", "offscreen")
+    from PyQt5.QtGui import QGuiApplication
+    if QGuiApplication.instance() is None:
+        _app = QGuiApplication(sys.argv[:1])
+
+
+def render_job(job):
+    """Render one job to its output file (runs inside a worker)"""
+    from PyQt5.QtGui import QImage
+    from .project import Project, deserialize_document
+    from .renderer import AnnotationRenderer
+
+    start = time.perf_counter()
+    try:
+        if job.project:
+            project = Project.load(job.project)
+            screenshot = QImage.fromData(project.capture_blob, "PNG")
+            document = project.document
+            images = {key: QImage.fromData(blob) for key, blob in project.image_blobs.items()}
+        else:
+            screenshot = QImage(job.screenshot)
+            document = job.document
+            images = {key: QImage(path) for key, path in job.image_paths.items()}
+        if screenshot.isNull():
+            raise ValueError("could not read the screenshot")
+        missing = [key for key, image in images.items() if image.isNull()]
+        if missing:
+            raise ValueError(f"could not read image {missing[0]}")
+
+        state = deserialize_document(document, images)
+        image = AnnotationRenderer().render_image(screenshot, state['drawings'],
+                                                  state['counter_items'], state['text_items'])
+        os.makedirs(os.path.dirname(os.path.abspath(job.output)), exist_ok=True)
+        if not image.save(job.output, "PNG"):
+            raise OSError(f"could not write {job.output}")
+    except Exception as e:
+        return BatchResult(job.output, f"{type(e).__name__}: {e}", time.perf_counter() - start)
+    return BatchResult(job.output, None, time.perf_counter() - start)
+
+
+class BatchExporter:
+    """Process pool rendering BatchJobs; use as a context manager.
+
+    Workers are started with 'spawn' so no Qt state is inherited from the
+    parent process. With workers=1 jobs are rendered in this process.
+    """
+
+    def __init__(self, workers=None):
+        self.workers = workers or os.cpu_count() or 1
+        self._pool = None
+
+    def __enter__(self):
+        if self.workers > 1:
+            self._pool = ProcessPoolExecutor(max_workers=self.workers,
+                                             mp_context=multiprocessing.get_context("spawn"),
+                                             initializer=init_worker)
+        else:
+            init_worker()
+        return self
+
+    def __exit__(self, *exc_info):
+        if self._pool is not None:
+            self._pool.shutdown()
+            self._pool = None
+
+    def export(self, jobs):
+        """Render jobs, yielding BatchResults in job order"""
+        if self._pool is None:
+            for job in jobs:
+                yield render_job(job)
+            return
+        # Several jobs per round trip keeps the workers busy without starving any
+        chunksize = max(1, min(16, len(jobs) // (self.workers * 4)))
+        yield from self._pool.map(render_job, jobs, chunksize=chunksize)
@@ -0,0 +1,203 @@
+"""
+Capture history for SnapTrace
+Keeps the last captures in memory so a screenshot replaced by the next one can
+still be reopened from the tray.
+
+Each capture is compressed losslessly on a worker thread (zlib over the raw
+pixels, which is faster than PNG and about as small for screenshots) and only
+decompressed when it is reopened. The history is capped by count and by
+megabytes of compressed data; the least recently used capture, captured or
+reopened, is evicted first. A capture that looks the same as an earlier one
+(perceptual hash) replaces it rather than taking another slot.
+"""
+
+import zlib
+from collections import OrderedDict
+from datetime import datetime
+
+from PyQt5.QtCore import QObject, QRunnable, QSettings, QThreadPool, pyqtSignal
+from PyQt5.QtGui import QImage, QPixmap
+
+from .constants import APP_NAME, HISTORY_MAX_CAPTURES, HISTORY_BUDGET_MB, DUPLICATE_MAX_DISTANCE
+from .image_hash import dhash, duplicate_action, hamming_distance
+
+HISTORY_COMPRESS_LEVEL = 1   # zlib level; higher levels are slower for little gain
+MAX_CAPTURES_SETTINGS_KEY = "history/max_captures"
+BUDGET_SETTINGS_KEY = "history/budget_mb"
+
+
+class HistoryEntry:
+    """One capture: the image until it is compressed, then only the blob"""
+    __slots__ = ('entry_id', 'captured_at', 'geometry', 'width', 'height', 'format',
+                 'bytes_per_line', 'image', 'blob', 'image_hash', 'deduplicate')
+
+    def __init__(self, entry_id, image, geometry, deduplicate=True):
+        self.entry_id = entry_id
+        self.captured_at = datetime.now()
+        self.geometry = geometry        # Screen rect it was captured from, if known
+        self.width = image.width()
+        self.height = image.height()
+        self.format = image.format()
+        self.bytes_per_line = image.bytesPerLine()
+        self.image = image              # QImage while compressing, then None
+        self.blob = None                # zlib-compressed pixels
+        self.image_hash = None          # dHash, computed with the compression
+        self.deduplicate = deduplicate  # Replaces earlier captures that look the same
+
+    @property
+    def compressed_size(self):
+        return len(self.blob) if self.blob is not None else 0
+
+    def decompress(self):
+        """The capture as a QImage"""
+        if self.image is not None:
+            return self.image
+        data = zlib.decompress(self.blob)
+        # copy() detaches the image from data, which is freed on return
+        return QImage(data, self.width, self.height, self.bytes_per_line, self.format).copy()
+
+    def label(self):
+        return f"{self.captured_at:%H:%M:%S}  {self.width}×{self.height}"
+
+
+class CompressSignals(QObject):
+    """Signals emitted by CompressTask (QRunnable cannot emit signals itself)"""
+    compressed = pyqtSignal(int, object, object)  # entry id, compressed bytes, dHash
+
+
+class CompressTask(QRunnable):
+    """Compress a capture's pixels, and hash it, on a thread pool worker"""
+
+    def __init__(self, entry_id, image, signals):
+        super().__init__()
+        self.entry_id = entry_id
+        self.image = image
+        self.signals = signals
+
+    def run(self):
+        pixels = self.image.constBits().asstring(self.image.sizeInBytes())
+        blob = zlib.compress(pixels, HISTORY_COMPRESS_LEVEL)
+        self.signals.compressed.emit(self.entry_id, blob, dhash(self.image))
+
+
+class CaptureHistory(QObject):
+    """Process-wide ring buffer of recent captures"""
+    changed = pyqtSignal()   # A capture was added or evicted
+
+    _instance = None
+
+    @classmethod
+    def instance(cls):
+        if cls._instance is None:
+            cls._instance = cls()
+        return cls._instance
+
+    def __init__(self, max_captures=None, budget_mb=None, parent=None):
+        super().__init__(parent)
+        settings = QSettings(APP_NAME, APP_NAME)
+        if max_captures is None:
+            max_captures = settings.value(MAX_CAPTURES_SETTINGS_KEY, HISTORY_MAX_CAPTURES, type=int)
+        if budget_mb is None:
+            budget_mb = settings.value(BUDGET_SETTINGS_KEY, HISTORY_BUDGET_MB, type=int)
+        self.max_captures = max_captures
+        self.budget_mb = budget_mb
+        self._entries = OrderedDict()   # entry id -> HistoryEntry, least recently used first
+        self._next_id = 1
+        # Unparented, so a task still compressing for a dropped history (a
+        # finished region watch) keeps its signals object alive
+        self._signals = CompressSignals()
+        self._signals.compressed.connect(self._on_compressed)
+
+    def entries(self):
+        """Captures in the history, newest first"""
+        return sorted(self._entries.values(), key=lambda entry: entry.entry_id, reverse=True)
+
+    def __len__(self):
+        return len(self._entries)
+
+    def compressed_bytes(self):
+        return sum(entry.compressed_size for entry in self._entries.values())
+
+    def add(self, screenshot, geometry=None, deduplicate=True):
+        """Keep a capture (QPixmap or QImage); compression starts in the background.
+
+        With deduplicate False the capture is kept even if it looks like an
+        earlier one (region watch frames differ in small details on purpose).
+        """
+        image = screenshot.toImage() if isinstance(screenshot, QPixmap) else QImage(screenshot)
+        entry = HistoryEntry(self._next_id, image, geometry, deduplicate)
+        self._next_id += 1
+        self._entries[entry.entry_id] = entry
+        QThreadPool.globalInstance().start(CompressTask(entry.entry_id, image, self._signals))
+        self._evict()
+        self.changed.emit()
+        return entry
+
+    def get(self, entry_id):
+        return self._entries.get(entry_id)
+
+    def pixmap(self, entry_id):
+        """Decompress a capture to reopen it, or None if it has been evicted"""
+        entry = self._entries.get(entry_id)
+        if entry is None:
+            return None
+        self._entries.move_to_end(entry_id)
+        return QPixmap.fromImage(entry.decompress())
+
+    def clear(self):
+        self._entries.clear()
+        self.changed.emit()
+
+    def set_limits(self, max_captures=None, budget_mb=None, persist=True):
+        """Change the caps, evicting at once if the history is over them"""
+        settings = QSettings(APP_NAME, APP_NAME) if persist else None
+        if max_captures is not None:
+            self.max_captures = max_captures
+            if settings is not None:
+                settings.setValue(MAX_CAPTURES_SETTINGS_KEY, max_captures)
+        if budget_mb is not None:
+            self.budget_mb = budget_mb
+            if settings is not None:
+                settings.setValue(BUDGET_SETTINGS_KEY, budget_mb)
+        if self._evict():
+            self.changed.emit()
+
+    def _on_compressed(self, entry_id, blob, image_hash):
+        entry = self._entries.get(entry_id)
+        if entry is None:
+            return  # Evicted while compressing
+        entry.blob = blob
+        entry.image = None
+        entry.image_hash = image_hash
+        changed = self._drop_duplicates_of(entry)
+        if self._evict() or changed:
+            self.changed.emit()
+
+    def _drop_duplicates_of(self, entry):
+        """Remove earlier captures that look the same as entry; True if any went"""
+        if entry.image_hash is None or not entry.deduplicate or duplicate_action() == "off":
+            return False
+        duplicates = [other.entry_id for other in self._entries.values()
+                      if other is not entry and other.image_hash is not None
+                      and other.entry_id < entry.entry_id
+                      and other.width == entry.width and other.height == entry.height
+                      and hamming_distance(other.image_hash, entry.image_hash)
+                      <= DUPLICATE_MAX_DISTANCE]
+        for entry_id in duplicates:
+            del self._entries[entry_id]
+        return bool(duplicates)
+
+    def _evict(self):
+        """Drop least recently used captures until within the caps; True if any went.
+
+        Captures still being compressed don't count towards the megabytes, and
+        the most recent capture is always kept.
+        """
+        budget = self.budget_mb * 1024 * 1024
+        evicted = False
+        total = self.compressed_bytes()
+        while len(self._entries) > 1 and (len(self._entries) > self.max_captures or total > budget):
+            _, entry = self._entries.popitem(last=False)
+            total -= entry.compressed_size
+            evicted = True
+        return evicted
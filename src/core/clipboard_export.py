@@ -0,0 +1,53 @@
+"""
+Clipboard export for SnapTrace
+Puts a rendered capture on the clipboard without writing a file.
+
+The clipboard only holds the QImage when copying; other formats are produced
+when an application pasting actually asks for them. PNG bytes in particular
+are encoded on the first request only, so copying a 4K capture returns at once.
+"""
+
+from PyQt5.QtCore import QBuffer, QByteArray, QIODevice, QMimeData
+from PyQt5.QtGui import QGuiApplication
+
+QT_IMAGE_MIME = "application/x-qt-image"  # What QMimeData.setImageData stores
+PNG_MIME = "image/png"
+
+
+class ImageMimeData(QMimeData):
+    """Clipboard data for one image whose PNG encoding is deferred"""
+
+    def __init__(self, image):
+        super().__init__()
+        self.image = image
+        self._png = None
+
+    def formats(self):
+        return [QT_IMAGE_MIME, PNG_MIME]
+
+    def hasFormat(self, mime_type):
+        return mime_type in (QT_IMAGE_MIME, PNG_MIME)
+
+    def retrieveData(self, mime_type, preferred_type):
+        if mime_type == QT_IMAGE_MIME:
+            return self.image
+        if mime_type == PNG_MIME:
+            if self._png is None:
+                self._png = encode_png(self.image)
+            return self._png
+        return super().retrieveData(mime_type, preferred_type)
+
+
+def encode_png(image):
+    """The image as PNG bytes in a QByteArray"""
+    data = QByteArray()
+    buffer = QBuffer(data)
+    buffer.open(QIODevice.WriteOnly)
+    image.save(buffer, "PNG")
+    buffer.close()
+    return data
+
+
+def copy_image_to_clipboard(image):
+    """Replace the clipboard contents with image; the clipboard takes ownership"""
+    QGuiApplication.clipboard().setMimeData(ImageMimeData(image))
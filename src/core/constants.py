@@ -10,6 +10,8 @@ from .utils import resource_path, external_data_path
 APP_NAME = "SnapTrace"
 APP_ICON = resource_path(os.path.join("assets", "logo.png"))
 DEFECT_CSV = external_data_path("defect_feedbacks.csv")  # External file next to executable
+# Folder of per-product feedback CSVs; used instead of DEFECT_CSV when it exists
+FEEDBACK_LIBRARY_DIR = external_data_path("feedback_libraries")
 
 # Icons directory path
 ICONS_DIR = resource_path(os.path.join("assets", "icons"))
@@ -19,3 +21,63 @@ DEFAULT_PEN_SIZE = 2
 DEFAULT_COUNTER_START = 1
 MAX_UNDO_STATES = 50
 DEFAULT_FONT_SIZE = 12
+
+# Memory budget for decoded embedded images (compressed blobs are not counted)
+IMAGE_STORE_BUDGET_MB = 256
+
+# Size cap of the on-disk thumbnail cache
+THUMBNAIL_CACHE_MB = 128
+
+# Captures whose perceptual hashes differ in at most this many of 64 bits are
+# duplicates (must stay below 4, the number of bands the hash index looks up)
+DUPLICATE_MAX_DISTANCE = 3
+
+# Similar-capture search lists captures at most this many bits away
+SIMILAR_MAX_DISTANCE = 15
+
+# Capture history: most captures kept, and megabytes of compressed captures
+HISTORY_MAX_CAPTURES = 20
+HISTORY_BUDGET_MB = 100
+
+# Editor tabs: megabytes of captures and undo history kept loaded across tabs,
+# and megabytes of unloaded tabs kept compressed in memory before spooling to disk
+DOCUMENT_MEMORY_BUDGET_MB = 512
+DOCUMENT_SPOOL_MEMORY_MB = 64
+
+# Scrolling capture: tallest stitched image (QPainter's coordinate limit is 32767),
+# and milliseconds between frames grabbed while scrolling
+SCROLL_CAPTURE_MAX_HEIGHT = 32000
+SCROLL_CAPTURE_INTERVAL_MS = 100
+
+# Region watch: grabs per second, percent of one core it may use, and the smallest
+# change (bounding box area in pixels) that counts, so a blinking caret doesn't
+# count as a change
+WATCH_RATE = 4
+WATCH_CPU_BUDGET = 10
+WATCH_MIN_CHANGE_PIXELS = 64
+# Changed frames a watch keeps in memory, and megabytes of them compressed; the
+# oldest go first, so a long watch never pushes out Recent Captures
+WATCH_MAX_FRAMES = 100
+WATCH_BUDGET_MB = 64
+
+# Region recording: frames per second, frames waiting for the encoder before new
+# ones are dropped, and the longest recording in seconds
+RECORD_FPS = 10
+RECORD_QUEUE_FRAMES = 32
+RECORD_MAX_SECONDS = 60
+
+# Pixel diff: largest per-channel difference still counted as unchanged, cell size
+# in pixels (changed areas about this close are boxed together), and most boxes added
+DIFF_TOLERANCE = 16
+DIFF_CELL_SIZE = 8
+DIFF_MAX_BOXES = 50
+
+# Redaction: pixelate block and blur radius in pixels per unit of tool size, and
+# megabytes of filtered regions kept so repaints don't filter again
+REDACT_PIXELATE_SCALE = 6
+REDACT_BLUR_SCALE = 3
+REDACTION_CACHE_MB = 64
+
+# Autosave journal: records between snapshots, and minimum seconds between fsyncs
+AUTOSAVE_COMPACT_RECORDS = 200
+AUTOSAVE_FSYNC_INTERVAL = 1.0
@@ -0,0 +1,425 @@
+"""
+Memory budget for open editor tabs in SnapTrace
+Tabs that are not being looked at give up their memory once the loaded
+documents together use more than the budget: the capture's pixels are
+compressed (zlib over the raw pixels, on a worker thread), the undo/redo
+history is serialized with the items shared between states written once, and
+decoded embedded images only that document uses are dropped from the image
+store. Unloaded documents beyond DOCUMENT_SPOOL_MEMORY_MB of compressed data
+move to a temporary spool file.
+
+The least recently shown tab is unloaded first, and a tab is loaded again
+when it is shown.
+"""
+
+import json
+import zlib
+import tempfile
+from collections import OrderedDict
+
+from PyQt5.QtCore import QObject, QRunnable, QSettings, QThreadPool, pyqtSignal
+from PyQt5.QtGui import QImage, QPixmap
+
+from .constants import APP_NAME, DOCUMENT_MEMORY_BUDGET_MB, DOCUMENT_SPOOL_MEMORY_MB
+from .image_store import ImageStore
+from .project import (serialize_drawing, serialize_text, serialize_counter,
+                      deserialize_drawing, deserialize_text, deserialize_counter)
+
+SPOOL_COMPRESS_LEVEL = 1   # zlib level, as for the capture history
+BUDGET_SETTINGS_KEY = "documents/budget_mb"
+ITEM_BYTES = 200           # Rough memory of one annotation in the undo history
+POINT_BYTES = 64           # ...plus this per point of a shape or pencil stroke
+
+_LIVE_LISTS = ('drawings', 'text_items', 'counter_items')
+_STATE_LISTS = (
+    ('drawings', serialize_drawing, deserialize_drawing),
+    ('text_items', serialize_text, deserialize_text),
+    ('counter_items', serialize_counter, deserialize_counter),
+)
+
+
+def document_bytes(area):
+    """Approximate memory a loaded document holds: capture pixels plus undo history"""
+    total = 0
+    if area.screenshot is not None:
+        screenshot = area.screenshot
+        total += screenshot.width() * screenshot.height() * max(1, screenshot.depth() // 8)
+    seen = set()
+    for state in area.undo_stack + area.redo_stack:
+        for name in _LIVE_LISTS:
+            for item in state.get(name, ()):
+                if id(item) in seen:
+                    continue
+                seen.add(id(item))
+                total += ITEM_BYTES
+                if name == 'drawings':
+                    total += POINT_BYTES * len(item[2])
+    return total
+
+
+def serialize_history(area):
+    """JSON-ready dict of the undo/redo stacks, and the image handles it refers to.
+
+    Each distinct item is serialized once and states list item numbers. Items
+    of the live document are stored as their position instead, so they stay
+    shared with the document when the history is restored. Image drawings
+    refer to the returned handles by index.
+    """
+    live = {}
+    for name in _LIVE_LISTS:
+        for position, item in enumerate(getattr(area, name)):
+            live.setdefault(id(item), [name, position])
+
+    items = []
+    numbers = {}
+    images = []
+    image_numbers = {}
+
+    def number(item, serialize):
+        key = id(item)
+        if key not in numbers:
+            numbers[key] = len(items)
+            if key in live:
+                items.append({'live': live[key]})
+            else:
+                data = serialize(item)
+                if 'image' in data:
+                    handle = item[4]
+                    if id(handle) not in image_numbers:
+                        image_numbers[id(handle)] = len(images)
+                        images.append(handle)
+                    data['image'] = image_numbers[id(handle)]
+                items.append(data)
+        return numbers[key]
+
+    def state_json(state):
+        data = {name: [number(item, serialize) for item in state.get(name, [])]
+                for name, serialize, _ in _STATE_LISTS}
+        data['counter_value'] = state.get('counter_value', area.counter_start)
+        return data
+
+    history = {
+        'items': items,
+        'undo': [state_json(state) for state in area.undo_stack],
+        'redo': [state_json(state) for state in area.redo_stack],
+    }
+    return history, images
+
+
+def deserialize_history(data, area, images):
+    """Inverse of serialize_history; returns (undo_stack, redo_stack)"""
+    items = data['items']
+    restored = {}
+
+    def item(number, deserialize):
+        if number not in restored:
+            value = items[number]
+            if 'live' in value:
+                name, position = value['live']
+                restored[number] = getattr(area, name)[position]
+            elif deserialize is deserialize_drawing:
+                restored[number] = deserialize_drawing(value, images)
+            else:
+                restored[number] = deserialize(value)
+        return restored[number]
+
+    def state(state_data):
+        state = {name: [item(number, deserialize) for number in state_data[name]]
+                 for name, _, deserialize in _STATE_LISTS}
+        state['counter_value'] = state_data['counter_value']
+        state['images'] = tuple(drawing[4] for drawing in state['drawings'] if len(drawing) == 5)
+        return state
+
+    return [state(entry) for entry in data['undo']], [state(entry) for entry in data['redo']]
+
+
+def history_spillable(area):
+    """False if the history holds images outside the image store, which can't be serialized"""
+    for state in area.undo_stack + area.redo_stack:
+        for drawing in state.get('drawings', ()):
+            if len(drawing) == 5 and isinstance(drawing[4], QPixmap):
+                return False
+    return True
+
+
+class SpoolFile:
+    """Temporary file for unloaded documents that don't fit in memory.
+
+    Blobs are appended; the file is emptied once nothing in it is needed.
+    """
+
+    def __init__(self, directory=None):
+        self.directory = directory
+        self._file = None
+        self._end = 0
+        self._live = 0
+
+    def write(self, data):
+        """Append data; returns its offset"""
+        if self._file is None:
+            self._file = tempfile.TemporaryFile(prefix="snaptrace_spool_", dir=self.directory)
+        self._file.seek(self._end)
+        self._file.write(data)
+        offset = self._end
+        self._end += len(data)
+        self._live += 1
+        return offset
+
+    def read(self, offset, length):
+        """Read a blob back; it is no longer needed afterwards"""
+        self._file.seek(offset)
+        data = self._file.read(length)
+        self.release()
+        return data
+
+    def release(self):
+        """A blob is no longer needed"""
+        self._live -= 1
+        if self._live == 0:
+            self._file.truncate(0)
+            self._end = 0
+
+    def size(self):
+        return self._end
+
+    def close(self):
+        if self._file is not None:
+            self._file.close()
+            self._file = None
+
+
+class SpilledDocument:
+    """What an unloaded document keeps: compressed capture and history, in
+    memory or in the spool file"""
+    __slots__ = ('width', 'height', 'format', 'bytes_per_line', 'images',
+                 'pixels', 'history', 'offset', 'lengths')
+
+    def __init__(self, image, images):
+        self.width = image.width()
+        self.height = image.height()
+        self.format = image.format()
+        self.bytes_per_line = image.bytesPerLine()
+        self.images = images    # ImageHandles the history refers to by index
+        self.pixels = None      # zlib-compressed capture pixels
+        self.history = None     # zlib-compressed history JSON
+        self.offset = None      # Position in the spool file once spooled...
+        self.lengths = None     # ...and the sizes of the pixels and history there
+
+    @property
+    def memory_size(self):
+        if self.pixels is None:
+            return 0
+        return len(self.pixels) + len(self.history)
+
+    def move_to(self, spool):
+        """Write the compressed data to the spool file and let go of it"""
+        self.lengths = (len(self.pixels), len(self.history))
+        self.offset = spool.write(self.pixels + self.history)
+        self.pixels = None
+        self.history = None
+
+    def load_from(self, spool):
+        """(pixels, history) compressed data, read back from the spool file if needed"""
+        if self.offset is None:
+            return self.pixels, self.history
+        pixels_length, history_length = self.lengths
+        data = spool.read(self.offset, pixels_length + history_length)
+        return data[:pixels_length], data[pixels_length:]
+
+
+class SpillSignals(QObject):
+    """Signals emitted by SpillTask (QRunnable cannot emit signals itself)"""
+    spilled = pyqtSignal(int, object, object)  # spill id, compressed pixels, compressed history
+
+
+class SpillTask(QRunnable):
+    """Compress an unloading document's capture and history on a thread pool worker"""
+
+    def __init__(self, spill_id, image, history, signals):
+        super().__init__()
+        self.spill_id = spill_id
+        self.image = image
+        self.history = history
+        self.signals = signals
+
+    def run(self):
+        pixels = zlib.compress(self.image.constBits().asstring(self.image.sizeInBytes()),
+                               SPOOL_COMPRESS_LEVEL)
+        history = zlib.compress(json.dumps(self.history, separators=(',', ':')).encode('utf-8'),
+                                SPOOL_COMPRESS_LEVEL)
+        self.signals.spilled.emit(self.spill_id, pixels, history)
+
+
+class _OpenDocument:
+    __slots__ = ('area', 'spilled', 'spill_id')
+
+    def __init__(self, area):
+        self.area = area
+        self.spilled = None     # SpilledDocument while unloaded
+        self.spill_id = None    # Set while compression is in flight
+
+
+class DocumentSpool(QObject):
+    """Process-wide memory budget for the documents open in editor tabs.
+
+    Editors add() their documents, call show() when a tab becomes the current
+    one and remove() when it is closed.
+    """
+
+    _instance = None
+
+    @classmethod
+    def instance(cls):
+        if cls._instance is None:
+            cls._instance = cls()
+        return cls._instance
+
+    def __init__(self, budget_mb=None, spool_memory_mb=DOCUMENT_SPOOL_MEMORY_MB,
+                 spool_dir=None, parent=None):
+        super().__init__(parent)
+        if budget_mb is None:
+            budget_mb = QSettings(APP_NAME, APP_NAME).value(
+                BUDGET_SETTINGS_KEY, DOCUMENT_MEMORY_BUDGET_MB, type=int)
+        self.budget_mb = budget_mb
+        self.spool_memory_mb = spool_memory_mb
+        self.spool = SpoolFile(spool_dir)
+        self.image_store = ImageStore.instance()
+        self._documents = OrderedDict()   # id(area) -> _OpenDocument, least recently shown first
+        self._spilling = {}               # spill id -> (_OpenDocument, SpilledDocument)
+        self._next_spill_id = 0
+        self._signals = SpillSignals(self)
+        self._signals.spilled.connect(self._on_spilled)
+
+    def add(self, area):
+        """Track a newly opened document; it counts as shown"""
+        self._documents[id(area)] = _OpenDocument(area)
+        self._enforce_budget()
+
+    def remove(self, area):
+        """Forget a closed document"""
+        document = self._documents.pop(id(area), None)
+        if document is None:
+            return
+        self._cancel_spill(document)
+        if document.spilled is not None and document.spilled.offset is not None:
+            self.spool.release()
+        document.spilled = None
+
+    def show(self, area):
+        """A document's tab became current: load it if it was unloaded"""
+        document = self._documents.get(id(area))
+        if document is None:
+            return
+        self._documents.move_to_end(id(area))
+        self._cancel_spill(document)
+        if document.spilled is not None:
+            self._restore(document)
+        self._enforce_budget()
+
+    def is_unloaded(self, area):
+        document = self._documents.get(id(area))
+        return document is not None and document.spilled is not None
+
+    def loaded_bytes(self):
+        return sum(document_bytes(document.area) for document in self._documents.values()
+                   if document.spilled is None)
+
+    def compressed_bytes(self):
+        """Bytes of unloaded documents held in memory (not in the spool file)"""
+        return sum(document.spilled.memory_size for document in self._documents.values()
+                   if document.spilled is not None)
+
+    def set_budget(self, budget_mb, persist=True):
+        """Change the budget, unloading tabs at once if over it"""
+        self.budget_mb = budget_mb
+        if persist:
+            QSettings(APP_NAME, APP_NAME).setValue(BUDGET_SETTINGS_KEY, budget_mb)
+        self._enforce_budget()
+
+    # Unloading
+
+    def _enforce_budget(self):
+        """Unload least recently shown documents until the rest fit the budget.
+
+        The most recently shown document is always kept loaded, and documents
+        already being compressed count as unloaded.
+        """
+        budget = self.budget_mb * 1024 * 1024
+        loaded = [(document, document_bytes(document.area))
+                  for document in self._documents.values()
+                  if document.spilled is None and document.spill_id is None]
+        total = sum(size for _, size in loaded)
+        for document, size in loaded[:-1]:
+            if total <= budget:
+                break
+            if self._spill(document):
+                total -= size
+
+    def _spill(self, document):
+        area = document.area
+        if area.screenshot is None or area.screenshot.isNull() or not history_spillable(area):
+            return False
+        if area.is_typing:
+            area.stop_text_editing()
+        history, images = serialize_history(area)
+        image = area.screenshot.toImage()
+        spill_id = self._next_spill_id
+        self._next_spill_id += 1
+        document.spill_id = spill_id
+        self._spilling[spill_id] = (document, SpilledDocument(image, images))
+        QThreadPool.globalInstance().start(SpillTask(spill_id, image, history, self._signals))
+        return True
+
+    def _cancel_spill(self, document):
+        if document.spill_id is not None:
+            del self._spilling[document.spill_id]
+            document.spill_id = None
+
+    def _on_spilled(self, spill_id, pixels, history):
+        pending = self._spilling.pop(spill_id, None)
+        if pending is None:
+            return  # Shown again or closed while compressing
+        document, spilled = pending
+        document.spill_id = None
+        spilled.pixels = pixels
+        spilled.history = history
+        document.spilled = spilled
+
+        area = document.area
+        area.screenshot = None
+        area.undo_stack = []
+        area.redo_stack = []
+        # The store keeps the references reported before unloading, so the
+        # image blobs stay; only decoded pixmaps nobody else shows are freed
+        self.image_store.drop_owner_pixmaps(id(area))
+        self._spool_overflow()
+
+    def _spool_overflow(self):
+        """Move unloaded documents to the spool file while over the in-memory share"""
+        limit = self.spool_memory_mb * 1024 * 1024
+        total = self.compressed_bytes()
+        for document in self._documents.values():
+            if total <= limit:
+                break
+            spilled = document.spilled
+            if spilled is None or spilled.offset is not None:
+                continue
+            total -= spilled.memory_size
+            spilled.move_to(self.spool)
+
+    # Loading
+
+    def _restore(self, document):
+        spilled = document.spilled
+        pixels, history = spilled.load_from(self.spool)
+        document.spilled = None
+
+        area = document.area
+        data = zlib.decompress(pixels)
+        # copy() detaches the image from data, which is freed on return
+        image = QImage(data, spilled.width, spilled.height, spilled.bytes_per_line,
+                       spilled.format).copy()
+        area.screenshot = QPixmap.fromImage(image)
+        area.undo_stack, area.redo_stack = deserialize_history(
+            json.loads(zlib.decompress(history)), area, spilled.images)
+        area.update()
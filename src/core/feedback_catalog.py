@@ -0,0 +1,361 @@
+"""
+Shared defect-feedback catalog for SnapTrace
+The feedback CSV is parsed once per process on a worker thread and shared by
+every editor window.
+
+- A compact binary cache (keyed on the CSV's path, size and mtime) lets the
+  next launch skip CSV parsing entirely.
+- The CSV is watched with QFileSystemWatcher. When rows are appended only the
+  new bytes are parsed; any other edit triggers a full reload.
+"""
+
+import io
+import os
+import csv
+import zlib
+import struct
+import hashlib
+
+from PyQt5.QtCore import (QObject, QRunnable, QThreadPool, QTimer, QFileSystemWatcher,
+                          QStandardPaths, pyqtSignal)
+
+from .constants import DEFECT_CSV, FEEDBACK_LIBRARY_DIR
+from .search_index import SearchIndex
+
+CACHE_MAGIC = b"SNFC"
+CACHE_VERSION = 1
+# magic, version, csv size, csv mtime_ns, bytes parsed, tail crc, category column,
+# feedback column, row count
+_CACHE_HEADER = struct.Struct("<4sHQqQIiiI")
+_FIELD_SEPARATOR = "\x00"
+
+TAIL_CHECK_BYTES = 4096  # Bytes before the old end compared to detect appends
+RELOAD_DELAY_MS = 250    # Editors often write a file in several steps
+
+
+def display_text(category, feedback):
+    return f"{category}: {feedback}" if category else feedback
+
+
+def cache_path_for(csv_path):
+    cache_dir = QStandardPaths.writableLocation(QStandardPaths.CacheLocation)
+    if not cache_dir:
+        return None
+    digest = hashlib.sha1(os.path.abspath(csv_path).encode("utf-8")).hexdigest()[:16]
+    return os.path.join(cache_dir, f"feedback_catalog_{digest}.bin")
+
+
+class CatalogState:
+    """What was parsed from the CSV, used to validate the cache and detect appends"""
+    __slots__ = ('size', 'mtime_ns', 'parsed_bytes', 'tail_crc', 'category_column',
+                 'feedback_column')
+
+    def __init__(self, size=0, mtime_ns=0, parsed_bytes=0, tail_crc=0,
+                 category_column=-1, feedback_column=-1):
+        self.size = size
+        self.mtime_ns = mtime_ns
+        self.parsed_bytes = parsed_bytes
+        self.tail_crc = tail_crc
+        self.category_column = category_column
+        self.feedback_column = feedback_column
+
+
+def _tail_crc(data, end):
+    return zlib.crc32(data[max(0, end - TAIL_CHECK_BYTES):end])
+
+
+def _parse_rows(text, category_column, feedback_column):
+    entries = []
+    for row in csv.reader(io.StringIO(text, newline='')):
+        if not row:
+            continue  # Blank line, skipped like csv.DictReader does
+        category = row[category_column] if 0 <= category_column < len(row) else ''
+        feedback = row[feedback_column] if 0 <= feedback_column < len(row) else ''
+        entries.append((category, feedback))
+    return entries
+
+
+def parse_csv_bytes(data):
+    """Parse a whole feedback CSV; returns (entries, category column, feedback column)"""
+    text = data.decode("utf-8-sig")
+    header_end = text.find("\n") + 1 or len(text)
+    header = next(csv.reader([text[:header_end]]), [])
+    header = [name.strip() for name in header]
+    category_column = header.index('Category') if 'Category' in header else -1
+    feedback_column = header.index('Feedback') if 'Feedback' in header else -1
+    return (_parse_rows(text[header_end:], category_column, feedback_column),
+            category_column, feedback_column)
+
+
+def read_cache(cache_path, size, mtime_ns):
+    """Cached (entries, state) if the cache matches the CSV's size and mtime"""
+    try:
+        with open(cache_path, 'rb') as f:
+            data = f.read()
+    except OSError:
+        return None
+    if len(data) < _CACHE_HEADER.size:
+        return None
+    (magic, version, cached_size, cached_mtime, parsed_bytes, tail_crc, category_column,
+     feedback_column, count) = _CACHE_HEADER.unpack_from(data)
+    if magic != CACHE_MAGIC or version != CACHE_VERSION \
+            or cached_size != size or cached_mtime != mtime_ns:
+        return None
+    if count == 0:
+        entries = []
+    else:
+        fields = data[_CACHE_HEADER.size:].decode("utf-8").split(_FIELD_SEPARATOR)
+        if len(fields) != count * 2:
+            return None
+        entries = list(zip(fields[0::2], fields[1::2]))
+    return entries, CatalogState(size, mtime_ns, parsed_bytes, tail_crc, category_column,
+                                 feedback_column)
+
+
+def write_cache(cache_path, entries, state):
+    header = _CACHE_HEADER.pack(CACHE_MAGIC, CACHE_VERSION, state.size, state.mtime_ns,
+                                state.parsed_bytes, state.tail_crc, state.category_column,
+                                state.feedback_column, len(entries))
+    fields = []
+    for category, feedback in entries:
+        fields.append(category.replace(_FIELD_SEPARATOR, ""))
+        fields.append(feedback.replace(_FIELD_SEPARATOR, ""))
+    os.makedirs(os.path.dirname(cache_path), exist_ok=True)
+    temp_path = cache_path + ".tmp"
+    with open(temp_path, 'wb') as f:
+        f.write(header)
+        f.write(_FIELD_SEPARATOR.join(fields).encode("utf-8"))
+    os.replace(temp_path, cache_path)
+
+
+class CatalogResult:
+    """Outcome of a CatalogLoadTask: kind is 'reset', 'append', 'unchanged' or 'error'"""
+    __slots__ = ('kind', 'entries', 'texts', 'state', 'error', 'index')
+
+    def __init__(self, kind, entries=None, texts=None, state=None, error=None):
+        self.kind = kind
+        self.entries = entries or []
+        self.texts = texts or []
+        self.state = state
+        self.error = error
+        self.index = None
+
+
+class CatalogSignals(QObject):
+    """Signals emitted by CatalogLoadTask (QRunnable cannot emit signals itself)"""
+    finished = pyqtSignal(object)  # CatalogResult
+
+
+class CatalogLoadTask(QRunnable):
+    """Load the catalog on a worker thread.
+
+    With a previous state and entries it first tries to parse only rows
+    appended since then; otherwise the binary cache is tried before the CSV.
+    For appends only the new entries are returned.
+    """
+
+    def __init__(self, csv_path, cache_path, signals, previous_state=None, previous_entries=()):
+        super().__init__()
+        self.csv_path = csv_path
+        self.cache_path = cache_path
+        self.signals = signals
+        self.previous_state = previous_state
+        self.previous_entries = previous_entries
+
+    def run(self):
+        try:
+            result = self._load()
+        except (OSError, UnicodeDecodeError, csv.Error) as e:
+            result = CatalogResult('error', error=str(e))
+        if result.kind == 'reset':
+            # Build the search index here too, off the GUI thread
+            result.index = SearchIndex(result.texts, [entry[0] for entry in result.entries])
+        self.signals.finished.emit(result)
+
+    def _load(self):
+        if not os.path.exists(self.csv_path):
+            return CatalogResult('reset', state=CatalogState())
+        stat = os.stat(self.csv_path)
+        previous = self.previous_state
+        if previous is not None and previous.size == stat.st_size \
+                and previous.mtime_ns == stat.st_mtime_ns:
+            return CatalogResult('unchanged', state=previous)
+
+        if previous is not None and previous.parsed_bytes and stat.st_size > previous.parsed_bytes:
+            appended = self._read_appended(previous, stat)
+            if appended is not None:
+                return appended
+
+        if previous is None and self.cache_path:
+            cached = read_cache(self.cache_path, stat.st_size, stat.st_mtime_ns)
+            if cached is not None:
+                entries, state = cached
+                return CatalogResult('reset', entries, [display_text(*entry) for entry in entries],
+                                     state)
+
+        with open(self.csv_path, 'rb') as f:
+            data = f.read()
+        entries, category_column, feedback_column = parse_csv_bytes(data)
+        state = CatalogState(stat.st_size, stat.st_mtime_ns, len(data),
+                             _tail_crc(data, len(data)), category_column, feedback_column)
+        self._save_cache(entries, state)
+        return CatalogResult('reset', entries, [display_text(*entry) for entry in entries], state)
+
+    def _read_appended(self, previous, stat):
+        """New entries if the file only grew past what was parsed, else None"""
+        start = max(0, previous.parsed_bytes - TAIL_CHECK_BYTES)
+        with open(self.csv_path, 'rb') as f:
+            f.seek(start)
+            data = f.read()
+        old_end = previous.parsed_bytes - start
+        if zlib.crc32(data[:old_end]) != previous.tail_crc:
+            return None  # Earlier content changed
+        if old_end and data[old_end - 1:old_end] not in (b"\n", b"\r"):
+            return None  # The last row was extended rather than a row added
+        entries = _parse_rows(data[old_end:].decode("utf-8"), previous.category_column,
+                              previous.feedback_column)
+        state = CatalogState(stat.st_size, stat.st_mtime_ns, start + len(data),
+                             _tail_crc(data, len(data)), previous.category_column,
+                             previous.feedback_column)
+        self._save_cache(list(self.previous_entries) + entries, state)
+        return CatalogResult('append', entries, [display_text(*entry) for entry in entries], state)
+
+    def _save_cache(self, entries, state):
+        if not self.cache_path:
+            return
+        try:
+            write_cache(self.cache_path, entries, state)
+        except OSError as e:
+            print(f"Could not write feedback catalog cache: {e}")
+
+
+class FeedbackCatalog(QObject):
+    """Process-wide list of feedback phrases, shared by all editor windows.
+
+    entries holds (category, feedback) tuples and texts the matching list
+    labels. Both are replaced (never mutated) on reload and extended on
+    append, so windows can keep references between signals. index is a
+    SearchIndex over texts.
+    """
+    reset = pyqtSignal()            # entries/texts replaced
+    appended = pyqtSignal(int)      # rows from this index on are new
+    failed = pyqtSignal(str)        # the CSV could not be read
+
+    _instance = None
+
+    @classmethod
+    def instance(cls):
+        if cls._instance is None:
+            if os.path.isdir(FEEDBACK_LIBRARY_DIR):
+                from .feedback_library import FeedbackLibraryCatalog
+                cls._instance = FeedbackLibraryCatalog(FEEDBACK_LIBRARY_DIR)
+            else:
+                cls._instance = cls(DEFECT_CSV)
+            cls._instance.load()
+        return cls._instance
+
+    def __init__(self, csv_path, cache_path=None, parent=None):
+        super().__init__(parent)
+        self.csv_path = os.path.abspath(csv_path)
+        self.cache_path = cache_path or cache_path_for(self.csv_path)
+        self.entries = []
+        self.texts = []
+        self.index = SearchIndex()
+        self._rows_by_text = None  # text -> first row, built on demand
+        self.state = None
+        self.loaded = False
+        self.error = None
+        self._loading = False
+        self._reload_pending = False
+
+        self._signals = CatalogSignals()
+        self._signals.finished.connect(self._on_finished)
+
+        self._reload_timer = QTimer(self)
+        self._reload_timer.setSingleShot(True)
+        self._reload_timer.setInterval(RELOAD_DELAY_MS)
+        self._reload_timer.timeout.connect(self.load)
+
+        self.watcher = QFileSystemWatcher(self)
+        self.watcher.fileChanged.connect(self._on_file_changed)
+        # Watching the folder catches the CSV being created or replaced
+        self.watcher.directoryChanged.connect(self._on_file_changed)
+        self._watch()
+
+    def load(self):
+        """(Re)load in the background; appended rows are parsed incrementally"""
+        if self._loading:
+            self._reload_pending = True
+            return
+        self._loading = True
+        QThreadPool.globalInstance().start(CatalogLoadTask(
+            self.csv_path, self.cache_path, self._signals, self.state, self.entries))
+
+    def _append(self, entries, texts, index=None):
+        """Add rows to the lists and the index; returns the first new row.
+
+        index, if given, already indexes texts and is merged in.
+        """
+        first = len(self.entries)
+        self.entries = self.entries + entries
+        self.texts = self.texts + texts
+        if index is not None:
+            self.index.merge(index)
+        else:
+            self.index.add(texts, [entry[0] for entry in entries])
+        if self._rows_by_text is not None:
+            for row, text in enumerate(texts, start=first):
+                self._rows_by_text.setdefault(text, row)
+        return first
+
+    def row_of(self, text):
+        """Row of the first phrase displayed as text, or None"""
+        if self._rows_by_text is None:
+            self._rows_by_text = {}
+            for row, phrase in enumerate(self.texts):
+                self._rows_by_text.setdefault(phrase, row)
+        return self._rows_by_text.get(text)
+
+    def wait_until_loaded(self, timeout_ms=-1):
+        """Block until the current load has been delivered (for scripts and benchmarks)"""
+        from PyQt5.QtCore import QCoreApplication
+        QThreadPool.globalInstance().waitForDone(timeout_ms)
+        QCoreApplication.processEvents()
+        return self.loaded
+
+    def _watch(self):
+        directory = os.path.dirname(self.csv_path)
+        if os.path.isdir(directory) and directory not in self.watcher.directories():
+            self.watcher.addPath(directory)
+        if os.path.exists(self.csv_path) and self.csv_path not in self.watcher.files():
+            self.watcher.addPath(self.csv_path)
+
+    def _on_file_changed(self, _path):
+        self._reload_timer.start()
+
+    def _on_finished(self, result):
+        self._loading = False
+        if result.kind == 'error':
+            self.error = result.error
+            print(f"Error loading defect feedbacks: {result.error}")
+            self.failed.emit(result.error)
+        elif result.kind == 'append':
+            first = self._append(result.entries, result.texts)
+            self.state = result.state
+            if result.entries:
+                self.appended.emit(first)
+        elif result.kind == 'reset':
+            self.entries = result.entries
+            self.texts = result.texts
+            self.index = result.index
+            self._rows_by_text = None
+            self.state = result.state
+            self.error = None
+            self.loaded = True
+            self.reset.emit()
+        else:
+            self.state = result.state
+        self._watch()  # Replaced files drop out of the watcher
+        if self._reload_pending:
+            self._reload_pending = False
+            self.load()
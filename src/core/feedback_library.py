@@ -0,0 +1,135 @@
+"""
+Feedback libraries for SnapTrace
+A folder of feedback CSVs (one per product: mesh, web, mobile...) used in place
+of the single defect_feedbacks.csv. Sub-folders group libraries, so
+"mobile/android.csv" is the library "mobile/android".
+
+Only the folder is scanned at start-up. A library's phrases are parsed (or read
+from its binary cache) and indexed on a worker thread the first time it is
+expanded or a search needs it, then appended to the shared catalog lists and
+merged into the shared search index. Any change in the folder, or to a loaded
+library, rescans it and reloads the libraries that were loaded.
+"""
+
+import os
+
+from PyQt5.QtCore import QThreadPool, pyqtSignal
+
+from .feedback_catalog import (FeedbackCatalog, CatalogLoadTask, CatalogSignals,
+                               cache_path_for)
+from .search_index import SearchIndex
+
+LIBRARY_EXTENSION = ".csv"
+
+
+class FeedbackLibrary:
+    """One CSV in a library folder and, once loaded, where its rows are"""
+
+    def __init__(self, path, name):
+        self.path = path
+        self.name = name
+        self.state = 'unloaded'   # 'loading', 'loaded' or 'error'
+        self.error = None
+        self.first_row = 0        # Catalog rows first_row .. first_row + row_count - 1
+        self.row_count = 0
+        self.categories = {}      # category -> catalog rows, in file order
+
+
+def discover_libraries(directory):
+    """Libraries under directory, sorted by name"""
+    libraries = []
+    for root, dirs, files in os.walk(directory):
+        dirs.sort()
+        for filename in sorted(files):
+            if filename.lower().endswith(LIBRARY_EXTENSION):
+                path = os.path.join(root, filename)
+                name = os.path.splitext(os.path.relpath(path, directory))[0]
+                libraries.append(FeedbackLibrary(path, name.replace(os.sep, "/")))
+    return libraries
+
+
+class FeedbackLibraryCatalog(FeedbackCatalog):
+    """FeedbackCatalog over a folder of libraries loaded on demand.
+
+    entries, texts and index only hold the libraries loaded so far, in the
+    order they finished loading; appended is emitted as each one arrives.
+    """
+    library_loaded = pyqtSignal(object)   # FeedbackLibrary, after appended
+
+    libraries = ()
+
+    def __init__(self, directory, parent=None):
+        self._generation = 0
+        super().__init__(directory, parent=parent)
+
+    def load(self):
+        """Rescan the folder; libraries that were loaded are loaded again"""
+        reload_paths = {library.path for library in self.libraries
+                        if library.state in ('loaded', 'loading')}
+        self._generation += 1  # Results still on their way are dropped
+        try:
+            self.libraries = discover_libraries(self.csv_path)
+            self.error = None
+        except OSError as e:
+            self.libraries = []
+            self.error = str(e)
+            print(f"Error reading feedback libraries: {e}")
+        self.entries = []
+        self.texts = []
+        self.index = SearchIndex()
+        self._rows_by_text = None
+        self.loaded = True
+        self.reset.emit()
+        self._watch()
+        for library in self.libraries:
+            if library.path in reload_paths:
+                self.load_library(library)
+
+    def load_library(self, library):
+        """Start loading one library, unless it is loaded or on its way"""
+        if library.state != 'unloaded':
+            return
+        library.state = 'loading'
+        signals = CatalogSignals(self)
+        generation = self._generation
+        signals.finished.connect(
+            lambda result: self._on_library_finished(library, generation, signals, result))
+        QThreadPool.globalInstance().start(CatalogLoadTask(
+            library.path, cache_path_for(library.path), signals))
+
+    def load_all(self):
+        """Start loading every library, e.g. before a search"""
+        for library in self.libraries:
+            self.load_library(library)
+
+    def _on_library_finished(self, library, generation, signals, result):
+        signals.deleteLater()
+        if generation != self._generation:
+            return
+        if result.kind == 'error':
+            library.state = 'error'
+            library.error = result.error
+            print(f"Error loading feedback library {library.name}: {result.error}")
+            self.failed.emit(f"{library.name}: {result.error}")
+            return
+        first = self._append(result.entries, result.texts, result.index)
+        library.first_row = first
+        library.row_count = len(result.entries)
+        for row, (category, _feedback) in enumerate(result.entries, start=first):
+            library.categories.setdefault(category, []).append(row)
+        library.state = 'loaded'
+        self._watch()
+        if result.entries:
+            self.appended.emit(first)
+        self.library_loaded.emit(library)
+
+    def _watch(self):
+        # The folders catch libraries being added, removed or replaced; loaded
+        # libraries are also watched for edits
+        paths = [self.csv_path]
+        paths += sorted({os.path.dirname(library.path) for library in self.libraries})
+        paths += [library.path for library in self.libraries if library.state == 'loaded']
+        watched = set(self.watcher.files()) | set(self.watcher.directories())
+        new_paths = [path for path in paths if path not in watched and os.path.exists(path)]
+        if new_paths:
+            self.watcher.addPaths(new_paths)
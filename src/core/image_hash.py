@@ -0,0 +1,411 @@
+"""
+Duplicate capture detection for SnapTrace
+A 64-bit difference hash (dHash) summarises what a capture looks like: it
+survives re-encoding, small scaling differences and the odd annotation, so two
+captures of the same screen hash within a few bits of each other.
+
+Hashes of the images in each save folder are kept in a SQLite index so saving
+only looks the new hash up instead of re-reading the folder. Each hash is also
+stored as four 16-bit bands; two hashes at most DUPLICATE_MAX_DISTANCE bits
+apart share at least one band exactly, so a lookup is four indexed queries
+(O(log n)) followed by an exact check of the few candidates.
+
+Searching the whole archive for the captures most like a screenshot uses the
+same bands in memory (SimilarityIndex), probing band values a few bits away
+as well to reach larger distances.
+"""
+
+import os
+import sqlite3
+
+from itertools import combinations
+
+from PyQt5.QtCore import (QObject, QRunnable, QSettings, QStandardPaths, QThreadPool, Qt,
+                          pyqtSignal)
+from PyQt5.QtGui import QImage, QImageReader
+
+from .constants import APP_NAME, DUPLICATE_MAX_DISTANCE, SIMILAR_MAX_DISTANCE
+
+try:
+    import numpy as np
+    NUMPY_AVAILABLE = True
+except ImportError:
+    NUMPY_AVAILABLE = False
+
+HASH_DB_NAME = "image_hashes.sqlite3"
+DUPLICATE_SETTINGS_KEY = "duplicates/action"
+DUPLICATE_ACTIONS = ("warn", "skip", "off")   # On saving a near-identical capture
+IMAGE_EXTENSIONS = (".png", ".jpg", ".jpeg", ".bmp")
+PREVIEW_SIZE = 256   # Images are first shrunk to this, which is cheap to read from JPEG
+BAND_COUNT = 4
+BAND_BITS = 64 // BAND_COUNT
+BAND_MASK = (1 << BAND_BITS) - 1
+INDEX_BATCH = 200    # Folder scan rows written per transaction
+SIMILAR_RESULT_LIMIT = 24
+
+
+def hash_db_path():
+    base = QStandardPaths.writableLocation(QStandardPaths.AppLocalDataLocation)
+    return os.path.join(base or os.path.expanduser(f"~/.{APP_NAME.lower()}"), HASH_DB_NAME)
+
+
+def duplicate_action():
+    """What saving a near-identical capture does: 'warn', 'skip' or 'off'"""
+    action = QSettings(APP_NAME, APP_NAME).value(DUPLICATE_SETTINGS_KEY, "warn", type=str)
+    return action if action in DUPLICATE_ACTIONS else "warn"
+
+
+def set_duplicate_action(action):
+    QSettings(APP_NAME, APP_NAME).setValue(DUPLICATE_SETTINGS_KEY, action)
+
+
+def dhash(image):
+    """64-bit difference hash of a QImage or QPixmap; None for a null image.
+
+    The image is shrunk to 9x8 grey levels and each bit records whether a
+    pixel is brighter than its right-hand neighbour.
+    """
+    if image.isNull():
+        return None
+    if not isinstance(image, QImage):
+        image = image.toImage()
+    if image.width() > PREVIEW_SIZE or image.height() > PREVIEW_SIZE:
+        # Same first step as hashing a file read at preview size, so both agree
+        image = image.scaled(image.size().scaled(PREVIEW_SIZE, PREVIEW_SIZE, Qt.KeepAspectRatio),
+                             Qt.IgnoreAspectRatio, Qt.SmoothTransformation)
+    return _difference_bits(image)
+
+
+def dhash_file(path):
+    """dHash of an image file, decoded at preview size; None if unreadable"""
+    reader = QImageReader(path)
+    reader.setAutoTransform(True)
+    size = reader.size()
+    if size.isValid() and (size.width() > PREVIEW_SIZE or size.height() > PREVIEW_SIZE):
+        reader.setScaledSize(size.scaled(PREVIEW_SIZE, PREVIEW_SIZE, Qt.KeepAspectRatio))
+    image = reader.read()
+    return None if image.isNull() else dhash(image)
+
+
+def _difference_bits(image):
+    """The 64 comparison bits of a dHash, the top row's leftmost first.
+
+    With NumPy all 64 comparisons are one array operation, packed into bytes;
+    otherwise they are made one at a time. Both give the same value.
+    """
+    tiny = image.scaled(9, 8, Qt.IgnoreAspectRatio, Qt.SmoothTransformation)
+    grey = tiny.convertToFormat(QImage.Format_Grayscale8)
+    stride = grey.bytesPerLine()
+    pixels = grey.constBits().asstring(stride * 8)
+    if NUMPY_AVAILABLE:
+        grid = np.frombuffer(pixels, np.uint8).reshape(8, stride)[:, :9]
+        return int.from_bytes(np.packbits(grid[:, :-1] > grid[:, 1:]).tobytes(), "big")
+    value = 0
+    for y in range(8):
+        row = pixels[y * stride:y * stride + 9]
+        for x in range(8):
+            value = (value << 1) | (row[x] > row[x + 1])
+    return value
+
+
+def hamming_distance(a, b):
+    return (a ^ b).bit_count()
+
+
+def bands(image_hash):
+    return [(image_hash >> (shift * BAND_BITS)) & BAND_MASK for shift in range(BAND_COUNT)]
+
+
+def _signed(image_hash):
+    # SQLite integers are signed 64-bit
+    return image_hash - (1 << 64) if image_hash >= 1 << 63 else image_hash
+
+
+def _unsigned(value):
+    return value + (1 << 64) if value < 0 else value
+
+
+def band_probes(flipped_bits):
+    """Masks with exactly flipped_bits of a band's bits set"""
+    return [sum(1 << bit for bit in bits) for bits in combinations(range(BAND_BITS), flipped_bits)]
+
+
+def open_hash_db(path):
+    connection = sqlite3.connect(path, timeout=10)
+    connection.execute("PRAGMA journal_mode=WAL")  # Lookups don't wait for a folder scan
+    connection.execute("CREATE TABLE IF NOT EXISTS image_hashes ("
+                       "path TEXT PRIMARY KEY, directory TEXT NOT NULL, "
+                       "size INTEGER NOT NULL, mtime_ns INTEGER NOT NULL, "
+                       "hash INTEGER NOT NULL, "
+                       + ", ".join(f"band{band} INTEGER NOT NULL" for band in range(BAND_COUNT))
+                       + ")")
+    for band in range(BAND_COUNT):
+        connection.execute(f"CREATE INDEX IF NOT EXISTS image_hashes_band{band} "
+                           f"ON image_hashes (directory, band{band})")
+    return connection
+
+
+def _row(path, stat, image_hash):
+    directory = os.path.dirname(os.path.abspath(path))
+    return (os.path.abspath(path), directory, stat.st_size, stat.st_mtime_ns,
+            _signed(image_hash), *bands(image_hash))
+
+
+def _store(connection, rows):
+    columns = ", ".join(f"band{band}" for band in range(BAND_COUNT))
+    placeholders = ", ".join("?" * (5 + BAND_COUNT))
+    with connection:
+        connection.executemany(
+            f"INSERT OR REPLACE INTO image_hashes (path, directory, size, mtime_ns, hash, "
+            f"{columns}) VALUES ({placeholders})", rows)
+
+
+class SimilarityIndex:
+    """In-memory multi-index hash table for nearest-neighbour search.
+
+    Every hash is filed under each of its band values. A hash within
+    (BAND_COUNT * (r + 1) - 1) bits of the query differs from it by at most r
+    bits in some band, so probing every band value within r bits finds all of
+    them; nearest() widens r until it has enough matches.
+    """
+
+    def __init__(self):
+        self.paths = []       # Row -> path, None once removed
+        self.hashes = []      # Row -> hash
+        self._rows = {}       # path -> row
+        self._tables = [{} for _ in range(BAND_COUNT)]  # band value -> rows
+        self._probes = []     # band_probes(r) for r = 0, 1, ...
+
+    def __len__(self):
+        return len(self._rows)
+
+    def set(self, path, image_hash):
+        self.discard(path)
+        row = len(self.paths)
+        self.paths.append(path)
+        self.hashes.append(image_hash)
+        self._rows[path] = row
+        for table, value in zip(self._tables, bands(image_hash)):
+            table.setdefault(value, []).append(row)
+
+    def extend(self, items):
+        """Add (path, hash) pairs for paths not in the index yet; faster than set()"""
+        paths, hashes, rows = self.paths, self.hashes, self._rows
+        tables = [(table, shift * BAND_BITS) for shift, table in enumerate(self._tables)]
+        for path, image_hash in items:
+            row = len(paths)
+            paths.append(path)
+            hashes.append(image_hash)
+            rows[path] = row
+            for table, shift in tables:
+                value = (image_hash >> shift) & BAND_MASK
+                bucket = table.get(value)
+                if bucket is None:
+                    table[value] = [row]
+                else:
+                    bucket.append(row)
+
+    def discard(self, path):
+        row = self._rows.pop(path, None)
+        if row is None:
+            return
+        self.paths[row] = None
+        for table, value in zip(self._tables, bands(self.hashes[row])):
+            rows = table[value]
+            rows.remove(row)
+            if not rows:
+                del table[value]
+
+    def discard_directory(self, directory):
+        for path in [path for path in self._rows if os.path.dirname(path) == directory]:
+            self.discard(path)
+
+    def nearest(self, image_hash, limit=SIMILAR_RESULT_LIMIT, max_distance=SIMILAR_MAX_DISTANCE):
+        """Up to limit (distance, path) pairs within max_distance bits, closest first"""
+        query_bands = bands(image_hash)
+        distances = {}   # row -> distance, for every row seen so far
+        band_radius = 0
+        while True:
+            if band_radius == len(self._probes):
+                self._probes.append(band_probes(band_radius))
+            for table, value in zip(self._tables, query_bands):
+                for probe in self._probes[band_radius]:
+                    for row in table.get(value ^ probe, ()):
+                        if row not in distances:
+                            distances[row] = hamming_distance(image_hash, self.hashes[row])
+            # Every row this close has been seen by now
+            complete = min(BAND_COUNT * (band_radius + 1) - 1, max_distance)
+            found = sorted((distance, self.paths[row]) for row, distance in distances.items()
+                           if distance <= complete)
+            if len(found) >= limit or complete >= max_distance:
+                return found[:limit]
+            band_radius += 1
+
+
+class IndexSignals(QObject):
+    """Signals emitted by IndexFolderTask (QRunnable cannot emit signals itself)"""
+    finished = pyqtSignal(str)   # directory
+
+
+class IndexFolderTask(QRunnable):
+    """Bring one folder's hashes up to date on a worker thread.
+
+    Only files that are new or whose size or modification time changed are
+    decoded; rows of deleted files are removed.
+    """
+
+    def __init__(self, db_path, directory, signals=None):
+        super().__init__()
+        self.db_path = db_path
+        self.directory = os.path.abspath(directory)
+        self.signals = signals
+
+    def run(self):
+        try:
+            connection = open_hash_db(self.db_path)
+        except (OSError, sqlite3.Error) as e:
+            print(f"Could not open image hash index {self.db_path}: {e}")
+            return
+        try:
+            self._index(connection)
+        except (OSError, sqlite3.Error) as e:
+            print(f"Error indexing {self.directory}: {e}")
+        finally:
+            connection.close()
+        if self.signals is not None:
+            self.signals.finished.emit(self.directory)
+
+    def _index(self, connection):
+        known = {path: (size, mtime_ns) for path, size, mtime_ns in connection.execute(
+            "SELECT path, size, mtime_ns FROM image_hashes WHERE directory = ?",
+            (self.directory,))}
+        rows = []
+        for entry in os.scandir(self.directory):
+            if not entry.name.lower().endswith(IMAGE_EXTENSIONS) or not entry.is_file():
+                continue
+            path = os.path.abspath(entry.path)
+            stat = entry.stat()
+            if known.pop(path, None) == (stat.st_size, stat.st_mtime_ns):
+                continue
+            image_hash = dhash_file(path)
+            if image_hash is not None:
+                rows.append(_row(path, stat, image_hash))
+            if len(rows) >= INDEX_BATCH:
+                _store(connection, rows)
+                rows = []
+        if rows:
+            _store(connection, rows)
+        if known:  # No longer in the folder
+            with connection:
+                connection.executemany("DELETE FROM image_hashes WHERE path = ?",
+                                       [(path,) for path in known])
+
+
+class ImageHashIndex(QObject):
+    """Process-wide hash index of save folders; lookups run on the GUI thread"""
+    folder_indexed = pyqtSignal(str)   # directory whose hashes are up to date
+
+    _instance = None
+
+    @classmethod
+    def instance(cls):
+        if cls._instance is None:
+            cls._instance = cls()
+        return cls._instance
+
+    def __init__(self, path=None, parent=None):
+        super().__init__(parent)
+        self.path = path or hash_db_path()
+        self._refreshed = set()
+        self._similarity = None   # SimilarityIndex of every indexed image, loaded on first search
+        self._signals = IndexSignals(self)
+        self._signals.finished.connect(self._on_folder_indexed)
+        try:
+            os.makedirs(os.path.dirname(self.path), exist_ok=True)
+            self.connection = open_hash_db(self.path)
+        except (OSError, sqlite3.Error) as e:
+            print(f"Could not open image hash index {self.path}: {e}")
+            self.connection = None
+
+    def refresh(self, directory, force=False):
+        """Index a folder in the background (once per process unless forced)"""
+        directory = os.path.abspath(directory)
+        if self.connection is None or (directory in self._refreshed and not force):
+            return
+        self._refreshed.add(directory)
+        QThreadPool.globalInstance().start(IndexFolderTask(self.path, directory, self._signals))
+
+    def nearest(self, image_hash, limit=SIMILAR_RESULT_LIMIT, max_distance=SIMILAR_MAX_DISTANCE):
+        """The indexed images in any folder that look most like image_hash, as
+        (distance, path) pairs, closest first"""
+        if image_hash is None:
+            return []
+        similarity = self.similarity_index()
+        matches = []
+        for distance, path in similarity.nearest(image_hash, limit, max_distance):
+            if os.path.exists(path):
+                matches.append((distance, path))
+            else:
+                similarity.discard(path)  # Deleted since its folder was indexed
+        return matches
+
+    def similarity_index(self):
+        if self._similarity is None:
+            self._similarity = SimilarityIndex()
+            self._load_similarity_rows()
+        return self._similarity
+
+    def _load_similarity_rows(self, directory=None):
+        if self.connection is None:
+            return
+        query = "SELECT path, hash FROM image_hashes"
+        parameters = ()
+        if directory is not None:
+            query += " WHERE directory = ?"
+            parameters = (directory,)
+        try:
+            self._similarity.extend((path, _unsigned(stored)) for path, stored
+                                    in self.connection.execute(query, parameters))
+        except sqlite3.Error as e:
+            print(f"Could not read image hash index: {e}")
+
+    def _on_folder_indexed(self, directory):
+        if self._similarity is not None:
+            self._similarity.discard_directory(directory)
+            self._load_similarity_rows(directory)
+        self.folder_indexed.emit(directory)
+
+    def find_similar(self, directory, image_hash, max_distance=DUPLICATE_MAX_DISTANCE):
+        """Indexed images in directory within max_distance bits, as sorted
+        (distance, path) pairs; files deleted since indexing are skipped."""
+        if self.connection is None or image_hash is None:
+            return []
+        directory = os.path.abspath(directory)
+        candidates = {}
+        try:
+            for band, value in enumerate(bands(image_hash)):
+                for path, stored in self.connection.execute(
+                        f"SELECT path, hash FROM image_hashes WHERE directory = ? AND band{band} = ?",
+                        (directory, value)):
+                    candidates[path] = _unsigned(stored)
+        except sqlite3.Error as e:
+            print(f"Image hash lookup failed: {e}")
+            return []
+        matches = []
+        for path, stored in candidates.items():
+            distance = hamming_distance(image_hash, stored)
+            if distance <= max_distance and os.path.exists(path):
+                matches.append((distance, path))
+        return sorted(matches)
+
+    def add(self, path, image_hash):
+        """Record the hash of a file that was just written"""
+        if self.connection is None or image_hash is None:
+            return
+        try:
+            _store(self.connection, [_row(path, os.stat(path), image_hash)])
+        except (OSError, sqlite3.Error) as e:
+            print(f"Could not index {path}: {e}")
+            return
+        if self._similarity is not None:
+            self._similarity.set(os.path.abspath(path), image_hash)
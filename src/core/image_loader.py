@@ -0,0 +1,97 @@
+"""
+Asynchronous image decoding for SnapTrace
+Images are decoded on a worker thread, directly at the size they are displayed at
+"""
+
+import hashlib
+from PyQt5.QtCore import QObject, QRunnable, QSize, Qt, QBuffer, QByteArray, QIODevice, pyqtSignal
+from PyQt5.QtGui import QImage, QImageReader
+
+
+def fit_size(size, max_width, max_height):
+    """Return size scaled down (never up) to fit inside max_width x max_height"""
+    if size.width() <= max_width and size.height() <= max_height:
+        return QSize(size)
+    return size.scaled(max_width, max_height, Qt.KeepAspectRatio)
+
+
+def content_key(data):
+    """Content hash used to address image blobs"""
+    return hashlib.sha1(data).hexdigest()
+
+
+def read_image_size(data):
+    """Read the pixel size from an encoded image header without decoding it"""
+    buffer = QBuffer()
+    buffer.setData(QByteArray(data))
+    buffer.open(QIODevice.ReadOnly)
+    reader = QImageReader(buffer)
+    reader.setAutoTransform(True)
+    return reader.size()
+
+
+class DecodeResult:
+    """Outcome of an ImageDecodeTask, delivered on the GUI thread"""
+    __slots__ = ('request_id', 'image', 'data', 'key')
+
+    def __init__(self, request_id, image, data=None, key=None):
+        self.request_id = request_id
+        self.image = image
+        self.data = data
+        self.key = key
+
+
+class DecodeSignals(QObject):
+    """Signals emitted by ImageDecodeTask (QRunnable cannot emit signals itself)"""
+    decoded = pyqtSignal(object)  # DecodeResult
+
+
+class ImageDecodeTask(QRunnable):
+    """Decode an image on a thread pool worker at a given target size.
+
+    source is either a file path or the encoded bytes. When reading from a
+    file the raw bytes and their content key are returned with the result so
+    the caller can keep the compressed blob instead of re-reading the file.
+    """
+
+    def __init__(self, source, target_size, request_id, signals):
+        super().__init__()
+        self.source = source
+        self.target_size = target_size
+        self.request_id = request_id
+        self.signals = signals
+
+    def run(self):
+        data = key = None
+        if isinstance(self.source, str):
+            try:
+                with open(self.source, 'rb') as image_file:
+                    data = image_file.read()
+            except OSError as e:
+                print(f"Error reading image {self.source}: {e}")
+                self.signals.decoded.emit(DecodeResult(self.request_id, QImage()))
+                return
+            key = content_key(data)
+            encoded = data
+        else:
+            encoded = self.source
+
+        buffer = QBuffer()
+        buffer.setData(QByteArray(encoded))
+        buffer.open(QIODevice.ReadOnly)
+        reader = QImageReader(buffer)
+        reader.setAutoTransform(True)
+        source_size = reader.size()
+        if source_size.isValid() and self.target_size.isValid():
+            if (self.target_size.width() < source_size.width() or
+                    self.target_size.height() < source_size.height()):
+                # Let the codec decode straight to the target size (JPEG can skip
+                # most of the work) instead of decoding everything and rescaling
+                reader.setScaledSize(self.target_size)
+        image = reader.read()
+        if (not image.isNull() and not source_size.isValid() and self.target_size.isValid()
+                and (image.width() > self.target_size.width() or
+                     image.height() > self.target_size.height())):
+            # Format did not report its size up front, scale after decoding
+            image = image.scaled(self.target_size, Qt.KeepAspectRatio, Qt.SmoothTransformation)
+        self.signals.decoded.emit(DecodeResult(self.request_id, image, data, key))
@@ -0,0 +1,369 @@
+"""
+Content-addressed image store for SnapTrace
+Embedded images are kept once per unique content as a compressed blob, shared by
+every placement, and decoded on demand under a memory budget
+"""
+
+import os
+from collections import Counter, OrderedDict
+from PyQt5.QtCore import QObject, QSize, QThreadPool, pyqtSignal
+from PyQt5.QtGui import QImageReader, QPixmap
+
+from .constants import IMAGE_STORE_BUDGET_MB
+from .image_loader import (DecodeSignals, ImageDecodeTask, content_key, fit_size,
+                           read_image_size)
+
+
+class _StoreEntry:
+    """One unique image: its encoded blob plus at most one decoded pixmap"""
+    __slots__ = ('key', 'path', 'blob', 'original_size', 'pixmap', 'decoded_size',
+                 'pending_size', 'pending_request', 'merged_into', 'failed')
+
+    def __init__(self, key, path, blob, original_size):
+        self.key = key                  # Content hash, None while the import is hashing
+        self.path = path                # Source file for imports still in flight
+        self.blob = blob                # Encoded bytes (PNG/JPEG/...)
+        self.original_size = original_size
+        self.pixmap = None
+        self.decoded_size = QSize()
+        self.pending_size = QSize()
+        self.pending_request = None
+        self.merged_into = None         # Set when an import turned out to be a duplicate
+        self.failed = False
+
+    def resolve(self):
+        entry = self
+        while entry.merged_into is not None:
+            entry = entry.merged_into
+        return entry
+
+    def pixmap_bytes(self):
+        if self.pixmap is None:
+            return 0
+        return self.pixmap.width() * self.pixmap.height() * max(1, self.pixmap.depth() // 8)
+
+
+class ImageHandle:
+    """A placement's reference to an image in the store.
+
+    Stored in the image drawing tuple in place of a QPixmap. Several handles
+    can point at the same content; the pixels are decoded once and shared.
+    """
+    __slots__ = ('store', '_entry', 'display_size')
+
+    def __init__(self, store, entry, display_size):
+        self.store = store
+        self._entry = entry
+        self.display_size = QSize(display_size)
+
+    @property
+    def entry(self):
+        entry = self._entry.resolve()
+        self._entry = entry
+        return entry
+
+    @property
+    def key(self):
+        return self.entry.key
+
+    @property
+    def original_size(self):
+        return self.entry.original_size
+
+    def is_ready(self):
+        return self.entry.pixmap is not None
+
+    def pixmap(self, wanted_size=None):
+        """Decoded pixmap, or None while it is being decoded (draw a placeholder)"""
+        return self.store.pixmap(self.entry, wanted_size or self.display_size)
+
+    def blob(self):
+        """Encoded image bytes"""
+        return self.store.blob(self.entry)
+
+
+class ImageStore(QObject):
+    """Process-wide store of embedded images keyed by content hash.
+
+    - Imports are deduplicated by the SHA-1 of the file bytes, so the same
+      logo pasted five times is read, hashed and decoded once.
+    - Owners (drawing areas) report which handles their document and undo
+      history still hold via set_references(); blobs nobody references are
+      dropped.
+    - Decoded pixmaps are kept in LRU order and evicted once the memory
+      budget is exceeded, least recently painted first. Images an owner
+      reports as on screen (set_shown()) are never evicted, so the budget
+      can be exceeded by what is visible. Evicted images are decoded again
+      from the in-memory blob when next needed.
+    """
+    image_ready = pyqtSignal()  # A decode finished, repaint to pick it up
+    import_finished = pyqtSignal()  # An import was hashed, so its handles have a key
+
+    _instance = None
+
+    @classmethod
+    def instance(cls):
+        if cls._instance is None:
+            cls._instance = cls()
+        return cls._instance
+
+    def __init__(self, memory_budget=IMAGE_STORE_BUDGET_MB * 1024 * 1024, parent=None):
+        super().__init__(parent)
+        self.memory_budget = memory_budget
+        self._entries = {}              # key -> _StoreEntry
+        self._path_keys = {}            # (path, mtime, size) -> key, skips re-reading files
+        self._pending = {}              # request id -> _StoreEntry
+        self._owner_refs = {}           # owner id -> Counter of ImageHandle
+        self._shown = {}                # owner id -> set of _StoreEntry it has on screen
+        self._decoded = OrderedDict()   # _StoreEntry -> None, in LRU order
+        self._decoded_bytes = 0
+        self._next_request_id = 0
+        self._signals = DecodeSignals()
+        self._signals.decoded.connect(self._on_decoded)
+
+    # Importing
+
+    def import_file(self, path, max_width, max_height):
+        """Import an image file and return a handle, or None if it is unreadable.
+
+        Only the header is read on the calling thread. Reading, hashing and
+        decoding happen on a worker; the handle draws as a placeholder until
+        then. A file already in the store is not read again.
+        """
+        reader = QImageReader(path)
+        reader.setAutoTransform(True)
+        if not reader.canRead():
+            return None
+        original_size = reader.size()
+        if original_size.isValid():
+            display_size = fit_size(original_size, max_width, max_height)
+        else:
+            # Size unknown until decoded, reserve a square placeholder
+            side = min(max_width, max_height)
+            display_size = QSize(side, side)
+
+        path_key = self._path_key(path)
+        key = self._path_keys.get(path_key)
+        if key in self._entries:
+            return ImageHandle(self, self._entries[key], display_size)
+
+        entry = _StoreEntry(None, path, None, original_size)
+        self._start_decode(entry, path, display_size)
+        return ImageHandle(self, entry, display_size)
+
+    def import_bytes(self, data, max_width=None, max_height=None):
+        """Import encoded image bytes and return a handle, or None if unreadable"""
+        original_size = read_image_size(data)
+        if not original_size.isValid():
+            return None
+        key = content_key(data)
+        entry = self._entries.get(key)
+        if entry is None:
+            entry = _StoreEntry(key, None, bytes(data), original_size)
+            self._entries[key] = entry
+        display_size = original_size
+        if max_width and max_height:
+            display_size = fit_size(original_size, max_width, max_height)
+        return ImageHandle(self, entry, display_size)
+
+    def resolve_import(self, handle):
+        """Hash an import still in flight on the calling thread and return its key.
+
+        For saving before the worker is done; the worker still delivers the
+        pixels. Raises OSError if the file can no longer be read.
+        """
+        entry = handle.entry
+        if entry.key is None and entry.path:
+            with open(entry.path, 'rb') as image_file:
+                data = image_file.read()
+            self._finish_import(entry, content_key(data), data)
+            self.import_finished.emit()
+        return handle.key
+
+    def _path_key(self, path):
+        try:
+            stat = os.stat(path)
+        except OSError:
+            return None
+        return (os.path.abspath(path), stat.st_mtime_ns, stat.st_size)
+
+    # Access
+
+    def blob(self, entry):
+        """Encoded bytes of an entry, reading the source file if still importing"""
+        entry = entry.resolve()
+        if entry.blob is None and entry.path:
+            with open(entry.path, 'rb') as image_file:
+                return image_file.read()
+        return entry.blob
+
+    def pixmap(self, entry, wanted_size):
+        """Return the decoded pixmap for entry, scheduling a decode if needed"""
+        entry = entry.resolve()
+        if entry.failed:
+            return None
+        if entry.pixmap is not None:
+            self._decoded.move_to_end(entry)
+        self._request_size(entry, wanted_size)
+        return entry.pixmap
+
+    def _request_size(self, entry, size):
+        if entry.blob is None:
+            return  # Import still hashing, its first decode is already queued
+        if self._covers(entry.decoded_size, size) or self._covers(entry.pending_size, size):
+            return
+        if not entry.original_size.isValid():
+            if entry.pixmap is None and not entry.pending_size.isValid():
+                self._start_decode(entry, entry.blob, size)
+            return
+        if entry.pixmap is not None and self._covers(entry.decoded_size, entry.original_size):
+            return  # Already at full resolution
+
+        # Step up by powers of two so dragging a resize handle does not
+        # trigger a fresh decode for every pixel
+        target = QSize(entry.original_size)
+        divisor = 2
+        while True:
+            step = QSize(max(1, entry.original_size.width() // divisor),
+                         max(1, entry.original_size.height() // divisor))
+            if not self._covers(step, size):
+                break
+            target = step
+            divisor *= 2
+        self._start_decode(entry, entry.blob, target)
+
+    def _covers(self, available, wanted):
+        return (available.isValid() and available.width() >= wanted.width() and
+                available.height() >= wanted.height())
+
+    def _start_decode(self, entry, source, size):
+        self._next_request_id += 1
+        self._pending[self._next_request_id] = entry
+        entry.pending_request = self._next_request_id
+        entry.pending_size = QSize(size)
+        task = ImageDecodeTask(source, QSize(size), self._next_request_id, self._signals)
+        QThreadPool.globalInstance().start(task)
+
+    def _on_decoded(self, result):
+        entry = self._pending.pop(result.request_id, None)
+        if entry is None:
+            return
+        if entry.pending_request == result.request_id:
+            entry.pending_request = None
+            entry.pending_size = QSize()
+        if result.key is not None and entry.key is None and entry.merged_into is None:
+            entry = self._finish_import(entry, result.key, result.data)
+            self.import_finished.emit()
+        else:
+            # Plain decode, or an import resolve_import() already hashed
+            entry = entry.resolve()
+
+        if result.image.isNull():
+            if entry.pixmap is None:
+                entry.failed = True
+                print(f"Failed to decode image: {entry.path or entry.key}")
+        elif entry.pixmap is None or not self._covers(entry.decoded_size, result.image.size()):
+            if self._entries.get(entry.key) is entry:
+                self._set_pixmap(entry, QPixmap.fromImage(result.image))
+        self.image_ready.emit()
+
+    def _finish_import(self, entry, key, data):
+        """Give a freshly hashed import its key, merging it into a duplicate"""
+        path_key = self._path_key(entry.path)
+        if path_key is not None:
+            self._path_keys[path_key] = key
+        existing = self._entries.get(key)
+        if existing is not None:
+            entry.merged_into = existing
+            return existing
+        entry.key = key
+        entry.blob = data
+        entry.path = None
+        self._entries[key] = entry
+        if not entry.original_size.isValid():
+            entry.original_size = read_image_size(data)
+        return entry
+
+    def _set_pixmap(self, entry, pixmap):
+        self._drop_pixmap(entry)
+        entry.pixmap = pixmap
+        entry.decoded_size = pixmap.size()
+        self._decoded[entry] = None
+        self._decoded_bytes += entry.pixmap_bytes()
+        self._enforce_budget(keep=entry)
+
+    def _drop_pixmap(self, entry):
+        if entry in self._decoded:
+            self._decoded_bytes -= entry.pixmap_bytes()
+            del self._decoded[entry]
+        entry.pixmap = None
+        entry.decoded_size = QSize()
+
+    def _enforce_budget(self, keep=None):
+        """Evict off-screen pixmaps, least recently painted first, down to the budget"""
+        shown = set().union(*self._shown.values())
+        for entry in list(self._decoded):
+            if self._decoded_bytes <= self.memory_budget:
+                break
+            if entry is not keep and entry not in shown:
+                self._drop_pixmap(entry)
+
+    # Reference accounting
+
+    def set_references(self, owner_id, handles):
+        """Record the handles an owner (document plus undo history) holds.
+
+        handles is an iterable of ImageHandle; duplicates count as separate
+        references. Entries no owner references any more are released.
+        """
+        self._owner_refs[owner_id] = Counter(handles)
+        self._collect()
+
+    def set_shown(self, owner_id, handles):
+        """Record the images an owner drew on screen in its latest paint"""
+        self._shown[owner_id] = {handle.entry for handle in handles}
+
+    def release_owner(self, owner_id):
+        """Forget all references of an owner that went away"""
+        self._shown.pop(owner_id, None)
+        if self._owner_refs.pop(owner_id, None) is not None:
+            self._collect()
+
+    def drop_owner_pixmaps(self, owner_id):
+        """Free the decoded pixmaps of images only this owner references.
+
+        The references and blobs stay; used when a document is unloaded.
+        """
+        shared = set()
+        for other_id, refs in self._owner_refs.items():
+            if other_id != owner_id:
+                shared.update(handle.entry for handle in refs)
+        self._shown.pop(owner_id, None)
+        for handle in self._owner_refs.get(owner_id, ()):
+            if handle.entry not in shared:
+                self._drop_pixmap(handle.entry)
+
+    def reference_count(self, key):
+        entry = self._entries.get(key)
+        if entry is None:
+            return 0
+        return sum(count for refs in self._owner_refs.values()
+                   for handle, count in refs.items() if handle.entry is entry)
+
+    def _collect(self):
+        live = set()
+        for refs in self._owner_refs.values():
+            for handle in refs:
+                live.add(handle.entry)
+        for key, entry in list(self._entries.items()):
+            if entry not in live:
+                self._drop_pixmap(entry)
+                del self._entries[key]
+        for path_key, key in list(self._path_keys.items()):
+            if key not in self._entries:
+                del self._path_keys[path_key]
+
+    def memory_usage(self):
+        """Bytes held in blobs and decoded pixmaps"""
+        blob_bytes = sum(len(entry.blob) for entry in self._entries.values() if entry.blob)
+        return blob_bytes + self._decoded_bytes
@@ -0,0 +1,263 @@
+"""
+Input trace recording and replay for SnapTrace
+Records mouse, wheel and key events on a widget to a compact gzip'd JSON file
+and feeds them back through QTest, measuring how long each event takes to handle.
+
+Set SNAPTRACE_RECORD_TRACES to a directory to record every editor and selector session.
+"""
+
+import os
+import gzip
+import json
+import time
+from datetime import datetime
+
+from PyQt5.QtCore import QObject, QEvent, QPoint, QPointF, Qt
+from PyQt5.QtGui import QKeyEvent, QMouseEvent, QWheelEvent
+from PyQt5.QtWidgets import QApplication
+
+RECORD_ENV_VAR = "SNAPTRACE_RECORD_TRACES"
+TRACE_FORMAT = "snaptrace-trace"
+TRACE_VERSION = 1
+TRACE_EXTENSION = ".sntrace"
+
+# Event type codes used in the trace file
+_MOUSE_CODES = {
+    QEvent.MouseButtonPress: "P",
+    QEvent.MouseButtonRelease: "R",
+    QEvent.MouseButtonDblClick: "D",
+    QEvent.MouseMove: "M",
+}
+_KEY_CODES = {
+    QEvent.KeyPress: "K",
+    QEvent.KeyRelease: "U",
+}
+EVENT_NAMES = {
+    "P": "mouse_press", "R": "mouse_release", "D": "mouse_double_click",
+    "M": "mouse_move", "W": "wheel", "K": "key_press", "U": "key_release",
+}
+
+
+class InputRecorder(QObject):
+    """Event filter that records a widget's input events with timestamps.
+
+    Each event becomes a short list: [ms since start, code, ...fields].
+      mouse: x, y, button, buttons, modifiers
+      wheel: x, y, angle dx, angle dy, buttons, modifiers
+      key:   key, modifiers, text, autorepeat
+
+    state (optional) is called when the first event arrives and its dict is
+    stored in the metadata, so a replay can restore the view the gestures
+    were made in (widget size, zoom, ...).
+    """
+
+    def __init__(self, widget, metadata=None, state=None, parent=None):
+        super().__init__(parent)
+        self.widget = widget
+        self.metadata = dict(metadata or {})
+        self.state = state
+        self.events = []
+        self.started_at = None
+        self.recording = False
+
+    def start(self):
+        self.events = []
+        self.started_at = time.perf_counter()
+        self.recording = True
+        self.metadata.setdefault("widget", type(self.widget).__name__)
+        self.metadata.setdefault("recorded", datetime.now().isoformat(timespec="seconds"))
+        self.widget.installEventFilter(self)
+
+    def stop(self):
+        if self.recording:
+            self.recording = False
+            try:
+                self.widget.removeEventFilter(self)
+            except RuntimeError:
+                pass  # Widget already deleted
+
+    def eventFilter(self, watched, event):
+        if not self.recording:
+            return False
+        event_type = event.type()
+        if event_type not in _MOUSE_CODES and event_type not in _KEY_CODES \
+                and event_type != QEvent.Wheel:
+            return False
+        if not self.events:
+            self.metadata["size"] = [self.widget.width(), self.widget.height()]
+            if self.state is not None:
+                self.metadata.update(self.state())
+        elapsed = round((time.perf_counter() - self.started_at) * 1000, 1)
+        if event_type in _MOUSE_CODES:
+            pos = event.pos()
+            self.events.append([elapsed, _MOUSE_CODES[event_type], pos.x(), pos.y(),
+                                int(event.button()), int(event.buttons()), int(event.modifiers())])
+        elif event_type == QEvent.Wheel:
+            pos = event.pos()
+            delta = event.angleDelta()
+            self.events.append([elapsed, "W", pos.x(), pos.y(), delta.x(), delta.y(),
+                                int(event.buttons()), int(event.modifiers())])
+        elif event_type in _KEY_CODES:
+            self.events.append([elapsed, _KEY_CODES[event_type], event.key(),
+                                int(event.modifiers()), event.text(), int(event.isAutoRepeat())])
+        return False  # Never swallow the event
+
+    def to_dict(self):
+        return {
+            "format": TRACE_FORMAT,
+            "version": TRACE_VERSION,
+            "metadata": self.metadata,
+            "events": self.events,
+        }
+
+    def save(self, path):
+        """Write the trace as gzip-compressed JSON"""
+        save_trace(self.to_dict(), path)
+        return path
+
+
+def save_trace(trace, path):
+    with gzip.open(path, "wt", encoding="utf-8", compresslevel=6) as f:
+        json.dump(trace, f, separators=(",", ":"))
+
+
+def load_trace(path):
+    """Load a trace file, raising ValueError if it is not a SnapTrace trace"""
+    with gzip.open(path, "rt", encoding="utf-8") as f:
+        trace = json.load(f)
+    if trace.get("format") != TRACE_FORMAT:
+        raise ValueError(f"{path} is not a SnapTrace input trace")
+    if trace.get("version", 0) > TRACE_VERSION:
+        raise ValueError(f"{path} uses trace version {trace['version']}, "
+                         f"newer than supported version {TRACE_VERSION}")
+    return trace
+
+
+def attach_recorder_from_env(widget, kind, state=None):
+    """Start recording widget if SNAPTRACE_RECORD_TRACES is set.
+
+    The trace is written into that directory when the widget is destroyed or
+    the application quits. Returns the recorder, or None when not recording.
+    """
+    directory = os.environ.get(RECORD_ENV_VAR)
+    if not directory:
+        return None
+    os.makedirs(directory, exist_ok=True)
+    recorder = InputRecorder(widget, state=state)
+    recorder.start()
+    stamp = datetime.now().strftime("%Y%m%d_%H%M%S")
+    path = os.path.join(directory, f"{kind}_{stamp}_{id(widget) & 0xffff:04x}{TRACE_EXTENSION}")
+
+    def flush():
+        if recorder.recording and recorder.events:
+            recorder.stop()
+            recorder.save(path)
+            print(f"Input trace saved: {path}")
+        recorder.stop()
+
+    widget.destroyed.connect(flush)
+    app = QApplication.instance()
+    if app is not None:
+        app.aboutToQuit.connect(flush)
+    return recorder
+
+
+class ReplayResult:
+    """Per-event latencies (seconds) of a replay, grouped by event kind"""
+
+    def __init__(self):
+        self.latencies = {}
+        self.wall_time = 0.0
+
+    def add(self, code, seconds):
+        self.latencies.setdefault(EVENT_NAMES[code], []).append(seconds)
+
+    def all_latencies(self):
+        return [value for values in self.latencies.values() for value in values]
+
+    def summary(self):
+        lines = [f"{'Event':<22}{'Count':>8}{'Mean ms':>10}{'p95 ms':>10}{'Max ms':>10}"]
+        for name, values in sorted(self.latencies.items()):
+            ordered = sorted(values)
+            p95 = ordered[min(len(ordered) - 1, int(len(ordered) * 0.95))]
+            lines.append(f"{name:<22}{len(values):>8}{sum(values) / len(values) * 1000:>10.3f}"
+                         f"{p95 * 1000:>10.3f}{ordered[-1] * 1000:>10.3f}")
+        lines.append(f"Total wall time: {self.wall_time:.3f} s")
+        return "\n".join(lines)
+
+
+class InputReplayer:
+    """Feed a recorded trace back into a widget.
+
+    Presses, releases, double clicks and keys go through QTest. Moves and
+    wheel events are sent as constructed events, because QTest's widget
+    mouseMove does not carry the pressed buttons and Qt 5's QTest has no
+    wheel helper; keys that produced text are sent the same way so the
+    recorded text is reproduced exactly. After each event pending updates
+    (including the repaint) are processed, so the latency covers the full
+    handling.
+    """
+
+    def __init__(self, widget):
+        self.widget = widget
+
+    def replay(self, trace, speed=None):
+        """Replay trace; speed=None runs as fast as possible, 1.0 at original pace"""
+        from PyQt5.QtTest import QTest
+
+        app = QApplication.instance()
+        result = ReplayResult()
+        start = time.perf_counter()
+        for event in trace["events"]:
+            timestamp, code = event[0], event[1]
+            if speed:
+                due = start + timestamp / 1000.0 / speed
+                remaining_ms = int((due - time.perf_counter()) * 1000)
+                if remaining_ms > 0:
+                    QTest.qWait(remaining_ms)
+            event_start = time.perf_counter()
+            self._dispatch(QTest, code, event[2:])
+            app.processEvents()
+            result.add(code, time.perf_counter() - event_start)
+        result.wall_time = time.perf_counter() - start
+        return result
+
+    def _dispatch(self, QTest, code, fields):
+        widget = self.widget
+        if code in ("P", "R", "D"):
+            x, y, button, _buttons, modifiers = fields
+            pos = QPoint(x, y)
+            button = Qt.MouseButton(button)
+            modifiers = Qt.KeyboardModifiers(modifiers)
+            if code == "P":
+                QTest.mousePress(widget, button, modifiers, pos)
+            elif code == "R":
+                QTest.mouseRelease(widget, button, modifiers, pos)
+            else:
+                QTest.mouseDClick(widget, button, modifiers, pos)
+        elif code == "M":
+            x, y, _button, buttons, modifiers = fields
+            pos = QPoint(x, y)
+            move = QMouseEvent(QEvent.MouseMove, QPointF(pos), QPointF(widget.mapToGlobal(pos)),
+                               Qt.NoButton, Qt.MouseButtons(buttons),
+                               Qt.KeyboardModifiers(modifiers))
+            QApplication.sendEvent(widget, move)
+        elif code == "W":
+            x, y, dx, dy, buttons, modifiers = fields
+            pos = QPointF(x, y)
+            wheel = QWheelEvent(pos, QPointF(widget.mapToGlobal(QPoint(x, y))), QPoint(0, 0),
+                                QPoint(dx, dy), Qt.MouseButtons(buttons),
+                                Qt.KeyboardModifiers(modifiers), Qt.NoScrollPhase, False)
+            QApplication.sendEvent(widget, wheel)
+        elif code in ("K", "U"):
+            key, modifiers, text, autorepeat = fields
+            modifiers = Qt.KeyboardModifiers(modifiers)
+            if text:
+                # Keep the recorded text exactly (QTest derives it from the key code)
+                event_type = QEvent.KeyPress if code == "K" else QEvent.KeyRelease
+                QApplication.sendEvent(widget, QKeyEvent(event_type, key, modifiers, text,
+                                                         bool(autorepeat)))
+            elif code == "K":
+                QTest.keyPress(widget, Qt.Key(key), modifiers)
+            else:
+                QTest.keyRelease(widget, Qt.Key(key), modifiers)
@@ -0,0 +1,165 @@
+"""
+Pixel diff for SnapTrace
+Finds what changed between a "before" and an "after" capture, as boxes around
+the changed areas, for marking regressions on the after capture.
+
+Both images are viewed as NumPy arrays without copying. A pixel counts as
+changed when any color channel differs by more than the tolerance (the unused
+alpha byte of Format_RGB32 is always 0xFF, so it never differs). The change
+mask is reduced to a grid of cells, the cells are grouped into connected
+areas run by run (so the Python work grows with the number of changed runs,
+not pixels), and each area's box is then tightened to its changed pixels.
+"""
+
+from PyQt5.QtCore import QRect, QSettings
+from PyQt5.QtGui import QImage
+
+from .constants import APP_NAME, DIFF_TOLERANCE, DIFF_CELL_SIZE, DIFF_MAX_BOXES
+
+try:
+    import numpy as np
+    NUMPY_AVAILABLE = True
+except ImportError:
+    NUMPY_AVAILABLE = False
+
+TOLERANCE_SETTINGS_KEY = "diff/tolerance"
+
+
+def diff_tolerance():
+    return QSettings(APP_NAME, APP_NAME).value(TOLERANCE_SETTINGS_KEY, DIFF_TOLERANCE, type=int)
+
+
+def set_diff_tolerance(tolerance):
+    QSettings(APP_NAME, APP_NAME).setValue(TOLERANCE_SETTINGS_KEY, tolerance)
+
+
+def image_array(image):
+    """(image, array): a Format_RGB32 image and a height x width uint32 view of
+    its pixels; keep the image alive while the array is used"""
+    if image.format() != QImage.Format_RGB32:
+        image = image.convertToFormat(QImage.Format_RGB32)
+    bits = image.constBits()
+    bits.setsize(image.sizeInBytes())
+    array = np.frombuffer(bits, np.uint32).reshape(image.height(), image.bytesPerLine() // 4)
+    return image, array[:, :image.width()]
+
+
+def difference_mask(before, after, tolerance=DIFF_TOLERANCE):
+    """Boolean height x width mask of the after image's changed pixels.
+
+    Where the images don't overlap (different sizes), after counts as changed.
+    """
+    before, old = image_array(before)
+    after, new = image_array(after)
+    height, width = min(old.shape[0], new.shape[0]), min(old.shape[1], new.shape[1])
+    old, common = old[:height, :width], new[:height, :width]
+    # Channels are compared as bytes (max - min stays within uint8, unlike a
+    # signed subtraction); the four flags of a pixel are then read as one uint32
+    old_bytes, new_bytes = old.view(np.uint8), common.view(np.uint8)
+    difference = np.maximum(old_bytes, new_bytes)
+    difference -= np.minimum(old_bytes, new_bytes)
+    mask = np.ones(new.shape, bool)
+    np.not_equal((difference > tolerance).view(np.uint32), 0, out=mask[:height, :width])
+    return mask
+
+
+def _runs(line):
+    """(start, end) of each run of True in a 1-D boolean array, end exclusive"""
+    edges = np.flatnonzero(np.diff(line, prepend=False, append=False))
+    return zip(edges[::2].tolist(), edges[1::2].tolist())
+
+
+def changed_boxes(mask, cell=DIFF_CELL_SIZE):
+    """Boxes around the connected changed areas of a mask, largest first.
+
+    Changes in touching cells (diagonals included) are one area, so changes
+    less than about a cell apart share a box.
+    """
+    height, width = mask.shape
+    rows, columns = -(-height // cell), -(-width // cell)
+    padded = np.zeros((rows * cell, columns * cell), bool)
+    padded[:height, :width] = mask
+    cells = padded.reshape(rows, cell, columns, cell).any(axis=(1, 3))
+
+    # Label runs of changed cells row by row, joining runs that touch one in
+    # the row above (union-find over run labels)
+    parent = []
+
+    def find(label):
+        while parent[label] != label:
+            parent[label] = parent[parent[label]]
+            label = parent[label]
+        return label
+
+    runs = []
+    previous = []
+    for row in np.flatnonzero(cells.any(axis=1)).tolist():
+        if runs and runs[-1][0] != row - 1:
+            previous = []
+        current = []
+        for start, end in _runs(cells[row]):
+            label = None
+            for above_start, above_end, above_label in previous:
+                if above_start <= end and above_end >= start:
+                    root = find(above_label)
+                    if label is None:
+                        label = root
+                    elif root != label:
+                        parent[root] = label
+            if label is None:
+                label = len(parent)
+                parent.append(label)
+            current.append((start, end, label))
+            runs.append((row, start, end, label))
+        previous = current
+
+    # Tighten each area to the changed pixels of its own cells; its cell box
+    # can also hold cells of other areas
+    areas = {}
+    for row, start, end, label in runs:
+        x, y = start * cell, row * cell
+        part = mask[y:y + cell, x:end * cell]
+        changed_rows = np.flatnonzero(part.any(axis=1))
+        changed_columns = np.flatnonzero(part.any(axis=0))
+        left, right = x + int(changed_columns[0]), x + int(changed_columns[-1]) + 1
+        top, bottom = y + int(changed_rows[0]), y + int(changed_rows[-1]) + 1
+        area = areas.get(find(label))
+        if area is None:
+            areas[find(label)] = [left, top, right, bottom]
+        else:
+            area[:] = [min(area[0], left), min(area[1], top),
+                       max(area[2], right), max(area[3], bottom)]
+
+    boxes = [QRect(left, top, right - left, bottom - top)
+             for left, top, right, bottom in areas.values()]
+    boxes.sort(key=lambda box: box.width() * box.height(), reverse=True)
+    return boxes
+
+
+class DiffResult:
+    """Changed areas of an after capture relative to a before capture"""
+
+    def __init__(self, boxes, changed_pixels, total_pixels, max_boxes=DIFF_MAX_BOXES):
+        self.boxes = boxes[:max_boxes]              # Largest first
+        self.omitted = max(0, len(boxes) - max_boxes)
+        self.changed_pixels = changed_pixels
+        self.total_pixels = total_pixels
+
+    def summary(self):
+        if not self.boxes:
+            return "No differences"
+        share = 100 * self.changed_pixels / max(1, self.total_pixels)
+        plural = "s" if len(self.boxes) != 1 else ""
+        text = f"{len(self.boxes)} changed area{plural} ({share:.1f}% of pixels)"
+        if self.omitted:
+            text += f", {self.omitted} smaller ones not marked"
+        return text
+
+
+def diff_images(before, after, tolerance=None, cell=DIFF_CELL_SIZE, max_boxes=DIFF_MAX_BOXES):
+    """Compare two QImages; boxes are in the after image's coordinates"""
+    if tolerance is None:
+        tolerance = diff_tolerance()
+    mask = difference_mask(before, after, tolerance)
+    return DiffResult(changed_boxes(mask, cell), int(np.count_nonzero(mask)), mask.size,
+                      max_boxes)
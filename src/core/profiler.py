@@ -0,0 +1,170 @@
+"""
+Opt-in performance instrumentation for SnapTrace
+Records per-call durations of editor hot paths into fixed-size histograms.
+Enable with the SNAPTRACE_PROFILE=1 environment variable or the Settings dialog.
+"""
+
+import os
+import time
+import atexit
+import functools
+from collections import deque
+from contextlib import contextmanager
+
+from PyQt5.QtCore import QSettings
+
+from .constants import APP_NAME
+
+PROFILE_ENV_VAR = "SNAPTRACE_PROFILE"
+PROFILE_SETTINGS_KEY = "debug/profiler_enabled"
+
+
+class Histogram:
+    """Duration histogram with power-of-two microsecond buckets.
+
+    Memory use is fixed no matter how many samples are added. Bucket i
+    counts durations in [2**(i-1), 2**i) microseconds; the last bucket
+    collects everything from about 8 seconds up.
+    """
+    BUCKET_COUNT = 24
+
+    __slots__ = ('count', 'total', 'minimum', 'maximum', 'buckets')
+
+    def __init__(self):
+        self.count = 0
+        self.total = 0.0
+        self.minimum = None
+        self.maximum = 0.0
+        self.buckets = [0] * self.BUCKET_COUNT
+
+    def add(self, seconds):
+        self.count += 1
+        self.total += seconds
+        if self.minimum is None or seconds < self.minimum:
+            self.minimum = seconds
+        if seconds > self.maximum:
+            self.maximum = seconds
+        micros = int(seconds * 1_000_000)
+        self.buckets[min(micros.bit_length(), self.BUCKET_COUNT - 1)] += 1
+
+    def mean(self):
+        return self.total / self.count if self.count else 0.0
+
+    def percentile(self, fraction):
+        """Upper bound (seconds) of the bucket holding the given percentile"""
+        if not self.count:
+            return 0.0
+        threshold = fraction * self.count
+        seen = 0
+        for index, bucket_count in enumerate(self.buckets):
+            seen += bucket_count
+            if seen >= threshold:
+                return min((1 << index) / 1_000_000, self.maximum)
+        return self.maximum
+
+
+class Profiler:
+    """Collects timings for instrumented functions and paint frames"""
+
+    def __init__(self):
+        self.enabled = self._initially_enabled()
+        self.histograms = {}
+        self.frame_times = deque(maxlen=120)  # perf_counter timestamps of recent frames
+
+    def _initially_enabled(self):
+        if os.environ.get(PROFILE_ENV_VAR, "").lower() in ("1", "true", "yes", "on"):
+            return True
+        settings = QSettings(APP_NAME, APP_NAME)
+        return settings.value(PROFILE_SETTINGS_KEY, False, type=bool)
+
+    def set_enabled(self, enabled, persist=True):
+        """Turn recording on or off, optionally remembering it for next launch"""
+        self.enabled = enabled
+        if persist:
+            QSettings(APP_NAME, APP_NAME).setValue(PROFILE_SETTINGS_KEY, enabled)
+
+    def record(self, name, seconds):
+        histogram = self.histograms.get(name)
+        if histogram is None:
+            histogram = self.histograms[name] = Histogram()
+        histogram.add(seconds)
+
+    def mark_frame(self):
+        """Note that a frame was painted, for the FPS readout"""
+        self.frame_times.append(time.perf_counter())
+
+    def fps(self):
+        """Frames painted during the last second"""
+        now = time.perf_counter()
+        return sum(1 for stamp in self.frame_times if now - stamp <= 1.0)
+
+    @contextmanager
+    def _timed(self, name):
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.record(name, time.perf_counter() - start)
+
+    def measure(self, name):
+        """Context manager timing a block; does nothing while disabled"""
+        if not self.enabled:
+            return _NULL_CONTEXT
+        return self._timed(name)
+
+    def summary(self):
+        """Human readable table of all recorded timings"""
+        if not self.histograms:
+            return "No timings recorded."
+        lines = [f"{'Name':<24}{'Calls':>8}{'Mean ms':>10}{'p50 ms':>10}{'p95 ms':>10}{'Max ms':>10}"]
+        for name in sorted(self.histograms):
+            histogram = self.histograms[name]
+            lines.append(
+                f"{name:<24}{histogram.count:>8}"
+                f"{histogram.mean() * 1000:>10.2f}"
+                f"{histogram.percentile(0.50) * 1000:>10.2f}"
+                f"{histogram.percentile(0.95) * 1000:>10.2f}"
+                f"{histogram.maximum * 1000:>10.2f}"
+            )
+        return "\n".join(lines)
+
+    def dump(self):
+        """Print the summary if anything was recorded"""
+        if self.histograms:
+            print("SnapTrace performance summary:")
+            print(self.summary())
+
+
+class _NullContext:
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        return False
+
+
+_NULL_CONTEXT = _NullContext()
+
+PROFILER = Profiler()
+atexit.register(PROFILER.dump)
+
+
+def profiled(name=None):
+    """Decorator recording each call's duration under name (default: function name).
+
+    While profiling is disabled the only cost is one attribute check per call.
+    """
+    def decorator(func):
+        label = name or func.__name__
+
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):
+            if not PROFILER.enabled:
+                return func(*args, **kwargs)
+            start = time.perf_counter()
+            try:
+                return func(*args, **kwargs)
+            finally:
+                PROFILER.record(label, time.perf_counter() - start)
+        return wrapper
+    return decorator
@@ -0,0 +1,315 @@
+"""
+SnapTrace project files (.snaptrace)
+Stores the original capture plus the editable annotation model so a saved
+screenshot can be reopened and edited later.
+
+A project is a zip archive:
+    manifest.json     format, version, capture size and the entry index
+    annotations.json  the annotation model (drawings, text, counters)
+    capture.png       the original capture, lossless
+    images/<sha1>     embedded image blobs, as imported
+
+PNG data is stored without zip compression (it is already compressed); only
+the JSON is deflated. Loading reads the manifest and annotations only; the
+capture is decoded when first asked for.
+"""
+
+import json
+import zipfile
+from datetime import datetime
+
+from PyQt5.QtCore import QBuffer, QByteArray, QIODevice, QPoint, QSize
+from PyQt5.QtGui import QColor, QFont, QImage, QPixmap
+
+from .image_loader import read_image_size
+from .image_store import ImageStore
+
+PROJECT_FORMAT = "snaptrace-project"
+PROJECT_VERSION = 1
+PROJECT_EXTENSION = ".snaptrace"
+
+MANIFEST_NAME = "manifest.json"
+ANNOTATIONS_NAME = "annotations.json"
+CAPTURE_NAME = "capture.png"
+IMAGES_DIR = "images/"
+
+# Trades a slightly larger file for much faster encoding of big captures
+CAPTURE_PNG_QUALITY = 80
+
+
+class ProjectError(Exception):
+    """Raised when a project file cannot be read"""
+
+
+# Annotation model <-> JSON
+
+def _color_to_json(color):
+    return color.name(QColor.HexArgb)
+
+
+def _color_from_json(value):
+    return QColor(value)
+
+
+def _points_to_json(points):
+    flat = []
+    for point in points:
+        flat.append(point.x())
+        flat.append(point.y())
+    return flat
+
+
+def _points_from_json(flat):
+    return [QPoint(flat[i], flat[i + 1]) for i in range(0, len(flat), 2)]
+
+
+def serialize_drawing(drawing):
+    """JSON-ready dict for one entry of DrawingArea.drawings"""
+    if len(drawing) == 5:
+        tool, _, points, _, image = drawing
+        return {
+            'type': tool,
+            'points': _points_to_json(points),
+            'image': image.key,
+        }
+    tool, color, points, size = drawing
+    return {
+        'type': tool,
+        'color': _color_to_json(color),
+        'points': _points_to_json(points),
+        'size': size,
+    }
+
+
+def serialize_text(text_item):
+    """JSON-ready dict for one entry of DrawingArea.text_items"""
+    if isinstance(text_item, dict):
+        font = text_item.get('font') or QFont("Arial", 12)
+        return {
+            'text': text_item['text'],
+            'pos': [text_item['pos'].x(), text_item['pos'].y()],
+            'color': _color_to_json(text_item['color']),
+            'font': font.toString(),
+        }
+    text, pos, color = text_item  # Old tuple format, drawn with Arial 12
+    return {
+        'text': text,
+        'pos': [pos.x(), pos.y()],
+        'color': _color_to_json(color),
+        'font': QFont("Arial", 12).toString(),
+    }
+
+
+def serialize_counter(counter_item):
+    """JSON-ready dict for one entry of DrawingArea.counter_items"""
+    if len(counter_item) == 4:
+        number, pos, color, size = counter_item
+    else:
+        number, pos, color = counter_item
+        size = 2  # Default size for old counters
+    return {
+        'number': number,
+        'pos': [pos.x(), pos.y()],
+        'color': _color_to_json(color),
+        'size': size,
+    }
+
+
+def deserialize_drawing(data, images):
+    """Rebuild a drawings tuple; images maps content key -> ImageHandle"""
+    points = _points_from_json(data['points'])
+    if data['type'] == "image":
+        return ("image", None, points, None, images[data['image']])
+    return (data['type'], _color_from_json(data['color']), points, data['size'])
+
+
+def deserialize_text(data):
+    font = QFont()
+    font.fromString(data['font'])
+    return {
+        'text': data['text'],
+        'pos': QPoint(*data['pos']),
+        'color': _color_from_json(data['color']),
+        'font': font,
+    }
+
+
+def deserialize_counter(data):
+    return (data['number'], QPoint(*data['pos']), _color_from_json(data['color']), data['size'])
+
+
+def serialize_document(drawings, text_items, counter_items, counter_value, counter_start=1):
+    """JSON-ready dict of a whole annotation model"""
+    return {
+        'drawings': [serialize_drawing(drawing) for drawing in drawings],
+        'text_items': [serialize_text(text_item) for text_item in text_items],
+        'counters': [serialize_counter(counter_item) for counter_item in counter_items],
+        'counter_value': counter_value,
+        'counter_start': counter_start,
+    }
+
+
+def deserialize_document(data, images):
+    """Inverse of serialize_document; returns a dict of DrawingArea attributes"""
+    return {
+        'drawings': [deserialize_drawing(item, images) for item in data.get('drawings', [])],
+        'text_items': [deserialize_text(item) for item in data.get('text_items', [])],
+        'counter_items': [deserialize_counter(item) for item in data.get('counters', [])],
+        'counter_value': data.get('counter_value', 1),
+        'counter_start': data.get('counter_start', 1),
+    }
+
+
+def document_image_handles(drawings):
+    """Image handles used by a drawings list, keyed by content key"""
+    return {drawing[4].key: drawing[4] for drawing in drawings
+            if len(drawing) == 5 and not isinstance(drawing[4], QPixmap)}
+
+
+def resolve_pending_images(drawings):
+    """Hash images still being imported, so every handle has its content key.
+
+    Raises OSError if an image file can no longer be read.
+    """
+    for drawing in drawings:
+        if len(drawing) == 5 and not isinstance(drawing[4], QPixmap) and drawing[4].key is None:
+            drawing[4].store.resolve_import(drawing[4])
+
+
+def encode_png(image, quality=CAPTURE_PNG_QUALITY):
+    """Encode a QImage or QPixmap as PNG bytes"""
+    data = QByteArray()
+    buffer = QBuffer(data)
+    buffer.open(QIODevice.WriteOnly)
+    image.save(buffer, "PNG", quality)
+    return bytes(data)
+
+
+# Project container
+
+class Project:
+    """An editable screenshot: the capture plus its annotation model.
+
+    capture_blob is the capture encoded as PNG. It is only decoded when
+    capture_pixmap() is called, and written back unchanged on save, so a
+    reopened project never pays for re-encoding the capture.
+    """
+
+    def __init__(self, capture_blob, capture_size, document, image_blobs=None, path=None):
+        self.capture_blob = capture_blob
+        self.capture_size = QSize(capture_size)
+        self.document = document          # serialize_document() dict
+        self.image_blobs = image_blobs or {}  # content key -> encoded bytes
+        self.path = path
+        self._capture = None
+
+    @classmethod
+    def from_drawing_area(cls, area, capture_blob=None):
+        """Snapshot a DrawingArea; pass capture_blob to reuse an encoded capture"""
+        if capture_blob is None:
+            capture_blob = encode_png(area.screenshot)
+        resolve_pending_images(area.drawings)
+        document = serialize_document(area.drawings, area.text_items, area.counter_items,
+                                      area.counter_value, area.counter_start)
+        image_blobs = {key: handle.blob()
+                       for key, handle in document_image_handles(area.drawings).items()}
+        return cls(capture_blob, area.screenshot.size(), document, image_blobs)
+
+    def capture_pixmap(self):
+        """The capture as a QPixmap, decoded on first use"""
+        if self._capture is None:
+            image = QImage.fromData(self.capture_blob, "PNG")
+            if image.isNull():
+                raise ProjectError("Project capture image is corrupt")
+            self._capture = QPixmap.fromImage(image)
+        return self._capture
+
+    def apply_to(self, area, store=None):
+        """Replace the screenshot and annotations of a DrawingArea with this project"""
+        store = store or area.image_store
+        images = self.image_handles(store)
+        state = deserialize_document(self.document, images)
+        area.screenshot = self.capture_pixmap()
+        area.setMinimumSize(area.screenshot.size())
+        area.clear_all_selections()
+        area.drawings = state['drawings']
+        area.text_items = state['text_items']
+        area.counter_items = state['counter_items']
+        area.counter_start = state['counter_start']
+        area.counter_value = state['counter_value']
+        area.undo_stack = []
+        area.redo_stack = []
+        area.add_to_undo_stack()
+        area.fit_to_viewport()
+        area.update()
+
+    def image_handles(self, store=None):
+        """Handles for the embedded images, registered in the image store"""
+        store = store or ImageStore.instance()
+        handles = {}
+        for key, blob in self.image_blobs.items():
+            handle = store.import_bytes(blob)
+            if handle is not None:
+                handles[key] = handle
+        return handles
+
+    def save(self, path):
+        manifest = {
+            'format': PROJECT_FORMAT,
+            'version': PROJECT_VERSION,
+            'saved': datetime.now().isoformat(timespec="seconds"),
+            'capture': {
+                'entry': CAPTURE_NAME,
+                'width': self.capture_size.width(),
+                'height': self.capture_size.height(),
+            },
+            'annotations': ANNOTATIONS_NAME,
+            'images': {key: IMAGES_DIR + key for key in self.image_blobs},
+            'counts': {
+                'drawings': len(self.document.get('drawings', [])),
+                'text_items': len(self.document.get('text_items', [])),
+                'counters': len(self.document.get('counters', [])),
+            },
+        }
+        annotations = json.dumps(self.document, separators=(",", ":"))
+        with zipfile.ZipFile(path, "w") as archive:
+            archive.writestr(MANIFEST_NAME, json.dumps(manifest, indent=1),
+                             compress_type=zipfile.ZIP_DEFLATED)
+            archive.writestr(ANNOTATIONS_NAME, annotations, compress_type=zipfile.ZIP_DEFLATED)
+            archive.writestr(CAPTURE_NAME, self.capture_blob, compress_type=zipfile.ZIP_STORED)
+            for key, blob in self.image_blobs.items():
+                archive.writestr(IMAGES_DIR + key, blob, compress_type=zipfile.ZIP_STORED)
+        self.path = path
+        return path
+
+    @classmethod
+    def load(cls, path):
+        """Read a project; the capture stays encoded until capture_pixmap()"""
+        try:
+            with zipfile.ZipFile(path, "r") as archive:
+                manifest = json.loads(archive.read(MANIFEST_NAME))
+                if manifest.get('format') != PROJECT_FORMAT:
+                    raise ProjectError(f"{path} is not a SnapTrace project")
+                if manifest.get('version', 0) > PROJECT_VERSION:
+                    raise ProjectError(f"{path} was saved by a newer SnapTrace "
+                                       f"(project version {manifest['version']})")
+                document = json.loads(archive.read(manifest.get('annotations', ANNOTATIONS_NAME)))
+                capture_info = manifest.get('capture', {})
+                capture_blob = archive.read(capture_info.get('entry', CAPTURE_NAME))
+                image_blobs = {key: archive.read(entry)
+                               for key, entry in manifest.get('images', {}).items()}
+        except (OSError, KeyError, ValueError, zipfile.BadZipFile) as e:
+            raise ProjectError(f"Could not read project {path}: {e}") from e
+
+        # Catch broken image references here rather than when the document is shown
+        for item in document.get('drawings', []):
+            if item.get('type') == "image" and item.get('image') not in image_blobs:
+                raise ProjectError(f"{path} references a missing image ({item.get('image')})")
+        for key, blob in image_blobs.items():
+            if not read_image_size(blob).isValid():
+                raise ProjectError(f"{path} has a corrupt image ({key})")
+
+        capture_size = QSize(capture_info.get('width', 0), capture_info.get('height', 0))
+        if not capture_size.isValid() or capture_size.isEmpty():
+            capture_size = read_image_size(capture_blob)
+        return cls(capture_blob, capture_size, document, image_blobs, path)
@@ -0,0 +1,328 @@
+"""
+Region recording for SnapTrace
+Records a screen region as an animated PNG (APNG), for defects that only make
+sense in motion.
+
+Frames are grabbed on the GUI thread by a timer and handed to an encoder thread
+through a bounded queue; when the encoder falls behind, new frames are dropped
+rather than stalling the grabs. The encoder compares each frame with the last
+one it stored, using the region watch's block hashes, and writes only the
+bounding rectangle of the changed pixels as an APNG sub-frame, blended over the
+previous frame with the unchanged blocks inside it made transparent (they
+compress to almost nothing). Unchanged frames just lengthen the previous
+frame's delay, so a mostly static UI costs little more than its first frame.
+Frames are appended to the file as they are encoded; only the frame count in
+the header is patched when recording stops. The part of the region covered by
+the recording panel itself is masked out of every frame, so its ticking status
+is neither recorded nor counted as a change.
+"""
+
+import os
+import time
+import queue
+import struct
+import zlib
+import tempfile
+import threading
+
+from PyQt5.QtCore import Qt, QObject, QRect, QTimer, pyqtSignal
+from PyQt5.QtGui import QImage, QPainter
+from PyQt5.QtWidgets import QApplication
+
+from .constants import RECORD_FPS, RECORD_QUEUE_FRAMES, RECORD_MAX_SECONDS
+from .region_watch import BLOCK_HEIGHT, block_bounds, block_hashes, changed_area
+
+PNG_SIGNATURE = b'\x89PNG\r\n\x1a\n'
+APNG_COMPRESSION = 6        # zlib level of the frame data
+MAX_DELAY_MS = 65535        # Longest delay one frame control chunk can hold
+FILTER_NONE = b'\x00'
+BLOCK_COLUMNS = 16          # Finer than the region watch, so less of each sub-frame is opaque
+MASK_COLOR = Qt.darkGray    # Fill of the masked (ignored) part of each frame
+STOP_CHECK_SECONDS = 0.1    # How often an idle encoder checks whether recording stopped
+
+
+def _chunk(kind, data):
+    return struct.pack('>I', len(data)) + kind + data + struct.pack('>I', zlib.crc32(kind + data))
+
+
+def _pixel_view(image):
+    bits = image.constBits()
+    bits.setsize(image.sizeInBytes())
+    return memoryview(bits)
+
+
+def scanlines(image):
+    """Unfiltered PNG scanlines of a Format_RGBA8888 image"""
+    pixels = _pixel_view(image)
+    stride = image.bytesPerLine()
+    row_bytes = image.width() * 4
+    parts = []
+    for offset in range(0, image.height() * stride, stride):
+        parts.append(FILTER_NONE)
+        parts.append(pixels[offset:offset + row_bytes])
+    return b''.join(parts)
+
+
+class ApngWriter:
+    """Writes an animated PNG one frame at a time.
+
+    The first frame must cover the whole image; later frames may be smaller,
+    and either replace the pixels they cover or be drawn over them (so their
+    transparent pixels keep the previous frame's). Each frame is shown for
+    delay_ms.
+    """
+
+    def __init__(self, path, width, height, compression=APNG_COMPRESSION):
+        self.path = path
+        self.width = width
+        self.height = height
+        self.compression = compression
+        self.frames = 0
+        self._sequence = 0      # Shared by frame control and frame data chunks
+        self._file = open(path, 'wb')
+        self._file.write(PNG_SIGNATURE)
+        # 8-bit truecolor with alpha, for transparent parts of sub-frames
+        self._file.write(_chunk(b'IHDR', struct.pack('>IIBBBBB', width, height, 8, 6, 0, 0, 0)))
+        self._actl_offset = self._file.tell()
+        self._file.write(self._actl())
+
+    def _actl(self):
+        return _chunk(b'acTL', struct.pack('>II', max(1, self.frames), 0))   # 0 = loop forever
+
+    @property
+    def size(self):
+        """Bytes written so far"""
+        return self._file.tell() if not self._file.closed else os.path.getsize(self.path)
+
+    def add_frame(self, image, x, y, delay_ms, blend=False):
+        """Append a Format_RGBA8888 image placed at x, y, shown for delay_ms;
+        with blend it is drawn over the previous frame instead of replacing it"""
+        if self.frames == 0 and (x, y, image.width(), image.height()) != (0, 0, self.width,
+                                                                          self.height):
+            raise ValueError("The first APNG frame must cover the whole image")
+        delay = max(1, min(int(delay_ms), MAX_DELAY_MS))
+        # dispose_op 0: the canvas keeps each frame, so only changes need writing
+        control = struct.pack('>IIIIIHHBB', self._sequence, image.width(), image.height(),
+                              x, y, delay, 1000, 0, 1 if blend else 0)
+        self._file.write(_chunk(b'fcTL', control))
+        self._sequence += 1
+        data = zlib.compress(scanlines(image), self.compression)
+        if self.frames == 0:
+            self._file.write(_chunk(b'IDAT', data))
+        else:
+            self._file.write(_chunk(b'fdAT', struct.pack('>I', self._sequence) + data))
+            self._sequence += 1
+        self.frames += 1
+
+    def close(self):
+        """Finish the file, filling in the frame count"""
+        if self._file.closed:
+            return
+        self._file.write(_chunk(b'IEND', b''))
+        self._file.seek(self._actl_offset)
+        self._file.write(self._actl())
+        self._file.close()
+
+    def discard(self):
+        self._file.close()
+        try:
+            os.remove(self.path)
+        except OSError:
+            pass
+
+
+def changed_part(frame, rect, changed):
+    """rect of a Format_RGB32 frame as Format_RGBA8888, with the blocks not in
+    changed (block indexes as from block_hashes) made transparent"""
+    part = frame.copy(rect).convertToFormat(QImage.Format_RGBA8888)
+    bounds = block_bounds(frame.width(), BLOCK_COLUMNS)
+    columns = len(bounds) - 1
+    changed = set(changed)
+    painter = QPainter(part)
+    painter.setCompositionMode(QPainter.CompositionMode_Clear)
+    for band in range(rect.top() // BLOCK_HEIGHT, rect.bottom() // BLOCK_HEIGHT + 1):
+        for column in range(columns):
+            if band * columns + column in changed:
+                continue
+            block = QRect(bounds[column], band * BLOCK_HEIGHT,
+                          bounds[column + 1] - bounds[column], BLOCK_HEIGHT)
+            if block.intersects(rect):
+                painter.fillRect(block.translated(-rect.topLeft()), Qt.transparent)
+    painter.end()
+    return part
+
+
+class RecordingSignals(QObject):
+    """Signals emitted from the encoder thread"""
+    finished = pyqtSignal(str, int)     # path, frames written
+    failed = pyqtSignal(str)            # error message
+
+
+class _FrameEncoder:
+    """Encoder thread: diffs queued frames and appends them to the APNG"""
+
+    def __init__(self, frames, path, signals):
+        self.frames = frames
+        self.path = path
+        self.signals = signals
+        self.writer = None
+        self.encoded = 0        # Frames that changed and were written
+        self.bytes = 0          # Size of the file so far
+        self._previous = None   # Last stored frame (Format_RGB32) and its block hashes
+        self._previous_hashes = None
+        self._pending = None    # (Format_RGBA8888 part, its rect, timestamp) awaiting its delay
+        self.ignore = QRect()   # Part of each frame masked out (the recording panel)
+        self.stop_at = None     # Set when stopping found the queue full; finish once drained
+
+    def run(self):
+        try:
+            while True:
+                try:
+                    command = self.frames.get(timeout=STOP_CHECK_SECONDS)
+                except queue.Empty:
+                    if self.stop_at is not None:
+                        self._finish(self.stop_at)
+                        return
+                    continue
+                if command[0] == "stop":
+                    self._finish(command[1])
+                    return
+                self._encode(command[1], command[2])
+        except (OSError, ValueError) as e:
+            print(f"Recording failed: {e}")
+            if self.writer is not None:
+                self.writer.discard()
+            self.signals.failed.emit(str(e))
+
+    def _encode(self, timestamp, frame):
+        if frame.format() != QImage.Format_RGB32:
+            frame = frame.convertToFormat(QImage.Format_RGB32)
+        if not self.ignore.isEmpty():
+            painter = QPainter(frame)
+            painter.fillRect(self.ignore, MASK_COLOR)
+            painter.end()
+        hashes = block_hashes(frame, columns=BLOCK_COLUMNS)
+        if self._previous is None:
+            self.writer = ApngWriter(self.path, frame.width(), frame.height())
+            rect = QRect(frame.rect())
+            part = frame.convertToFormat(QImage.Format_RGBA8888)
+        else:
+            if frame.size() != self._previous.size():
+                return
+            changed = [index for index, (old, new) in enumerate(zip(self._previous_hashes, hashes))
+                       if old != new]
+            if not changed:
+                return
+            rect = changed_area(self._previous, frame, changed, columns=BLOCK_COLUMNS)
+            if rect.isEmpty():
+                return
+            part = changed_part(frame, rect, changed)
+            self._write_pending(timestamp)
+        self._previous, self._previous_hashes = frame, hashes
+        # The frame's delay is known once the next change (or the end) arrives
+        self._pending = (part, rect, timestamp)
+
+    def _write_pending(self, until):
+        image, rect, timestamp = self._pending
+        self.writer.add_frame(image, rect.x(), rect.y(), (until - timestamp) * 1000,
+                              blend=self.writer.frames > 0)
+        self._pending = None
+        self.encoded += 1
+        self.bytes = self.writer.size
+
+    def _finish(self, until):
+        if self.writer is None:
+            self.signals.failed.emit("No frames were recorded")
+            return
+        self._write_pending(until)
+        self.writer.close()
+        self.bytes = self.writer.size
+        self.signals.finished.emit(self.path, self.writer.frames)
+
+
+class RegionRecorder(QObject):
+    """Records a screen region to an APNG in a temporary file.
+
+    start() begins grabbing fps frames per second; stop() (or reaching
+    max_seconds) emits stopped and lets the encoder drain its queue, after
+    which finished is emitted with the file's path.
+    """
+    stopped = pyqtSignal()
+    finished = pyqtSignal(str, int)     # APNG path, frames
+    failed = pyqtSignal(str)
+
+    def __init__(self, region, screen=None, fps=RECORD_FPS, max_seconds=RECORD_MAX_SECONDS,
+                 parent=None):
+        super().__init__(parent)
+        self.region = region            # Rect to grab, relative to the screen
+        self.screen = screen or QApplication.primaryScreen()
+        self.fps = fps
+        self.max_seconds = max_seconds
+        self.grabbed = 0
+        self.dropped = 0                # Frames dropped because the encoder was behind
+        self.started = None
+        self.ignore = QRect()           # Part of the region masked out (our own panel)
+        handle, self.path = tempfile.mkstemp(prefix="snaptrace_recording_", suffix=".png")
+        os.close(handle)
+        self._frames = queue.Queue(maxsize=RECORD_QUEUE_FRAMES)
+        self._signals = RecordingSignals(self)
+        self._signals.finished.connect(self.finished)
+        self._signals.failed.connect(self.failed)
+        self._encoder = _FrameEncoder(self._frames, self.path, self._signals)
+        self._thread = None
+        self.timer = QTimer(self)
+        self.timer.timeout.connect(self.tick)
+
+    @property
+    def encoded(self):
+        return self._encoder.encoded
+
+    @property
+    def bytes(self):
+        return self._encoder.bytes
+
+    def elapsed(self):
+        return time.monotonic() - self.started if self.started is not None else 0.0
+
+    def start(self):
+        self._encoder.ignore = QRect(self.ignore)
+        self._thread = threading.Thread(target=self._encoder.run, name="region-recorder",
+                                        daemon=True)
+        self._thread.start()
+        self.started = time.monotonic()
+        self.tick()
+        self.timer.start(1000 // self.fps)
+
+    def is_recording(self):
+        return self.timer.isActive()
+
+    def stop(self):
+        """Stop grabbing; the encoder finishes what is queued in the background"""
+        if not self.timer.isActive():
+            return
+        self.timer.stop()
+        stop_at = time.monotonic()
+        try:
+            self._frames.put_nowait(("stop", stop_at))
+        except queue.Full:
+            # Never wait on the GUI thread: the encoder stops once it has drained the queue
+            self._encoder.stop_at = stop_at
+        self.stopped.emit()
+
+    def grab(self):
+        """The region's current pixels"""
+        return self.screen.grabWindow(0, self.region.x(), self.region.y(),
+                                      self.region.width(), self.region.height()).toImage()
+
+    def tick(self):
+        if self.elapsed() >= self.max_seconds:
+            self.stop()
+            return
+        frame = self.grab()
+        if frame.isNull():
+            return
+        self.grabbed += 1
+        try:
+            self._frames.put_nowait(("frame", time.monotonic(), frame))
+        except queue.Full:
+            self.dropped += 1
@@ -0,0 +1,283 @@
+"""
+Redaction filters for SnapTrace
+Pixelates, blurs or fills regions of a capture to hide passwords, tokens and
+personal data.
+
+Blur windows are differences of a summed-area table (running sums of the
+rows), taken one axis at a time, so each window costs the same whatever its
+size; three box blurs in a row approximate a Gaussian. Pixelation sums each
+block. All color channels are filtered together, vectorized with NumPy, and
+sums use the smallest integer type that holds a window. Filters read only the
+capture's own pixels inside the region, never annotations or pixels around it.
+
+Filtered regions are cached by capture, tool, rect and strength, so repaints
+reuse them and moving or resizing a redaction filters only that region again.
+The editor filters regions larger than BACKGROUND_FILTER_PIXELS on a worker
+thread and draws the quick filter until the result is cached. Without NumPy,
+and while a redaction is being dragged, the filters fall back to Qt image
+scaling.
+"""
+
+from collections import OrderedDict
+
+from PyQt5.QtCore import Qt, QObject, QRect, QRunnable, QThreadPool, pyqtSignal
+from PyQt5.QtGui import QColor, QImage
+
+from .constants import REDACT_PIXELATE_SCALE, REDACT_BLUR_SCALE, REDACTION_CACHE_MB
+
+try:
+    import numpy as np
+    NUMPY_AVAILABLE = True
+except ImportError:
+    NUMPY_AVAILABLE = False
+
+REDACTION_TOOLS = ("pixelate", "blur", "redact")
+BLUR_PASSES = 3
+BACKGROUND_FILTER_PIXELS = 512 * 512   # Larger regions are filtered off the GUI thread
+
+
+def pixelate_block(size):
+    """Pixelation block size in pixels for a redaction's tool size"""
+    return max(4, size * REDACT_PIXELATE_SCALE)
+
+
+def blur_radius(size):
+    return max(2, size * REDACT_BLUR_SCALE)
+
+
+def _pixels(image):
+    """height x width x 4 view of a Format_RGB32 image's bytes"""
+    bits = image.bits()
+    bits.setsize(image.sizeInBytes())
+    return np.frombuffer(bits, np.uint8).reshape(image.height(), image.bytesPerLine() // 4,
+                                                 4)[:, :image.width()]
+
+
+def _transposed(pixels):
+    """height x width x 4 pixels as width x height x 4, moved a pixel (uint32) at a time"""
+    return np.ascontiguousarray(pixels.view(np.uint32)[:, :, 0].T)[:, :, None].view(np.uint8)
+
+
+def _sum_dtype(window):
+    """Smallest dtype holding the sum of window bytes"""
+    return np.uint16 if 255 * window < 2 ** 16 else np.uint32
+
+
+def row_prefix_sums(pixels, dtype):
+    """Summed-area table along the rows: entry i is the sum of pixels[:i].
+
+    Accumulated a row at a time, which is several times faster on images than
+    np.cumsum along axis 0. The sums may wrap; differences of entries are
+    exact as long as the windows they cover fit in dtype.
+    """
+    table = np.empty((len(pixels) + 1,) + pixels.shape[1:], dtype)
+    table[0] = 0
+    for index, row in enumerate(pixels):
+        np.add(table[index], row, out=table[index + 1])
+    return table
+
+
+def _box_rows(pixels, radius):
+    """Each row replaced by the mean of the 2 * radius + 1 rows around it,
+    edge rows repeated"""
+    window = 2 * radius + 1
+    padded = np.concatenate((np.repeat(pixels[:1], radius, axis=0), pixels,
+                             np.repeat(pixels[-1:], radius, axis=0)))
+    table = row_prefix_sums(padded, _sum_dtype(window))
+    sums = table[window:] - table[:-window]
+    sums += window // 2
+    sums //= window
+    return sums.astype(np.uint8)
+
+
+def box_blur(pixels, radius):
+    """Mean over the (2 * radius + 1) square around each pixel of a
+    height x width x 4 uint8 array, one axis at a time"""
+    return _transposed(_box_rows(_transposed(_box_rows(pixels, radius)), radius))
+
+
+def _block_rows(pixels, block):
+    """Sums of each block of rows (the last may be shorter), as uint32"""
+    starts = range(0, len(pixels), block)
+    sums = np.zeros((len(starts),) + pixels.shape[1:], np.uint32)
+    for index, start in enumerate(starts):
+        for row in pixels[start:start + block]:
+            np.add(sums[index], row, out=sums[index])
+    return sums
+
+
+def pixelate(pixels, block):
+    """Each block x block cell of a height x width x 4 uint8 array replaced by its mean"""
+    height, width = pixels.shape[:2]
+    # Block sums down the rows, then across the columns of the (much smaller) result
+    sums = _block_rows(pixels, block).transpose(1, 0, 2)
+    sums = _block_rows(sums, block).transpose(1, 0, 2)
+    rows = np.diff(np.append(np.arange(0, height, block), height))
+    columns = np.diff(np.append(np.arange(0, width, block), width))
+    counts = (rows[:, None] * columns[None, :]).astype(np.uint32)[:, :, None]
+    means = np.ascontiguousarray(((sums + counts // 2) // counts).astype(np.uint8))
+    # Expand whole pixels (uint32) to the blocks' sizes
+    cells = means.view(np.uint32)[:, :, 0]
+    return np.repeat(np.repeat(cells, columns, axis=1), rows, axis=0)[:, :, None].view(np.uint8)
+
+
+def filter_region(region, tool, size):
+    """A pixelated or blurred copy of a Format_RGB32 QImage"""
+    if not NUMPY_AVAILABLE:
+        return _scaled_filter(region, tool, size)
+    pixels = _pixels(region)
+    if tool == "pixelate":
+        pixels = pixelate(pixels, pixelate_block(size))
+    else:
+        for _ in range(BLUR_PASSES):
+            pixels = box_blur(pixels, blur_radius(size))
+    # The alpha bytes are all 0xFF in the source, so every mean keeps them opaque
+    result = QImage(region.size(), QImage.Format_RGB32)
+    _pixels(result)[:] = pixels
+    return result
+
+
+def _scaled_filter(region, tool, size):
+    """Pixelate or blur by scaling down and back up with Qt"""
+    factor = pixelate_block(size) if tool == "pixelate" else blur_radius(size)
+    small = region.scaled(max(1, region.width() // factor), max(1, region.height() // factor),
+                          Qt.IgnoreAspectRatio, Qt.SmoothTransformation)
+    mode = Qt.FastTransformation if tool == "pixelate" else Qt.SmoothTransformation
+    return small.scaled(region.size(), Qt.IgnoreAspectRatio, mode)
+
+
+class FilterSignals(QObject):
+    """Signals emitted by FilterRegionTask (QRunnable cannot emit signals itself)"""
+    filtered = pyqtSignal(object, QImage)  # cache key, filtered region
+
+
+class FilterRegionTask(QRunnable):
+    """Filter a copied region of the capture on a pool thread"""
+
+    def __init__(self, key, region, tool, size, signals):
+        super().__init__()
+        self.key = key
+        self.region = region
+        self.tool = tool
+        self.size = size
+        self.signals = signals
+
+    def run(self):
+        try:
+            image = filter_region(self.region, self.tool, self.size)
+        except Exception as e:
+            print(f"Failed to filter redaction: {e}")
+            image = _scaled_filter(self.region, self.tool, self.size)
+        self.signals.filtered.emit(self.key, image)
+
+
+class RedactionCache(QObject):
+    """Filtered regions by capture, tool, rect and size, least recently used
+    dropped first beyond budget_mb"""
+    region_ready = pyqtSignal()  # A background filter finished, repaint to pick it up
+    _instance = None
+
+    @classmethod
+    def instance(cls):
+        if cls._instance is None:
+            cls._instance = cls()
+        return cls._instance
+
+    def __init__(self, budget_mb=REDACTION_CACHE_MB):
+        super().__init__()
+        self.budget = budget_mb * 1024 * 1024
+        self.bytes = 0
+        self._images = OrderedDict()
+        self._pending = set()  # Keys being filtered in the background
+        self._signals = FilterSignals()
+        self._signals.filtered.connect(self._on_filtered)
+        # Not the global pool: Qt's smooth scaling runs on that one, and the
+        # quick preview must not wait behind a filter holding the GIL
+        self._filter_pool = QThreadPool(self)
+        self._filter_pool.setMaxThreadCount(1)
+
+    def region(self, screenshot, tool, rect, size, background=False):
+        """(rect clipped to the capture, filtered QImage), or None if the rect
+        is outside the capture; screenshot is a QPixmap or QImage.
+
+        With background, regions over BACKGROUND_FILTER_PIXELS that aren't
+        cached yet are filtered on a worker thread and (rect, None) is
+        returned; region_ready is emitted once the result is cached.
+        """
+        rect = rect.intersected(QRect(0, 0, screenshot.width(), screenshot.height()))
+        if rect.isEmpty():
+            return None
+        key = (screenshot.cacheKey(), tool, rect.getRect(), size)
+        image = self._images.get(key)
+        if image is not None:
+            self._images.move_to_end(key)
+            return rect, image
+        if key in self._pending:
+            return rect, None
+
+        region = _region_image(screenshot, rect)
+        if background and rect.width() * rect.height() > BACKGROUND_FILTER_PIXELS:
+            self._pending.add(key)
+            self._filter_pool.start(FilterRegionTask(key, region, tool, size, self._signals))
+            return rect, None
+        image = filter_region(region, tool, size)
+        self._store(key, image)
+        return rect, image
+
+    def _store(self, key, image):
+        self._images[key] = image
+        self.bytes += image.sizeInBytes()
+        while self.bytes > self.budget and len(self._images) > 1:
+            _, dropped = self._images.popitem(last=False)
+            self.bytes -= dropped.sizeInBytes()
+
+    def _on_filtered(self, key, image):
+        if key not in self._pending:
+            return  # Cleared while filtering
+        self._pending.discard(key)
+        self._store(key, image)
+        self.region_ready.emit()
+
+    def clear(self):
+        self._images.clear()
+        self._pending.clear()
+        self.bytes = 0
+
+
+def _region_image(screenshot, rect):
+    """A Format_RGB32 QImage copy of rect of a QPixmap or QImage"""
+    region = screenshot.copy(rect)
+    if not isinstance(region, QImage):
+        region = region.toImage()
+    if region.format() != QImage.Format_RGB32:
+        region = region.convertToFormat(QImage.Format_RGB32)
+    return region
+
+
+def draw_redaction(painter, screenshot, tool, color, rect, size, preview=False,
+                   background=False):
+    """Draw a redaction of rect; a solid fill where the capture isn't known.
+
+    preview filters with Qt scaling and skips the cache, for redactions that
+    change on every mouse move while being drawn, moved or resized. With
+    background, large regions are filtered on a worker thread and previewed
+    until the cache has them (see RedactionCache.region).
+    """
+    if tool != "redact" and screenshot is not None:
+        if preview:
+            rect = rect.intersected(QRect(0, 0, screenshot.width(), screenshot.height()))
+            if not rect.isEmpty():
+                painter.drawImage(rect.topLeft(),
+                                  _scaled_filter(_region_image(screenshot, rect), tool, size))
+            return
+        filtered = RedactionCache.instance().region(screenshot, tool, rect, size, background)
+        if filtered is None:
+            return
+        rect, image = filtered
+        if image is None:
+            image = _scaled_filter(_region_image(screenshot, rect), tool, size)
+        painter.drawImage(rect.topLeft(), image)
+        return
+    opaque = QColor(color)
+    opaque.setAlpha(255)
+    painter.fillRect(rect, opaque)
@@ -0,0 +1,314 @@
+"""
+Region watching for SnapTrace
+Grabs a screen region at a fixed rate and keeps the frames in which something
+changed, for catching UI glitches that come and go.
+
+Each frame is hashed in blocks (CRC32 of every block's row segments), so an
+unchanged frame costs one grab and a comparison of a few hundred integers. Only
+blocks whose hash differs are compared pixel by pixel, to find the changed area
+and ignore changes smaller than WATCH_MIN_CHANGE_PIXELS (a blinking caret).
+Changed frames go to the watch's own capture history (compressed on a worker
+thread and capped at WATCH_MAX_FRAMES / WATCH_BUDGET_MB, oldest frames evicted
+first), never to Recent Captures, and optionally to a folder, written by a
+single background writer; saves are skipped rather than queued without end
+when the writer falls behind (the frame is still kept in memory).
+
+The watcher keeps its own work under a CPU budget (a share of one core) by
+grabbing less often when grabbing and hashing a frame takes too long.
+"""
+
+import os
+import time
+import zlib
+from datetime import datetime
+
+from PyQt5.QtCore import QObject, QRect, QRunnable, QSettings, QThreadPool, QTimer, pyqtSignal
+from PyQt5.QtGui import QImage
+from PyQt5.QtWidgets import QApplication
+
+from .constants import (APP_NAME, WATCH_RATE, WATCH_CPU_BUDGET, WATCH_MIN_CHANGE_PIXELS,
+                        WATCH_MAX_FRAMES, WATCH_BUDGET_MB)
+from .capture_history import CaptureHistory
+
+BLOCK_HEIGHT = 16          # Rows per block
+BLOCK_COLUMNS = 4          # Blocks across the region
+MAX_PENDING_SAVES = 8      # Frames waiting for the writer before new saves are skipped
+STATS_WINDOW = 5.0         # Seconds the grab rate and CPU share are averaged over
+RATE_SETTINGS_KEY = "watch/rate"
+CPU_BUDGET_SETTINGS_KEY = "watch/cpu_budget"
+SAVE_DIRECTORY_SETTINGS_KEY = "watch/save_directory"
+
+
+def watch_settings():
+    """(grabs per second, CPU budget in percent, save folder or "")"""
+    settings = QSettings(APP_NAME, APP_NAME)
+    return (settings.value(RATE_SETTINGS_KEY, WATCH_RATE, type=int),
+            settings.value(CPU_BUDGET_SETTINGS_KEY, WATCH_CPU_BUDGET, type=int),
+            settings.value(SAVE_DIRECTORY_SETTINGS_KEY, "", type=str))
+
+
+def set_watch_settings(rate=None, cpu_budget=None, save_directory=None):
+    settings = QSettings(APP_NAME, APP_NAME)
+    if rate is not None:
+        settings.setValue(RATE_SETTINGS_KEY, rate)
+    if cpu_budget is not None:
+        settings.setValue(CPU_BUDGET_SETTINGS_KEY, cpu_budget)
+    if save_directory is not None:
+        settings.setValue(SAVE_DIRECTORY_SETTINGS_KEY, save_directory)
+
+
+def _pixel_view(image):
+    bits = image.constBits()
+    bits.setsize(image.sizeInBytes())
+    return memoryview(bits)
+
+
+def block_bounds(width, columns=BLOCK_COLUMNS):
+    """Pixel column at which each block starts, plus the width"""
+    columns = max(1, min(columns, width))
+    return [width * column // columns for column in range(columns + 1)]
+
+
+def block_hashes(image, block_height=BLOCK_HEIGHT, columns=BLOCK_COLUMNS):
+    """CRC32 of each block of a Format_RGB32 image, row of blocks by row of blocks"""
+    bounds = [x * 4 for x in block_bounds(image.width(), columns)]
+    spans = list(zip(bounds, bounds[1:]))
+    stride = image.bytesPerLine()
+    pixels = _pixel_view(image)
+    crc32 = zlib.crc32
+    hashes = []
+    for top in range(0, image.height(), block_height):
+        band = [0] * len(spans)
+        for offset in range(top * stride, min(top + block_height, image.height()) * stride, stride):
+            for index, (start, end) in enumerate(spans):
+                band[index] = crc32(pixels[offset + start:offset + end], band[index])
+        hashes.extend(band)
+    return hashes
+
+
+def _first_difference(a, b):
+    """Index of the first differing byte of two equal-length buffers, by bisection"""
+    low, high = 0, len(a)
+    while high - low > 64:
+        middle = (low + high) // 2
+        if a[low:middle] == b[low:middle]:
+            low = middle
+        else:
+            high = middle
+    for index in range(low, high):
+        if a[index] != b[index]:
+            return index
+    return None
+
+
+def changed_area(previous, current, blocks, block_height=BLOCK_HEIGHT, columns=BLOCK_COLUMNS):
+    """Bounding rect of the pixels that differ inside the given block indexes"""
+    bounds = block_bounds(current.width(), columns)
+    columns = len(bounds) - 1
+    stride = current.bytesPerLine()
+    old, new = _pixel_view(previous), _pixel_view(current)
+    area = QRect()
+    for block in blocks:
+        band, column = divmod(block, columns)
+        left, right = bounds[column] * 4, bounds[column + 1] * 4
+        for y in range(band * block_height, min((band + 1) * block_height, current.height())):
+            row = y * stride
+            a, b = old[row + left:row + right], new[row + left:row + right]
+            if a == b:
+                continue
+            first = _first_difference(a, b)
+            last = len(a) - 1 - _first_difference(a[::-1], b[::-1])
+            area = area.united(QRect((left + first) // 4, y, (last - first) // 4 + 1, 1))
+    return area
+
+
+class SaveSignals(QObject):
+    """Signals emitted by SaveFrameTask (QRunnable cannot emit signals itself)"""
+    saved = pyqtSignal(str, bool)   # path, success
+
+
+class SaveFrameTask(QRunnable):
+    """Write a changed frame to disk on the watcher's writer thread"""
+
+    def __init__(self, image, path, signals):
+        super().__init__()
+        self.image = image
+        self.path = path
+        self.signals = signals
+
+    def run(self):
+        self.signals.saved.emit(self.path, self.image.save(self.path, "PNG"))
+
+
+class WatchStats:
+    """Counters shown while watching"""
+
+    def __init__(self):
+        self.grabs = 0          # Frames grabbed
+        self.changes = 0        # Frames that differed from the previous one
+        self.kept = 0           # Changed frames still in the watch's history
+        self.saved = 0          # Frames written to the save folder
+        self.dropped = 0        # Frames not saved because the writer was behind
+        self._recent = []       # (finish time, seconds of work) of recent grabs
+
+    def record_grab(self, finished, seconds):
+        self.grabs += 1
+        self._recent.append((finished, seconds))
+        while self._recent and finished - self._recent[0][0] > STATS_WINDOW:
+            self._recent.pop(0)
+
+    def grabs_per_second(self):
+        if len(self._recent) < 2:
+            return 0.0
+        span = self._recent[-1][0] - self._recent[0][0]
+        return (len(self._recent) - 1) / span if span > 0 else 0.0
+
+    def cpu_share(self):
+        """Share of one core spent grabbing and comparing, over the recent window"""
+        if len(self._recent) < 2:
+            return 0.0
+        span = self._recent[-1][0] - self._recent[0][0]
+        return sum(seconds for _, seconds in self._recent[1:]) / span if span > 0 else 0.0
+
+    def summary(self):
+        return (f"{self.grabs_per_second():.1f} grabs/s · {self.changes} changes · "
+                f"{self.kept} kept" + (f" · {self.saved} saved" if self.saved else "") +
+                (f" · {self.dropped} not saved" if self.dropped else "") +
+                f" · CPU {self.cpu_share() * 100:.0f}%")
+
+
+class RegionWatcher(QObject):
+    """Grabs a screen region and keeps the frames that changed.
+
+    rate is in grabs per second and cpu_budget in percent of one core; the
+    grab interval is stretched whenever a grab costs more than the budget
+    allows. Changed frames are kept in frames, a CaptureHistory of the
+    watch's own that outlives the watcher, and, with save_directory, written
+    to PNG files there.
+    """
+    frame_changed = pyqtSignal(QImage, QRect)   # changed frame, changed area in it
+    stats_changed = pyqtSignal()
+
+    def __init__(self, region, screen=None, rate=None, cpu_budget=None, save_directory=None,
+                 parent=None):
+        super().__init__(parent)
+        saved_rate, saved_budget, saved_directory = watch_settings()
+        self.region = region            # Rect to grab, relative to the screen
+        self.screen = screen or QApplication.primaryScreen()
+        self.rate = rate or saved_rate
+        self.cpu_budget = cpu_budget or saved_budget
+        self.save_directory = saved_directory if save_directory is None else save_directory
+        self.min_change = WATCH_MIN_CHANGE_PIXELS
+        self.ignore = QRect()           # Part of the region not watched (our own panel)
+        self.stats = WatchStats()
+        # Not parented to the watcher, so the frames can be reopened after it is gone
+        self.frames = CaptureHistory(WATCH_MAX_FRAMES, WATCH_BUDGET_MB)
+        self.frames.changed.connect(self._on_frames_changed)
+        self.interval_ms = 1000 // self.rate
+        self._previous = None           # Last frame and its block hashes
+        self._previous_hashes = None
+        self._pending_saves = 0
+        self._save_number = 0           # Keeps names unique within a millisecond
+        self._writer = QThreadPool(self)
+        self._writer.setMaxThreadCount(1)
+        self._save_signals = SaveSignals(self)
+        self._save_signals.saved.connect(self._on_saved)
+        self.timer = QTimer(self)
+        self.timer.setSingleShot(True)
+        self.timer.timeout.connect(self.tick)
+
+    def start(self):
+        self.timer.start(0)
+
+    def stop(self):
+        self.timer.stop()
+
+    def is_running(self):
+        return self.timer.isActive()
+
+    def grab(self):
+        """The region's current pixels"""
+        return self.screen.grabWindow(0, self.region.x(), self.region.y(),
+                                      self.region.width(), self.region.height()).toImage()
+
+    def tick(self):
+        start = time.perf_counter()
+        frame = self.grab()
+        if not frame.isNull():
+            if frame.format() != QImage.Format_RGB32:
+                frame = frame.convertToFormat(QImage.Format_RGB32)
+            self.compare(frame)
+        finished = time.perf_counter()
+        cost = finished - start
+        self.stats.record_grab(finished, cost)
+
+        # Stay within the CPU budget: a grab costing cost seconds may only
+        # happen every cost / budget seconds
+        budget_interval = cost / (self.cpu_budget / 100.0)
+        self.interval_ms = int(max(1000 / self.rate, budget_interval * 1000))
+        self.stats_changed.emit()
+        self.timer.start(max(0, self.interval_ms - int(cost * 1000)))
+
+    def compare(self, frame):
+        """Keep frame if it differs from the previous one; True if it was kept"""
+        hashes = block_hashes(frame)
+        previous, previous_hashes = self._previous, self._previous_hashes
+        self._previous, self._previous_hashes = frame, hashes
+        if previous is None:
+            self._keep(frame, QRect(frame.rect()))
+            return True
+        if previous.size() != frame.size():
+            return False   # Screen resolution changed; start over from this frame
+
+        changed = [index for index, (old, new) in enumerate(zip(previous_hashes, hashes))
+                   if old != new]
+        if changed and not self.ignore.isEmpty():
+            changed = self._outside_ignored(changed, frame)
+        if not changed:
+            return False
+        area = changed_area(previous, frame, changed)
+        if area.width() * area.height() < self.min_change:
+            return False
+        self.stats.changes += 1
+        self._keep(frame, area)
+        return True
+
+    def _outside_ignored(self, blocks, frame):
+        bounds = block_bounds(frame.width())
+        columns = len(bounds) - 1
+        kept = []
+        for block in blocks:
+            band, column = divmod(block, columns)
+            rect = QRect(bounds[column], band * BLOCK_HEIGHT,
+                         bounds[column + 1] - bounds[column], BLOCK_HEIGHT)
+            if not rect.intersects(self.ignore):
+                kept.append(block)
+        return kept
+
+    def _keep(self, frame, area):
+        """Hand a frame to the watch's history and saver without waiting on either"""
+        if self.save_directory:
+            if self._pending_saves >= MAX_PENDING_SAVES:
+                self.stats.dropped += 1
+            else:
+                self._save(frame)
+        self.frames.add(frame, self.region, deduplicate=False)
+        self.frame_changed.emit(frame, area)
+
+    def _on_frames_changed(self):
+        # Frames evicted past the caps are no longer counted as kept
+        self.stats.kept = len(self.frames)
+
+    def _save(self, frame):
+        stamp = datetime.now().strftime("%Y%m%d_%H%M%S_%f")[:-3]
+        self._save_number += 1
+        path = os.path.join(self.save_directory, f"watch_{stamp}_{self._save_number:04d}.png")
+        self._pending_saves += 1
+        self._writer.start(SaveFrameTask(frame, path, self._save_signals))
+
+    def _on_saved(self, path, success):
+        self._pending_saves -= 1
+        if success:
+            self.stats.saved += 1
+        else:
+            print(f"Could not save watched frame: {path}")
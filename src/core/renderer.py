@@ -0,0 +1,204 @@
+"""
+Annotation renderer for SnapTrace
+The drawing code for every annotation type, shared by the editor
+(DrawingArea.paintEvent), PNG export and headless batch export.
+
+Only QtGui is used, so it runs under a bare QGuiApplication without widgets.
+"""
+
+from math import cos, sin, atan2, pi
+
+from PyQt5.QtCore import Qt, QPoint, QRect
+from PyQt5.QtGui import QColor, QFont, QFontMetrics, QImage, QPainter, QPainterPath, QPen
+
+from .constants import DEFAULT_PEN_SIZE
+from .redaction import REDACTION_TOOLS, draw_redaction
+
+OLD_COUNTER_SIZE = 2  # Counters saved before they had a size
+OLD_TEXT_FONT = ("Arial", 12)  # Text saved before it had a font
+
+
+def draw_picture(painter, rect, picture):
+    """Draw a QPixmap or QImage scaled into rect"""
+    if isinstance(picture, QImage):
+        painter.drawImage(rect, picture)
+    else:
+        painter.drawPixmap(rect, picture)
+
+
+class AnnotationRenderer:
+    """Draws a document's annotations with a QPainter.
+
+    zoom_level is the editor zoom the painter is scaled by; pen widths and
+    arrow heads are divided by it so they keep their on-screen size.
+    arrow_pen_size is the pen size arrow heads are scaled from.
+    image_painter(painter, rect, image) draws image annotations; by default
+    the image must be a QPixmap or QImage.
+    screenshot is the capture redactions filter; render_document sets it.
+    background_redactions filters large redactions on a worker thread and
+    draws a quick preview until they are ready (the editor sets it; exports
+    filter every redaction before returning).
+    """
+
+    def __init__(self, zoom_level=1.0, arrow_pen_size=DEFAULT_PEN_SIZE, image_painter=None,
+                 min_pen_width=1):
+        self.zoom_level = zoom_level
+        self.arrow_pen_size = arrow_pen_size
+        self.image_painter = image_painter or draw_picture
+        self.min_pen_width = min_pen_width
+        self.screenshot = None
+        self.background_redactions = False
+        self._pens = {}
+        self._counter_fonts = {}
+
+    def scaled_pen_width(self, original_width):
+        # Ensure pen width is never less than 1 pixel and is always an integer
+        return max(self.min_pen_width, int(round(original_width / self.zoom_level)))
+
+    def pen(self, color, size):
+        """Cached QPen for a color and unscaled size"""
+        key = (color.rgba(), self.scaled_pen_width(size))
+        pen = self._pens.get(key)
+        if pen is None:
+            pen = QPen(color)
+            pen.setWidth(key[1])
+            self._pens[key] = pen
+        return pen
+
+    def render_document(self, painter, screenshot, drawings, counter_items, text_items):
+        """Draw the screenshot and all annotations in the editor's stacking order"""
+        painter.setRenderHint(QPainter.Antialiasing)
+        self.screenshot = screenshot
+        if isinstance(screenshot, QImage):
+            painter.drawImage(0, 0, screenshot)
+        else:
+            painter.drawPixmap(0, 0, screenshot)
+        for drawing in drawings:
+            self.draw_drawing(painter, drawing)
+        for counter_item in counter_items:
+            self.draw_counter(painter, counter_item)
+        for text_item in text_items:
+            self.draw_text(painter, text_item)
+
+    def render_image(self, screenshot, drawings, counter_items, text_items):
+        """Render a document to a new QImage the size of the screenshot"""
+        image = QImage(screenshot.size(), QImage.Format_ARGB32_Premultiplied)
+        image.fill(Qt.transparent)
+        painter = QPainter(image)
+        try:
+            self.render_document(painter, screenshot, drawings, counter_items, text_items)
+        finally:
+            painter.end()
+        return image
+
+    def draw_drawing(self, painter, drawing):
+        """Draw one entry of DrawingArea.drawings"""
+        if len(drawing) == 5:  # Image drawing
+            tool, _, points, _, image = drawing
+            if tool == "image":
+                self.image_painter(painter, QRect(points[0], points[1]).normalized(), image)
+            return
+        tool, color, points, size = drawing
+        if tool in REDACTION_TOOLS:
+            self.draw_redaction(painter, tool, color, points, size)
+            return
+        painter.setPen(self.pen(color, size))
+        self.draw_shape(painter, tool, points)
+
+    def draw_redaction(self, painter, tool, color, points, size, preview=False):
+        """Pixelate, blur or fill the box between two points of the screenshot"""
+        draw_redaction(painter, self.screenshot, tool, color,
+                       QRect(points[0], points[1]).normalized(), size, preview,
+                       self.background_redactions)
+
+    def draw_shape(self, painter, tool, points):
+        """Draw a shape outline with the painter's current pen"""
+        if tool == "rectangle":
+            painter.drawRect(QRect(points[0], points[1]).normalized())
+        elif tool == "circle":
+            painter.drawEllipse(QRect(points[0], points[1]).normalized())
+        elif tool == "arrow":
+            self.draw_arrow(painter, points[0], points[1])
+        elif tool == "line":
+            painter.drawLine(points[0], points[1])
+        elif tool == "pencil":
+            if len(points) > 1:
+                path = QPainterPath()
+                path.moveTo(points[0])
+                for point in points[1:]:
+                    path.lineTo(point)
+                painter.drawPath(path)
+
+    def draw_arrow(self, painter, start, end):
+        if start == end:
+            return
+
+        # Draw the main line
+        painter.drawLine(start, end)
+
+        # Calculate the arrow head
+        angle = atan2(end.y() - start.y(), end.x() - start.x())
+        # Scale arrow size with pen width and zoom
+        arrow_size = max(8, int((self.arrow_pen_size * 3 + 12) / self.zoom_level))
+        arrow_angle = pi/6  # 30 degrees
+
+        # Calculate arrow head points
+        p1 = QPoint(
+            int(end.x() - arrow_size * cos(angle - arrow_angle)),
+            int(end.y() - arrow_size * sin(angle - arrow_angle))
+        )
+        p2 = QPoint(
+            int(end.x() - arrow_size * cos(angle + arrow_angle)),
+            int(end.y() - arrow_size * sin(angle + arrow_angle))
+        )
+
+        # Draw arrow head lines
+        painter.drawLine(end, p1)
+        painter.drawLine(end, p2)
+
+    def draw_counter(self, painter, counter_item):
+        """Draw a numbered counter; returns (center, highlight radius)"""
+        if len(counter_item) == 4:  # New format with size
+            number, pos, color, size = counter_item
+        else:  # Old format without size (backward compatibility)
+            number, pos, color = counter_item
+            size = OLD_COUNTER_SIZE
+
+        # Draw highlight circle with stored size
+        highlight_color = QColor(color)
+        highlight_color.setAlpha(50)
+        painter.setBrush(highlight_color)
+        painter.setPen(Qt.NoPen)
+        highlight_radius = 10 + size  # Use stored size
+        painter.drawEllipse(pos, highlight_radius, highlight_radius)
+
+        # Draw number with stored font size
+        painter.setPen(QPen(color))
+        font = self._counter_fonts.get(size)
+        if font is None:
+            font = self._counter_fonts[size] = QFont("Arial", size + 10, QFont.Bold)
+        painter.setFont(font)
+        painter.drawText(QRect(pos.x() - highlight_radius, pos.y() - highlight_radius,
+                               highlight_radius * 2, highlight_radius * 2),
+                         Qt.AlignCenter, str(number))
+        return pos, highlight_radius
+
+    def draw_text(self, painter, text_item):
+        """Draw a text item, one baseline per line"""
+        if not isinstance(text_item, dict):  # Backward compatibility for old format
+            painter.setPen(QPen(text_item[2]))
+            # Use a default font size for old text items instead of current pen_size
+            painter.setFont(QFont(*OLD_TEXT_FONT))
+            painter.drawText(text_item[1], text_item[0])
+            return
+
+        painter.setPen(QPen(text_item['color']))
+        painter.setFont(text_item['font'])
+        text = text_item['text']
+        pos = text_item['pos']
+        if '\n' in text:
+            line_height = QFontMetrics(text_item['font']).height()
+            for i_line, line in enumerate(text.split('\n')):
+                painter.drawText(QPoint(pos.x(), pos.y() + (i_line * line_height)), line)
+        else:
+            painter.drawText(pos, text)
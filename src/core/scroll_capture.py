@@ -0,0 +1,239 @@
+"""
+Scrolling capture for SnapTrace
+Stitches frames of a screen region, grabbed while the content under it scrolls,
+into one tall image.
+
+Every frame row is reduced to one integer hash of its pixels (with NumPy, a
+weighted sum of its 64-bit words computed for all rows at once; without it, a
+CRC32 per row), so matching consecutive frames compares short lists of
+integers instead of pixels. Rows that stay put
+between frames (sticky headers, footers) are left out of the match; the scroll
+distance is the offset at which the rest of the previous frame lines up with the
+new one. Only the rows scrolled into view are appended to the output, which is
+kept as fixed-height tiles: memory grows with the stitched image, not with the
+number of frames, and nothing already stitched is copied again.
+"""
+
+import zlib
+from functools import lru_cache
+
+from PyQt5.QtGui import QImage
+
+from .constants import SCROLL_CAPTURE_MAX_HEIGHT
+
+try:
+    import numpy as np
+    NUMPY_AVAILABLE = True
+except ImportError:
+    NUMPY_AVAILABLE = False
+
+TILE_HEIGHT = 1024       # Rows per tile of the stitched image
+MIN_OVERLAP = 32         # Rows two frames must share to be stitched
+ANCHOR_ROWS = 16         # Rows at the top of a frame tried as match anchors
+SCROLLBAR_MARGIN = 24    # Right-hand columns left out of row hashes (moving scrollbar thumbs)
+
+
+def frame_image(image):
+    """image as a 32-bit QImage, the format frames are hashed and stitched in"""
+    if image.format() == QImage.Format_RGB32:
+        return image
+    return image.convertToFormat(QImage.Format_RGB32)
+
+
+def _pixel_view(image, writable=False):
+    bits = image.bits() if writable else image.constBits()
+    bits.setsize(image.sizeInBytes())
+    return memoryview(bits)
+
+
+@lru_cache(maxsize=4)
+def _row_weights(words):
+    """Random odd multipliers for the 64-bit words of a row, the same for every frame"""
+    return np.random.default_rng(words).integers(0, 2 ** 64, words, dtype=np.uint64) | 1
+
+
+def row_hashes(image, ignore_right=SCROLLBAR_MARGIN):
+    """A hash of each row of a Format_RGB32 image, without the rightmost columns.
+
+    With NumPy each row is read as 64-bit words (two pixels each) and hashed
+    as their sum weighted by random odd multipliers, modulo 2**64, in one
+    matrix product for the whole frame; otherwise it is the row's CRC32. The
+    two give different values, so only compare hashes made the same way.
+    """
+    width = image.width()
+    if width > 3 * ignore_right:
+        width -= ignore_right
+    if NUMPY_AVAILABLE:
+        return _row_hashes_numpy(image, width)
+    row_bytes = width * 4
+    stride = image.bytesPerLine()
+    pixels = _pixel_view(image)
+    crc32 = zlib.crc32
+    return [crc32(pixels[offset:offset + row_bytes])
+            for offset in range(0, stride * image.height(), stride)]
+
+
+def _row_hashes_numpy(image, width):
+    pixels = np.frombuffer(_pixel_view(image), np.uint32).reshape(
+        image.height(), image.bytesPerLine() // 4)
+    words = np.ascontiguousarray(pixels[:, :width - width % 2]).view(np.uint64)
+    weights = _row_weights(words.shape[1] + width % 2)
+    # Integer products and sums wrap around, which is what a modular hash wants
+    hashes = words @ weights[:words.shape[1]]
+    if width % 2:
+        hashes += pixels[:, width - 1].astype(np.uint64) * weights[-1]
+    return hashes.tolist()
+
+
+def find_scroll(previous, current, min_overlap=MIN_OVERLAP):
+    """How far the content scrolled between two frames, from their row hashes.
+
+    Returns (distance, header, footer): the rows the content moved up, and the
+    number of rows at the top and bottom that did not move. distance is 0 if
+    nothing scrolled, None if the frames don't overlap by min_overlap rows.
+    """
+    height = len(current)
+    header = 0
+    while header < height and previous[header] == current[header]:
+        header += 1
+    if header == height:
+        return 0, height, 0
+    footer = 0
+    while previous[height - 1 - footer] == current[height - 1 - footer]:
+        footer += 1
+    end = height - footer
+    if end - header <= min_overlap:
+        return None
+
+    # Where each row of the previous frame's moving part is
+    positions = {}
+    for row in range(header, end):
+        positions.setdefault(previous[row], []).append(row)
+
+    # The first rows of the new frame are in any overlap, so the rarest of them
+    # gives the fewest candidate distances to check
+    anchors = [row for row in range(header, min(header + ANCHOR_ROWS, end))
+               if current[row] in positions]
+    if not anchors:
+        return None
+    anchor = min(anchors, key=lambda row: len(positions[current[row]]))
+    for position in positions[current[anchor]]:
+        distance = position - anchor
+        if distance <= 0 or end - header - distance < min_overlap:
+            continue
+        if previous[header + distance:end] == current[header:end - distance]:
+            return distance, header, footer
+    return None
+
+
+class TiledImage:
+    """A tall Format_RGB32 image stored as fixed-height tiles.
+
+    Appending rows fills the last tile and starts new ones, so growing the
+    image never copies what is already in it.
+    """
+
+    def __init__(self, width, tile_height=TILE_HEIGHT):
+        self.width = width
+        self.tile_height = tile_height
+        self.height = 0
+        self._tiles = []
+
+    def append(self, image, top, bottom):
+        """Append rows top..bottom (exclusive) of a Format_RGB32 image as wide as this one"""
+        source = _pixel_view(image)
+        stride = image.bytesPerLine()
+        row = top
+        while row < bottom:
+            tile_index, tile_row = divmod(self.height, self.tile_height)
+            if tile_index == len(self._tiles):
+                self._tiles.append(QImage(self.width, self.tile_height, QImage.Format_RGB32))
+            tile = self._tiles[tile_index]
+            count = min(bottom - row, self.tile_height - tile_row)
+            # Same format and width, so whole runs of rows are one contiguous copy
+            target = _pixel_view(tile, writable=True)
+            tile_stride = tile.bytesPerLine()
+            target[tile_row * tile_stride:(tile_row + count) * tile_stride] = \
+                source[row * stride:(row + count) * stride]
+            self.height += count
+            row += count
+
+    def truncate(self, height):
+        """Drop the rows from height on; they are overwritten by later appends"""
+        self.height = min(self.height, height)
+        del self._tiles[(self.height + self.tile_height - 1) // self.tile_height:]
+
+    def take_image(self):
+        """The stitched image as one QImage; the tiles are released as they are copied"""
+        image = QImage(self.width, max(1, self.height), QImage.Format_RGB32)
+        target = _pixel_view(image, writable=True)
+        stride = image.bytesPerLine()
+        row = 0
+        while self._tiles:
+            tile = self._tiles.pop(0)
+            count = min(self.tile_height, self.height - row)
+            target[row * stride:(row + count) * stride] = \
+                _pixel_view(tile)[:count * tile.bytesPerLine()]
+            row += count
+        self.height = 0
+        return image
+
+
+class ScrollStitcher:
+    """Builds a tall image from frames of a scrolling region.
+
+    add_frame() takes each grabbed frame; frames that don't overlap the last
+    stitched one (scrolled too far at once) are skipped and counted in missed.
+    """
+
+    def __init__(self, max_height=SCROLL_CAPTURE_MAX_HEIGHT):
+        self.max_height = max_height
+        self.output = None
+        self.missed = 0
+        self._previous = None   # Row hashes of the last stitched frame
+
+    @property
+    def height(self):
+        return self.output.height if self.output is not None else 0
+
+    def is_full(self):
+        return self.height >= self.max_height
+
+    def add_frame(self, image):
+        """Stitch a frame; returns the number of new rows it added"""
+        image = frame_image(image)
+        hashes = row_hashes(image)
+        if self.output is None:
+            self.output = TiledImage(image.width())
+            self.output.append(image, 0, min(image.height(), self.max_height))
+            self._previous = hashes
+            return self.output.height
+        if image.width() != self.output.width or len(hashes) != len(self._previous):
+            raise ValueError("Scrolling capture frames must all be the same size")
+
+        match = find_scroll(self._previous, hashes)
+        if match is None:
+            self.missed += 1
+            return 0
+        distance, _, footer = match
+        if distance == 0 or self.is_full():
+            return 0
+
+        # The new rows go between the previous frame's moving content and its
+        # footer, which is written again after them
+        start = self.output.height - footer
+        top = image.height() - footer - distance
+        new_rows = max(0, min(distance, self.max_height - start - footer))
+        self.output.truncate(start)
+        self.output.append(image, top, top + new_rows)
+        self.output.append(image, image.height() - footer, image.height())
+        self._previous = hashes
+        return new_rows
+
+    def take_image(self):
+        """The stitched capture as a QImage (null if no frame was added)"""
+        if self.output is None:
+            return QImage()
+        image = self.output.take_image()
+        self.output = None
+        return image
@@ -0,0 +1,464 @@
+"""
+Search index for the Quick Commands feedback list
+Answers "every query term is a substring of the phrase" (the filter the
+panel has always used) without scanning every phrase on every keystroke.
+
+Query terms never contain whitespace, so a term is a substring of a phrase
+exactly when it is a substring of one of the phrase's whitespace-separated
+tokens. Catalogs reuse a small vocabulary, so the index works on tokens:
+
+- token -> rows containing it (postings)
+- trigram -> tokens containing it, to find the tokens matching a term
+- one row mask per character, answering one-letter terms directly
+
+Results are row masks (one byte per row, 1 = match) combined with integer
+AND. When a query extends the previous one, only the previous matches can
+still match, so they are narrowed instead of searched again.
+
+rank() is the forgiving variant: terms of three or more letters also match
+tokens they start or merely resemble (one typo, found through a
+deletion-neighbourhood index), and the best rows are returned by score.
+rank_result() narrows the previous matches the same way; only rows the
+extended term now reaches through a typo are added back.
+"""
+
+from array import array
+from itertools import compress, islice
+from collections import OrderedDict
+
+MASK_CACHE_SIZE = 64         # Cached masks for two-letter terms and rank() parts
+NARROW_LIMIT = 4000          # Re-check previous matches directly below this many
+
+FUZZY_MIN_LENGTH = 3         # Shorter terms only filter, they are not scored
+TYPO_MIN_LENGTH = 4          # Shorter terms are not matched with typos
+TOKEN_PUNCTUATION = ".,;:!?()[]{}\"'"
+
+# How well a term matches a token
+EXACT_SCORE = 1.0
+PREFIX_SCORE = 0.8
+SUBSTRING_SCORE = 0.6
+TYPO_SCORE = 0.4
+# Added to a row's average term score
+CATEGORY_BOOST = 0.3         # A term starts the row's category
+LEADING_BOOST = 0.1          # The first term matches the phrase's first word
+
+
+def _to_int(mask):
+    return int.from_bytes(mask, 'little')
+
+
+def _to_mask(value, length):
+    return value.to_bytes(length, 'little')
+
+
+def _mask_rows(mask):
+    """Rows set in mask, found with bytes.find so sparse masks are cheap"""
+    row = mask.find(1)
+    while row != -1:
+        yield row
+        row = mask.find(1, row + 1)
+
+
+def query_terms(query):
+    return query.lower().split()
+
+
+def _deletions(word):
+    return {word[:i] + word[i + 1:] for i in range(len(word))}
+
+
+def within_one_edit(a, b):
+    """True if a and b differ by at most one insertion, deletion, substitution
+    or transposition of adjacent letters"""
+    if a == b:
+        return True
+    if abs(len(a) - len(b)) > 1:
+        return False
+    if len(a) > len(b):
+        a, b = b, a
+    i = 0
+    while i < len(a) and a[i] == b[i]:
+        i += 1
+    if len(a) == len(b):
+        if a[i + 1:] == b[i + 1:]:
+            return True  # Substitution
+        return (i + 1 < len(a) and a[i] == b[i + 1] and a[i + 1] == b[i]
+                and a[i + 2:] == b[i + 2:])
+    return a[i:] == b[i + 1:]
+
+
+class SearchResult:
+    """Rows matching a query; mask is None when every row matches.
+
+    ranked holds the best rows in order for results of rank_result().
+    """
+
+    def __init__(self, query, terms, mask, length, ranked=None):
+        self.query = query
+        self.terms = terms
+        self.mask = mask
+        self.length = length
+        self.ranked = ranked
+        self._rows = None
+
+    @property
+    def count(self):
+        return self.length if self.mask is None else self.mask.count(1)
+
+    def contains(self, row):
+        return self.mask is None or (row < len(self.mask) and self.mask[row] == 1)
+
+    def rows(self):
+        """Matching row numbers in ascending order"""
+        if self._rows is None:
+            if self.mask is None:
+                self._rows = range(self.length)
+            else:
+                self._rows = list(compress(range(self.length), self.mask))
+        return self._rows
+
+
+class SearchIndex:
+    """Incrementally extendable substring index over a list of phrases"""
+
+    def __init__(self, texts=(), categories=None):
+        self.texts = []          # Lower-cased phrases
+        self._token_ids = {}     # token -> token id
+        self._tokens = []        # token id -> token
+        self._postings = []      # token id -> array of rows
+        self._token_grams = {}   # trigram -> array of token ids
+        self._token_variants = {}  # word or word minus one letter -> token ids
+        self._char_masks = {}    # character -> bytearray row mask
+        self._mask_cache = OrderedDict()  # two-letter terms and rank() parts -> row masks
+        self._category_rows = {}  # lower-cased category -> array of rows
+        self._first_rows = {}     # token id -> rows whose phrase starts with the token
+        self.add(texts, categories)
+
+    def __len__(self):
+        return len(self.texts)
+
+    def add(self, texts, categories=None):
+        """Index phrases appended after the existing ones.
+
+        categories, if given, holds each phrase's category; rank() favours
+        phrases whose category a query term starts.
+        """
+        first = len(self.texts)
+        new_texts = [text.lower() for text in texts]
+        if not new_texts:
+            return
+        self.texts.extend(new_texts)
+
+        token_ids = self._token_ids
+        for row, text in enumerate(new_texts, start=first):
+            for token in set(text.split()):
+                token_id = token_ids.get(token)
+                if token_id is None:
+                    token_id = token_ids[token] = len(self._tokens)
+                    self._tokens.append(token)
+                    self._postings.append(array('I'))
+                    self._index_token(token, token_id)
+                self._postings[token_id].append(row)
+
+        for row, text in enumerate(new_texts, start=first):
+            category = categories[row - first].lower() if categories is not None else ""
+            if category:
+                rows = self._category_rows.get(category)
+                if rows is None:
+                    rows = self._category_rows[category] = array('I')
+                rows.append(row)
+            # The phrase's first word follows the "category: " label, if any
+            words = text[len(category) + 2:].split() if category else text.split()
+            if words:
+                rows = self._first_rows.get(token_ids[words[0]])
+                if rows is None:
+                    rows = self._first_rows[token_ids[words[0]]] = array('I')
+                rows.append(row)
+
+        # Character masks: extend the existing ones, create masks for new characters
+        characters = set()
+        for text in new_texts:
+            characters.update(text)
+        characters.discard(" ")
+        for character, mask in self._char_masks.items():
+            if character not in characters:
+                mask.extend(bytes(len(new_texts)))
+        for character in characters:
+            mask = self._char_masks.get(character)
+            if mask is None:
+                mask = self._char_masks[character] = bytearray(first)
+            mask.extend(character in text for text in new_texts)
+
+        self._mask_cache.clear()
+
+    def merge(self, other):
+        """Append the phrases of another index, e.g. one built on a worker thread.
+
+        Much cheaper than add() on the same phrases: only other's postings are
+        shifted and its new words indexed.
+        """
+        offset = len(self.texts)
+        if not other.texts:
+            return
+        self.texts.extend(other.texts)
+
+        def shifted(rows):
+            return array('I', map(offset.__add__, rows))
+
+        token_ids = self._token_ids
+        merged_ids = []
+        for token, rows in zip(other._tokens, other._postings):
+            token_id = token_ids.get(token)
+            if token_id is None:
+                token_id = token_ids[token] = len(self._tokens)
+                self._tokens.append(token)
+                self._postings.append(shifted(rows))
+                self._index_token(token, token_id)
+            else:
+                self._postings[token_id].extend(shifted(rows))
+            merged_ids.append(token_id)
+
+        for category, rows in other._category_rows.items():
+            self._category_rows.setdefault(category, array('I')).extend(shifted(rows))
+        for token_id, rows in other._first_rows.items():
+            self._first_rows.setdefault(merged_ids[token_id], array('I')).extend(shifted(rows))
+
+        for character, mask in self._char_masks.items():
+            mask.extend(other._char_masks.get(character) or bytes(len(other.texts)))
+        for character, mask in other._char_masks.items():
+            if character not in self._char_masks:
+                self._char_masks[character] = bytearray(offset) + mask
+
+        self._mask_cache.clear()
+
+    def _index_token(self, token, token_id):
+        for gram in {token[i:i + 3] for i in range(len(token) - 2)}:
+            token_list = self._token_grams.get(gram)
+            if token_list is None:
+                token_list = self._token_grams[gram] = array('I')
+            token_list.append(token_id)
+        word = token.strip(TOKEN_PUNCTUATION)
+        if len(word) >= TYPO_MIN_LENGTH - 1:
+            for variant in _deletions(word) | {word}:
+                token_list = self._token_variants.get(variant)
+                if token_list is None:
+                    token_list = self._token_variants[variant] = array('I')
+                token_list.append(token_id)
+
+    def search(self, query, previous=None):
+        """Rows whose phrase contains every term of query.
+
+        Pass the previous result to narrow it when query extends its query.
+        """
+        terms = query_terms(query)
+        length = len(self.texts)
+        if not terms:
+            return SearchResult(query, terms, None, length)
+
+        narrowing = (previous is not None and previous.length == length
+                     and query.lower().startswith(previous.query.lower()))
+        if narrowing and previous.mask is not None and previous.count <= NARROW_LIMIT:
+            # Few candidates left: check them directly
+            texts = self.texts
+            mask = bytearray(length)
+            for row in previous.rows():
+                text = texts[row]
+                if all(term in text for term in terms):
+                    mask[row] = 1
+            return SearchResult(query, terms, bytes(mask), length)
+
+        # Most selective terms first, so a miss ends the search early
+        value = _to_int(previous.mask) if narrowing and previous.mask is not None else None
+        for term in sorted(set(terms), key=len, reverse=True):
+            term_value = _to_int(self._term_mask(term))
+            value = term_value if value is None else value & term_value
+            if not value:
+                break
+        return SearchResult(query, terms, _to_mask(value, length), length)
+
+    def _term_mask(self, term):
+        length = len(self.texts)
+        if len(term) == 1:
+            mask = self._char_masks.get(term)
+            return bytes(mask) if mask is not None else bytes(length)
+        if len(term) == 2:
+            # Scanning the vocabulary is much cheaper than scanning phrases
+            tokens = self._tokens
+            return self._cached(term, lambda: self._rows_mask(
+                token_id for token_id in range(len(tokens)) if term in tokens[token_id]))
+
+        return self._rows_mask(self._substring_tokens(term))
+
+    def _cached(self, key, build):
+        mask = self._mask_cache.get(key)
+        if mask is None:
+            mask = self._mask_cache[key] = build()
+            if len(self._mask_cache) > MASK_CACHE_SIZE:
+                self._mask_cache.popitem(last=False)
+        else:
+            self._mask_cache.move_to_end(key)
+        return mask
+
+    def _substring_tokens(self, term):
+        """Ids of the tokens containing term (three letters or more)"""
+        # Candidate tokens share every trigram of the term; confirm by substring
+        grams = {term[i:i + 3] for i in range(len(term) - 2)}
+        token_lists = []
+        for gram in grams:
+            token_list = self._token_grams.get(gram)
+            if token_list is None:
+                return set()
+            token_lists.append(token_list)
+        token_lists.sort(key=len)
+        candidates = set(token_lists[0])
+        for token_list in token_lists[1:]:
+            candidates.intersection_update(token_list)
+            if not candidates:
+                return candidates
+        if len(grams) > 1:
+            tokens = self._tokens
+            candidates = {token_id for token_id in candidates if term in tokens[token_id]}
+        return candidates
+
+    def _rows_mask(self, token_ids):
+        """Row mask of every row containing one of the tokens"""
+        postings = self._postings
+        return self._postings_mask(postings[token_id] for token_id in token_ids)
+
+    def _postings_mask(self, row_lists):
+        mask = bytearray(len(self.texts))
+        for rows in row_lists:
+            for row in rows:
+                mask[row] = 1
+        return bytes(mask)
+
+    def rank(self, query, limit=100, boosts=None):
+        """Up to limit rows best matching query, best first.
+
+        Every term must match: terms shorter than FUZZY_MIN_LENGTH as
+        substrings, longer ones as a substring of a word or a word one typo
+        away. Rows score the average of their terms' best word matches plus
+        CATEGORY_BOOST and LEADING_BOOST where they apply, plus boosts[row]
+        (e.g. usage). Equal scores keep catalog order.
+        """
+        return self.rank_result(query, limit, boosts).ranked
+
+    def rank_result(self, query, limit=100, boosts=None, previous=None):
+        """rank() as a SearchResult whose mask holds every matching row.
+
+        Pass the previous result to narrow it when query extends its query.
+        """
+        raw_terms = query_terms(query)
+        length = len(self.texts)
+        if not raw_terms or not length:
+            return SearchResult(query, raw_terms, None, length, [])
+        boosts = boosts or {}
+        terms = list(dict.fromkeys(raw_terms))
+        scored_terms = [term for term in terms if len(term) >= FUZZY_MIN_LENGTH]
+
+        # Each part of the score is a few (score, row mask) levels; a row is in
+        # exactly one level of each part. Row masks are combined as integers.
+        parts = []
+        for term in scored_terms:
+            levels = self._term_levels(term)
+            if not levels:
+                return SearchResult(query, raw_terms, bytes(length), length, [])
+            parts.append([(score / len(scored_terms), mask) for score, mask in levels])
+
+        narrowing = (previous is not None and previous.ranked is not None
+                     and previous.mask is not None and previous.length == length
+                     and query.lower().startswith(previous.query.lower()))
+        if narrowing:
+            # Only the previous matches can still match, apart from rows the
+            # extended last term reaches through a typo and the shorter one did not
+            matching = _to_int(previous.mask)
+            position = len(previous.terms) - 1
+            extended = raw_terms[position]
+            if extended != previous.terms[position] and len(extended) >= TYPO_MIN_LENGTH:
+                matching |= dict(self._term_levels(extended)).get(TYPO_SCORE, 0)
+        else:
+            matching = _to_int(b"\x01" * length)
+        # Every row must match the short terms as substrings
+        for term in terms:
+            if len(term) < FUZZY_MIN_LENGTH:
+                matching &= _to_int(self._term_mask(term))
+        categories = [category for category in self._category_rows
+                      if any(category.startswith(term) for term in terms)]
+        if categories:
+            in_category = self._cached(("category",) + tuple(categories), lambda: _to_int(
+                self._postings_mask(self._category_rows[category] for category in categories)))
+            parts.append([(CATEGORY_BOOST, in_category), (0.0, ~in_category)])
+        if scored_terms and terms[0] == scored_terms[0]:
+            leading = self._cached(("leading", terms[0]), lambda: _to_int(self._postings_mask(
+                self._first_rows.get(token_id, ()) for token_id in self._fuzzy_tokens(terms[0]))))
+            parts.append([(LEADING_BOOST, leading), (0.0, ~leading)])
+
+        # Rows with the same total score, best first
+        buckets = {}
+        def combine(index, score, mask):
+            if not mask:
+                return
+            if index == len(parts):
+                score = round(score, 9)
+                buckets[score] = buckets.get(score, 0) | mask
+                return
+            for level_score, level_mask in parts[index]:
+                combine(index + 1, score + level_score, mask & level_mask)
+        combine(0, 0.0, matching)
+        ordered = sorted(buckets.items(), reverse=True)
+        found = 0
+        for _score, mask in ordered:
+            found |= mask
+
+        rows = []        # (score, row) of the best unboosted rows
+        for score, mask in ordered:
+            bucket_rows = (row for row in _mask_rows(_to_mask(mask, length)) if row not in boosts)
+            rows.extend((score, row) for row in islice(bucket_rows, limit - len(rows)))
+            if len(rows) >= limit:
+                break
+        if boosts:
+            masks = [(score, _to_mask(mask, length)) for score, mask in ordered]
+            for row, boost in boosts.items():
+                score = next((score for score, mask in masks if row < length and mask[row]), None)
+                if score is not None:
+                    rows.append((score + boost, row))
+        rows.sort(key=lambda item: (-item[0], item[1]))
+        return SearchResult(query, raw_terms, _to_mask(found, length), length,
+                            [row for _score, row in rows[:limit]])
+
+    def _term_levels(self, term):
+        """[(score, row mask as int)] for term, each row in the level of its best word"""
+        def build():
+            matches = self._fuzzy_tokens(term)
+            levels = []
+            seen = 0
+            for score in (EXACT_SCORE, PREFIX_SCORE, SUBSTRING_SCORE, TYPO_SCORE):
+                token_ids = [token_id for token_id, match in matches.items() if match == score]
+                if token_ids:
+                    mask = _to_int(self._rows_mask(token_ids)) & ~seen
+                    if mask:
+                        levels.append((score, mask))
+                        seen |= mask
+            return levels
+        return self._cached(("levels", term), build)
+
+    def _fuzzy_tokens(self, term):
+        """token id -> how well term matches it (EXACT_SCORE ... TYPO_SCORE)"""
+        tokens = self._tokens
+        matches = {}
+        for token_id in self._substring_tokens(term):
+            word = tokens[token_id].strip(TOKEN_PUNCTUATION)
+            if word == term:
+                matches[token_id] = EXACT_SCORE
+            elif word.startswith(term):
+                matches[token_id] = PREFIX_SCORE
+            else:
+                matches[token_id] = SUBSTRING_SCORE
+        if len(term) >= TYPO_MIN_LENGTH:
+            variants = self._token_variants
+            for variant in _deletions(term) | {term}:
+                for token_id in variants.get(variant, ()):
+                    if token_id not in matches and \
+                            within_one_edit(term, tokens[token_id].strip(TOKEN_PUNCTUATION)):
+                        matches[token_id] = TYPO_SCORE
+        return matches
@@ -0,0 +1,241 @@
+"""
+Thumbnails for SnapTrace
+Small previews of saved captures for history and gallery views. Files are
+decoded on a worker pool straight at thumbnail size and the results kept in an
+on-disk cache, so each capture is only decoded once, however large the folder.
+
+Cached thumbnails are addressed by the file's path, size and modification time,
+so an overwritten capture gets a new thumbnail. Reading a thumbnail refreshes
+its modification time; when the cache grows past its cap the least recently
+used thumbnails are deleted.
+"""
+
+import os
+import hashlib
+import threading
+from collections import OrderedDict
+
+from PyQt5.QtCore import (QObject, QRunnable, QThreadPool, QBuffer, QByteArray, QIODevice,
+                          QStandardPaths, Qt, pyqtSignal)
+from PyQt5.QtGui import QImage, QImageReader
+
+from .constants import THUMBNAIL_CACHE_MB
+from .image_loader import fit_size
+
+THUMBNAIL_SIZE = 256          # Longest side, in pixels
+THUMBNAIL_JPEG_QUALITY = 85   # Opaque thumbnails are stored as JPEG, others as PNG
+MEMORY_THUMBNAILS = 512       # Decoded thumbnails kept in memory by the service
+EVICT_TO = 0.9                # Eviction frees space down to this share of the cap
+
+
+def thumbnail_cache_dir():
+    cache_dir = QStandardPaths.writableLocation(QStandardPaths.CacheLocation)
+    return os.path.join(cache_dir, "thumbnails") if cache_dir else None
+
+
+def thumbnail_key(path, stat, size=THUMBNAIL_SIZE):
+    """Cache key of a file's thumbnail at the given size"""
+    source = f"{os.path.abspath(path)}\0{stat.st_size}\0{stat.st_mtime_ns}\0{size}"
+    return hashlib.sha1(source.encode("utf-8")).hexdigest()
+
+
+def read_thumbnail(path, size=THUMBNAIL_SIZE):
+    """Decode an image file scaled to fit size x size; a null QImage on failure"""
+    reader = QImageReader(path)
+    reader.setAutoTransform(True)
+    source_size = reader.size()
+    if source_size.isValid():
+        # JPEG decodes at a fraction of the size directly; other formats at
+        # least skip a separate full-size scaled copy
+        reader.setScaledSize(fit_size(source_size, size, size))
+    image = reader.read()
+    if not image.isNull() and (image.width() > size or image.height() > size):
+        image = image.scaled(size, size, Qt.KeepAspectRatio, Qt.SmoothTransformation)
+    return image
+
+
+class ThumbnailCache:
+    """Content-addressed thumbnail files with an LRU size cap; safe across threads"""
+
+    def __init__(self, directory, max_bytes):
+        self.directory = directory
+        self.max_bytes = max_bytes
+        self._lock = threading.Lock()
+        self._total = None   # Bytes on disk, counted on first write
+
+    def path_for(self, key):
+        return os.path.join(self.directory, key[:2], key)
+
+    def get(self, key):
+        """The cached thumbnail, or None"""
+        path = self.path_for(key)
+        image = QImage(path)
+        if image.isNull():
+            return None
+        try:
+            os.utime(path)  # Mark as recently used
+        except OSError:
+            pass
+        return image
+
+    def put(self, key, image):
+        data = QByteArray()
+        buffer = QBuffer(data)
+        buffer.open(QIODevice.WriteOnly)
+        if image.hasAlphaChannel():
+            image.save(buffer, "PNG")
+        else:
+            image.save(buffer, "JPEG", THUMBNAIL_JPEG_QUALITY)
+        path = self.path_for(key)
+        temp_path = f"{path}.{threading.get_ident()}.tmp"
+        try:
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+            with open(temp_path, 'wb') as f:
+                f.write(bytes(data))
+            os.replace(temp_path, path)
+        except OSError as e:
+            print(f"Could not cache thumbnail {path}: {e}")
+            return
+        with self._lock:
+            if self._total is None:
+                self._total = self._disk_usage()
+            else:
+                self._total += data.size()
+            if self._total > self.max_bytes:
+                self._evict()
+
+    def _files(self):
+        """(mtime, size, path) of every cached thumbnail"""
+        files = []
+        try:
+            subdirectories = list(os.scandir(self.directory))
+        except OSError:
+            return files
+        for subdirectory in subdirectories:
+            if not subdirectory.is_dir():
+                continue
+            try:
+                for entry in os.scandir(subdirectory.path):
+                    stat = entry.stat()
+                    files.append((stat.st_mtime_ns, stat.st_size, entry.path))
+            except OSError:
+                continue
+        return files
+
+    def _disk_usage(self):
+        return sum(size for _mtime, size, _path in self._files())
+
+    def _evict(self):
+        # Called with the lock held; least recently used first
+        files = sorted(self._files())
+        self._total = sum(size for _mtime, size, _path in files)
+        target = self.max_bytes * EVICT_TO
+        for _mtime, size, path in files:
+            if self._total <= target:
+                break
+            try:
+                os.remove(path)
+                self._total -= size
+            except OSError:
+                pass
+
+
+class ThumbnailSignals(QObject):
+    """Signals emitted by ThumbnailTask (QRunnable cannot emit signals itself)"""
+    finished = pyqtSignal(str, QImage)  # path, thumbnail (null if unreadable)
+
+
+class ThumbnailTask(QRunnable):
+    """Serve one file's thumbnail from the disk cache, or decode and cache it"""
+
+    def __init__(self, path, size, cache, signals):
+        super().__init__()
+        self.path = path
+        self.size = size
+        self.cache = cache
+        self.signals = signals
+
+    def run(self):
+        try:
+            stat = os.stat(self.path)
+        except OSError:
+            self.signals.finished.emit(self.path, QImage())
+            return
+        key = thumbnail_key(self.path, stat, self.size)
+        image = self.cache.get(key) if self.cache is not None else None
+        if image is None:
+            image = read_thumbnail(self.path, self.size)
+            if not image.isNull() and self.cache is not None:
+                self.cache.put(key, image)
+        self.signals.finished.emit(self.path, image)
+
+
+class ThumbnailService(QObject):
+    """Asynchronous thumbnails for the UI, with an in-memory LRU in front of the
+    disk cache.
+
+    request() returns a thumbnail already in memory; otherwise it queues the
+    file and thumbnail_ready is emitted when the thumbnail is available.
+    Views pass themselves as requester so that cancel_pending() drops only
+    their own queued requests when they close.
+    Thumbnails use their own thread pool so a large folder does not hold up
+    other background work.
+    """
+    thumbnail_ready = pyqtSignal(str, QImage)  # path, thumbnail (null if unreadable)
+
+    _instance = None
+
+    @classmethod
+    def instance(cls):
+        if cls._instance is None:
+            cls._instance = cls()
+        return cls._instance
+
+    def __init__(self, cache_dir=None, max_cache_mb=THUMBNAIL_CACHE_MB, size=THUMBNAIL_SIZE,
+                 parent=None):
+        super().__init__(parent)
+        cache_dir = cache_dir or thumbnail_cache_dir()
+        self.cache = ThumbnailCache(cache_dir, max_cache_mb * 1024 * 1024) if cache_dir else None
+        self.size = size
+        self.pool = QThreadPool(self)
+        self._memory = OrderedDict()   # path -> QImage, least recently used first
+        self._pending = {}             # path -> (ThumbnailTask, requesters waiting for it)
+        self._signals = ThumbnailSignals(self)
+        self._signals.finished.connect(self._on_finished)
+
+    def request(self, path, priority=0, requester=None):
+        """The thumbnail if it is in memory, else None and thumbnail_ready follows"""
+        image = self._memory.get(path)
+        if image is not None:
+            self._memory.move_to_end(path)
+            return image
+        pending = self._pending.get(path)
+        if pending is None:
+            task = ThumbnailTask(path, self.size, self.cache, self._signals)
+            # Kept alive by _pending, so cancel_pending() can take it back from the pool
+            task.setAutoDelete(False)
+            pending = self._pending[path] = (task, set())
+            self.pool.start(task, priority)
+        pending[1].add(requester)
+        return None
+
+    def invalidate(self, path):
+        """Forget the in-memory thumbnail of a file that was just written"""
+        self._memory.pop(path, None)
+
+    def cancel_pending(self, requester):
+        """Drop a requester's queued requests, e.g. when the view showing them
+        closes; thumbnails other requesters still wait for stay queued"""
+        for path, (task, requesters) in list(self._pending.items()):
+            requesters.discard(requester)
+            if not requesters and self.pool.tryTake(task):
+                del self._pending[path]
+
+    def _on_finished(self, path, image):
+        self._pending.pop(path, None)
+        if not image.isNull():
+            self._memory[path] = image
+            self._memory.move_to_end(path)
+            while len(self._memory) > MEMORY_THUMBNAILS:
+                self._memory.popitem(last=False)
+        self.thumbnail_ready.emit(path, image)
@@ -0,0 +1,117 @@
+"""
+Feedback phrase usage for SnapTrace
+Counts how often, and how recently, each Quick Commands phrase is dropped onto
+a capture, so search can rank the phrases a tester actually uses first.
+
+Counts live in a small SQLite database next to the autosave folder. Drops are
+recorded in memory immediately and written in one transaction a moment later,
+so dragging phrases never waits on the disk.
+"""
+
+import os
+import math
+import time
+import sqlite3
+
+from PyQt5.QtCore import QCoreApplication, QObject, QTimer, QStandardPaths, pyqtSignal
+
+from .constants import APP_NAME
+
+USAGE_DB_NAME = "usage.sqlite3"
+FLUSH_DELAY_MS = 2000        # Drops are written in batches at most this often
+USAGE_WEIGHT = 0.5           # Boost of a phrase used often and just now
+USAGE_SATURATION = 20        # Uses after which more uses add no boost
+USAGE_HALF_LIFE = 14 * 24 * 3600  # Seconds for a phrase's boost to halve
+
+
+def usage_db_path():
+    base = QStandardPaths.writableLocation(QStandardPaths.AppLocalDataLocation)
+    return os.path.join(base or os.path.expanduser(f"~/.{APP_NAME.lower()}"), USAGE_DB_NAME)
+
+
+class UsageStats(QObject):
+    """Process-wide phrase -> (count, last used) store with batched writes"""
+    changed = pyqtSignal()   # counts changed in memory
+
+    _instance = None
+
+    @classmethod
+    def instance(cls):
+        if cls._instance is None:
+            cls._instance = cls()
+            app = QCoreApplication.instance()
+            if app is not None:
+                app.aboutToQuit.connect(cls._instance.close)
+        return cls._instance
+
+    def __init__(self, path=None, parent=None):
+        super().__init__(parent)
+        self.path = path or usage_db_path()
+        self.phrases = {}    # phrase -> [count, last used (epoch seconds)]
+        self._pending = set()
+        self.connection = self._open()
+
+        self._flush_timer = QTimer(self)
+        self._flush_timer.setSingleShot(True)
+        self._flush_timer.setInterval(FLUSH_DELAY_MS)
+        self._flush_timer.timeout.connect(self.flush)
+
+    def _open(self):
+        try:
+            os.makedirs(os.path.dirname(self.path), exist_ok=True)
+            connection = sqlite3.connect(self.path)
+            connection.execute("CREATE TABLE IF NOT EXISTS phrase_usage ("
+                               "phrase TEXT PRIMARY KEY, count INTEGER NOT NULL, "
+                               "last_used REAL NOT NULL)")
+            for phrase, count, last_used in connection.execute(
+                    "SELECT phrase, count, last_used FROM phrase_usage"):
+                self.phrases[phrase] = [count, last_used]
+            return connection
+        except (OSError, sqlite3.Error) as e:
+            # Ranking still learns for this session, it just isn't kept
+            print(f"Could not open usage statistics {self.path}: {e}")
+            return None
+
+    def record(self, phrase, when=None):
+        """Count one use of phrase; written to disk with the next batch"""
+        entry = self.phrases.setdefault(phrase, [0, 0.0])
+        entry[0] += 1
+        entry[1] = time.time() if when is None else when
+        self._pending.add(phrase)
+        if not self._flush_timer.isActive():
+            self._flush_timer.start()
+        self.changed.emit()
+
+    def boost(self, phrase, now=None):
+        """Ranking bonus between 0 and USAGE_WEIGHT, decaying with time since last use"""
+        entry = self.phrases.get(phrase)
+        if entry is None:
+            return 0.0
+        count, last_used = entry
+        now = time.time() if now is None else now
+        frequency = min(1.0, math.log1p(count) / math.log1p(USAGE_SATURATION))
+        recency = 0.5 ** (max(0.0, now - last_used) / USAGE_HALF_LIFE)
+        return USAGE_WEIGHT * frequency * recency
+
+    def flush(self):
+        """Write pending counts in one transaction"""
+        self._flush_timer.stop()
+        if not self._pending or self.connection is None:
+            self._pending.clear()
+            return
+        rows = [(phrase, *self.phrases[phrase]) for phrase in self._pending]
+        self._pending.clear()
+        try:
+            with self.connection:
+                self.connection.executemany(
+                    "INSERT INTO phrase_usage (phrase, count, last_used) VALUES (?, ?, ?) "
+                    "ON CONFLICT(phrase) DO UPDATE SET count = excluded.count, "
+                    "last_used = excluded.last_used", rows)
+        except sqlite3.Error as e:
+            print(f"Could not save usage statistics: {e}")
+
+    def close(self):
+        self.flush()
+        if self.connection is not None:
+            self.connection.close()
+            self.connection = None
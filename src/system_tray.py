@@ -5,14 +5,28 @@ Handles system tray functionality, global hotkeys, and application lifecycle
 
 import sys
 import os
+import shutil
 import threading
+from datetime import datetime
 from PyQt5.QtWidgets import (QSystemTrayIcon, QMenu, QAction, QActionGroup,
                             QApplication, QMessageBox, QDialog, QVBoxLayout, 
-                            QLabel, QPushButton, QHBoxLayout, QTextEdit, QWidget)
-from PyQt5.QtGui import QIcon, QPixmap, QCursor
+                            QLabel, QPushButton, QHBoxLayout, QTextEdit, QWidget,
+                            QCheckBox, QFileDialog, QSpinBox, QComboBox)
+from PyQt5.QtGui import QIcon, QPixmap, QCursor, QColor
 from PyQt5.QtCore import QObject, pyqtSignal, QTimer, QThread, Qt
 from .ui.screenshot_selector import ScreenshotSelector
 from .ui.main_window import ScreenshotTool
+from .ui.region_watch_panel import RegionWatchPanel
+from .ui.recording_panel import RecordingPanel
+from .core.profiler import PROFILER
+from .core.project import Project, ProjectError, PROJECT_EXTENSION
+from .core.autosave import find_sessions, recover_session, discard_session
+from .core.feedback_catalog import FeedbackCatalog
+from .core.capture_history import CaptureHistory
+from .core.document_spool import DocumentSpool
+from .core.region_watch import watch_settings, set_watch_settings
+from .core.pixel_diff import diff_tolerance, set_diff_tolerance
+from .core.image_hash import DUPLICATE_ACTIONS, duplicate_action, set_duplicate_action
 
 try:
     import keyboard
@@ -76,6 +90,9 @@ class SystemTrayManager(QWidget):
         self.tray_icon = None
         self.screenshot_selector = None
         self.main_window = None
+        self.watch_panel = None
+        self.watch_frames = None  # Changed frames of the latest region watch
+        self.recording_panel = None
         self.hotkey_thread = None
         self.context_menu = None
         
@@ -96,6 +113,12 @@ class SystemTrayManager(QWidget):
         
         self.setup_tray_icon()
         self.setup_hotkey()
+
+        # Start parsing the feedback catalog now so editor windows open instantly
+        FeedbackCatalog.instance()
+
+        # Offer to restore work from a previous run that did not exit cleanly
+        QTimer.singleShot(500, self.offer_autosave_recovery)
     
     def setup_tray_icon(self):
         """Setup the system tray icon and menu"""
@@ -126,7 +149,26 @@ class SystemTrayManager(QWidget):
         new_screenshot_action.triggered.connect(self.take_screenshot)
         new_screenshot_action.setToolTip("Take a new screenshot (Ctrl+Alt+S)")
         self.context_menu.addAction(new_screenshot_action)
+
+        open_project_action = QAction("📂 Open Project...", self)
+        open_project_action.triggered.connect(self.open_project_dialog)
+        self.context_menu.addAction(open_project_action)
         print("Added New Screenshot action")
+
+        self.watch_action = QAction("👁 Watch Region...", self)
+        self.watch_action.triggered.connect(self.watch_region)
+        self.watch_action.setToolTip("Capture a screen region automatically whenever it changes")
+        self.context_menu.addAction(self.watch_action)
+
+        self.record_action = QAction("⏺ Record Region...", self)
+        self.record_action.triggered.connect(self.record_region)
+        self.record_action.setToolTip("Record a screen region as an animated PNG")
+        self.context_menu.addAction(self.record_action)
+
+        # Recent captures, rebuilt each time the submenu opens
+        self.history_menu = QMenu("🕘 Recent Captures", self.context_menu)
+        self.history_menu.aboutToShow.connect(self.populate_history_menu)
+        self.context_menu.addMenu(self.history_menu)
         
         self.context_menu.addSeparator()
         
@@ -265,21 +307,12 @@ class SystemTrayManager(QWidget):
             
             # Hide the selector
             self.screenshot_selector.hide()
+            CaptureHistory.instance().add(self.screenshot_selector.screenshot,
+                                          self.screenshot_selector.selected_geometry)
             
-            # Create and show the editing tool
-            self.main_window = ScreenshotTool(
-                self.screenshot_selector.screenshot, 
-                self.screenshot_selector.selected_geometry
-            )
-            
-            # Set the current color in the main window
-            if hasattr(self.main_window, 'drawing_area'):
-                from PyQt5.QtGui import QColor
-                self.main_window.drawing_area.current_color = QColor(self.current_color)
-            
-            self.main_window.show()
-            self.main_window.raise_()
-            self.main_window.activateWindow()
+            # Show the editing tool, with the capture in a new tab
+            self.open_in_editor(self.screenshot_selector.screenshot,
+                                self.screenshot_selector.selected_geometry)
             
             print("Main window should be visible now")
         
@@ -288,6 +321,197 @@ class SystemTrayManager(QWidget):
             self.screenshot_selector.deleteLater()
             self.screenshot_selector = None
     
+    def watch_region(self):
+        """Select a region to watch for changes, or stop the running watch"""
+        if self.watch_panel is not None:
+            self.watch_panel.stop()
+            return
+        self.select_region(self.on_watch_region_selected)
+
+    def select_region(self, on_selected):
+        """Show the selector; on_selected(region, screen) gets the selected rect"""
+        if self.main_window:
+            self.main_window.hide()
+        self.screenshot_selector = ScreenshotSelector(allow_scroll_capture=False)
+        self.screenshot_selector.finished.connect(lambda: self.on_region_selected(on_selected))
+        self.screenshot_selector.cancelled.connect(self.on_screenshot_cancelled)
+        self.screenshot_selector.showFullScreen()
+        self.screenshot_selector.raise_()
+        self.screenshot_selector.activateWindow()
+
+    def on_region_selected(self, on_selected):
+        if self.screenshot_selector and self.screenshot_selector.selected_geometry is not None:
+            self.screenshot_selector.hide()
+            on_selected(self.screenshot_selector.selected_geometry, self.screenshot_selector.screen)
+        if self.screenshot_selector:
+            self.screenshot_selector.deleteLater()
+            self.screenshot_selector = None
+
+    def on_watch_region_selected(self, region, screen):
+        """Start watching the selected region"""
+        self.watch_panel = RegionWatchPanel(region, screen)
+        self.watch_panel.stopped.connect(self.on_watch_stopped)
+        self.watch_frames = self.watch_panel.watcher.frames
+        self.watch_panel.start()
+        self.watch_action.setText("⏹ Stop Watching")
+        print("Watching region for changes")
+
+    def on_watch_stopped(self):
+        stats = self.watch_panel.watcher.stats
+        self.watch_panel = None
+        self.watch_action.setText("👁 Watch Region...")
+        print(f"Region watch stopped: {stats.summary()}")
+        if self.tray_icon.supportsMessages():
+            self.tray_icon.showMessage(
+                "Region Watch Stopped",
+                f"{stats.kept} changed frames kept in Recent Captures → Watched Region"
+                + (f", {stats.saved} saved" if stats.saved else ""),
+                QSystemTrayIcon.Information,
+                2000
+            )
+
+    def record_region(self):
+        """Select a region to record, or stop the running recording"""
+        if self.recording_panel is not None:
+            self.recording_panel.stop()
+            return
+        self.select_region(self.on_record_region_selected)
+
+    def on_record_region_selected(self, region, screen):
+        """Start recording the selected region"""
+        self.recording_panel = RecordingPanel(region, screen)
+        self.recording_panel.finished.connect(self.on_recording_finished)
+        self.recording_panel.failed.connect(self.on_recording_failed)
+        self.recording_panel.start()
+        self.record_action.setText("⏹ Stop Recording")
+        print("Recording region")
+
+    def on_recording_finished(self, path):
+        """Ask where to keep the finished recording"""
+        self.recording_panel = None
+        self.record_action.setText("⏺ Record Region...")
+        directory = self.main_window.save_directory if self.main_window else os.path.expanduser("~")
+        name = f"recording_{datetime.now().strftime('%Y%m%d_%H%M%S')}.png"
+        filename, _ = QFileDialog.getSaveFileName(
+            None, "Save Recording", os.path.join(directory, name),
+            "Animated PNG (*.png);;All Files (*)")
+        if not filename:
+            try:
+                os.remove(path)
+            except OSError:
+                pass
+            return
+        try:
+            shutil.move(path, filename)
+        except OSError as e:
+            QMessageBox.warning(None, "Save Recording", f"Could not save the recording:\n{e}")
+            return
+        print(f"Recording saved: {filename}")
+        if self.tray_icon.supportsMessages():
+            self.tray_icon.showMessage("Recording Saved", filename, QSystemTrayIcon.Information, 2000)
+
+    def on_recording_failed(self, message):
+        self.recording_panel = None
+        self.record_action.setText("⏺ Record Region...")
+        QMessageBox.warning(None, "Record Region", f"The recording failed:\n{message}")
+
+    def populate_history_menu(self):
+        """List the captures kept in the history, newest first"""
+        self.history_menu.clear()
+        history = CaptureHistory.instance()
+        entries = history.entries()
+        watched = self.watch_frames.entries() if self.watch_frames is not None else []
+        if not entries and not watched:
+            empty_action = self.history_menu.addAction("No captures yet")
+            empty_action.setEnabled(False)
+            return
+        for entry in entries:
+            action = self.history_menu.addAction(entry.label())
+            action.triggered.connect(lambda checked, i=entry.entry_id: self.show_capture(i))
+        if watched:
+            # Frames of the latest region watch, kept apart from the captures above
+            frames = self.watch_frames
+            watch_menu = self.history_menu.addMenu(f"👁 Watched Region ({len(watched)} frames)")
+            for entry in watched:
+                action = watch_menu.addAction(entry.label())
+                action.triggered.connect(
+                    lambda checked, i=entry.entry_id: self.show_capture(i, frames))
+            watch_menu.addSeparator()
+            watch_menu.addAction("Clear Watched Frames", frames.clear)
+        self.history_menu.addSeparator()
+        self.history_menu.addAction("Clear History", history.clear)
+
+    def open_in_editor(self, pixmap, geometry=None):
+        """Open a capture in a new tab of the editor, creating the window if needed"""
+        if self.main_window and self.main_window.documents:
+            self.main_window.open_document(pixmap, geometry)
+        else:
+            if self.main_window:
+                self.main_window.close()
+            self.main_window = ScreenshotTool(pixmap, geometry)
+        # Set the current color in the main window
+        self.main_window.drawing_area.current_color = QColor(self.current_color)
+        self.main_window.show()
+        self.main_window.raise_()
+        self.main_window.activateWindow()
+        return self.main_window
+
+    def show_capture(self, entry_id, history=None):
+        """Reopen a capture from the history (or a watch's frames) in a new editor tab"""
+        if history is None:
+            history = CaptureHistory.instance()
+        pixmap = history.pixmap(entry_id)
+        if pixmap is None:
+            return
+        self.open_in_editor(pixmap, history.get(entry_id).geometry)
+
+    def open_project_dialog(self):
+        """Ask for a .snaptrace project and open it"""
+        filename, _ = QFileDialog.getOpenFileName(
+            None, "Open Project", os.path.expanduser("~"),
+            f"SnapTrace Project (*{PROJECT_EXTENSION})")
+        if filename:
+            self.open_project(filename)
+
+    def open_project(self, filename):
+        """Open a saved project in a new editor window"""
+        try:
+            project = Project.load(filename)
+            self.show_project(project)
+        except ProjectError as e:
+            QMessageBox.critical(None, "Error", f"Failed to open project:\n{str(e)}")
+            return
+        print(f"Project opened: {filename}")
+
+    def show_project(self, project):
+        """Show a Project in a new editor tab"""
+        self.open_in_editor(project.capture_pixmap()).load_project(project)
+
+    def offer_autosave_recovery(self):
+        """Restore the newest autosave session left by a crashed run"""
+        sessions = find_sessions()
+        if not sessions:
+            return
+        others = f"\n({len(sessions) - 1} older session(s) will be offered next time.)" \
+            if len(sessions) > 1 else ""
+        reply = QMessageBox.question(
+            None, "Recover Unsaved Work",
+            f"SnapTrace did not exit cleanly last time.\n"
+            f"Recover the screenshot you were editing?{others}",
+            QMessageBox.Yes | QMessageBox.No, QMessageBox.Yes)
+        if reply != QMessageBox.Yes:
+            discard_session(sessions[0])
+            return
+        try:
+            project = recover_session(sessions[0])
+        except (OSError, ValueError, KeyError) as e:
+            QMessageBox.critical(None, "Error", f"Failed to recover session:\n{str(e)}")
+            return
+        # The editor journals the recovered document into a fresh session
+        self.show_project(project)
+        discard_session(sessions[0])
+        print(f"Recovered autosave session: {sessions[0]}")
+
     def on_screenshot_cancelled(self):
         """Handle when screenshot is cancelled"""
         print("Screenshot cancelled")
@@ -321,7 +545,8 @@ class SystemTrayManager(QWidget):
         """Show settings dialog"""
         dialog = QDialog()
         dialog.setWindowTitle("SnapTrace Settings")
-        dialog.setFixedSize(300, 200)
+        # Sized to its contents, so added settings never end up clipped
+        dialog.setMinimumWidth(300)
         
         layout = QVBoxLayout()
         
@@ -349,6 +574,111 @@ class SystemTrayManager(QWidget):
         )
         layout.addWidget(instructions)
         
+        # Performance overlay toggle (also SNAPTRACE_PROFILE=1)
+        profiler_checkbox = QCheckBox("Show performance overlay")
+        profiler_checkbox.setChecked(PROFILER.enabled)
+        profiler_checkbox.toggled.connect(self.set_profiler_enabled)
+        layout.addWidget(profiler_checkbox)
+
+        # Capture history limits (Recent Captures menu)
+        history = CaptureHistory.instance()
+        history_layout = QHBoxLayout()
+        history_layout.addWidget(QLabel("Keep last"))
+        history_count = QSpinBox()
+        history_count.setRange(1, 200)
+        history_count.setValue(history.max_captures)
+        history_count.valueChanged.connect(lambda value: history.set_limits(max_captures=value))
+        history_layout.addWidget(history_count)
+        history_layout.addWidget(QLabel("captures, up to"))
+        history_budget = QSpinBox()
+        history_budget.setRange(8, 4096)
+        history_budget.setSuffix(" MB")
+        history_budget.setValue(history.budget_mb)
+        history_budget.valueChanged.connect(lambda value: history.set_limits(budget_mb=value))
+        history_layout.addWidget(history_budget)
+        layout.addLayout(history_layout)
+
+        # Memory for editor tabs; tabs in the background are unloaded beyond it
+        spool = DocumentSpool.instance()
+        tabs_layout = QHBoxLayout()
+        tabs_layout.addWidget(QLabel("Editor tabs memory:"))
+        tabs_budget = QSpinBox()
+        tabs_budget.setRange(64, 16384)
+        tabs_budget.setSuffix(" MB")
+        tabs_budget.setValue(spool.budget_mb)
+        tabs_budget.valueChanged.connect(lambda value: spool.set_budget(value))
+        tabs_layout.addWidget(tabs_budget)
+        layout.addLayout(tabs_layout)
+
+        # Region watch: grab rate, CPU budget and where changed frames are saved
+        watch_rate, watch_budget, watch_directory = watch_settings()
+        watch_layout = QHBoxLayout()
+        watch_layout.addWidget(QLabel("Region watch:"))
+        rate_spin = QSpinBox()
+        rate_spin.setRange(1, 30)
+        rate_spin.setSuffix(" grabs/s")
+        rate_spin.setValue(watch_rate)
+        rate_spin.valueChanged.connect(lambda value: set_watch_settings(rate=value))
+        watch_layout.addWidget(rate_spin)
+        watch_layout.addWidget(QLabel("CPU budget"))
+        budget_spin = QSpinBox()
+        budget_spin.setRange(1, 100)
+        budget_spin.setSuffix(" %")
+        budget_spin.setValue(watch_budget)
+        budget_spin.valueChanged.connect(lambda value: set_watch_settings(cpu_budget=value))
+        watch_layout.addWidget(budget_spin)
+        layout.addLayout(watch_layout)
+
+        watch_folder_layout = QHBoxLayout()
+        watch_folder_layout.addWidget(QLabel("Save watched changes to:"))
+        watch_folder_btn = QPushButton()
+
+        def show_watch_folder(folder):
+            # Long paths are elided in the middle; the tooltip has the whole path
+            watch_folder_btn.setText(watch_folder_btn.fontMetrics().elidedText(
+                folder or "Not saved", Qt.ElideMiddle, 220))
+            watch_folder_btn.setToolTip((f"{folder}\n\n" if folder else "") +
+                                        "The latest changed frames are kept in Recent Captures → "
+                                        "Watched Region; choose a folder to also save them all "
+                                        "as PNG files")
+
+        def choose_watch_folder():
+            folder = QFileDialog.getExistingDirectory(dialog, "Save Watched Changes To",
+                                                      watch_settings()[2] or os.path.expanduser("~"))
+            set_watch_settings(save_directory=folder)
+            show_watch_folder(folder)
+
+        show_watch_folder(watch_directory)
+
+        watch_folder_btn.clicked.connect(choose_watch_folder)
+        watch_folder_layout.addWidget(watch_folder_btn)
+        layout.addLayout(watch_folder_layout)
+
+        # Compare captures: per-channel difference still treated as unchanged
+        diff_layout = QHBoxLayout()
+        diff_layout.addWidget(QLabel("Compare captures tolerance:"))
+        tolerance_spin = QSpinBox()
+        tolerance_spin.setRange(0, 255)
+        tolerance_spin.setToolTip("Color differences up to this much (0-255 per channel) "
+                                  "are not marked, e.g. from compression or font smoothing")
+        tolerance_spin.setValue(diff_tolerance())
+        tolerance_spin.valueChanged.connect(set_diff_tolerance)
+        diff_layout.addWidget(tolerance_spin)
+        layout.addLayout(diff_layout)
+
+        # Saving a screenshot that looks like one already in the folder
+        duplicate_layout = QHBoxLayout()
+        duplicate_layout.addWidget(QLabel("Duplicate screenshots:"))
+        duplicate_combo = QComboBox()
+        labels = {"warn": "Ask before saving", "skip": "Don't save", "off": "Allow"}
+        for action in DUPLICATE_ACTIONS:
+            duplicate_combo.addItem(labels[action], action)
+        duplicate_combo.setCurrentIndex(DUPLICATE_ACTIONS.index(duplicate_action()))
+        duplicate_combo.currentIndexChanged.connect(
+            lambda index: set_duplicate_action(duplicate_combo.itemData(index)))
+        duplicate_layout.addWidget(duplicate_combo)
+        layout.addLayout(duplicate_layout)
+        
         # Close button
         button_layout = QHBoxLayout()
         close_button = QPushButton("Close")
@@ -357,8 +687,15 @@ class SystemTrayManager(QWidget):
         layout.addLayout(button_layout)
         
         dialog.setLayout(layout)
+        dialog.adjustSize()
         dialog.exec_()
     
+    def set_profiler_enabled(self, enabled):
+        """Toggle hot-path timing and the editor's frame time overlay"""
+        PROFILER.set_enabled(enabled)
+        if self.main_window and hasattr(self.main_window, 'drawing_area'):
+            self.main_window.drawing_area.update()
+    
     def show_help(self):
         """Show help dialog"""
         dialog = QDialog()
@@ -374,6 +711,9 @@ class SystemTrayManager(QWidget):
 • Press Ctrl+Alt+S from anywhere
 • Double-click the system tray icon
 • Right-click tray icon → New Screenshot
+• Shift+drag: scrolling capture, scroll the page then press Done
+• Right-click tray icon → Watch Region: capture whenever a region changes
+• Right-click tray icon → Record Region: record a region as an animated PNG
 
 <b>Drawing Tools:</b>
 • R - Rectangle
@@ -384,6 +724,7 @@ class SystemTrayManager(QWidget):
 • T - Text
 • E - Eraser
 • N - Counter
+• X - Pixelate, B - Blur, F - Solid redaction
 
 <b>Mouse Controls:</b>
 • Left-click: Draw/Create
@@ -395,12 +736,17 @@ class SystemTrayManager(QWidget):
 <b>Keyboard Shortcuts:</b>
 • Ctrl+Z: Undo
 • Ctrl+Y: Redo
+• Ctrl+Shift+S: Save editable project (.snaptrace)
+• Ctrl+O: Open project in a new tab
+• Ctrl+Tab / Ctrl+W: Next tab / Close tab
+• Ctrl+D: Mark differences from an earlier capture
 • Delete: Delete selected item
 • Escape: Clear selection/Cancel
 • Enter: Finish text editing
 
 <b>System Tray:</b>
 • Right-click for color options
+• Recent Captures: reopen an earlier screenshot or a watched region's frames
 • Change drawing colors on-the-fly
 • Exit application
         """
@@ -1,41 +1,70 @@
-from PyQt5.QtWidgets import QListWidget
+from PyQt5.QtWidgets import QListView, QTreeView
 from PyQt5.QtCore import Qt, QPoint, QMimeData
 from PyQt5.QtGui import QDrag, QFont, QFontMetrics, QPainter, QPixmap
 
-class DraggableListWidget(QListWidget):
+LAYOUT_BATCH_SIZE = 5000
+
+def start_text_drag(view, text):
+    """Drag text out of view, showing the text under the cursor"""
+    mimeData = QMimeData()
+    mimeData.setText(text)
+
+    drag = QDrag(view)
+    drag.setMimeData(mimeData)
+
+    # Create a pixmap for drag feedback
+    font = view.font()
+    metrics = QFontMetrics(font)
+    text_width = metrics.width(text)
+    text_height = metrics.height()
+
+    pixmap = QPixmap(text_width + 8, text_height + 8)
+    pixmap.fill(Qt.transparent)
+
+    painter = QPainter(pixmap)
+    painter.setFont(font)
+    painter.setPen(Qt.white)
+    painter.drawText(4, text_height, text)
+    painter.end()
+
+    drag.setPixmap(pixmap)
+    drag.setHotSpot(QPoint(4, text_height))
+
+    drag.exec_(Qt.CopyAction)
+
+class DraggableListView(QListView):
+    def __init__(self, parent=None):
+        super().__init__(parent)
+        # Every row is one line of text, so the view never measures rows it doesn't paint,
+        # and large lists are laid out in batches between events
+        self.setUniformItemSizes(True)
+        self.setLayoutMode(QListView.Batched)
+        self.setBatchSize(LAYOUT_BATCH_SIZE)
+        self.setDragEnabled(True)
+        self.setAcceptDrops(False)
+        self.setDefaultDropAction(Qt.CopyAction)
+        self.setSelectionMode(QListView.SingleSelection)
+        self.setDragDropMode(QListView.DragOnly)
+
+    def startDrag(self, supportedActions):
+        index = self.currentIndex()
+        if index.isValid():
+            start_text_drag(self, index.data())
+
+class DraggableTreeView(QTreeView):
+    """Tree whose leaves drag out the text in their Qt.UserRole data"""
+
     def __init__(self, parent=None):
         super().__init__(parent)
+        self.setHeaderHidden(True)
+        self.setUniformRowHeights(True)
         self.setDragEnabled(True)
         self.setAcceptDrops(False)
         self.setDefaultDropAction(Qt.CopyAction)
-        self.setSelectionMode(QListWidget.SingleSelection)
-        self.setDragDropMode(QListWidget.DragOnly)
+        self.setSelectionMode(QTreeView.SingleSelection)
+        self.setDragDropMode(QTreeView.DragOnly)
 
     def startDrag(self, supportedActions):
-        item = self.currentItem()
-        if item:
-            mimeData = QMimeData()
-            mimeData.setText(item.text())
-            
-            drag = QDrag(self)
-            drag.setMimeData(mimeData)
-            
-            # Create a pixmap for drag feedback
-            font = self.font()
-            metrics = QFontMetrics(font)
-            text_width = metrics.width(item.text())
-            text_height = metrics.height()
-            
-            pixmap = QPixmap(text_width + 8, text_height + 8)
-            pixmap.fill(Qt.transparent)
-            
-            painter = QPainter(pixmap)
-            painter.setFont(font)
-            painter.setPen(Qt.white)
-            painter.drawText(4, text_height, item.text())
-            painter.end()
-            
-            drag.setPixmap(pixmap)
-            drag.setHotSpot(QPoint(4, text_height))
-            
-            drag.exec_(Qt.CopyAction)
+        text = self.currentIndex().data(Qt.UserRole)
+        if text:
+            start_text_drag(self, text)
@@ -1,11 +1,22 @@
-from math import cos, sin, atan2, pi
+import weakref
 from PyQt5.QtWidgets import QWidget, QScrollArea
-from PyQt5.QtCore import Qt, QPoint, QRect, QTimer
-from PyQt5.QtGui import (QColor, QPainter, QPixmap, QPen, QPainterPath,
+from PyQt5.QtCore import Qt, QPoint, QRect, QSize, QTimer, pyqtSignal
+from PyQt5.QtGui import (QColor, QPainter, QPixmap, QImage, QPen,
                         QFont, QFontMetrics, QBrush)
 from ..core.constants import DEFAULT_PEN_SIZE, MAX_UNDO_STATES, DEFAULT_FONT_SIZE
+from ..core.image_store import ImageStore
+from ..core.profiler import PROFILER, profiled
+from ..core.input_trace import attach_recorder_from_env
+from ..core.renderer import AnnotationRenderer
+from ..core.redaction import REDACTION_TOOLS, RedactionCache
+
+# Tools whose drawings are the box between two points (moved and resized by
+# their corners); redactions are boxes too
+BOX_TOOLS = ("rectangle", "circle", "arrow", "line") + REDACTION_TOOLS
 
 class DrawingArea(QWidget):
+    text_dropped = pyqtSignal(str)  # Text dragged in and placed on the capture
+
     def __init__(self, screenshot, parent=None):
         super().__init__(parent)
         self.screenshot = screenshot
@@ -35,6 +46,9 @@ class DrawingArea(QWidget):
         self.pan_start = None
         self.zoom_level = 1.0
         self.min_pen_width = 1
+        self.renderer = AnnotationRenderer(image_painter=self.draw_image,
+                                           min_pen_width=self.min_pen_width)
+        self.renderer.background_redactions = True  # Large blurs never stall a repaint
         self.undo_stack = []
         self.redo_stack = []
         self.max_undo_states = MAX_UNDO_STATES
@@ -57,12 +71,36 @@ class DrawingArea(QWidget):
         self.cursor_visible = True
         self.text_editing_background = True  # Show background when editing text
         self.text_tool_ready = True  # Track if text tool is ready for new text creation
+        self.exporting = False  # Set while rendering for export, hides on-screen overlays
+        self.journal = None  # AutosaveJournal told about every document change
+        
+        # Embedded images are shared through the image store, which needs to
+        # know what this document and its undo history still reference
+        self.image_store = ImageStore.instance()
+        self.image_store.image_ready.connect(self.update)
+        weakref.finalize(self, self.image_store.release_owner, id(self))
+        RedactionCache.instance().region_ready.connect(self.update)
+        self.shown_images = []  # Handles drawn inside the visible area by the last paint
+        self.visible_rect = QRect()
         
         self.add_to_undo_stack()
 
         # Add viewport fitting
         self.fit_to_viewport()
 
+        # Record input for replay when SNAPTRACE_RECORD_TRACES is set
+        self.input_recorder = attach_recorder_from_env(self, "editor", self.view_state)
+
+    def view_state(self):
+        """Screenshot size and view transform, stored with recorded input traces"""
+        return {
+            'screenshot_size': [self.screenshot.width(), self.screenshot.height()],
+            'zoom': self.zoom_level,
+            'offset': [self.viewport_offset.x(), self.viewport_offset.y()],
+            'tool': self.current_tool,
+            'pen_size': self.pen_size,
+        }
+
     def fit_to_viewport(self):
         """Fit the image to the viewport while maintaining aspect ratio"""
         if not self.screenshot:
@@ -93,11 +131,17 @@ class DrawingArea(QWidget):
         super().resizeEvent(event)
         self.fit_to_viewport()
 
+    def hideEvent(self, event):
+        super().hideEvent(event)
+        # Nothing of a hidden tab is on screen, its images may be evicted
+        self.shown_images = []
+        self.image_store.set_shown(id(self), ())
+
     def get_scaled_pen_width(self, original_width):
-        # Ensure pen width is never less than 1 pixel and is always an integer
-        scaled_width = max(self.min_pen_width, int(round(original_width / self.zoom_level)))
-        return scaled_width
+        self.renderer.zoom_level = self.zoom_level
+        return self.renderer.scaled_pen_width(original_width)
 
+    @profiled()
     def paintEvent(self, event):
         painter = QPainter(self)
         painter.setRenderHint(QPainter.Antialiasing)
@@ -105,62 +149,30 @@ class DrawingArea(QWidget):
         # Apply viewport transformation
         painter.translate(self.viewport_offset)
         painter.scale(self.zoom_level, self.zoom_level)
+        renderer = self.renderer
+        renderer.zoom_level = self.zoom_level
+        renderer.arrow_pen_size = self.pen_size
+        renderer.screenshot = self.screenshot
+        self.shown_images = []
+        self.visible_rect = self.visibleRegion().boundingRect()
         
         # Draw screenshot
         painter.drawPixmap(0, 0, self.screenshot)
         
-        # Draw all saved drawings
-        for i, drawing in enumerate(self.drawings):
-            if len(drawing) == 5:  # Image drawing
-                tool, _, points, _, image = drawing
-                if tool == "image":
-                    rect = QRect(points[0], points[1]).normalized()
-                    painter.drawPixmap(rect, image)
-            else:  # Regular drawing
-                tool, color, points, size = drawing
-                pen = QPen(color)
-                pen.setWidth(self.get_scaled_pen_width(size))
-                painter.setPen(pen)
-                
-                if tool == "rectangle":
-                    painter.drawRect(QRect(points[0], points[1]).normalized())
-                elif tool == "circle":
-                    painter.drawEllipse(QRect(points[0], points[1]).normalized())
-                elif tool == "arrow":
-                    self.draw_arrow(painter, points[0], points[1])
-                elif tool == "line":
-                    painter.drawLine(points[0], points[1])
-                elif tool == "pencil":
-                    if len(points) > 1:
-                        path = QPainterPath()
-                        path.moveTo(points[0])
-                        for point in points[1:]:
-                            path.lineTo(point)
-                        painter.drawPath(path)
+        # Draw all saved drawings; a redaction being moved or resized gets a
+        # quick filter until it is released
+        adjusting = self.selected_shape_index if self.is_moving or self.is_resizing else None
+        for index, drawing in enumerate(self.drawings):
+            if index == adjusting and drawing[0] in REDACTION_TOOLS:
+                renderer.draw_redaction(painter, *drawing, preview=True)
+            else:
+                renderer.draw_drawing(painter, drawing)
+        # Images on screen are kept decoded even when over the memory budget
+        self.image_store.set_shown(id(self), self.shown_images)
         
         # Draw counter items with highlight
         for i, counter_item in enumerate(self.counter_items):
-            if len(counter_item) == 4:  # New format with size
-                number, pos, color, size = counter_item
-            else:  # Old format without size (backward compatibility)
-                number, pos, color = counter_item
-                size = 2  # Default size for old counters
-            
-            # Draw highlight circle with stored size
-            highlight_color = QColor(color)
-            highlight_color.setAlpha(50)
-            painter.setBrush(highlight_color)
-            painter.setPen(Qt.NoPen)
-            highlight_radius = 10 + size  # Use stored size
-            painter.drawEllipse(pos, highlight_radius, highlight_radius)
-            
-            # Draw number with stored font size
-            painter.setPen(QPen(color))
-            font = QFont("Arial", size + 10, QFont.Bold)  # Use stored size
-            painter.setFont(font)
-            painter.drawText(QRect(pos.x() - highlight_radius, pos.y() - highlight_radius,
-                                 highlight_radius * 2, highlight_radius * 2),
-                           Qt.AlignCenter, str(number))
+            pos, highlight_radius = renderer.draw_counter(painter, counter_item)
             
             # Draw selection feedback for selected counter
             if self.selected_counter_index == i:
@@ -168,34 +180,11 @@ class DrawingArea(QWidget):
         
         # Draw text items
         for i, text_item in enumerate(self.text_items):
-            if isinstance(text_item, dict):
-                painter.setPen(QPen(text_item['color']))
-                painter.setFont(text_item['font'])
-                
-                # Handle multi-line text
-                text = text_item['text']
-                pos = text_item['pos']
-                
-                if '\n' in text:
-                    lines = text.split('\n')
-                    metrics = QFontMetrics(text_item['font'])
-                    line_height = metrics.height()
-                    
-                    for i_line, line in enumerate(lines):
-                        line_pos = QPoint(pos.x(), pos.y() + (i_line * line_height))
-                        painter.drawText(line_pos, line)
-                else:
-                    painter.drawText(pos, text)
-                    
-                # Draw selection feedback for selected text
-                if self.selected_text_index == i:
-                    self.draw_text_selection(painter, text_item)
-                    
-            else:  # Backward compatibility for old format
-                painter.setPen(QPen(text_item[2]))
-                # Use a default font size for old text items instead of current pen_size
-                painter.setFont(QFont("Arial", 12))  # Fixed default font size
-                painter.drawText(text_item[1], text_item[0])
+            renderer.draw_text(painter, text_item)
+            
+            # Draw selection feedback for selected text
+            if self.selected_text_index == i and isinstance(text_item, dict):
+                self.draw_text_selection(painter, text_item)
         
         # Draw current text if typing
         if self.is_typing and self.text_position:
@@ -245,30 +234,95 @@ class DrawingArea(QWidget):
         
         # Draw current drawing
         if self.is_drawing:
-            pen = QPen(self.current_color)
-            pen.setWidth(self.get_scaled_pen_width(self.pen_size))
-            painter.setPen(pen)
-            
-            if self.current_tool == "rectangle":
-                painter.drawRect(QRect(self.begin, self.end).normalized())
-            elif self.current_tool == "circle":
-                painter.drawEllipse(QRect(self.begin, self.end).normalized())
-            elif self.current_tool == "arrow":
-                self.draw_arrow(painter, self.begin, self.end)
-            elif self.current_tool == "line":
-                painter.drawLine(self.begin, self.end)
-            elif self.current_tool == "pencil":
-                if len(self.pencil_points) > 1:
-                    path = QPainterPath()
-                    path.moveTo(self.pencil_points[0])
-                    for point in self.pencil_points[1:]:
-                        path.lineTo(point)
-                    painter.drawPath(path)
+            painter.setPen(renderer.pen(self.current_color, self.pen_size))
+            if self.current_tool == "pencil":
+                renderer.draw_shape(painter, "pencil", self.pencil_points)
+            elif self.current_tool in REDACTION_TOOLS:
+                renderer.draw_redaction(painter, self.current_tool, self.current_color,
+                                        [self.begin, self.end], self.pen_size, preview=True)
+            else:
+                renderer.draw_shape(painter, self.current_tool, [self.begin, self.end])
 
         # Draw selection handles for selected shape
         if self.selected_shape_index is not None and self.selected_shape_index < len(self.drawings):
             self.draw_selection_handles(painter, self.drawings[self.selected_shape_index])
 
+        if PROFILER.enabled and not self.exporting:
+            PROFILER.mark_frame()
+            self.draw_profiler_overlay(painter)
+
+    def draw_profiler_overlay(self, painter):
+        """Draw frame time and FPS in the top-left corner of the widget"""
+        paint_stats = PROFILER.histograms.get("paintEvent")
+        if paint_stats is None:
+            text = f"FPS {PROFILER.fps()}"
+        else:
+            text = (f"paint {paint_stats.mean() * 1000:.1f} ms avg, "
+                    f"{paint_stats.percentile(0.95) * 1000:.1f} ms p95 | FPS {PROFILER.fps()}")
+        
+        painter.save()
+        painter.resetTransform()  # Overlay is in widget coordinates, not zoomed
+        painter.setFont(QFont("Consolas", 9))
+        metrics = QFontMetrics(painter.font())
+        bg_rect = QRect(4, 4, metrics.width(text) + 12, metrics.height() + 8)
+        painter.fillRect(bg_rect, QColor(0, 0, 0, 160))
+        painter.setPen(QPen(QColor(0, 255, 128)))
+        painter.drawText(bg_rect, Qt.AlignCenter, text)
+        painter.restore()
+
+    def draw_image(self, painter, rect, image):
+        """Draw an imported image, or a placeholder while it is still decoding"""
+        if isinstance(image, QPixmap):
+            painter.drawPixmap(rect, image)
+            return
+
+        if painter.transform().mapRect(rect).intersects(self.visible_rect):
+            self.shown_images.append(image)
+
+        # Ask for a sharper decode if the image is shown larger than decoded
+        # (QRect built from two corner points is one pixel larger than the image)
+        scale = max(1.0, self.zoom_level)
+        pixmap = image.pixmap(QSize(rect.width() - 1, rect.height() - 1) * scale)
+        if pixmap is not None:
+            painter.drawPixmap(rect, pixmap)
+            return
+
+        # Placeholder until the worker thread has finished decoding
+        painter.save()
+        painter.fillRect(rect, QColor(128, 128, 128, 80))
+        placeholder_pen = QPen(QColor(200, 200, 200), 1)
+        placeholder_pen.setStyle(Qt.DashLine)
+        placeholder_pen.setCosmetic(True)
+        painter.setPen(placeholder_pen)
+        painter.setBrush(Qt.NoBrush)
+        painter.drawRect(rect)
+        painter.restore()
+
+    def draw_export_image(self, painter, rect, image):
+        """Draw an imported image for export, decoding it now if it isn't ready"""
+        if isinstance(image, QPixmap):
+            painter.drawPixmap(rect, image)
+            return
+        pixmap = image.pixmap(QSize(rect.width() - 1, rect.height() - 1))
+        if pixmap is not None:
+            painter.drawPixmap(rect, pixmap)
+            return
+        decoded = QImage.fromData(image.blob())
+        if not decoded.isNull():
+            painter.drawImage(rect, decoded)
+
+    def render_to_image(self):
+        """Render the annotated screenshot at its native resolution for export.
+
+        Unlike grabbing the widget this ignores zoom, panning and editor
+        overlays (selection handles, text cursor, profiler).
+        """
+        renderer = AnnotationRenderer(arrow_pen_size=self.pen_size,
+                                      image_painter=self.draw_export_image,
+                                      min_pen_width=self.min_pen_width)
+        return renderer.render_image(self.screenshot, self.drawings,
+                                     self.counter_items, self.text_items)
+
     def draw_selection_handles(self, painter, drawing):
         """Draw selection feedback with dashed outline and resize handles"""
         # Save current pen and brush
@@ -289,7 +343,7 @@ class DrawingArea(QWidget):
             rect = QRect(points[0], points[1]).normalized()
         else:
             tool, _, points, _ = drawing
-            if tool in ["rectangle", "circle", "arrow", "line"]:
+            if tool in BOX_TOOLS:
                 rect = QRect(points[0], points[1]).normalized()
             elif tool == "pencil":
                 # For pencil, create bounding rectangle
@@ -342,31 +396,9 @@ class DrawingArea(QWidget):
         painter.setBrush(old_brush)
 
     def draw_arrow(self, painter, start, end):
-        if start == end:
-            return
-            
-        # Draw the main line
-        painter.drawLine(start, end)
-        
-        # Calculate the arrow head
-        angle = atan2(end.y() - start.y(), end.x() - start.x())
-        # Scale arrow size with pen width and zoom
-        arrow_size = max(8, int((self.pen_size * 3 + 12) / self.zoom_level))
-        arrow_angle = pi/6  # 30 degrees
-        
-        # Calculate arrow head points
-        p1 = QPoint(
-            int(end.x() - arrow_size * cos(angle - arrow_angle)),
-            int(end.y() - arrow_size * sin(angle - arrow_angle))
-        )
-        p2 = QPoint(
-            int(end.x() - arrow_size * cos(angle + arrow_angle)),
-            int(end.y() - arrow_size * sin(angle + arrow_angle))
-        )
-        
-        # Draw arrow head lines
-        painter.drawLine(end, p1)
-        painter.drawLine(end, p2)
+        self.renderer.zoom_level = self.zoom_level
+        self.renderer.arrow_pen_size = self.pen_size
+        self.renderer.draw_arrow(painter, start, end)
 
     def wheelEvent(self, event):
         if event.modifiers() & Qt.ControlModifier:
@@ -410,6 +442,7 @@ class DrawingArea(QWidget):
         self.add_to_undo_stack()
         self.update()
         event.acceptProposedAction()
+        self.text_dropped.emit(text)
 
     def mousePressEvent(self, event):
         if event.button() == Qt.MiddleButton:
@@ -532,7 +565,7 @@ class DrawingArea(QWidget):
                     return  # Don't start drawing if we're about to resize/move
             
             # Start drawing for drawing tools only if not interacting with selected elements
-            if self.current_tool in ["rectangle", "circle", "arrow", "line", "pencil"]:
+            if self.current_tool in BOX_TOOLS or self.current_tool == "pencil":
                 self.is_drawing = True
                 self.begin = pos
                 self.end = pos
@@ -541,6 +574,7 @@ class DrawingArea(QWidget):
         
         self.update()
 
+    @profiled()
     def mouseMoveEvent(self, event):
         transformed_pos = self.transform_point(event.pos())
         
@@ -684,7 +718,7 @@ class DrawingArea(QWidget):
                             ))
                             self.add_to_undo_stack()
                         self.pencil_points = []
-                    elif self.current_tool in ["rectangle", "circle", "arrow", "line"]:
+                    elif self.current_tool in BOX_TOOLS:
                         if self.begin != self.end:
                             self.drawings.append((
                                 self.current_tool,
@@ -859,12 +893,15 @@ class DrawingArea(QWidget):
             widget = widget.parent()
         return None
 
+    @profiled()
     def add_to_undo_stack(self):
         state = {
             'drawings': self.drawings.copy(),
             'text_items': self.text_items.copy(),
             'counter_items': self.counter_items.copy(),
-            'counter_value': self.counter_value
+            'counter_value': self.counter_value,
+            # Image handles in this state, so reference syncing doesn't rescan drawings
+            'images': tuple(drawing[4] for drawing in self.drawings if len(drawing) == 5)
         }
         self.undo_stack.append(state)
         self.redo_stack.clear()  # Clear redo stack when new action is performed
@@ -872,6 +909,20 @@ class DrawingArea(QWidget):
         # Limit undo stack size
         if len(self.undo_stack) > self.max_undo_states:
             self.undo_stack.pop(0)
+        
+        self.sync_image_references()
+        if self.journal is not None:
+            self.journal.record(self)
+
+    def sync_image_references(self):
+        """Report the images held by the document and undo/redo history to the store"""
+        handles = []
+        for state in self.undo_stack + self.redo_stack:
+            handles.extend(image for image in state.get('images', ())
+                           if not isinstance(image, QPixmap))
+        handles.extend(drawing[4] for drawing in self.drawings
+                       if len(drawing) == 5 and not isinstance(drawing[4], QPixmap))
+        self.image_store.set_references(id(self), handles)
 
     def undo(self):
         if len(self.undo_stack) > 1:  # Keep at least one state
@@ -882,6 +933,9 @@ class DrawingArea(QWidget):
             self.text_items = previous_state.get('text_items', []).copy()
             self.counter_items = previous_state.get('counter_items', []).copy()
             self.counter_value = previous_state.get('counter_value', self.counter_start)
+            self.sync_image_references()
+            if self.journal is not None:
+                self.journal.record(self)
             self.update()
 
     def redo(self):
@@ -892,6 +946,9 @@ class DrawingArea(QWidget):
             self.text_items = next_state.get('text_items', []).copy()
             self.counter_items = next_state.get('counter_items', []).copy()
             self.counter_value = next_state.get('counter_value', self.counter_start)
+            self.sync_image_references()
+            if self.journal is not None:
+                self.journal.record(self)
             self.update()
 
     def is_point_in_shape(self, point, drawing):
@@ -901,7 +958,7 @@ class DrawingArea(QWidget):
             return rect.contains(point)
             
         tool, _, points, _ = drawing
-        if tool in ["rectangle", "circle", "line", "arrow"]:
+        if tool in BOX_TOOLS:
             rect = QRect(points[0], points[1]).normalized()
             return rect.contains(point)
         elif tool == "pencil":
@@ -917,7 +974,7 @@ class DrawingArea(QWidget):
         else:
             tool, _, points, _ = drawing
             
-        if tool in ["rectangle", "circle", "arrow", "line", "image"]:
+        if tool in BOX_TOOLS or tool == "image":
             rect = QRect(points[0], points[1]).normalized()
             handles = self.get_resize_handles(rect)
             
@@ -963,7 +1020,7 @@ class DrawingArea(QWidget):
         else:
             tool, color, points, size = drawing
         
-        if tool in ["rectangle", "circle", "arrow", "line", "image"]:
+        if tool in BOX_TOOLS or tool == "image":
             rect = QRect(points[0], points[1]).normalized()
             new_rect = QRect(rect)
             
@@ -1070,6 +1127,7 @@ class DrawingArea(QWidget):
                 self.counter_items[self.selected_counter_index] = (number, self._original_counter_pos + delta, color)
             moved = True
 
+    @profiled()
     def handle_eraser(self, pos):
         """Handle eraser tool at the given position"""
         erase_radius = self.pen_size * 2
@@ -1084,7 +1142,7 @@ class DrawingArea(QWidget):
                     items_to_remove.append(("drawing", i))
             else:  # Regular drawings
                 tool, _, points, _ = drawing
-                if tool in ["rectangle", "circle", "arrow", "line"]:
+                if tool in BOX_TOOLS:
                     rect = QRect(points[0], points[1]).normalized()
                     if rect.contains(pos):
                         items_to_remove.append(("drawing", i))
@@ -1126,22 +1184,26 @@ class DrawingArea(QWidget):
         return False
 
     def add_image(self, image_path):
-        """Add an image to the drawing area"""
-        image = QPixmap(image_path)
-        if not image.isNull():
-            # Scale image to reasonable size if too large
-            max_size = min(self.width(), self.height()) // 2
-            if image.width() > max_size or image.height() > max_size:
-                image = image.scaled(max_size, max_size, Qt.KeepAspectRatio, Qt.SmoothTransformation)
-            
-            # Place image in center of viewport
-            center = self.transform_point(QPoint(self.width()//2, self.height()//2))
-            top_left = center - QPoint(image.width()//2, image.height()//2)
-            bottom_right = top_left + QPoint(image.width(), image.height())
-            
-            self.drawings.append(("image", None, [top_left, bottom_right], None, image))
-            self.add_to_undo_stack()
-            self.update()
+        """Add an image to the drawing area.
+
+        Only the image header is read here. A placeholder is shown right away
+        and the pixels are decoded at display size on a worker thread.
+        """
+        # Scale image to reasonable size if too large
+        max_size = max(1, min(self.width(), self.height()) // 2)
+        image = self.image_store.import_file(image_path, max_size, max_size)
+        if image is None:
+            return
+
+        # Place image in center of viewport
+        size = image.display_size
+        center = self.transform_point(QPoint(self.width()//2, self.height()//2))
+        top_left = center - QPoint(size.width()//2, size.height()//2)
+        bottom_right = top_left + QPoint(size.width(), size.height())
+
+        self.drawings.append(("image", None, [top_left, bottom_right], None, image))
+        self.add_to_undo_stack()
+        self.update()
 
     def add_counter(self, pos):
         # Store the counter with its size at the time of creation
@@ -0,0 +1,226 @@
+from PyQt5.QtCore import Qt, QAbstractItemModel, QAbstractListModel, QModelIndex
+
+FETCH_BATCH_SIZE = 500  # Phrases added to an expanded category per fetch
+
+
+class FeedbackListModel(QAbstractListModel):
+    """Read-only list model over the catalog's phrases, optionally showing
+    only search results.
+
+    The model keeps a reference to the catalog's list rather than copying
+    it, and the view only asks for the rows it paints. Search results come
+    ranked from the search index, so the model is told which catalog rows to
+    show (set_rows) instead of testing every row like a QSortFilterProxyModel.
+    The row mapping lives here rather than in a separate proxy model because
+    QListView asks the model for an index per row on every layout, and each
+    extra Python model in the chain adds to that per-row cost.
+    """
+
+    def __init__(self, texts=(), parent=None):
+        super().__init__(parent)
+        self.texts = texts
+        self.rows = None   # Catalog rows shown, in order; None shows all
+
+    def rowCount(self, parent=QModelIndex()):
+        if parent.isValid():
+            return 0
+        return len(self.texts) if self.rows is None else len(self.rows)
+
+    def data(self, index, role=Qt.DisplayRole):
+        if role == Qt.DisplayRole and index.isValid():
+            return self.texts[self.catalog_row(index.row())]
+        return None
+
+    def flags(self, index):
+        if not index.isValid():
+            return Qt.NoItemFlags
+        return Qt.ItemIsEnabled | Qt.ItemIsSelectable | Qt.ItemIsDragEnabled
+
+    def catalog_row(self, row):
+        """Catalog row shown at row"""
+        return row if self.rows is None else self.rows[row]
+
+    def set_texts(self, texts):
+        """Show a new phrase list, all rows"""
+        self.beginResetModel()
+        self.texts = texts
+        self.rows = None
+        self.endResetModel()
+
+    def extend(self, texts):
+        """Show texts, which starts with the phrases already shown"""
+        first = len(self.texts)
+        if self.rows is not None or len(texts) <= first:
+            self.texts = texts  # New rows appear with the next search
+            return
+        self.beginInsertRows(QModelIndex(), first, len(texts) - 1)
+        self.texts = texts
+        self.endInsertRows()
+
+    def set_rows(self, rows):
+        """Show these catalog rows in this order, or every row when None"""
+        self.beginResetModel()
+        self.rows = rows
+        self.endResetModel()
+
+
+class CategoryNode:
+    """A category of one loaded library in FeedbackTreeModel"""
+
+    def __init__(self, library, position, name, rows):
+        self.library = library
+        self.position = position  # Row under the library
+        self.name = name
+        self.rows = rows          # Catalog rows
+        self.fetched = 0          # Rows handed to the view so far
+
+
+class FeedbackTreeModel(QAbstractItemModel):
+    """Libraries > categories > phrases of a FeedbackLibraryCatalog.
+
+    Expanding a library loads it (fetchMore); a category's phrases are handed
+    to the view FETCH_BATCH_SIZE at a time as it scrolls, so huge categories
+    cost nothing until shown. Phrases display their feedback text and carry
+    the catalog text (what the list drags and search ranks) in Qt.UserRole.
+    """
+
+    def __init__(self, catalog, parent=None):
+        super().__init__(parent)
+        self.catalog = catalog
+        self._root = object()     # internalPointer of library indexes
+        self._nodes = {}          # library -> [CategoryNode]
+        self._positions = {}      # library -> row
+        self._rebuild()
+        catalog.reset.connect(self._catalog_reset)
+        catalog.library_loaded.connect(self._library_loaded)
+
+    def _rebuild(self):
+        self._nodes = {}
+        self._positions = {library: row for row, library in enumerate(self.catalog.libraries)}
+        for library in self.catalog.libraries:
+            if library.state == 'loaded':
+                self._nodes[library] = self._category_nodes(library)
+
+    def _category_nodes(self, library):
+        return [CategoryNode(library, position, name, rows)
+                for position, (name, rows) in enumerate(library.categories.items())]
+
+    def _catalog_reset(self):
+        self.beginResetModel()
+        self._rebuild()
+        self.endResetModel()
+
+    def _library_loaded(self, library):
+        row = self._positions.get(library)
+        if row is None:
+            return
+        parent = self.index(row, 0)
+        nodes = self._category_nodes(library)
+        if nodes:
+            self.beginInsertRows(parent, 0, len(nodes) - 1)
+            self._nodes[library] = nodes
+            self.endInsertRows()
+        self.dataChanged.emit(parent, parent)
+
+    def index(self, row, column, parent=QModelIndex()):
+        if column != 0 or row < 0 or row >= self.rowCount(parent):
+            return QModelIndex()
+        if not parent.isValid():
+            return self.createIndex(row, 0, self._root)
+        pointer = parent.internalPointer()
+        if pointer is self._root:
+            return self.createIndex(row, 0, self.catalog.libraries[parent.row()])
+        return self.createIndex(row, 0, self._nodes[pointer][parent.row()])
+
+    def parent(self, index):
+        if not index.isValid():
+            return QModelIndex()
+        pointer = index.internalPointer()
+        if pointer is self._root:
+            return QModelIndex()
+        if isinstance(pointer, CategoryNode):
+            return self.createIndex(pointer.position, 0, pointer.library)
+        return self.createIndex(self._positions[pointer], 0, self._root)
+
+    def _item(self, index):
+        """('library', library), ('category', node) or ('phrase', catalog row)"""
+        pointer = index.internalPointer()
+        if pointer is self._root:
+            return 'library', self.catalog.libraries[index.row()]
+        if isinstance(pointer, CategoryNode):
+            return 'phrase', pointer.rows[index.row()]
+        return 'category', self._nodes[pointer][index.row()]
+
+    def rowCount(self, parent=QModelIndex()):
+        if not parent.isValid():
+            return len(self.catalog.libraries)
+        kind, item = self._item(parent)
+        if kind == 'library':
+            return len(self._nodes.get(item, ()))
+        return item.fetched if kind == 'category' else 0
+
+    def columnCount(self, parent=QModelIndex()):
+        return 1
+
+    def hasChildren(self, parent=QModelIndex()):
+        if not parent.isValid():
+            return bool(self.catalog.libraries)
+        kind, item = self._item(parent)
+        if kind == 'library':
+            # Unloaded libraries show an expander so they can be opened
+            return item.state in ('unloaded', 'loading') or bool(self._nodes.get(item))
+        return kind == 'category' and bool(item.rows)
+
+    def canFetchMore(self, parent):
+        if not parent.isValid():
+            return False
+        kind, item = self._item(parent)
+        if kind == 'library':
+            return item.state == 'unloaded'
+        return kind == 'category' and item.fetched < len(item.rows)
+
+    def fetchMore(self, parent):
+        if not parent.isValid():
+            return
+        kind, item = self._item(parent)
+        if kind == 'library':
+            self.catalog.load_library(item)
+            self.dataChanged.emit(parent, parent)
+        elif kind == 'category':
+            count = min(FETCH_BATCH_SIZE, len(item.rows) - item.fetched)
+            if count > 0:
+                self.beginInsertRows(parent, item.fetched, item.fetched + count - 1)
+                item.fetched += count
+                self.endInsertRows()
+
+    def data(self, index, role=Qt.DisplayRole):
+        if not index.isValid():
+            return None
+        kind, item = self._item(index)
+        if kind == 'phrase':
+            if role == Qt.DisplayRole:
+                return self.catalog.entries[item][1]
+            if role in (Qt.UserRole, Qt.ToolTipRole):
+                return self.catalog.texts[item]
+            return None
+        if role == Qt.DisplayRole:
+            if kind == 'category':
+                return f"{item.name or 'Uncategorized'} ({len(item.rows)})"
+            if item.state == 'loaded':
+                return f"{item.name} ({item.row_count})"
+            if item.state == 'loading':
+                return f"{item.name} (loading...)"
+            if item.state == 'error':
+                return f"{item.name} (could not load)"
+            return item.name
+        if role == Qt.ToolTipRole and kind == 'library':
+            return item.error or item.path
+        return None
+
+    def flags(self, index):
+        if not index.isValid():
+            return Qt.NoItemFlags
+        flags = Qt.ItemIsEnabled | Qt.ItemIsSelectable
+        if isinstance(index.internalPointer(), CategoryNode):
+            flags |= Qt.ItemIsDragEnabled
+        return flags
@@ -1,52 +1,128 @@
 import os
-import csv
+import time
 from datetime import datetime
 from PyQt5.QtWidgets import (QMainWindow, QWidget, QVBoxLayout, QHBoxLayout, 
                            QPushButton, QLabel, QLineEdit, QSpinBox, QScrollArea,
-                           QListWidgetItem, QButtonGroup, QGridLayout, QFileDialog,
-                           QMessageBox, QFrame, QColorDialog, QApplication)
-from PyQt5.QtCore import Qt, QTimer, QSize
-from PyQt5.QtGui import QIcon, QPixmap, QPainter, QFont, QColor, QPen
+                           QButtonGroup, QGridLayout, QFileDialog,
+                           QMessageBox, QFrame, QColorDialog, QApplication, QShortcut,
+                           QToolTip, QTabWidget, QMenu)
+from PyQt5.QtCore import Qt, QTimer, QSize, QPoint
+from PyQt5.QtGui import QIcon, QPixmap, QPainter, QFont, QColor, QPen, QKeySequence, QImage
 
-from ..core.constants import APP_NAME, APP_ICON, DEFECT_CSV, ICONS_DIR, DEFAULT_PEN_SIZE
+from ..core.constants import APP_NAME, APP_ICON, ICONS_DIR, DEFAULT_PEN_SIZE
+from ..core.profiler import PROFILER
+from ..core.project import Project, ProjectError, PROJECT_EXTENSION
+from ..core.autosave import AutosaveJournal
+from ..core.clipboard_export import copy_image_to_clipboard
+from ..core.capture_history import CaptureHistory
+from ..core.document_spool import DocumentSpool
+from ..core.thumbnails import ThumbnailService
+from ..core.image_hash import ImageHashIndex, dhash, duplicate_action
+from ..core.pixel_diff import NUMPY_AVAILABLE, diff_images
+from ..core.feedback_catalog import FeedbackCatalog
+from ..core.feedback_library import FeedbackLibraryCatalog
+from ..core.usage_stats import UsageStats
 from .styles import DARK_THEME_STYLESHEET
 from .drawing_area import DrawingArea
-from .draggable_list import DraggableListWidget
+from .draggable_list import DraggableListView, DraggableTreeView
+from .feedback_model import FeedbackListModel, FeedbackTreeModel
 from .screenshot_selector import ScreenshotSelector
+from .similar_dialog import SimilarCapturesDialog
+
+SEARCH_DEBOUNCE_MS = 60    # Quick Commands filtering waits for a pause in typing
+SEARCH_RESULT_LIMIT = 200  # Best matches listed while searching
+COMPARE_MENU_CAPTURES = 15 # Recent captures offered by the Compare button
+
+
+class Document:
+    """One capture open in an editor tab, with its annotations and journal"""
+
+    def __init__(self, area, scroll_area, number, geometry=None):
+        self.area = area
+        self.scroll_area = scroll_area   # The tab's page
+        self.number = number             # Shown in the tab title until it has a name
+        self.geometry = geometry         # Screen rect it was captured from, if known
+        self.name = ""                   # File name typed for it
+        self.project_path = None         # .snaptrace file it was opened from/saved to
+        self.capture_blob = None         # PNG bytes of the capture, once encoded
+        self.autosave = AutosaveJournal()
+
+    def title(self):
+        return self.name or f"Screenshot {self.number}"
+
 
 class ScreenshotTool(QMainWindow):
     def __init__(self, screenshot=None, geometry=None):
         super().__init__()
-        self.screenshot = screenshot
-        self.geometry = geometry
         self.current_tool_button = None
         self.save_directory = os.path.expanduser("~")
+        # Tab page -> Document; inactive tabs are unloaded under a memory budget
+        self.documents = {}
+        self.shown_document = None
+        self.document_count = 0
+        self.spool = DocumentSpool.instance()
         
-        # Initialize defect_data first - using simple list instead of pandas
-        self.defect_data = []
-        if os.path.exists(DEFECT_CSV):
-            try:
-                with open(DEFECT_CSV, 'r', newline='', encoding='utf-8') as csvfile:
-                    reader = csv.DictReader(csvfile)
-                    self.defect_data = list(reader)
-                    # Ensure all entries have both Category and Feedback keys
-                    for entry in self.defect_data:
-                        if 'Category' not in entry:
-                            entry['Category'] = ''
-                        if 'Feedback' not in entry:
-                            entry['Feedback'] = ''
-            except Exception as e:
-                QMessageBox.warning(self, "CSV Load Error", f"Error loading defect feedbacks: {str(e)}")
-                self.defect_data = []
+        # Feedback phrases are parsed once per process and shared between windows
+        self.catalog = FeedbackCatalog.instance()
+        # The catalog loads in the background, so errors are reported when it finishes
+        self.catalog.failed.connect(self.show_catalog_error)
+        if self.catalog.error:
+            self.show_catalog_error(self.catalog.error)
+        # Phrases dropped onto captures rank higher in search
+        self.usage = UsageStats.instance()
+        self.usage_boosts = None
+        # The previous search, narrowed while the query is extended
+        self.last_search = None
         
         self.init_icons()
         self.initUI()
+
+        # Hashes of the images already in the save folder, for duplicate warnings
+        self.hash_index = ImageHashIndex.instance()
+        self.index_save_directory()
+
+        self.open_document(screenshot, geometry)
+        QApplication.instance().aboutToQuit.connect(self.end_autosave_sessions)
+        self.usage.changed.connect(self.invalidate_usage_boosts)
         
         # Set window title and icon
         self.setWindowTitle(APP_NAME)
         if os.path.exists(APP_ICON):
             self.setWindowIcon(QIcon(APP_ICON))
 
+    @property
+    def document(self):
+        """The Document in the current tab"""
+        return self.documents.get(self.tabs.currentWidget())
+
+    @property
+    def drawing_area(self):
+        return self.document.area
+
+    @property
+    def screenshot(self):
+        return self.document.area.screenshot
+
+    @property
+    def autosave(self):
+        return self.document.autosave
+
+    @property
+    def project_path(self):
+        return self.document.project_path
+
+    @project_path.setter
+    def project_path(self, path):
+        self.document.project_path = path
+
+    @property
+    def capture_blob(self):
+        return self.document.capture_blob
+
+    @capture_blob.setter
+    def capture_blob(self, blob):
+        self.document.capture_blob = blob
+
     def init_icons(self):
         # Load icons from the icons folder
         self.icons = {
@@ -66,6 +142,10 @@ class ScreenshotTool(QMainWindow):
             'save': QIcon(os.path.join(ICONS_DIR, "save.png")),
             'new': QIcon(os.path.join(ICONS_DIR, "new.png")),
             'paste': QIcon(os.path.join(ICONS_DIR, "paste.png")),
+            'copy': QIcon.fromTheme("edit-copy", QIcon(os.path.join(ICONS_DIR, "paste.png"))),
+            'similar': QIcon.fromTheme("edit-find", QIcon(os.path.join(ICONS_DIR, "image.png"))),
+            'compare': QIcon.fromTheme("view-split-left-right",
+                                       QIcon(os.path.join(ICONS_DIR, "rectangle.png"))),
             'folder': QIcon(os.path.join(ICONS_DIR, "folder.png"))
         }
         
@@ -93,6 +173,35 @@ class ScreenshotTool(QMainWindow):
         
         self.icons['count'] = counter_icon
 
+        # Redaction tools have no icon files; draw them
+        for tool in ("pixelate", "blur", "redact"):
+            self.icons[tool] = self.redaction_icon(tool)
+
+    def redaction_icon(self, tool):
+        pixmap = QPixmap(64, 64)
+        pixmap.fill(Qt.transparent)
+        painter = QPainter(pixmap)
+        painter.setRenderHint(QPainter.Antialiasing)
+        if tool == "pixelate":
+            # Checkerboard of grays
+            for row in range(4):
+                for col in range(4):
+                    shade = 90 + 40 * ((row * 3 + col * 5) % 4)
+                    painter.fillRect(8 + col * 12, 8 + row * 12, 12, 12, QColor(shade, shade, shade))
+        elif tool == "blur":
+            # Rings fading out from the center
+            painter.setPen(Qt.NoPen)
+            for radius, alpha in ((26, 50), (20, 90), (14, 150), (8, 230)):
+                painter.setBrush(QColor(220, 220, 220, alpha))
+                painter.drawEllipse(32 - radius, 32 - radius, radius * 2, radius * 2)
+        else:
+            # Blacked-out line of text
+            painter.setPen(QPen(QColor(220, 220, 220), 2))
+            painter.drawRect(6, 18, 52, 28)
+            painter.fillRect(12, 26, 40, 12, QColor(220, 220, 220))
+        painter.end()
+        return QIcon(pixmap)
+
     def initUI(self):
         # Apply stylesheet
         self.setStyleSheet(DARK_THEME_STYLESHEET)
@@ -104,29 +213,108 @@ class ScreenshotTool(QMainWindow):
         self.layout.setSpacing(0)
         self.layout.setContentsMargins(0, 0, 0, 0)
         
-        # Create drawing area with dark background and padding
+        # One tab per open capture, each with its own drawing area
+        self.tabs = QTabWidget()
+        self.tabs.setObjectName("documentTabs")
+        self.tabs.setTabsClosable(True)
+        self.tabs.setMovable(True)
+        self.tabs.setDocumentMode(True)
+        self.tabs.currentChanged.connect(self.document_shown)
+        self.tabs.tabCloseRequested.connect(self.close_document)
+        self.layout.addWidget(self.tabs, stretch=4)
+
+        close_tab_shortcut = QShortcut(QKeySequence.Close, self)
+        close_tab_shortcut.activated.connect(lambda: self.close_document(self.tabs.currentIndex()))
+        next_tab_shortcut = QShortcut(QKeySequence.NextChild, self)
+        next_tab_shortcut.activated.connect(
+            lambda: self.tabs.setCurrentIndex((self.tabs.currentIndex() + 1) % self.tabs.count()))
+        
+        # Right sidebar with tools
+        self.create_right_panel()
+        
+        # Window setup
+        self.setWindowTitle('SnapTrace')
+        self.setGeometry(100, 100, 1400, 900)
+        self.setMinimumSize(1000, 700)
+
+    def open_document(self, screenshot, geometry=None):
+        """Open a capture in a new tab and switch to it"""
+        # Drawing area with dark background and padding
         scroll_area = QScrollArea()
         scroll_area.setWidgetResizable(True)
         scroll_area.setHorizontalScrollBarPolicy(Qt.ScrollBarAsNeeded)
-        scroll_area.setVerticalScrollBarPolicy(Qt.ScrollBarAlwaysOff)
+        # Scrolling captures can be much taller than the window
+        scroll_area.setVerticalScrollBarPolicy(Qt.ScrollBarAsNeeded)
         
         container = QWidget()
         container.setStyleSheet("background-color: #1a1a1a; padding: 24px;")
         container_layout = QVBoxLayout(container)
         container_layout.setAlignment(Qt.AlignCenter)
         
-        self.drawing_area = DrawingArea(self.screenshot)
-        container_layout.addWidget(self.drawing_area)
+        area = DrawingArea(screenshot)
+        container_layout.addWidget(area)
         scroll_area.setWidget(container)
-        self.layout.addWidget(scroll_area, stretch=4)
-        
-        # Right sidebar with tools
-        self.create_right_panel()
-        
-        # Window setup
-        self.setWindowTitle('SnapTrace')
-        self.setGeometry(100, 100, 1400, 900)
-        self.setMinimumSize(1000, 700)
+
+        self.document_count += 1
+        document = Document(area, scroll_area, self.document_count, geometry)
+        # Journal every edit so the session can be recovered after a crash
+        area.journal = document.autosave
+        document.autosave.begin(area)
+        area.text_dropped.connect(self.record_feedback_use)
+
+        self.documents[scroll_area] = document
+        self.spool.add(area)
+        index = self.tabs.addTab(scroll_area, document.title())
+        self.tabs.setCurrentIndex(index)
+        return document
+
+    def document_shown(self, index):
+        """Point the side panel at the current tab's document"""
+        document = self.document
+        if document is None:
+            return
+        previous = self.shown_document
+        self.shown_document = document
+        # Loads the document again if it was unloaded while in the background
+        self.spool.show(document.area)
+        if previous is not None and previous is not document:
+            if previous.area.is_typing:
+                previous.area.stop_text_editing()
+            # Tool, color and size belong to the window, not to a tab
+            document.area.current_tool = previous.area.current_tool
+            document.area.current_color = previous.area.current_color
+            document.area.pen_size = previous.area.pen_size
+            document.area.current_text_font = previous.area.current_text_font
+
+        self.name_input.setText(document.name)
+        self.start_from_input.blockSignals(True)
+        self.start_from_input.setValue(document.area.counter_start)
+        self.start_from_input.blockSignals(False)
+
+    def rename_document(self, name):
+        """Keep the current tab's file name and title in step with the name field"""
+        document = self.document
+        if document is not None:
+            document.name = name
+            self.tabs.setTabText(self.tabs.indexOf(document.scroll_area), document.title())
+
+    def close_document(self, index):
+        """Close a tab and end its autosave session; closing the last tab closes the window"""
+        if self.tabs.count() <= 1:
+            self.close()
+            return
+        scroll_area = self.tabs.widget(index)
+        document = self.documents.pop(scroll_area)
+        document.autosave.close()
+        self.spool.remove(document.area)
+        self.tabs.removeTab(index)
+        if self.shown_document is document:
+            self.shown_document = None
+        scroll_area.deleteLater()
+
+    def end_autosave_sessions(self):
+        for document in self.documents.values():
+            document.autosave.close()
 
     def create_right_panel(self):
         """Create the right panel with all controls"""
@@ -195,9 +383,45 @@ class ScreenshotTool(QMainWindow):
         save_btn.setToolTip("Save Screenshot (Ctrl+S)")
         save_btn.setFixedSize(42, 42)
         save_btn.clicked.connect(self.save_screenshot)
+
+        self.copy_btn = QPushButton()
+        self.copy_btn.setObjectName("saveButton")
+        self.copy_btn.setIcon(self.icons['copy'])
+        self.copy_btn.setIconSize(QSize(20, 20))
+        self.copy_btn.setToolTip("Copy Screenshot to Clipboard (Ctrl+C)")
+        self.copy_btn.setFixedSize(42, 42)
+        self.copy_btn.clicked.connect(self.copy_to_clipboard)
+
+        # Window-wide so it works whichever panel has focus; text fields keep
+        # their own Ctrl+C for copying text
+        copy_shortcut = QShortcut(QKeySequence.Copy, self)
+        copy_shortcut.activated.connect(self.copy_to_clipboard)
+
+        similar_btn = QPushButton()
+        similar_btn.setObjectName("saveButton")
+        similar_btn.setIcon(self.icons['similar'])
+        similar_btn.setIconSize(QSize(20, 20))
+        similar_btn.setToolTip("Find Similar Captures (Ctrl+F)")
+        similar_btn.setFixedSize(42, 42)
+        similar_btn.clicked.connect(self.find_similar_captures)
+        similar_shortcut = QShortcut(QKeySequence.Find, self)
+        similar_shortcut.activated.connect(self.find_similar_captures)
+
+        self.compare_btn = QPushButton()
+        self.compare_btn.setObjectName("saveButton")
+        self.compare_btn.setIcon(self.icons['compare'])
+        self.compare_btn.setIconSize(QSize(20, 20))
+        self.compare_btn.setToolTip("Compare with an Earlier Capture (Ctrl+D)")
+        self.compare_btn.setFixedSize(42, 42)
+        self.compare_btn.clicked.connect(self.show_compare_menu)
+        compare_shortcut = QShortcut(QKeySequence("Ctrl+D"), self)
+        compare_shortcut.activated.connect(self.show_compare_menu)
         
         header_layout.addWidget(header_label)
         header_layout.addWidget(save_btn)
+        header_layout.addWidget(self.copy_btn)
+        header_layout.addWidget(similar_btn)
+        header_layout.addWidget(self.compare_btn)
         header_layout.addStretch()
         layout.addLayout(header_layout)
 
@@ -246,6 +470,7 @@ class ScreenshotTool(QMainWindow):
         input_layout.setSpacing(10)
         self.name_input = QLineEdit()
         self.name_input.setPlaceholderText("Enter file name")
+        self.name_input.textChanged.connect(self.rename_document)
         
         paste_btn = QPushButton()
         paste_btn.setIcon(self.icons['paste'])
@@ -357,13 +582,31 @@ class ScreenshotTool(QMainWindow):
         
         self.search_input = QLineEdit()
         self.search_input.setPlaceholderText("Type to search commands...")
-        self.search_input.textChanged.connect(self.filter_commands)
+        # Search once typing pauses rather than on every keystroke
+        self.search_timer = QTimer(self)
+        self.search_timer.setSingleShot(True)
+        self.search_timer.setInterval(SEARCH_DEBOUNCE_MS)
+        self.search_timer.timeout.connect(lambda: self.filter_commands(self.search_input.text()))
+        self.search_input.textChanged.connect(lambda: self.search_timer.start())
         commands_layout.addWidget(self.search_input)
         
-        self.feedback_list = DraggableListWidget()
+        # The view shows the whole catalog, or the ranked matches while searching
+        self.feedback_model = FeedbackListModel(self.catalog.texts, self)
+        self.feedback_list = DraggableListView()
+        self.feedback_list.setModel(self.feedback_model)
         self.feedback_list.setMinimumHeight(200)
-        self.populate_defect_list()
+        self.catalog.reset.connect(self.populate_defect_list)
+        self.catalog.appended.connect(self.append_defect_items)
         commands_layout.addWidget(self.feedback_list)
+
+        # A library folder is browsed as a tree; the list then only shows search results
+        self.feedback_tree = None
+        if isinstance(self.catalog, FeedbackLibraryCatalog):
+            self.feedback_tree = DraggableTreeView()
+            self.feedback_tree.setModel(FeedbackTreeModel(self.catalog, self))
+            self.feedback_tree.setMinimumHeight(200)
+            commands_layout.addWidget(self.feedback_tree)
+            self.feedback_list.hide()
         layout.addWidget(commands_group)
 
     def add_separator(self, layout):
@@ -375,14 +618,42 @@ class ScreenshotTool(QMainWindow):
         layout.addWidget(separator)
 
     def filter_commands(self, text):
-        """Filter the commands list based on search text"""
-        search_terms = text.lower().split()
-        for i in range(self.feedback_list.count()):
-            item = self.feedback_list.item(i)
-            item_text = item.text().lower()
-            # Show item if all search terms are found in the item text
-            should_show = all(term in item_text for term in search_terms)
-            item.setHidden(not should_show)
+        """List the best matches for the search text, or the whole catalog when empty"""
+        searching = bool(text.strip())
+        if self.feedback_tree is not None:
+            self.feedback_tree.setVisible(not searching)
+            self.feedback_list.setVisible(searching)
+            if searching:
+                # Results fill in as the remaining libraries load
+                self.catalog.load_all()
+        if not searching:
+            self.last_search = None
+            if self.feedback_model.rows is not None:
+                self.feedback_model.set_rows(None)
+            return
+        with PROFILER.measure("filter_commands"):
+            self.last_search = self.catalog.index.rank_result(
+                text, SEARCH_RESULT_LIMIT, self.row_usage_boosts(), self.last_search)
+        self.feedback_model.set_rows(self.last_search.ranked)
+
+    def row_usage_boosts(self):
+        """Catalog row -> usage boost, rebuilt when usage or the catalog changes"""
+        if self.usage_boosts is None:
+            self.usage_boosts = {}
+            now = time.time()
+            for phrase in self.usage.phrases:
+                row = self.catalog.row_of(phrase)
+                if row is not None:
+                    self.usage_boosts[row] = self.usage.boost(phrase, now)
+        return self.usage_boosts
+
+    def invalidate_usage_boosts(self):
+        self.usage_boosts = None
+
+    def record_feedback_use(self, text):
+        """Count a catalog phrase dropped onto the capture"""
+        if self.catalog.row_of(text) is not None:
+            self.usage.record(text)
 
     def add_drawing_tools(self, grid_layout):
         tools = [
@@ -397,6 +668,9 @@ class ScreenshotTool(QMainWindow):
             ("image", "Add Image (I)"),
             ("color", "Color Picker (K)"),
             ("count", "Counter (#)"),
+            ("pixelate", "Pixelate (X)"),
+            ("blur", "Blur (B)"),
+            ("redact", "Solid Redaction (F)"),
             ("undo", "Undo (Ctrl+Z)"),
             ("redo", "Redo (Ctrl+Y)")
         ]
@@ -421,10 +695,10 @@ class ScreenshotTool(QMainWindow):
                 btn.clicked.connect(self.choose_color)
                 btn.setCheckable(False)
             elif tool_id == "undo":
-                btn.clicked.connect(self.drawing_area.undo)
+                btn.clicked.connect(lambda: self.drawing_area.undo())
                 btn.setCheckable(False)
             elif tool_id == "redo":
-                btn.clicked.connect(self.drawing_area.redo)
+                btn.clicked.connect(lambda: self.drawing_area.redo())
                 btn.setCheckable(False)
             else:
                 btn.clicked.connect(lambda checked, t=tool_id, b=btn: self.set_tool(t, b))
@@ -500,15 +774,26 @@ class ScreenshotTool(QMainWindow):
                 break
             index += 1
             
-        # Create a new pixmap with the drawings
-        final_image = QPixmap(self.drawing_area.size())
-        final_image.fill(Qt.transparent)
-        painter = QPainter(final_image)
-        self.drawing_area.render(painter)
-        painter.end()
+        # Text still being typed belongs in the saved image
+        if self.drawing_area.is_typing:
+            self.drawing_area.stop_text_editing()
+
+        # Render the screenshot with its annotations at native resolution
+        final_image = self.drawing_area.render_to_image()
+        image_hash = None
+        if duplicate_action() != "off":
+            image_hash = dhash(final_image)
+            if not self.confirm_not_duplicate(image_hash):
+                return
+
+        with PROFILER.measure("save_screenshot"):
+            saved = final_image.save(filename)
+        if saved:
+            ThumbnailService.instance().invalidate(filename)
+            self.hash_index.add(filename, image_hash)
         
         try:
-            if final_image.save(filename):
+            if saved:
                 # Show success message
                 msg = QMessageBox()
                 msg.setIcon(QMessageBox.Information)
@@ -527,6 +812,171 @@ class ScreenshotTool(QMainWindow):
             msg.setStandardButtons(QMessageBox.Ok)
             msg.exec_()
 
+    def index_save_directory(self):
+        """Start hashing the save folder's images in the background"""
+        if duplicate_action() != "off" and os.path.isdir(self.save_directory):
+            self.hash_index.refresh(self.save_directory)
+
+    def confirm_not_duplicate(self, image_hash):
+        """False if an image in the save folder looks the same and the save
+        should not go ahead (skipped, or the user declined)"""
+        matches = self.hash_index.find_similar(self.save_directory, image_hash)
+        if not matches:
+            return True
+        existing = os.path.basename(matches[0][1])
+        if duplicate_action() == "skip":
+            QMessageBox.information(self, "Duplicate Screenshot",
+                                    f"Not saved: this screenshot looks the same as\n{existing}")
+            return False
+        reply = QMessageBox.question(
+            self, "Duplicate Screenshot",
+            f"This screenshot looks the same as\n{existing}\nalready in the save folder.\n\n"
+            f"Save it anyway?",
+            QMessageBox.Yes | QMessageBox.No, QMessageBox.No)
+        return reply == QMessageBox.Yes
+
+    def find_similar_captures(self):
+        """Show earlier captures of the same screen from the indexed folders"""
+        if not self.drawing_area.screenshot:
+            return
+        self.index_save_directory()
+        SimilarCapturesDialog(self.drawing_area.screenshot, self).exec_()
+
+    def show_compare_menu(self):
+        """Offer recent captures and image files to compare the current capture with"""
+        if not self.screenshot:
+            return
+        menu = QMenu(self)
+        for entry in CaptureHistory.instance().entries()[:COMPARE_MENU_CAPTURES]:
+            action = menu.addAction(f"🕘 {entry.label()}")
+            action.triggered.connect(lambda checked, e=entry: self.compare_with(e.decompress(),
+                                                                                e.label()))
+        if not menu.isEmpty():
+            menu.addSeparator()
+        menu.addAction("📂 Open File...").triggered.connect(self.compare_with_file)
+        menu.exec_(self.compare_btn.mapToGlobal(QPoint(0, self.compare_btn.height())))
+
+    def compare_with_file(self):
+        filename, _ = QFileDialog.getOpenFileName(
+            self, "Compare With", self.save_directory,
+            "Image Files (*.png *.jpg *.jpeg *.bmp);;All Files (*)")
+        if filename:
+            image = QImage(filename)
+            if image.isNull():
+                QMessageBox.warning(self, "Compare Captures", f"Could not open {filename}")
+                return
+            self.compare_with(image, os.path.basename(filename))
+
+    def compare_with(self, before, name):
+        """Mark what changed since the before image with rectangles on the current capture"""
+        if not NUMPY_AVAILABLE:
+            QMessageBox.information(self, "Compare Captures",
+                                    "Comparing captures needs NumPy (pip install numpy).")
+            return
+        area = self.drawing_area
+        if area.is_typing:
+            area.stop_text_editing()
+        after = area.screenshot.toImage()
+        with PROFILER.measure("pixel_diff"):
+            result = diff_images(before, after)
+
+        # Rectangles go just outside the changed pixels so they stay visible
+        bounds = after.rect()
+        margin = area.pen_size
+        for box in result.boxes:
+            rect = box.adjusted(-margin, -margin, margin, margin).intersected(bounds)
+            area.drawings.append(("rectangle", area.current_color,
+                                  [rect.topLeft(), rect.bottomRight()], area.pen_size))
+        if result.boxes:
+            area.add_to_undo_stack()
+            area.update()
+        QToolTip.showText(self.compare_btn.mapToGlobal(QPoint(0, self.compare_btn.height())),
+                          f"Compared with {name}: {result.summary()}", self.compare_btn)
+
+    def copy_to_clipboard(self):
+        """Put the annotated screenshot on the clipboard, ready to paste"""
+        if not self.screenshot:
+            return
+
+        if self.drawing_area.is_typing:
+            self.drawing_area.stop_text_editing()
+
+        with PROFILER.measure("copy_to_clipboard"):
+            # Only the image itself is rendered now; PNG bytes are encoded if
+            # and when the application pasting asks for them
+            copy_image_to_clipboard(self.drawing_area.render_to_image())
+
+        QToolTip.showText(self.copy_btn.mapToGlobal(QPoint(0, self.copy_btn.height())),
+                          "Copied to clipboard", self.copy_btn)
+
+    def save_project(self):
+        """Save the capture and its editable annotations as a .snaptrace project"""
+        if not self.screenshot:
+            return
+
+        default_path = self.project_path or os.path.join(
+            self.save_directory, f"{self.name_input.text() or 'screenshot'}{PROJECT_EXTENSION}")
+        filename, _ = QFileDialog.getSaveFileName(
+            self, "Save Project", default_path, f"SnapTrace Project (*{PROJECT_EXTENSION})")
+        if not filename:
+            return
+        if not filename.endswith(PROJECT_EXTENSION):
+            filename += PROJECT_EXTENSION
+
+        try:
+            with PROFILER.measure("save_project"):
+                project = Project.from_drawing_area(self.drawing_area, self.capture_blob)
+                project.save(filename)
+            # The capture never changes while editing, so encode it only once
+            self.capture_blob = project.capture_blob
+            self.project_path = filename
+            print(f"Project saved: {filename}")
+        except (OSError, ProjectError) as e:
+            QMessageBox.critical(self, "Error", f"Failed to save project:\n{str(e)}")
+
+    def open_project(self, filename=None):
+        """Open a .snaptrace project in a new tab"""
+        if not filename:
+            filename, _ = QFileDialog.getOpenFileName(
+                self, "Open Project", self.project_path or self.save_directory,
+                f"SnapTrace Project (*{PROJECT_EXTENSION})")
+            if not filename:
+                return
+        try:
+            with PROFILER.measure("open_project"):
+                project = Project.load(filename)
+                self.open_document(project.capture_pixmap())
+                self.load_project(project)
+        except ProjectError as e:
+            QMessageBox.critical(self, "Error", f"Failed to open project:\n{str(e)}")
+
+    def load_project(self, project):
+        """Show a loaded Project in the current tab, replacing its document"""
+        project.apply_to(self.drawing_area)
+        self.drawing_area.sync_image_references()
+        self.autosave.begin(self.drawing_area)
+        self.document.geometry = None
+        self.capture_blob = project.capture_blob
+        self.project_path = project.path
+        if project.path:
+            self.save_directory = os.path.dirname(os.path.abspath(project.path))
+            self.index_save_directory()
+            self.name_input.setText(os.path.splitext(os.path.basename(project.path))[0])
+        # Show the saved start value without resetting the restored counter
+        self.start_from_input.blockSignals(True)
+        self.start_from_input.setValue(self.drawing_area.counter_start)
+        self.start_from_input.blockSignals(False)
+
+    def closeEvent(self, event):
+        """Closing the editor closes its tabs, ending their autosave sessions"""
+        self.end_autosave_sessions()
+        for document in self.documents.values():
+            self.spool.remove(document.area)
+        self.documents.clear()
+        self.shown_document = None
+        self.tabs.clear()
+        super().closeEvent(event)
+
     def take_new_screenshot(self):
         """Show screen selection overlay"""
         # Create and show the screenshot selector with reference to this window
@@ -543,19 +993,11 @@ class ScreenshotTool(QMainWindow):
     def handle_new_selection(self):
         """Handle new area selection"""
         if self.selector.screenshot is not None:
-            self.screenshot = self.selector.screenshot
-            self.geometry = self.selector.selected_geometry
-            self.drawing_area.screenshot = self.selector.screenshot
-            self.drawing_area.setMinimumSize(self.selector.screenshot.size())
+            CaptureHistory.instance().add(self.selector.screenshot, self.selector.selected_geometry)
+            # The new capture gets its own tab; earlier ones stay open
+            self.open_document(self.selector.screenshot, self.selector.selected_geometry)
             
-            # Clear any existing drawings
-            self.drawing_area.drawings = []
-            self.drawing_area.text_items = []
-            self.drawing_area.undo_stack = []
-            self.drawing_area.redo_stack = []
-            
-            # Reset and suggest filename
-            self.name_input.clear()
+            # Suggest filename
             timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
             self.name_input.setText(f"screenshot_{timestamp}")
             
@@ -581,6 +1023,10 @@ class ScreenshotTool(QMainWindow):
         if event.modifiers() & Qt.ControlModifier:
             if event.key() == Qt.Key_N:
                 self.take_new_screenshot()
+            elif event.key() == Qt.Key_S and event.modifiers() & Qt.ShiftModifier:
+                self.save_project()
+            elif event.key() == Qt.Key_O:
+                self.open_project()
             elif event.key() == Qt.Key_S:
                 self.save_screenshot()
         else:
@@ -595,7 +1041,10 @@ class ScreenshotTool(QMainWindow):
                 Qt.Key_E: "eraser",
                 Qt.Key_I: "image",
                 Qt.Key_K: "color",
-                Qt.Key_NumberSign: "count"  # Add shortcut for counter tool
+                Qt.Key_NumberSign: "count",  # Add shortcut for counter tool
+                Qt.Key_X: "pixelate",
+                Qt.Key_B: "blur",
+                Qt.Key_F: "redact"
             }
             if event.key() in key_tool_map:
                 tool = key_tool_map[event.key()]
@@ -626,6 +1075,7 @@ class ScreenshotTool(QMainWindow):
                 display_path = "..." + display_path[-37:]
             self.folder_path_label.setText(display_path)
             self.folder_path_label.setToolTip(self.save_directory)
+            self.index_save_directory()
 
     def update_counter_start(self, value):
         """Update the counter start value"""
@@ -636,13 +1086,17 @@ class ScreenshotTool(QMainWindow):
         self.drawing_area.reset_counter()
 
     def populate_defect_list(self):
-        """Populate the defect list from the defect_data list"""
-        self.feedback_list.clear()  # Clear existing items first
-        for row in self.defect_data:
-            feedback_text = row.get('Feedback', '')
-            if row.get('Category'):
-                feedback_text = f"{row['Category']}: {feedback_text}"
-            item = QListWidgetItem(feedback_text)
-            item.setFlags(item.flags() | Qt.ItemIsDragEnabled)
-            self.feedback_list.addItem(item)
+        """Show the shared feedback catalog's phrases after it (re)loads"""
+        self.feedback_model.set_texts(self.catalog.texts)
+        self.usage_boosts = None
+        self.last_search = None  # A reloaded catalog has a new index
+        self.filter_commands(self.search_input.text())
+
+    def show_catalog_error(self, error):
+        QMessageBox.warning(self, "CSV Load Error", f"Error loading defect feedbacks: {error}")
 
+    def append_defect_items(self, first_index):
+        """Add feedback rows appended to the catalog CSV"""
+        self.feedback_model.extend(self.catalog.texts)
+        self.usage_boosts = None
+        self.filter_commands(self.search_input.text())
@@ -0,0 +1,80 @@
+from PyQt5.QtWidgets import QWidget, QHBoxLayout, QLabel, QPushButton, QApplication
+from PyQt5.QtCore import Qt, QRect, QTimer, pyqtSignal
+
+from ..core.recording import RegionRecorder
+from .scroll_capture_panel import PANEL_STYLESHEET, place_beside_region
+
+STATUS_INTERVAL_MS = 250
+
+
+class RecordingPanel(QWidget):
+    """Always-on-top bar shown while a region is recorded, with a Stop button.
+
+    Shows the elapsed time, frames stored and file size; after Stop it waits
+    for the encoder and emits finished with the recording's temporary path.
+    """
+    finished = pyqtSignal(str)
+    failed = pyqtSignal(str)
+
+    def __init__(self, region, screen=None):
+        super().__init__(None)
+        self.target_screen = screen or QApplication.primaryScreen()
+        self.recorder = RegionRecorder(region, self.target_screen, parent=self)
+        self.recorder.stopped.connect(self.on_stopped)
+        self.recorder.finished.connect(self.on_finished)
+        self.recorder.failed.connect(self.on_failed)
+        self.setWindowFlags(Qt.FramelessWindowHint | Qt.WindowStaysOnTopHint | Qt.Tool)
+        self.setAttribute(Qt.WA_DeleteOnClose)
+        self.setStyleSheet(PANEL_STYLESHEET)
+
+        layout = QHBoxLayout(self)
+        layout.setContentsMargins(12, 6, 6, 6)
+        self.status_label = QLabel("● Recording...")
+        layout.addWidget(self.status_label)
+        self.stop_btn = QPushButton("Stop")
+        self.stop_btn.setToolTip("Stop recording (Enter)")
+        self.stop_btn.clicked.connect(self.stop)
+        layout.addWidget(self.stop_btn)
+        self.setMinimumWidth(360)
+        self.adjustSize()
+        place_beside_region(self, region, self.target_screen)
+
+        panel = QRect(self.pos() - self.target_screen.geometry().topLeft(), self.size())
+        if panel.intersects(region):
+            self.recorder.ignore = panel.translated(-region.topLeft())
+
+        self.status_timer = QTimer(self)
+        self.status_timer.timeout.connect(self.update_status)
+
+    def start(self):
+        self.show()
+        self.recorder.start()
+        self.status_timer.start(STATUS_INTERVAL_MS)
+
+    def update_status(self):
+        elapsed = int(self.recorder.elapsed())
+        status = (f"● {elapsed // 60}:{elapsed % 60:02d} · {self.recorder.encoded} frames · "
+                  f"{self.recorder.bytes / 2 ** 20:.1f} MB")
+        if self.recorder.dropped:
+            status += f" · {self.recorder.dropped} dropped"
+        self.status_label.setText(status)
+
+    def stop(self):
+        self.recorder.stop()
+
+    def on_stopped(self):
+        self.status_timer.stop()
+        self.stop_btn.setEnabled(False)
+        self.status_label.setText("Finishing recording...")
+
+    def on_finished(self, path, frames):
+        self.close()
+        self.finished.emit(path)
+
+    def on_failed(self, message):
+        self.close()
+        self.failed.emit(message)
+
+    def keyPressEvent(self, event):
+        if event.key() in (Qt.Key_Return, Qt.Key_Enter, Qt.Key_Escape):
+            self.stop()
@@ -0,0 +1,51 @@
+from PyQt5.QtWidgets import QWidget, QHBoxLayout, QLabel, QPushButton, QApplication
+from PyQt5.QtCore import Qt, QRect, pyqtSignal
+
+from ..core.region_watch import RegionWatcher
+from .scroll_capture_panel import PANEL_STYLESHEET, place_beside_region
+
+
+class RegionWatchPanel(QWidget):
+    """Always-on-top bar showing a region watch's statistics, with a Stop button.
+
+    If the bar has to sit inside the watched region, its own area is left out
+    of the comparison so updating the statistics doesn't count as a change.
+    """
+    stopped = pyqtSignal()
+
+    def __init__(self, region, screen=None):
+        super().__init__(None)
+        self.target_screen = screen or QApplication.primaryScreen()
+        self.watcher = RegionWatcher(region, self.target_screen, parent=self)
+        self.setWindowFlags(Qt.FramelessWindowHint | Qt.WindowStaysOnTopHint | Qt.Tool)
+        self.setAttribute(Qt.WA_DeleteOnClose)
+        self.setStyleSheet(PANEL_STYLESHEET)
+
+        layout = QHBoxLayout(self)
+        layout.setContentsMargins(12, 6, 6, 6)
+        self.status_label = QLabel("Watching for changes...")
+        layout.addWidget(self.status_label)
+        stop_btn = QPushButton("Stop")
+        stop_btn.setToolTip("Stop watching; changed frames are in Recent Captures → Watched Region")
+        stop_btn.clicked.connect(self.stop)
+        layout.addWidget(stop_btn)
+        self.setMinimumWidth(420)
+        self.adjustSize()
+        place_beside_region(self, region, self.target_screen)
+
+        panel = QRect(self.pos() - self.target_screen.geometry().topLeft(), self.size())
+        if panel.intersects(region):
+            self.watcher.ignore = panel.translated(-region.topLeft())
+        self.watcher.stats_changed.connect(self.update_status)
+
+    def start(self):
+        self.show()
+        self.watcher.start()
+
+    def update_status(self):
+        self.status_label.setText(self.watcher.stats.summary())
+
+    def stop(self):
+        self.watcher.stop()
+        self.close()
+        self.stopped.emit()
@@ -1,14 +1,17 @@
 from PyQt5.QtWidgets import QWidget, QLabel, QRubberBand, QApplication
 from PyQt5.QtCore import Qt, QPoint, QRect, QTimer, pyqtSignal
 from PyQt5.QtGui import QColor, QPainter, QPixmap, QPen
+from ..core.input_trace import attach_recorder_from_env
+from .scroll_capture_panel import ScrollCapturePanel
 
 class ScreenshotSelector(QWidget):
     finished = pyqtSignal()  # Signal when screenshot is taken
     cancelled = pyqtSignal()  # Signal when selection is cancelled
 
-    def __init__(self, parent_window=None):
+    def __init__(self, parent_window=None, allow_scroll_capture=True):
         super().__init__(None)  # Set no parent to avoid inheritance issues
         self.parent_window = parent_window
+        self.allow_scroll_capture = allow_scroll_capture  # Shift+drag starts a scrolling capture
         self.setWindowFlags(Qt.FramelessWindowHint | Qt.WindowStaysOnTopHint | Qt.Tool)
         self.setStyleSheet('''
             QWidget {
@@ -32,8 +35,12 @@ class ScreenshotSelector(QWidget):
         self.selected_geometry = None
         self.screenshot = None
         self.full_screenshot = None
+        self.scroll_panel = None
         self.setCursor(Qt.CrossCursor)
         
+        # Record input for replay when SNAPTRACE_RECORD_TRACES is set
+        self.input_recorder = attach_recorder_from_env(self, "selector")
+        
         # Hide parent window first
         if self.parent_window:
             self.parent_window.hide()
@@ -53,7 +60,11 @@ class ScreenshotSelector(QWidget):
         self.setWindowState(self.windowState() & ~Qt.WindowMinimized | Qt.WindowActive)
         
         # Add instruction label after showing
-        self.label = QLabel("Click and drag to select area (Esc to cancel)", self)
+        if self.allow_scroll_capture:
+            text = "Click and drag to select area, Shift+drag for a scrolling capture (Esc to cancel)"
+        else:
+            text = "Click and drag to select area (Esc to cancel)"
+        self.label = QLabel(text, self)
         self.label.setAlignment(Qt.AlignCenter)
         self.label.setStyleSheet('''
             QLabel {
@@ -65,7 +76,7 @@ class ScreenshotSelector(QWidget):
             }
         ''')
         # Position label at the top center
-        label_width = 400
+        label_width = 640
         self.label.setFixedWidth(label_width)
         self.label.move((self.width() - label_width) // 2, 50)
         self.label.show()
@@ -118,6 +129,9 @@ class ScreenshotSelector(QWidget):
         if self.begin and self.end:
             self.selected_geometry = QRect(self.begin, self.end).normalized()
             if self.selected_geometry.width() > 0 and self.selected_geometry.height() > 0:
+                if self.allow_scroll_capture and event.modifiers() & Qt.ShiftModifier:
+                    self.start_scroll_capture()
+                    return
                 # Take a new screenshot of the selected area
                 self.screenshot = self.full_screenshot.copy(self.selected_geometry)
                 # Use a timer to emit the signal after a brief delay
@@ -126,6 +140,25 @@ class ScreenshotSelector(QWidget):
                 self.rubber_band.hide()
                 self.update()
     
+    def start_scroll_capture(self):
+        """Get out of the way and stitch the selected area while the user scrolls under it"""
+        self.hide()
+        self.scroll_panel = ScrollCapturePanel(self.selected_geometry, self.screen)
+        self.scroll_panel.finished.connect(self._scroll_capture_finished)
+        self.scroll_panel.cancelled.connect(self._scroll_capture_cancelled)
+        # Let the overlay disappear from the screen before the first grab
+        QTimer.singleShot(100, self.scroll_panel.start)
+
+    def _scroll_capture_finished(self, image):
+        self.scroll_panel = None
+        self.screenshot = QPixmap.fromImage(image)
+        self._emit_finished()
+
+    def _scroll_capture_cancelled(self):
+        self.scroll_panel = None
+        self.cancelled.emit()
+        self.close()
+
     def _emit_finished(self):
         """Emit the finished signal and close"""
         self.finished.emit()
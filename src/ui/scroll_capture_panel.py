@@ -0,0 +1,125 @@
+from PyQt5.QtWidgets import QWidget, QHBoxLayout, QLabel, QPushButton, QApplication
+from PyQt5.QtCore import Qt, QTimer, pyqtSignal
+from PyQt5.QtGui import QImage
+
+from ..core.constants import SCROLL_CAPTURE_INTERVAL_MS
+from ..core.profiler import PROFILER
+from ..core.scroll_capture import ScrollStitcher
+
+PANEL_MARGIN = 8
+
+
+def place_beside_region(widget, region, screen):
+    """Move a small top-level widget below a screen-relative region if it fits
+    on screen, else above it, else inside its top edge"""
+    available = screen.geometry()
+    region = region.translated(available.topLeft())
+    x = max(available.left(), min(region.left(), available.right() - widget.width()))
+    if region.bottom() + PANEL_MARGIN + widget.height() <= available.bottom():
+        y = region.bottom() + PANEL_MARGIN
+    elif region.top() - PANEL_MARGIN - widget.height() >= available.top():
+        y = region.top() - PANEL_MARGIN - widget.height()
+    else:
+        y = region.top() + PANEL_MARGIN
+    widget.move(x, y)
+
+
+PANEL_STYLESHEET = '''
+    QWidget {
+        background-color: #262626;
+        color: white;
+        font-size: 13px;
+    }
+    QPushButton {
+        background-color: #0078d4;
+        border: none;
+        border-radius: 4px;
+        padding: 6px 14px;
+    }
+    QPushButton:hover {
+        background-color: #1084d8;
+    }
+'''
+
+
+class ScrollCapturePanel(QWidget):
+    """Small always-on-top bar shown during a scrolling capture.
+
+    Grabs the region every SCROLL_CAPTURE_INTERVAL_MS while the user scrolls
+    the window under it and stitches the frames; Done emits the tall image.
+    The bar sits outside the region where there is room, so it is not captured.
+    """
+    finished = pyqtSignal(QImage)
+    cancelled = pyqtSignal()
+
+    def __init__(self, region, screen=None):
+        super().__init__(None)
+        self.region = region    # Rect to grab, relative to the screen
+        self.target_screen = screen or QApplication.primaryScreen()
+        self.stitcher = ScrollStitcher()
+        self.setWindowFlags(Qt.FramelessWindowHint | Qt.WindowStaysOnTopHint | Qt.Tool)
+        self.setAttribute(Qt.WA_DeleteOnClose)
+        self.setStyleSheet(PANEL_STYLESHEET)
+
+        layout = QHBoxLayout(self)
+        layout.setContentsMargins(12, 6, 6, 6)
+        self.status_label = QLabel("Scroll the page slowly...")
+        layout.addWidget(self.status_label)
+        done_btn = QPushButton("Done")
+        done_btn.setToolTip("Finish the scrolling capture (Enter)")
+        done_btn.clicked.connect(self.finish)
+        layout.addWidget(done_btn)
+        cancel_btn = QPushButton("Cancel")
+        cancel_btn.clicked.connect(self.cancel)
+        layout.addWidget(cancel_btn)
+        self.adjustSize()
+        place_beside_region(self, self.region, self.target_screen)
+
+        self.timer = QTimer(self)
+        self.timer.timeout.connect(self.grab_frame)
+
+    def start(self):
+        self.show()
+        self.grab_frame()
+        self.timer.start(SCROLL_CAPTURE_INTERVAL_MS)
+
+    def grab_region(self):
+        """The region's current pixels"""
+        return self.target_screen.grabWindow(0, self.region.x(), self.region.y(),
+                                      self.region.width(), self.region.height()).toImage()
+
+    def grab_frame(self):
+        frame = self.grab_region()
+        if frame.isNull():
+            return  # The screen could not be grabbed this time
+        missed = self.stitcher.missed
+        with PROFILER.measure("scroll_capture_frame"):
+            self.stitcher.add_frame(frame)
+        if self.stitcher.is_full():
+            self.finish()
+            return
+        status = f"{self.stitcher.height} px captured"
+        if self.stitcher.missed > missed:
+            status += " (scrolled too far at once, scroll back a little)"
+        self.status_label.setText(status)
+        self.adjustSize()
+
+    def finish(self):
+        self.timer.stop()
+        image = self.stitcher.take_image()
+        self.close()
+        if image.isNull():
+            self.cancelled.emit()
+        else:
+            self.finished.emit(image)
+
+    def cancel(self):
+        self.timer.stop()
+        self.close()
+        self.cancelled.emit()
+
+    def keyPressEvent(self, event):
+        if event.key() in (Qt.Key_Return, Qt.Key_Enter):
+            self.finish()
+        elif event.key() == Qt.Key_Escape:
+            self.cancel()
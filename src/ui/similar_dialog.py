@@ -0,0 +1,112 @@
+import os
+import time
+
+from PyQt5.QtWidgets import (QDialog, QVBoxLayout, QHBoxLayout, QLabel, QListWidget,
+                             QListWidgetItem, QPushButton, QFileDialog, QListView)
+from PyQt5.QtCore import Qt, QSize, QUrl
+from PyQt5.QtGui import QDesktopServices, QIcon, QPixmap
+
+from ..core.image_hash import ImageHashIndex, dhash
+from ..core.thumbnails import ThumbnailService
+
+THUMBNAIL_ICON_SIZE = QSize(192, 120)
+
+
+class SimilarCapturesDialog(QDialog):
+    """Captures in the indexed folders that look most like a screenshot.
+
+    Matches come from the perceptual hash index; thumbnails fill in as the
+    thumbnail service delivers them. Double-click opens a capture.
+    """
+
+    def __init__(self, screenshot, parent=None):
+        super().__init__(parent)
+        self.setWindowTitle("Similar Captures")
+        self.resize(720, 520)
+        self.image_hash = dhash(screenshot)
+        self.index = ImageHashIndex.instance()
+        self.thumbnails = ThumbnailService.instance()
+        self._items = {}   # path -> QListWidgetItem
+
+        layout = QVBoxLayout(self)
+        self.status_label = QLabel()
+        layout.addWidget(self.status_label)
+
+        self.results = QListWidget()
+        self.results.setViewMode(QListView.IconMode)
+        self.results.setIconSize(THUMBNAIL_ICON_SIZE)
+        self.results.setResizeMode(QListView.Adjust)
+        self.results.setMovement(QListView.Static)
+        self.results.setSpacing(8)
+        self.results.setWordWrap(True)
+        self.results.itemActivated.connect(self.open_capture)
+        layout.addWidget(self.results)
+
+        button_layout = QHBoxLayout()
+        add_folder_btn = QPushButton("Search Another Folder...")
+        add_folder_btn.setToolTip("Index a folder of captures and include it in the search")
+        add_folder_btn.clicked.connect(self.add_folder)
+        button_layout.addWidget(add_folder_btn)
+        button_layout.addStretch()
+        close_btn = QPushButton("Close")
+        close_btn.clicked.connect(self.close)
+        button_layout.addWidget(close_btn)
+        layout.addLayout(button_layout)
+
+        self.thumbnails.thumbnail_ready.connect(self.set_thumbnail)
+        # Folders finishing indexing (the save folder, or one just added) may hold matches
+        self.index.folder_indexed.connect(self.folder_indexed)
+        self.search()
+
+    def search(self):
+        """List the closest captures"""
+        start = time.perf_counter()
+        matches = self.index.nearest(self.image_hash)
+        elapsed = time.perf_counter() - start
+
+        self.results.clear()
+        self._items = {}
+        placeholder = QPixmap(THUMBNAIL_ICON_SIZE)
+        placeholder.fill(Qt.darkGray)
+        for distance, path in matches:
+            similarity = round(100 * (1 - distance / 64))
+            item = QListWidgetItem(f"{os.path.basename(path)}\n{similarity}% similar")
+            item.setData(Qt.UserRole, path)
+            item.setToolTip(path)
+            image = self.thumbnails.request(path, requester=self)
+            item.setIcon(QIcon(QPixmap.fromImage(image)) if image is not None else QIcon(placeholder))
+            self.results.addItem(item)
+            self._items[path] = item
+
+        indexed = len(self.index.similarity_index())
+        if matches:
+            self.status_label.setText(f"{len(matches)} similar captures among {indexed} indexed "
+                                      f"images ({elapsed * 1000:.0f} ms)")
+        else:
+            self.status_label.setText(f"No similar captures among {indexed} indexed images. "
+                                      f"Folders you save to are indexed automatically.")
+
+    def folder_indexed(self, directory):
+        self.search()
+
+    def set_thumbnail(self, path, image):
+        item = self._items.get(path)
+        if item is not None and not image.isNull():
+            item.setIcon(QIcon(QPixmap.fromImage(image)))
+
+    def open_capture(self, item):
+        QDesktopServices.openUrl(QUrl.fromLocalFile(item.data(Qt.UserRole)))
+
+    def add_folder(self):
+        folder = QFileDialog.getExistingDirectory(self, "Search Folder", os.path.expanduser("~"))
+        if folder:
+            self.status_label.setText(f"Indexing {folder}...")
+            self.index.refresh(folder, force=True)
+
+    def done(self, result):
+        if self._items is not None:
+            self.thumbnails.thumbnail_ready.disconnect(self.set_thumbnail)
+            self.index.folder_indexed.disconnect(self.folder_indexed)
+            self.thumbnails.cancel_pending(self)
+            self._items = None
+        super().done(result)
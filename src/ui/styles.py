@@ -162,25 +162,25 @@ DARK_THEME_STYLESHEET = '''
         font-size: 13px;
     }
     
-    /* List Widget */
-    QListWidget {
+    /* Lists */
+    QListView, QTreeView {
         background-color: #2d2d2d;
         border: 1px solid #3d3d3d;
         border-radius: 8px;
         padding: 8px;
         min-height: 300px;
     }
-    QListWidget::item {
+    QListView::item, QTreeView::item {
         background-color: #333333;
         padding: 10px 14px;
         border-radius: 6px;
         margin: 3px 4px;
         font-size: 13px;
     }
-    QListWidget::item:hover {
+    QListView::item:hover, QTreeView::item:hover {
         background-color: #3d3d3d;
     }
-    QListWidget::item:selected {
+    QListView::item:selected, QTreeView::item:selected {
         background-color: #0066cc;
         color: white;
     }
@@ -211,6 +211,25 @@ DARK_THEME_STYLESHEET = '''
         background: none;
     }
     
+    /* Document Tabs */
+    #documentTabs::pane {
+        border: none;
+    }
+    QTabBar::tab {
+        background-color: #262626;
+        color: #888888;
+        padding: 8px 16px;
+        border: none;
+        border-right: 1px solid #1a1a1a;
+    }
+    QTabBar::tab:selected {
+        background-color: #1a1a1a;
+        color: white;
+    }
+    QTabBar::tab:hover:!selected {
+        background-color: #2d2d2d;
+    }
+    
     /* Color Indicator */
     #colorIndicator {
         border: 1px solid #3d3d3d;
@@ -0,0 +1,58 @@
+"""
+Shared fixtures for the SnapTrace tests
+Tests run headless (QT_QPA_PLATFORM=offscreen) with Qt's standard paths in
+test mode and QSettings in a temporary folder, so caches and settings never
+touch the user's own.
+"""
+
+import os
+import sys
+import time
+
+import pytest
+
+os.environ.setdefault("QT_QPA_PLATFORM", "offscreen")
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+
+@pytest.fixture(scope="session")
+def qapp(tmp_path_factory):
+    """The QApplication shared by every test"""
+    from PyQt5.QtCore import QSettings, QStandardPaths, QThreadPool
+    from PyQt5.QtWidgets import QApplication
+    QStandardPaths.setTestModeEnabled(True)
+    settings_dir = str(tmp_path_factory.mktemp("settings"))
+    for settings_format in (QSettings.NativeFormat, QSettings.IniFormat):
+        QSettings.setPath(settings_format, QSettings.UserScope, settings_dir)
+    app = QApplication.instance() or QApplication(sys.argv[:1])
+    yield app
+    # Decodes still running must not report to objects torn down at exit
+    QThreadPool.globalInstance().waitForDone()
+
+
+@pytest.fixture
+def wait_until(qapp):
+    """wait_until(condition, timeout): process events until condition() is true"""
+    def wait(condition, timeout=5.0):
+        deadline = time.monotonic() + timeout
+        while not condition():
+            if time.monotonic() > deadline:
+                return False
+            qapp.processEvents()
+            time.sleep(0.005)
+        return True
+    return wait
+
+
+@pytest.fixture
+def image_file(qapp, tmp_path):
+    """make(name, color, width, height): path of a new PNG filled with color"""
+    from PyQt5.QtGui import QColor, QImage
+
+    def make(name="image.png", color="green", width=60, height=40):
+        image = QImage(width, height, QImage.Format_RGB32)
+        image.fill(QColor(color))
+        path = str(tmp_path / name)
+        assert image.save(path)
+        return path
+    return make
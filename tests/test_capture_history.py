@@ -0,0 +1,85 @@
+"""The compressed capture history and its count and megabyte caps"""
+
+import os
+
+from PyQt5.QtCore import QRect
+from PyQt5.QtGui import QColor, QImage, QLinearGradient, QPainter
+
+from src.core.capture_history import CaptureHistory
+from src.core.image_hash import set_duplicate_action
+
+
+def screenshot(color, width=320, height=200):
+    """A capture with some structure, so dHashes of different colours differ"""
+    image = QImage(width, height, QImage.Format_RGB32)
+    painter = QPainter(image)
+    gradient = QLinearGradient(0, 0, width, height)
+    gradient.setColorAt(0, QColor(color))
+    gradient.setColorAt(1, QColor(color).darker(300))
+    painter.fillRect(image.rect(), gradient)
+    painter.fillRect(QColor(color).hue() % width, 20, 40, 60, QColor("white"))
+    painter.end()
+    return image
+
+
+def noise(width, height):
+    """Pixels zlib cannot compress"""
+    data = os.urandom(width * height * 4)
+    return QImage(data, width, height, width * 4, QImage.Format_RGB32).copy()
+
+
+def compressed(history, wait_until):
+    return wait_until(lambda: all(entry.blob is not None for entry in history.entries()))
+
+
+def test_reopened_capture_round_trips(qapp, wait_until):
+    history = CaptureHistory(max_captures=5, budget_mb=10)
+    image = screenshot("orange")
+    entry = history.add(image, QRect(10, 20, 320, 200))
+    assert compressed(history, wait_until)
+    assert entry.image is None and 0 < entry.compressed_size < image.sizeInBytes()
+    assert entry.image_hash is not None
+    assert history.pixmap(entry.entry_id).toImage().convertToFormat(QImage.Format_RGB32) == image
+    assert history.get(entry.entry_id).geometry == QRect(10, 20, 320, 200)
+
+
+def test_count_cap_evicts_least_recently_used(qapp, wait_until):
+    set_duplicate_action("off")
+    history = CaptureHistory(max_captures=3, budget_mb=10)
+    first, second, third = (history.add(screenshot(color)) for color in ("red", "green", "blue"))
+    history.pixmap(first.entry_id)                    # Reopened, so second is older
+    fourth = history.add(screenshot("yellow"))
+    assert [entry.entry_id for entry in history.entries()] == \
+        [fourth.entry_id, third.entry_id, first.entry_id]
+    assert history.pixmap(second.entry_id) is None
+
+    history.set_limits(max_captures=1, persist=False)
+    assert [entry.entry_id for entry in history.entries()] == [fourth.entry_id]
+    assert compressed(history, wait_until)
+
+
+def test_megabyte_budget_counts_compressed_bytes(qapp, wait_until):
+    set_duplicate_action("off")
+    history = CaptureHistory(max_captures=10, budget_mb=1)
+    # About 0.7 MB each even compressed, so two do not fit in 1 MB
+    for _ in range(3):
+        history.add(noise(420, 420))
+    assert len(history) == 3                          # Not counted until compressed
+    assert wait_until(lambda: len(history) == 1)
+    assert history.compressed_bytes() <= 1024 * 1024
+
+    # The newest capture stays even when it alone is over the budget
+    history.add(noise(600, 600))
+    assert wait_until(lambda: len(history) == 1 and history.compressed_bytes() > 1024 * 1024)
+
+
+def test_duplicates_replace_earlier_captures(qapp, wait_until):
+    set_duplicate_action("warn")
+    history = CaptureHistory(max_captures=10, budget_mb=10)
+    history.add(screenshot("red"))
+    history.add(screenshot("navy"))
+    again = history.add(screenshot("red"))
+    kept = history.add(screenshot("red"), deduplicate=False)
+    assert compressed(history, wait_until)
+    assert [entry.entry_id for entry in history.entries()] == \
+        [kept.entry_id, again.entry_id, again.entry_id - 1]
@@ -0,0 +1,34 @@
+"""Clipboard export with the PNG encoded only when asked for"""
+
+from PyQt5.QtGui import QColor, QGuiApplication, QImage
+
+from src.core.clipboard_export import (PNG_MIME, QT_IMAGE_MIME, ImageMimeData,
+                                       copy_image_to_clipboard)
+
+
+def capture():
+    image = QImage(64, 48, QImage.Format_RGB32)
+    image.fill(QColor("white"))
+    image.setPixelColor(10, 20, QColor("red"))
+    return image
+
+
+def test_png_is_encoded_once_on_request(qapp):
+    image = capture()
+    data = ImageMimeData(image)
+    assert data.hasImage() and data.hasFormat(PNG_MIME)
+    assert set(data.formats()) == {QT_IMAGE_MIME, PNG_MIME}
+    assert data._png is None                     # Nothing encoded by copying
+    png = data.data(PNG_MIME)
+    assert bytes(png).startswith(b"\x89PNG")
+    assert data.retrieveData(PNG_MIME, None) is data._png
+    decoded = QImage.fromData(png, "PNG").convertToFormat(QImage.Format_RGB32)
+    assert decoded == image
+
+
+def test_copy_replaces_the_clipboard(qapp):
+    image = capture()
+    copy_image_to_clipboard(image)
+    clipboard = QGuiApplication.clipboard()
+    assert clipboard.image().convertToFormat(QImage.Format_RGB32) == image
+    assert bytes(clipboard.mimeData().data(PNG_MIME)).startswith(b"\x89PNG")
@@ -0,0 +1,92 @@
+"""Unloading background tabs under the memory budget and restoring them"""
+
+from PyQt5.QtCore import QPoint
+from PyQt5.QtGui import QColor, QImage, QPixmap
+
+from src.core.document_spool import (DocumentSpool, SpoolFile, deserialize_history,
+                                     document_bytes, serialize_history)
+from src.ui.drawing_area import DrawingArea
+
+
+def edited_area(color="white"):
+    screenshot = QPixmap(300, 200)
+    screenshot.fill(QColor(color))
+    area = DrawingArea(screenshot)
+    area.resize(300, 200)
+    for offset in range(3):
+        area.drawings.append(("rectangle", QColor("red"),
+                              [QPoint(offset, offset), QPoint(50 + offset, 40)], 2))
+        area.add_to_undo_stack()
+    area.add_counter(QPoint(100, 100))
+    area.undo()                                   # Leaves a redo state
+    return area
+
+
+def pixels(area):
+    return area.screenshot.toImage().convertToFormat(QImage.Format_RGB32)
+
+
+def test_spool_file_is_emptied_when_nothing_is_needed(tmp_path):
+    spool = SpoolFile(str(tmp_path))
+    first = spool.write(b"first")
+    second = spool.write(b"second blob")
+    assert spool.read(second, 11) == b"second blob"
+    assert spool.size() == 16                     # first is still needed
+    assert spool.read(first, 5) == b"first"
+    assert spool.size() == 0
+    spool.close()
+
+
+def test_history_round_trip_keeps_shared_items(qapp):
+    area = edited_area()
+    history, images = serialize_history(area)
+    assert len(history['items']) == len({id(item) for state in area.undo_stack + area.redo_stack
+                                         for name in ('drawings', 'counter_items')
+                                         for item in state[name]})
+    undo, redo = deserialize_history(history, area, images)
+    assert len(undo) == len(area.undo_stack) and len(redo) == len(area.redo_stack)
+    assert serialize_history(area)[0] == history
+    # Items of the live document stay the same objects
+    assert undo[-1]['drawings'][0] is area.drawings[0]
+    assert redo[0]['counter_items'] == area.redo_stack[0]['counter_items']
+
+
+def test_background_tab_is_unloaded_and_restored(qapp, tmp_path, wait_until):
+    spool = DocumentSpool(budget_mb=0, spool_memory_mb=0, spool_dir=str(tmp_path))
+    first, second = edited_area("orange"), edited_area("navy")
+    before = pixels(first)
+    history = serialize_history(first)[0]
+    spool.add(first)
+    assert not spool.is_unloaded(first)           # The shown tab is never unloaded
+    spool.add(second)
+    assert wait_until(lambda: spool.is_unloaded(first))
+    assert first.screenshot is None and first.undo_stack == []
+    assert spool.spool.size() > 0                 # Over the in-memory share, so spooled
+    assert spool.loaded_bytes() == document_bytes(second)
+
+    spool.show(first)
+    assert not spool.is_unloaded(first)
+    assert pixels(first) == before
+    assert serialize_history(first)[0] == history
+    first.redo()
+    assert len(first.counter_items) == 1
+    assert wait_until(lambda: spool.is_unloaded(second))
+    spool.remove(first)
+    spool.remove(second)
+    assert spool.spool.size() == 0
+    spool.spool.close()
+
+
+def test_showing_a_tab_while_it_compresses_keeps_it(qapp, tmp_path, wait_until):
+    spool = DocumentSpool(budget_mb=0, spool_dir=str(tmp_path))
+    first, second = edited_area(), edited_area()
+    spool.add(first)
+    spool.add(second)
+    spool.show(first)                             # Before the worker reports back
+    assert wait_until(lambda: spool.is_unloaded(second))
+    assert not spool.is_unloaded(first) and first.screenshot is not None
+    assert spool.compressed_bytes() > 0
+
+    spool.set_budget(100, persist=False)
+    spool.show(second)
+    assert not spool.is_unloaded(first) and not spool.is_unloaded(second)
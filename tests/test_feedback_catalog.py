@@ -0,0 +1,111 @@
+"""The shared feedback catalog: binary cache and reloading a changed CSV"""
+
+import os
+
+from src.core.feedback_catalog import (CatalogState, FeedbackCatalog, parse_csv_bytes,
+                                       read_cache, write_cache)
+
+HEADER = "Category,Feedback\n"
+ROWS = ["Layout,Button overlaps the label\n", "Text,\"Typo, in submit\"\n", "\n",
+        "Colors,Low contrast\n"]
+
+
+def write_csv(path, rows):
+    with open(path, 'w', encoding='utf-8', newline='') as f:
+        f.write(HEADER + "".join(rows))
+
+
+def load(catalog, wait_until, signal=None):
+    """Start a reload and wait for it to be delivered"""
+    delivered = []
+    (signal or catalog.reset).connect(lambda *args: delivered.append(args))
+    catalog.load()
+    assert wait_until(lambda: delivered)
+    return delivered[0]
+
+
+def test_parse_skips_blank_lines_and_finds_columns():
+    data = ("\ufeffID, Feedback ,Category\n1,Too dark,Colors\n\n2,\"Says \"\"OK\"\"\",Text\n"
+            .encode("utf-8"))
+    entries, category_column, feedback_column = parse_csv_bytes(data)
+    assert (category_column, feedback_column) == (2, 1)
+    assert entries == [("Colors", "Too dark"), ("Text", 'Says "OK"')]
+
+
+def test_cache_is_only_used_for_the_same_file(tmp_path):
+    cache = str(tmp_path / "cache" / "catalog.bin")
+    entries = [("Layout", "Overlap"), ("", "No category")]
+    state = CatalogState(120, 555, 120, 7, 0, 1)
+    write_cache(cache, entries, state)
+    cached_entries, cached_state = read_cache(cache, 120, 555)
+    assert cached_entries == entries
+    assert (cached_state.parsed_bytes, cached_state.tail_crc) == (120, 7)
+    assert read_cache(cache, 121, 555) is None
+    assert read_cache(cache, 120, 556) is None
+    write_cache(cache, [], state)
+    assert read_cache(cache, 120, 555)[0] == []
+
+
+def test_catalog_loads_and_caches(qapp, tmp_path, wait_until):
+    csv_path = str(tmp_path / "defects.csv")
+    cache = str(tmp_path / "catalog.bin")
+    write_csv(csv_path, ROWS)
+    catalog = FeedbackCatalog(csv_path, cache)
+    load(catalog, wait_until)
+    assert catalog.entries == [("Layout", "Button overlaps the label"),
+                               ("Text", "Typo, in submit"), ("Colors", "Low contrast")]
+    assert catalog.texts[1] == "Text: Typo, in submit"
+    assert catalog.index.rank("contrast") == [2]
+    assert catalog.row_of("Colors: Low contrast") == 2
+
+    # A second catalog reads the cache, even with the CSV unreadable as UTF-8 text
+    stat = os.stat(csv_path)
+    with open(csv_path, 'r+b') as f:
+        f.write(b"\xff")
+    os.utime(csv_path, ns=(stat.st_atime_ns, stat.st_mtime_ns))
+    again = FeedbackCatalog(csv_path, cache)
+    load(again, wait_until)
+    assert again.entries == catalog.entries
+
+
+def test_appended_rows_are_parsed_incrementally(qapp, tmp_path, wait_until):
+    csv_path = str(tmp_path / "defects.csv")
+    write_csv(csv_path, ROWS)
+    catalog = FeedbackCatalog(csv_path, str(tmp_path / "catalog.bin"))
+    load(catalog, wait_until)
+    entries = catalog.entries
+
+    write_csv(csv_path, ROWS + ["Misc,Added later\n"])
+    first, = load(catalog, wait_until, catalog.appended)
+    assert first == 3
+    assert catalog.entries[:3] == entries and catalog.entries[3] == ("Misc", "Added later")
+    assert catalog.index.rank("later") == [3]
+    assert catalog.row_of("Misc: Added later") == 3
+
+
+def test_edited_rows_reload_everything(qapp, tmp_path, wait_until):
+    csv_path = str(tmp_path / "defects.csv")
+    write_csv(csv_path, ROWS)
+    catalog = FeedbackCatalog(csv_path, str(tmp_path / "catalog.bin"))
+    load(catalog, wait_until)
+
+    # The file grew, but an earlier row changed too, so it is not an append
+    write_csv(csv_path, ["Layout,Button overlaps the LABEL\n"] + ROWS[1:] + ["X,Y\n"])
+    load(catalog, wait_until)
+    assert catalog.entries[0] == ("Layout", "Button overlaps the LABEL")
+    assert len(catalog.entries) == 4
+
+
+def test_watcher_reloads_a_changed_file(qapp, tmp_path, wait_until):
+    csv_path = str(tmp_path / "defects.csv")
+    write_csv(csv_path, ROWS)
+    catalog = FeedbackCatalog(csv_path, str(tmp_path / "catalog.bin"))
+    load(catalog, wait_until)
+    write_csv(csv_path, ["Misc,Only row\n"])
+    assert wait_until(lambda: catalog.entries == [("Misc", "Only row")])
+
+
+def test_missing_file_is_an_empty_catalog(qapp, tmp_path, wait_until):
+    catalog = FeedbackCatalog(str(tmp_path / "missing.csv"), str(tmp_path / "catalog.bin"))
+    load(catalog, wait_until)
+    assert catalog.loaded and catalog.entries == []
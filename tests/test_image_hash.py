@@ -0,0 +1,111 @@
+"""Perceptual hashes and the duplicate lookup of save folders"""
+
+import os
+import random
+
+from PyQt5.QtCore import Qt
+from PyQt5.QtGui import QColor, QImage, QLinearGradient, QPainter
+
+from src.core import image_hash
+from src.core.image_hash import ImageHashIndex, bands, dhash, dhash_file, hamming_distance
+
+
+def flipped(image_hash, bits):
+    for bit in bits:
+        image_hash ^= 1 << bit
+    return image_hash
+
+
+def brute_force(items, image_hash, max_distance):
+    return sorted((hamming_distance(image_hash, stored), path) for path, stored in items
+                  if hamming_distance(image_hash, stored) <= max_distance)
+
+
+def gradient_image(width, height, colors):
+    image = QImage(width, height, QImage.Format_RGB32)
+    painter = QPainter(image)
+    gradient = QLinearGradient(0, 0, width, height)
+    for position, color in colors:
+        gradient.setColorAt(position, QColor(color))
+    painter.fillRect(image.rect(), gradient)
+    painter.fillRect(width // 3, height // 4, width // 5, height // 2, QColor("black"))
+    painter.end()
+    return image
+
+
+def test_bands_split_the_hash():
+    image_hash = 0x0123_4567_89ab_cdef
+    assert bands(image_hash) == [0xcdef, 0x89ab, 0x4567, 0x0123]
+    assert hamming_distance(image_hash, flipped(image_hash, [0, 17, 63])) == 3
+
+
+def test_dhash_survives_scaling_but_not_other_content(qapp):
+    image = gradient_image(800, 600, [(0, "white"), (0.5, "orange"), (1, "navy")])
+    smaller = image.scaled(400, 300, Qt.IgnoreAspectRatio, Qt.SmoothTransformation)
+    other = gradient_image(800, 600, [(0, "navy"), (1, "white")]).mirrored(True, False)
+    assert hamming_distance(dhash(image), dhash(smaller)) <= 3
+    assert hamming_distance(dhash(image), dhash(other)) > 10
+    assert dhash(QImage()) is None
+
+
+def test_dhash_bits_are_the_same_with_and_without_numpy(qapp, monkeypatch):
+    rng = random.Random(5)
+    images = [QImage(os.urandom(width * 8 * 4), width, 8, width * 4, QImage.Format_RGB32).copy()
+              for width in (9, 13, rng.randrange(20, 200))]
+    images.append(gradient_image(300, 200, [(0, "white"), (1, "navy")]))
+    with_numpy = [dhash(image) for image in images]
+    monkeypatch.setattr(image_hash, "NUMPY_AVAILABLE", False)
+    assert [dhash(image) for image in images] == with_numpy
+    assert len(set(with_numpy)) == len(images)
+
+
+def test_find_similar_finds_every_close_hash(qapp, tmp_path):
+    rng = random.Random(3)
+    folder = tmp_path / "captures"
+    folder.mkdir()
+    index = ImageHashIndex(path=str(tmp_path / "hashes.sqlite3"))
+    query = rng.getrandbits(64)
+    items = []
+    for number in range(60):
+        # Up to 3 flipped bits anywhere, so often spread over several bands
+        image_hash = flipped(query, rng.sample(range(64), number % 6))
+        path = folder / f"{number}.png"
+        path.write_bytes(b"")
+        index.add(str(path), image_hash)
+        items.append((str(path), image_hash))
+    (folder / "0.png").unlink()             # Deleted after it was indexed
+
+    found = index.find_similar(str(folder), query, max_distance=3)
+    expected = [match for match in brute_force(items, query, 3) if not match[1].endswith("/0.png")]
+    assert found == expected
+    assert index.find_similar(str(tmp_path), query) == []     # Other folder
+    index.connection.close()
+
+
+def test_refresh_indexes_new_and_changed_files(qapp, tmp_path, wait_until):
+    folder = tmp_path / "captures"
+    folder.mkdir()
+    first = gradient_image(320, 240, [(0, "white"), (1, "navy")])
+    second = gradient_image(320, 240, [(0, "orange"), (1, "black")]).mirrored(True, True)
+    first.save(str(folder / "first.png"))
+    (folder / "notes.txt").write_text("not an image")
+    index = ImageHashIndex(path=str(tmp_path / "hashes.sqlite3"))
+    indexed = []
+    index.folder_indexed.connect(indexed.append)
+
+    index.refresh(str(folder))
+    assert wait_until(lambda: indexed)
+    assert index.find_similar(str(folder), dhash(first)) == [(0, str(folder / "first.png"))]
+    assert dhash_file(str(folder / "first.png")) == dhash(first)
+
+    # Overwritten with other content, and a new file added
+    second.save(str(folder / "first.png"))
+    stat = os.stat(folder / "first.png")
+    os.utime(folder / "first.png", ns=(stat.st_atime_ns, stat.st_mtime_ns + 10 ** 9))
+    first.save(str(folder / "again.png"))
+    index.refresh(str(folder))               # Once per process unless forced
+    index.refresh(str(folder), force=True)
+    assert wait_until(lambda: len(indexed) == 2)
+    assert index.find_similar(str(folder), dhash(first)) == [(0, str(folder / "again.png"))]
+    assert index.find_similar(str(folder), dhash(second))[0][1] == str(folder / "first.png")
+    index.connection.close()
@@ -0,0 +1,62 @@
+"""Decoding imported images on a worker at the size they are shown at"""
+
+from PyQt5.QtCore import QSize
+from PyQt5.QtGui import QColor, QPixmap
+
+from src.core.image_loader import (DecodeSignals, ImageDecodeTask, content_key, fit_size,
+                                   read_image_size)
+from src.ui.drawing_area import DrawingArea
+
+
+def decode(source, size):
+    results = []
+    signals = DecodeSignals()
+    signals.decoded.connect(results.append)
+    ImageDecodeTask(source, size, 7, signals).run()
+    assert len(results) == 1 and results[0].request_id == 7
+    return results[0]
+
+
+def test_fit_size_only_scales_down():
+    assert fit_size(QSize(300, 200), 400, 400) == QSize(300, 200)
+    assert fit_size(QSize(800, 200), 400, 400) == QSize(400, 100)
+    assert fit_size(QSize(100, 900), 400, 300) == QSize(33, 300)
+
+
+def test_file_decodes_at_target_size_with_its_bytes(qapp, image_file):
+    path = image_file("large.png", "orange", 800, 600)
+    result = decode(path, QSize(200, 150))
+    assert result.image.size() == QSize(200, 150)
+    assert result.image.pixelColor(100, 75) == QColor("orange")
+    with open(path, 'rb') as f:
+        data = f.read()
+    assert result.data == data and result.key == content_key(data)
+    assert read_image_size(data) == QSize(800, 600)
+
+
+def test_bytes_decode_without_key_and_never_upscale(qapp, image_file):
+    with open(image_file("small.png", "navy", 40, 30), 'rb') as f:
+        data = f.read()
+    result = decode(data, QSize(400, 300))
+    assert result.image.size() == QSize(40, 30)
+    assert result.data is None and result.key is None
+
+
+def test_unreadable_file_gives_null_image(qapp, tmp_path):
+    result = decode(str(tmp_path / "missing.png"), QSize(10, 10))
+    assert result.image.isNull()
+
+
+def test_add_image_shows_placeholder_until_decoded(qapp, image_file, wait_until):
+    screenshot = QPixmap(400, 300)
+    screenshot.fill(QColor("white"))
+    area = DrawingArea(screenshot)
+    area.resize(400, 300)
+    area.add_image(image_file("photo.png", "teal", 1200, 600))
+    handle = area.drawings[0][4]
+    assert handle.display_size == QSize(150, 75)      # Half the viewport at most
+    assert not handle.is_ready()
+
+    assert wait_until(handle.is_ready)
+    # Decoded at display size, not at the original 1200x600
+    assert handle.pixmap().size() == QSize(150, 75)
@@ -0,0 +1,126 @@
+"""The content-addressed image store: sharing, reference counting and eviction"""
+
+from PyQt5.QtCore import QBuffer, QByteArray, QIODevice, QPoint, QSize
+from PyQt5.QtGui import QColor, QImage, QPixmap
+
+from src.core.image_store import ImageStore
+from src.ui.drawing_area import DrawingArea
+
+SIDE = 100
+PIXMAP_BYTES = SIDE * SIDE * 4
+
+
+def png_bytes(color, side=SIDE):
+    image = QImage(side, side, QImage.Format_RGB32)
+    image.fill(QColor(color))
+    data = QByteArray()
+    buffer = QBuffer(data)
+    buffer.open(QIODevice.WriteOnly)
+    image.save(buffer, "PNG")
+    return bytes(data)
+
+
+def decoded(store, handle, wait_until):
+    handle.pixmap()
+    assert wait_until(handle.is_ready)
+    return handle.pixmap()
+
+
+def test_imports_share_one_entry(qapp, tmp_path, image_file, wait_until):
+    store = ImageStore()
+    path = image_file("logo.png", "red")
+    first = store.import_file(path, 200, 200)
+    assert wait_until(lambda: first.key is not None)
+    second = store.import_file(path, 20, 20)          # Not read again
+    assert second.key == first.key and second.entry is first.entry
+    assert second.display_size == QSize(20, 13)
+
+    copy = image_file("copy.png", "red")               # Same bytes, other file
+    third = store.import_file(copy, 200, 200)
+    assert wait_until(lambda: third.key is not None)
+    assert third.entry is first.entry
+    assert store.import_bytes(png_bytes("blue")).key != first.key
+    assert store.import_file(str(tmp_path / "missing.png"), 10, 10) is None
+
+
+def test_references_keep_entries_alive(qapp):
+    store = ImageStore()
+    red = store.import_bytes(png_bytes("red"))
+    red_again = store.import_bytes(png_bytes("red"))
+    blue = store.import_bytes(png_bytes("blue"))
+    store.set_references(1, [red, red_again, blue])
+    store.set_references(2, [red])
+    assert store.reference_count(red.key) == 3
+    assert store.reference_count(blue.key) == 1
+
+    usage = store.memory_usage()
+    store.set_references(1, [red])
+    assert store.reference_count(blue.key) == 0
+    assert store.memory_usage() == usage - len(blue.blob())
+    store.release_owner(2)
+    assert store.reference_count(red.key) == 1
+    store.release_owner(1)
+    assert store.memory_usage() == 0
+
+
+def test_budget_evicts_least_recently_painted(qapp, wait_until):
+    store = ImageStore(memory_budget=2 * PIXMAP_BYTES + PIXMAP_BYTES // 2)
+    a, b, c = (store.import_bytes(png_bytes(color)) for color in ("red", "green", "blue"))
+    store.set_references(1, [a, b, c])
+    decoded(store, a, wait_until)
+    decoded(store, b, wait_until)
+    a.pixmap()                                         # Painted again, so b is older
+    decoded(store, c, wait_until)
+    assert a.is_ready() and not b.is_ready() and c.is_ready()
+
+    # Images on screen are kept even over the budget
+    store.set_shown(1, [a, c])
+    pixmap = decoded(store, b, wait_until)
+    assert pixmap.size() == QSize(SIDE, SIDE)
+    assert a.is_ready() and b.is_ready() and c.is_ready()
+
+
+def test_unloaded_owner_drops_only_its_own_pixmaps(qapp, wait_until):
+    store = ImageStore()
+    shared = store.import_bytes(png_bytes("red"))
+    own = store.import_bytes(png_bytes("blue"))
+    store.set_references(1, [shared, own])
+    store.set_references(2, [shared])
+    decoded(store, shared, wait_until)
+    decoded(store, own, wait_until)
+    store.drop_owner_pixmaps(1)
+    assert shared.is_ready() and not own.is_ready()
+    assert store.reference_count(own.key) == 1         # Blob kept for reloading
+    assert decoded(store, own, wait_until).size() == QSize(SIDE, SIDE)
+
+
+def test_undo_redo_history_keeps_images(qapp, image_file):
+    screenshot = QPixmap(400, 300)
+    screenshot.fill(QColor("white"))
+    area = DrawingArea(screenshot)
+    area.resize(400, 300)
+    store = area.image_store
+    area.add_image(image_file("history.png", "olive"))
+    handle = area.drawings[0][4]
+    store.resolve_import(handle)
+    key = handle.key
+    area.drawings.append(("line", QColor("red"), [QPoint(0, 0), QPoint(50, 50)], 2))
+    area.add_to_undo_stack()
+    with_line = list(area.drawings)
+
+    area.undo()
+    area.undo()
+    assert area.drawings == []
+    # The redo history still holds the image
+    assert store.reference_count(key) == 2
+
+    area.redo()
+    area.redo()
+    assert area.drawings[0][4] is handle
+    assert area.drawings == with_line
+
+    area.undo_stack = area.undo_stack[:1]
+    area.redo_stack = []
+    area.drawings = []
+    area.sync_image_references()
+    assert store.reference_count(key) == 0
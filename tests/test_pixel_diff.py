@@ -0,0 +1,99 @@
+"""Pixel diff: change masks and the boxes around changed areas"""
+
+import random
+
+import pytest
+from PyQt5.QtCore import QRect
+from PyQt5.QtGui import QColor, QImage
+
+np = pytest.importorskip("numpy")
+
+from src.core.pixel_diff import changed_boxes, difference_mask
+
+
+def reference_boxes(mask, cell):
+    """Tight boxes of the areas of 8-connected changed cells, by flood fill"""
+    height, width = mask.shape
+    rows, columns = -(-height // cell), -(-width // cell)
+    changed = {(row, column) for row in range(rows) for column in range(columns)
+               if mask[row * cell:(row + 1) * cell, column * cell:(column + 1) * cell].any()}
+    boxes = []
+    while changed:
+        stack = [changed.pop()]
+        area = []
+        while stack:
+            row, column = stack.pop()
+            area.append((row, column))
+            for neighbour in [(row + dy, column + dx) for dy in (-1, 0, 1) for dx in (-1, 0, 1)]:
+                if neighbour in changed:
+                    changed.remove(neighbour)
+                    stack.append(neighbour)
+        ys, xs = [], []
+        for row, column in area:
+            cell_ys, cell_xs = np.nonzero(
+                mask[row * cell:(row + 1) * cell, column * cell:(column + 1) * cell])
+            ys.extend((cell_ys + row * cell).tolist())
+            xs.extend((cell_xs + column * cell).tolist())
+        boxes.append(QRect(min(xs), min(ys), max(xs) - min(xs) + 1, max(ys) - min(ys) + 1))
+    return boxes
+
+
+def box_set(boxes):
+    return sorted(box.getRect() for box in boxes)
+
+
+def test_no_changes():
+    assert changed_boxes(np.zeros((40, 50), bool), cell=8) == []
+
+
+def test_separate_changes_largest_first():
+    mask = np.zeros((100, 100), bool)
+    mask[5:8, 6:9] = True
+    mask[60:90, 40:75] = True
+    assert [box.getRect() for box in changed_boxes(mask, cell=8)] == \
+        [(40, 60, 35, 30), (6, 5, 3, 3)]
+
+
+def test_nearby_changes_share_a_box():
+    mask = np.zeros((64, 64), bool)
+    mask[10, 10] = True
+    mask[17, 20] = True          # Next cell down and to the right
+    assert box_set(changed_boxes(mask, cell=8)) == [(10, 10, 11, 8)]
+
+
+def test_runs_joined_below_are_one_area():
+    # A U shape: two columns only meet in the bottom row of cells
+    mask = np.zeros((48, 48), bool)
+    mask[0:40, 0:4] = True
+    mask[0:40, 40:44] = True
+    mask[36:40, 0:44] = True
+    assert box_set(changed_boxes(mask, cell=4)) == [(0, 0, 44, 40)]
+
+
+@pytest.mark.parametrize("seed", range(6))
+def test_matches_flood_fill_reference(seed):
+    rng = random.Random(seed)
+    height, width = rng.randint(20, 90), rng.randint(20, 90)
+    mask = np.zeros((height, width), bool)
+    for _ in range(rng.randint(1, 25)):
+        y, x = rng.randrange(height), rng.randrange(width)
+        mask[y:y + rng.randint(1, 6), x:x + rng.randint(1, 6)] = True
+    cell = rng.choice((3, 4, 8))
+    boxes = changed_boxes(mask, cell=cell)
+    assert box_set(boxes) == box_set(reference_boxes(mask, cell))
+    areas = [box.width() * box.height() for box in boxes]
+    assert areas == sorted(areas, reverse=True)
+
+
+def test_difference_mask_tolerance_and_size(qapp):
+    before = QImage(30, 20, QImage.Format_RGB32)
+    before.fill(QColor(100, 100, 100))
+    after = QImage(32, 20, QImage.Format_RGB32)   # Two columns wider
+    after.fill(QColor(100, 100, 100))
+    after.setPixelColor(3, 4, QColor(110, 100, 100))   # Within the tolerance
+    after.setPixelColor(7, 9, QColor(100, 100, 130))
+    mask = difference_mask(before, after, tolerance=16)
+    assert mask.shape == (20, 32)
+    assert mask[9, 7] and not mask[4, 3]
+    assert mask[:, 30:].all()
+    assert mask.sum() == 1 + 2 * 20
@@ -0,0 +1,113 @@
+"""Project files, including images still being imported"""
+
+import json
+import zipfile
+
+import pytest
+from PyQt5.QtCore import QPoint
+from PyQt5.QtGui import QColor, QFont, QPixmap
+
+from src.core.project import Project, ProjectError, serialize_document
+from src.ui.drawing_area import DrawingArea
+
+
+def make_area(width=400, height=300):
+    screenshot = QPixmap(width, height)
+    screenshot.fill(QColor("white"))
+    area = DrawingArea(screenshot)
+    area.resize(width, height)
+    return area
+
+
+def document_of(area):
+    return serialize_document(area.drawings, area.text_items, area.counter_items,
+                              area.counter_value, area.counter_start)
+
+
+def annotate(area):
+    area.drawings.append(("rectangle", QColor("red"), [QPoint(10, 10), QPoint(80, 60)], 3))
+    area.drawings.append(("pencil", QColor(0, 0, 255, 128),
+                          [QPoint(5, 5), QPoint(6, 8), QPoint(9, 12)], 2))
+    area.drawings.append(("blur", QColor("black"), [QPoint(100, 100), QPoint(160, 140)], 2))
+    area.text_items.append({'text': "Wrong label", 'pos': QPoint(30, 200),
+                            'color': QColor("magenta"), 'font': QFont("Arial", 14)})
+    area.add_counter(QPoint(300, 40))
+    area.add_counter(QPoint(320, 60))
+
+
+def test_project_round_trip(qapp, tmp_path):
+    area = make_area()
+    annotate(area)
+    path = str(tmp_path / "capture.snaptrace")
+    Project.from_drawing_area(area).save(path)
+
+    project = Project.load(path)
+    assert project.document == document_of(area)
+    assert project.capture_size == area.screenshot.size()
+
+    reopened = make_area(10, 10)
+    project.apply_to(reopened)
+    assert reopened.screenshot.size() == area.screenshot.size()
+    assert document_of(reopened) == document_of(area)
+    assert len(reopened.undo_stack) == 1
+
+
+def test_save_resolves_pending_images(qapp, tmp_path, image_file):
+    area = make_area()
+    # No events are processed, so both imports are still waiting to be hashed
+    area.add_image(image_file("pending.png", "orange"))
+    area.add_image(image_file("other.png", "navy"))
+    assert [drawing[4].key for drawing in area.drawings] == [None, None]
+
+    path = str(tmp_path / "pending.snaptrace")
+    Project.from_drawing_area(area).save(path)
+
+    keys = [drawing[4].key for drawing in area.drawings]
+    assert None not in keys and keys[0] != keys[1]
+    project = Project.load(path)
+    assert [item['image'] for item in project.document['drawings']] == keys
+    assert set(project.image_blobs) == set(keys)
+
+    reopened = make_area()
+    project.apply_to(reopened)
+    assert [drawing[4].key for drawing in reopened.drawings] == keys
+
+
+def test_pending_import_finishes_after_save(qapp, tmp_path, image_file, wait_until):
+    area = make_area()
+    area.add_image(image_file("late.png", "teal"))
+    Project.from_drawing_area(area).save(str(tmp_path / "late.snaptrace"))
+    handle = area.drawings[0][4]
+    key = handle.key
+    # The worker's result for the already-hashed import must not re-key it
+    assert wait_until(handle.is_ready)
+    assert handle.key == key
+    assert area.image_store.reference_count(key) >= 1
+
+
+def test_load_rejects_missing_image_reference(qapp, tmp_path, image_file):
+    area = make_area()
+    area.add_image(image_file("gone.png", "purple"))
+    path = str(tmp_path / "full.snaptrace")
+    Project.from_drawing_area(area).save(path)
+
+    broken = str(tmp_path / "broken.snaptrace")
+    with zipfile.ZipFile(path) as source, zipfile.ZipFile(broken, "w") as target:
+        for name in source.namelist():
+            data = source.read(name)
+            if name == "manifest.json":
+                manifest = json.loads(data)
+                manifest['images'] = {}
+                data = json.dumps(manifest)
+            if not name.startswith("images/"):
+                target.writestr(name, data)
+
+    with pytest.raises(ProjectError, match="missing image"):
+        Project.load(broken)
+
+
+def test_load_rejects_other_files(qapp, tmp_path):
+    path = tmp_path / "notes.snaptrace"
+    path.write_text("not a zip archive")
+    with pytest.raises(ProjectError):
+        Project.load(str(path))
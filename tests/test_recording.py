@@ -0,0 +1,172 @@
+"""Animated PNG writing, checked by decoding the file again"""
+
+import queue
+import struct
+import zlib
+
+import pytest
+from PyQt5.QtCore import QRect
+from PyQt5.QtGui import QColor, QImage, QPainter
+
+from src.core.recording import (MASK_COLOR, PNG_SIGNATURE, ApngWriter, RecordingSignals,
+                                _FrameEncoder, changed_part)
+
+
+def read_chunks(path):
+    """(kind, data) of every chunk, checking each CRC"""
+    with open(path, "rb") as f:
+        data = f.read()
+    assert data.startswith(PNG_SIGNATURE)
+    chunks = []
+    offset = len(PNG_SIGNATURE)
+    while offset < len(data):
+        length, = struct.unpack(">I", data[offset:offset + 4])
+        kind = data[offset + 4:offset + 8]
+        body = data[offset + 8:offset + 8 + length]
+        crc, = struct.unpack(">I", data[offset + 8 + length:offset + 12 + length])
+        assert crc == zlib.crc32(kind + body), kind
+        chunks.append((kind, body))
+        offset += 12 + length
+    return chunks
+
+
+def decode_apng(path):
+    """(frame count from acTL, [(delay in ms, canvas after the frame)]),
+    canvases as lists of RGBA rows, composited as viewers do"""
+    chunks = read_chunks(path)
+    assert chunks[0][0] == b"IHDR" and chunks[-1] == (b"IEND", b"")
+    width, height, depth, color_type = struct.unpack(">IIBB", chunks[0][1][:10])
+    assert (depth, color_type) == (8, 6)
+    frame_count, = struct.unpack(">I", chunks[1][1][:4])
+    assert chunks[1][0] == b"acTL"
+
+    canvas = [[(0, 0, 0, 0)] * width for _ in range(height)]
+    frames = []
+    sequence = 0
+    control = None
+    for kind, body in chunks[2:-1]:
+        if kind == b"fcTL":
+            control = struct.unpack(">IIIIIHHBB", body)
+            assert control[0] == sequence
+            sequence += 1
+            continue
+        if kind == b"fdAT":
+            assert struct.unpack(">I", body[:4])[0] == sequence
+            sequence += 1
+            body = body[4:]
+        else:
+            assert kind == b"IDAT"
+        _, frame_width, frame_height, x, y, delay, denominator, dispose, blend = control
+        assert denominator == 1000 and dispose == 0
+        assert x + frame_width <= width and y + frame_height <= height
+        raw = zlib.decompress(body)
+        stride = 1 + frame_width * 4
+        for row in range(frame_height):
+            line = raw[row * stride:(row + 1) * stride]
+            assert line[0] == 0          # Filter type None
+            for column in range(frame_width):
+                pixel = tuple(line[1 + column * 4:5 + column * 4])
+                if blend and pixel[3] == 0:
+                    continue             # Only fully transparent pixels are written here
+                canvas[y + row][x + column] = pixel
+        frames.append((delay, [list(row) for row in canvas]))
+    return frame_count, frames
+
+
+def rgba_rows(image):
+    image = image.convertToFormat(QImage.Format_RGBA8888)
+    return [[QColor(image.pixel(x, y)).getRgb() for x in range(image.width())]
+            for y in range(image.height())]
+
+
+def solid(width, height, color):
+    image = QImage(width, height, QImage.Format_RGBA8888)
+    image.fill(QColor(color))
+    return image
+
+
+def test_writer_frames_decode(qapp, tmp_path):
+    path = str(tmp_path / "frames.png")
+    writer = ApngWriter(path, 8, 6)
+    writer.add_frame(solid(8, 6, "white"), 0, 0, 100)
+    writer.add_frame(solid(3, 2, "red"), 2, 1, 250)
+    part = solid(4, 4, "blue")
+    part.setPixelColor(0, 0, QColor(0, 0, 0, 0))
+    writer.add_frame(part, 4, 2, 100000, blend=True)
+    writer.close()
+
+    frame_count, frames = decode_apng(path)
+    assert frame_count == 3
+    assert [delay for delay, _canvas in frames] == [100, 250, 65535]
+    expected = rgba_rows(solid(8, 6, "white"))
+    for y in range(1, 3):
+        for x in range(2, 5):
+            expected[y][x] = (255, 0, 0, 255)
+    for y in range(2, 6):
+        for x in range(4, 8):
+            if (x, y) != (4, 2):     # The transparent pixel keeps the red below
+                expected[y][x] = (0, 0, 255, 255)
+    assert frames[-1][1] == expected
+    # Viewers without APNG support show the first frame
+    assert rgba_rows(QImage(path)) == rgba_rows(solid(8, 6, "white"))
+
+
+def test_first_frame_must_cover_the_image(qapp, tmp_path):
+    writer = ApngWriter(str(tmp_path / "partial.png"), 8, 6)
+    with pytest.raises(ValueError):
+        writer.add_frame(solid(4, 6, "white"), 0, 0, 100)
+    writer.discard()
+    assert not (tmp_path / "partial.png").exists()
+
+
+def test_changed_part_clears_unchanged_blocks(qapp):
+    frame = QImage(64, 32, QImage.Format_RGB32)
+    frame.fill(QColor("green"))
+    part = changed_part(frame, QRect(0, 0, 64, 32), [0])
+    assert part.pixelColor(1, 1).alpha() == 255
+    assert part.pixelColor(63, 31).alpha() == 0
+
+
+def test_encoder_records_only_changes(qapp, tmp_path):
+    path = str(tmp_path / "recording.png")
+    base = QImage(96, 48, QImage.Format_RGB32)
+    base.fill(QColor("white"))
+    changed = base.copy()
+    painter = QPainter(changed)
+    painter.fillRect(60, 20, 10, 10, QColor("black"))
+    painter.end()
+
+    frames = queue.Queue()
+    for timestamp, image in [(0.0, base), (0.1, base), (0.2, changed), (0.3, changed)]:
+        frames.put(("frame", timestamp, image))
+    frames.put(("stop", 0.5))
+    encoder = _FrameEncoder(frames, path, RecordingSignals())
+    encoder.run()
+
+    frame_count, decoded = decode_apng(path)
+    assert frame_count == encoder.encoded == 2
+    assert [delay for delay, _canvas in decoded] == [200, 300]
+    assert decoded[0][1] == rgba_rows(base)
+    assert decoded[1][1] == rgba_rows(changed)
+
+
+def test_masked_panel_is_not_recorded(qapp, tmp_path):
+    path = str(tmp_path / "masked.png")
+    base = QImage(96, 48, QImage.Format_RGB32)
+    base.fill(QColor("white"))
+    ticked = base.copy()
+    ticked.setPixelColor(90, 40, QColor("black"))     # The panel's status changes
+
+    frames = queue.Queue()
+    frames.put(("frame", 0.0, base))
+    frames.put(("frame", 0.1, ticked))
+    encoder = _FrameEncoder(frames, path, RecordingSignals())
+    encoder.ignore = QRect(80, 32, 16, 16)
+    encoder.stop_at = 0.4           # Stopped without room in the queue for the command
+    encoder.run()
+
+    frame_count, decoded = decode_apng(path)
+    assert frame_count == encoder.encoded == 1
+    assert decoded[0][0] == 400
+    assert decoded[0][1][40][90] == QColor(MASK_COLOR).getRgb()
+    assert decoded[0][1][0][0] == (255, 255, 255, 255)
@@ -0,0 +1,119 @@
+"""Redaction filters against straightforward reference implementations"""
+
+import pytest
+from PyQt5.QtCore import QPoint, QRect
+from PyQt5.QtGui import QColor, QImage, QPainter
+
+np = pytest.importorskip("numpy")
+
+from src.core.redaction import (BACKGROUND_FILTER_PIXELS, RedactionCache, box_blur,
+                                draw_redaction, filter_region, pixelate)
+
+
+def random_pixels(height, width, seed=0):
+    pixels = np.random.default_rng(seed).integers(0, 256, (height, width, 4), dtype=np.uint8)
+    pixels[:, :, 3] = 255
+    return pixels
+
+
+def rounded_mean(total, count):
+    return (total + count // 2) // count
+
+
+def reference_box_rows(pixels, radius):
+    """Mean of the rows within radius of each row, edge rows repeated"""
+    height = len(pixels)
+    wide = pixels.astype(np.int64)
+    result = np.empty_like(pixels)
+    for row in range(height):
+        total = sum(wide[min(max(row + offset, 0), height - 1)]
+                    for offset in range(-radius, radius + 1))
+        result[row] = rounded_mean(total, 2 * radius + 1)
+    return result
+
+
+def reference_box_blur(pixels, radius):
+    # Down the columns, then across the rows, rounding after each pass
+    rows = reference_box_rows(pixels, radius)
+    return reference_box_rows(rows.transpose(1, 0, 2), radius).transpose(1, 0, 2)
+
+
+def reference_pixelate(pixels, block):
+    height, width = pixels.shape[:2]
+    result = np.empty_like(pixels)
+    for top in range(0, height, block):
+        for left in range(0, width, block):
+            cell = pixels[top:top + block, left:left + block].astype(np.int64)
+            count = cell.shape[0] * cell.shape[1]
+            result[top:top + block, left:left + block] = \
+                rounded_mean(cell.sum(axis=(0, 1)), count)
+    return result
+
+
+@pytest.mark.parametrize("height, width, radius", [(9, 13, 1), (17, 6, 2), (5, 40, 4), (30, 31, 7)])
+def test_box_blur_matches_reference(height, width, radius):
+    pixels = random_pixels(height, width, seed=height * width)
+    assert np.array_equal(box_blur(pixels, radius), reference_box_blur(pixels, radius))
+
+
+def test_box_blur_wide_window_sums_in_uint32():
+    # 255 * 259 overflows uint16, so the sums must be taken in uint32
+    pixels = np.full((300, 3, 4), 255, np.uint8)
+    assert (box_blur(pixels, 129) == 255).all()
+
+
+@pytest.mark.parametrize("height, width, block", [(8, 8, 4), (10, 13, 4), (23, 7, 5), (3, 50, 8)])
+def test_pixelate_matches_reference(height, width, block):
+    pixels = random_pixels(height, width, seed=block)
+    assert np.array_equal(pixelate(pixels, block), reference_pixelate(pixels, block))
+
+
+def test_filter_region_keeps_alpha_and_size(qapp):
+    region = QImage(37, 21, QImage.Format_RGB32)
+    region.fill(QColor(10, 20, 30))
+    for tool in ("pixelate", "blur"):
+        filtered = filter_region(region, tool, 2)
+        assert filtered.size() == region.size()
+        assert filtered.pixelColor(5, 5) == QColor(10, 20, 30)
+
+
+def test_solid_redaction_is_opaque(qapp):
+    target = QImage(20, 20, QImage.Format_RGB32)
+    target.fill(QColor("white"))
+    painter = QPainter(target)
+    draw_redaction(painter, None, "redact", QColor(255, 0, 0, 40), QRect(0, 0, 10, 10), 2)
+    painter.end()
+    assert target.pixelColor(5, 5) == QColor("red")
+    assert target.pixelColor(15, 15) == QColor("white")
+
+
+def test_cache_filters_large_regions_in_the_background(qapp, wait_until):
+    cache = RedactionCache.instance()
+    cache.clear()
+    side = int(BACKGROUND_FILTER_PIXELS ** 0.5) + 8
+    capture = QImage(side, side, QImage.Format_RGB32)
+    capture.fill(QColor("orange"))
+    rect = QRect(0, 0, side, side)
+    ready = []
+
+    def on_ready():
+        ready.append(True)
+    cache.region_ready.connect(on_ready)
+
+    assert cache.region(capture, "blur", rect, 2, background=True) == (rect, None)
+    # Drawn meanwhile with the quick filter
+    target = QImage(side, side, QImage.Format_RGB32)
+    target.fill(QColor("black"))
+    painter = QPainter(target)
+    draw_redaction(painter, capture, "blur", QColor("red"), rect, 2, background=True)
+    painter.end()
+    assert target.pixelColor(side // 2, side // 2) == QColor("orange")
+
+    assert wait_until(lambda: ready)
+    cached_rect, image = cache.region(capture, "blur", rect, 2, background=True)
+    assert image is not None and image.size() == rect.size()
+    # Small regions are filtered straight away
+    small = QRect(QPoint(4, 4), QPoint(40, 40))
+    assert cache.region(capture, "pixelate", small, 2, background=True)[1] is not None
+    cache.region_ready.disconnect(on_ready)
+    cache.clear()
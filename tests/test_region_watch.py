@@ -0,0 +1,93 @@
+"""Region watch: block hashes, the changed area between frames and the kept frames"""
+
+from PyQt5.QtCore import QRect
+from PyQt5.QtGui import QColor, QImage, QPainter
+
+from src.core import region_watch
+from src.core.capture_history import CaptureHistory
+from src.core.region_watch import (BLOCK_COLUMNS, BLOCK_HEIGHT, RegionWatcher, block_bounds,
+                                   block_hashes, changed_area)
+
+
+def frame(width=200, height=100, color="white"):
+    image = QImage(width, height, QImage.Format_RGB32)
+    image.fill(QColor(color))
+    return image
+
+
+def painted(image, rect, color="black"):
+    image = image.copy()
+    painter = QPainter(image)
+    painter.fillRect(rect, QColor(color))
+    painter.end()
+    return image
+
+
+def changed_blocks(a, b):
+    return [index for index, (old, new) in enumerate(zip(block_hashes(a), block_hashes(b)))
+            if old != new]
+
+
+def test_block_bounds_cover_the_width():
+    assert block_bounds(200) == [0, 50, 100, 150, 200]
+    assert block_bounds(3) == [0, 1, 2, 3]
+    assert block_bounds(10, columns=1) == [0, 10]
+
+
+def test_hashes_change_only_in_touched_blocks(qapp):
+    base = frame()
+    bands = -(-100 // BLOCK_HEIGHT)
+    assert len(block_hashes(base)) == bands * BLOCK_COLUMNS
+    assert changed_blocks(base, base.copy()) == []
+    # x 60-69 is column 1; y 20-39 spans bands 1 and 2
+    assert changed_blocks(base, painted(base, QRect(60, 20, 10, 20))) == \
+        [1 * BLOCK_COLUMNS + 1, 2 * BLOCK_COLUMNS + 1]
+    # The last, partial band of rows counts too
+    assert changed_blocks(base, painted(base, QRect(199, 99, 1, 1))) == [bands * BLOCK_COLUMNS - 1]
+
+
+def test_changed_area_is_tight(qapp):
+    base = frame()
+    changed = painted(painted(base, QRect(60, 20, 10, 20)), QRect(120, 33, 3, 2))
+    blocks = changed_blocks(base, changed)
+    assert changed_area(base, changed, blocks) == QRect(60, 20, 63, 20)
+    assert changed_area(base, changed, blocks[:1]) == QRect(60, 20, 10, 12)
+
+
+def test_compare_keeps_only_real_changes(qapp):
+    watcher = RegionWatcher(QRect(0, 0, 200, 100), rate=5, cpu_budget=10, save_directory="")
+    watcher.min_change = 50
+    areas = []
+    watcher.frame_changed.connect(lambda image, area: areas.append(area))
+    base = frame()
+    assert watcher.compare(base)                                   # First frame
+    assert not watcher.compare(base.copy())
+    assert not watcher.compare(painted(base, QRect(5, 5, 2, 2)))    # A caret blinks...
+    assert not watcher.compare(base)                               # ...and back
+    big = painted(base, QRect(100, 50, 20, 10))
+    assert watcher.compare(big)
+    assert areas == [QRect(0, 0, 200, 100), QRect(100, 50, 20, 10)]
+
+    watcher.ignore = QRect(0, 60, 200, 40)                         # Our own panel
+    assert not watcher.compare(painted(big, QRect(10, 70, 40, 20)))
+    assert not watcher.compare(frame(100, 100))                    # Resolution changed
+    assert watcher.stats.changes == 1 and watcher.stats.kept == 2
+
+
+def test_frames_are_kept_apart_from_recent_captures(qapp, tmp_path, wait_until, monkeypatch):
+    monkeypatch.setattr(region_watch, "WATCH_MAX_FRAMES", 3)
+    history = CaptureHistory.instance()
+    captures = len(history)
+    watcher = RegionWatcher(QRect(0, 0, 200, 100), rate=5, cpu_budget=10,
+                            save_directory=str(tmp_path))
+    image = frame()
+    for step in range(5):
+        image = painted(image, QRect(step * 30, 10, 20, 20), QColor.fromHsv(step * 60, 255, 255))
+        assert watcher.compare(image)
+    assert len(history) == captures
+    # Only the latest frames are kept, and counted
+    assert watcher.stats.kept == len(watcher.frames) == 3
+    assert watcher.frames.entries()[0].decompress() == image
+    assert wait_until(lambda: watcher.stats.saved == 5)
+    assert len(list(tmp_path.glob("watch_*.png"))) == 5
+    assert "3 kept · 5 saved" in watcher.stats.summary()
@@ -0,0 +1,155 @@
+"""Scrolling capture: scroll detection, tiled output and stitching"""
+
+import pytest
+from PyQt5.QtGui import QColor, QImage, QPainter
+
+from src.core import scroll_capture
+from src.core.scroll_capture import ScrollStitcher, TiledImage, find_scroll, row_hashes
+
+WIDTH = 80
+HEADER = 10
+FOOTER = 8
+VIEW = 120                       # Frame height
+CONTENT = VIEW - HEADER - FOOTER
+
+
+def row_color(row):
+    """A different color for every row of the page"""
+    return QColor(row % 256, (row // 256) * 37 % 256, row * 7 % 256)
+
+
+def paint_rows(image, colors, top=0):
+    painter = QPainter(image)
+    for offset, color in enumerate(colors):
+        painter.setPen(color)
+        painter.drawLine(0, top + offset, image.width() - 1, top + offset)
+    painter.end()
+
+
+def page_frame(scroll):
+    """The window onto a long page scrolled by scroll rows, with a sticky
+    header and footer"""
+    frame = QImage(WIDTH, VIEW, QImage.Format_RGB32)
+    frame.fill(QColor("lightgray"))
+    paint_rows(frame, [row_color(row) for row in range(scroll, scroll + CONTENT)], HEADER)
+    painter = QPainter(frame)
+    painter.fillRect(0, VIEW - FOOTER, WIDTH, FOOTER, QColor("darkblue"))
+    painter.end()
+    return frame
+
+
+def stitched_page(last_scroll):
+    """What stitching every frame up to last_scroll should produce"""
+    height = HEADER + last_scroll + CONTENT + FOOTER
+    image = QImage(WIDTH, height, QImage.Format_RGB32)
+    image.fill(QColor("lightgray"))
+    paint_rows(image, [row_color(row) for row in range(last_scroll + CONTENT)], HEADER)
+    painter = QPainter(image)
+    painter.fillRect(0, height - FOOTER, WIDTH, FOOTER, QColor("darkblue"))
+    painter.end()
+    return image
+
+
+def test_find_scroll_identical_frames():
+    rows = list(range(50))
+    assert find_scroll(rows, list(rows)) == (0, 50, 0)
+
+
+def test_find_scroll_with_header_and_footer():
+    header, footer = [-1, -2, -3], [-9, -8]
+    previous = header + list(range(100, 160)) + footer
+    current = header + list(range(125, 185)) + footer
+    assert find_scroll(previous, current) == (25, 3, 2)
+
+
+def test_find_scroll_repeated_rows():
+    # The new frame starts on blank rows, which match at many distances; the
+    # rows after them single out the right one
+    content = list(range(100, 110)) + [0] * 20 + list(range(1, 60))
+    previous = content[:60]
+    current = content[12:72]
+    assert find_scroll(previous, current) == (12, 0, 0)
+
+
+def test_find_scroll_without_overlap():
+    previous = list(range(0, 60))
+    current = list(range(50, 110))
+    assert find_scroll(previous, current, min_overlap=32) is None
+
+
+@pytest.mark.parametrize("numpy", [True, False])
+def test_find_scroll_on_frames(qapp, monkeypatch, numpy):
+    if not numpy:
+        monkeypatch.setattr(scroll_capture, "NUMPY_AVAILABLE", False)
+    assert find_scroll(row_hashes(page_frame(0)), row_hashes(page_frame(40))) == \
+        (40, HEADER, FOOTER)
+
+
+@pytest.mark.parametrize("width", [61, 79, 200])
+def test_row_hashes_tell_the_same_rows_apart_either_way(qapp, monkeypatch, width):
+    frame = QImage(width, 30, QImage.Format_RGB32)
+    frame.fill(QColor("white"))
+    frame.setPixelColor(width - 30, 4, QColor("red"))      # Inside the hashed columns
+    frame.setPixelColor(0, 9, QColor("red"))
+    frame.setPixelColor(width - 1, 20, QColor("red"))      # In the scrollbar margin when wide
+    with_numpy = row_hashes(frame)
+    monkeypatch.setattr(scroll_capture, "NUMPY_AVAILABLE", False)
+    with_crc = row_hashes(frame)
+    changed = [4, 9] if width > 3 * scroll_capture.SCROLLBAR_MARGIN else [4, 9, 20]
+    for hashes in (with_numpy, with_crc):
+        assert [row for row in range(30) if hashes[row] != hashes[0]] == changed
+
+
+@pytest.mark.parametrize("pieces", [[(0, 5), (5, 20)], [(0, 7)], [(3, 9), (0, 17), (2, 4)]])
+def test_tiled_image_appends_across_tiles(qapp, pieces):
+    source = QImage(12, 20, QImage.Format_RGB32)
+    paint_rows(source, [row_color(row * 11) for row in range(20)])
+    tiled = TiledImage(12, tile_height=4)
+    expected = []
+    for top, bottom in pieces:
+        tiled.append(source, top, bottom)
+        expected.extend(range(top, bottom))
+    assert tiled.height == len(expected)
+
+    image = tiled.take_image()
+    assert image.size().height() == len(expected)
+    for row, source_row in enumerate(expected):
+        assert image.pixel(5, row) == source.pixel(5, source_row)
+
+
+def test_tiled_image_truncate_then_append(qapp):
+    source = QImage(6, 10, QImage.Format_RGB32)
+    paint_rows(source, [row_color(row * 3) for row in range(10)])
+    tiled = TiledImage(6, tile_height=3)
+    tiled.append(source, 0, 10)
+    tiled.truncate(4)
+    tiled.append(source, 8, 10)
+    image = tiled.take_image()
+    assert [image.pixel(0, row) for row in range(image.height())] == \
+        [source.pixel(0, row) for row in (0, 1, 2, 3, 8, 9)]
+
+
+def test_stitcher_builds_the_whole_page(qapp):
+    stitcher = ScrollStitcher()
+    scrolls = [0, 0, 30, 60, 95, 140, 140, 170]
+    for scroll in scrolls:
+        stitcher.add_frame(page_frame(scroll))
+    assert stitcher.missed == 0
+    assert stitcher.take_image() == stitched_page(scrolls[-1])
+
+
+def test_stitcher_skips_frames_scrolled_too_far(qapp):
+    stitcher = ScrollStitcher()
+    stitcher.add_frame(page_frame(0))
+    assert stitcher.add_frame(page_frame(90)) == 0      # Overlaps by 12 rows only
+    assert stitcher.missed == 1
+    assert stitcher.add_frame(page_frame(50)) == 50
+    assert stitcher.take_image() == stitched_page(50)
+
+
+def test_stitcher_stops_at_max_height(qapp):
+    stitcher = ScrollStitcher(max_height=200)
+    for scroll in range(0, 400, 40):
+        stitcher.add_frame(page_frame(scroll))
+    assert stitcher.is_full()
+    assert stitcher.take_image().height() <= 200 + FOOTER
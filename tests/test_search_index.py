@@ -0,0 +1,85 @@
+"""Quick Commands search index"""
+
+import pytest
+
+from src.core.feedback_catalog import display_text
+from src.core.search_index import SearchIndex
+
+ENTRIES = [
+    ("Layout", "Button overlaps the label"),     # 0
+    ("Layout", "Buttons misaligned in toolbar"),  # 1
+    ("Text", "Typo in submit button"),            # 2
+    ("Colors", "Contrast of the button text"),    # 3
+    ("Text", "Label truncated"),                  # 4
+    ("Layout", "Rebutton widget"),                # 5
+    ("Misc", "Butten looks odd"),                 # 6
+]
+QUERIES = ["button", "text", "bu la", "buton", "layout button", "label", "zzz", ""]
+
+
+def build(entries=ENTRIES):
+    return SearchIndex([display_text(*entry) for entry in entries],
+                       [category for category, _feedback in entries])
+
+
+def linear_scan(query):
+    terms = query.lower().split()
+    return [row for row, (category, feedback) in enumerate(ENTRIES)
+            if all(term in display_text(category, feedback).lower() for term in terms)]
+
+
+@pytest.mark.parametrize("query", ["b", "bu", "butt", "button", "on la", "t", "xt: ty", "zzz"])
+def test_search_matches_substrings(query):
+    assert list(build().search(query).rows()) == linear_scan(query)
+
+
+def test_search_narrows_the_previous_result():
+    index = build()
+    previous = None
+    for end in range(1, len("button tool") + 1):
+        query = "button tool"[:end]
+        previous = index.search(query, previous)
+        assert list(previous.rows()) == linear_scan(query), query
+    assert index.search("").count == len(ENTRIES)
+
+
+def test_short_terms_only_filter():
+    assert build().rank("bu la") == [0, 1, 5]
+
+
+def test_every_term_must_match():
+    assert build().rank("button toolbar") == [1]
+    assert build().rank("button zzz") == []
+
+
+@pytest.mark.parametrize("typed", ["layout button", "butten", "lbael", "text bu"])
+def test_rank_narrowing_matches_a_fresh_rank(typed):
+    index = build()
+    previous = None
+    for end in range(1, len(typed) + 1):
+        query = typed[:end]
+        previous = index.rank_result(query, boosts={4: 0.5}, previous=previous)
+        assert previous.ranked == index.rank(query, boosts={4: 0.5}), query
+
+
+def test_rank_typo_rows_come_back_when_a_term_grows():
+    # "btun" does not contain "but", but is one transposition from "butn"
+    index = build([("Misc", "Butter"), ("Misc", "Btun")])
+    previous = index.rank_result("bu")
+    previous = index.rank_result("but", previous=previous)
+    assert previous.ranked == [0]
+    assert index.rank_result("butn", previous=previous).ranked == [1]
+
+
+@pytest.mark.parametrize("split", [1, 3, 6])
+def test_merged_and_extended_indexes_rank_alike(split):
+    whole = build()
+    merged = build(ENTRIES[:split])
+    merged.merge(build(ENTRIES[split:]))
+    extended = build(ENTRIES[:split])
+    extended.add([display_text(*entry) for entry in ENTRIES[split:]],
+                 [category for category, _feedback in ENTRIES[split:]])
+    for query in QUERIES:
+        assert merged.rank(query) == whole.rank(query), query
+        assert extended.rank(query) == whole.rank(query), query
+        assert list(merged.search(query).rows()) == list(whole.search(query).rows()), query
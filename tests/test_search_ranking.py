@@ -0,0 +1,79 @@
+"""Quick Commands match ranking: typo tolerance, boosts and usage"""
+
+import pytest
+
+from src.core.feedback_catalog import display_text
+from src.core.search_index import SearchIndex, within_one_edit
+from src.core.usage_stats import USAGE_HALF_LIFE, USAGE_SATURATION, USAGE_WEIGHT, UsageStats
+
+ENTRIES = [
+    ("Layout", "Button overlaps the label"),     # 0
+    ("Layout", "Buttons misaligned in toolbar"),  # 1
+    ("Text", "Typo in submit button"),            # 2
+    ("Colors", "Contrast of the button text"),    # 3
+    ("Text", "Label truncated"),                  # 4
+    ("Layout", "Rebutton widget"),                # 5
+    ("Misc", "Butten looks odd"),                 # 6
+]
+
+
+def build(entries=ENTRIES):
+    return SearchIndex([display_text(*entry) for entry in entries],
+                       [category for category, _feedback in entries])
+
+
+def test_exact_prefix_substring_and_typo_order():
+    # Exact words first (the phrase starting with one ahead of the others,
+    # equal scores in catalog order), then prefixes, substrings and typos
+    assert build().rank("button") == [0, 2, 3, 1, 5, 6]
+
+
+def test_category_boost():
+    assert build().rank("text") == [2, 4, 3]
+
+
+def test_typos_need_longer_terms():
+    assert build().rank("buton") == [0, 2, 3]
+    assert build().rank("lbl") == []
+
+
+def test_limit_and_usage_boosts():
+    index = build()
+    assert index.rank("button", limit=2) == [0, 2]
+    assert index.rank("button", boosts={6: 1.0})[0] == 6
+    assert index.rank("button", limit=2, boosts={4: 5.0}) == [0, 2]   # Row 4 doesn't match
+
+
+@pytest.mark.parametrize("a, b, expected", [
+    ("button", "button", True),
+    ("button", "buton", True),       # Deletion
+    ("buton", "button", True),       # Insertion
+    ("button", "bitton", True),      # Substitution
+    ("button", "btuton", True),      # Transposition
+    ("button", "btoton", False),
+    ("button", "buttons!", False),
+    ("label", "lable", True),
+    ("label", "lbeal", False),
+])
+def test_within_one_edit(a, b, expected):
+    assert within_one_edit(a, b) is expected
+
+
+def test_usage_boost_grows_with_use_and_decays(qapp, tmp_path):
+    path = str(tmp_path / "usage.sqlite3")
+    usage = UsageStats(path)
+    now = 1_000_000.0
+    assert usage.boost("Layout: Label truncated", now) == 0.0
+    usage.record("Layout: Label truncated", when=now)
+    once = usage.boost("Layout: Label truncated", now)
+    for _ in range(USAGE_SATURATION * 2):
+        usage.record("Layout: Label truncated", when=now)
+    often = usage.boost("Layout: Label truncated", now)
+    assert 0 < once < often == pytest.approx(USAGE_WEIGHT)
+    assert usage.boost("Layout: Label truncated", now + USAGE_HALF_LIFE) == \
+        pytest.approx(often / 2)
+
+    usage.close()
+    reopened = UsageStats(path)
+    assert reopened.phrases["Layout: Label truncated"] == [USAGE_SATURATION * 2 + 1, now]
+    reopened.close()
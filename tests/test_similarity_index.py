@@ -0,0 +1,96 @@
+"""Similar-capture search: banded multi-index lookups against brute force"""
+
+import random
+
+import pytest
+
+from src.core.image_hash import (BAND_BITS, ImageHashIndex, SimilarityIndex, band_probes,
+                                 hamming_distance)
+
+
+def flipped(image_hash, bits):
+    for bit in bits:
+        image_hash ^= 1 << bit
+    return image_hash
+
+
+def brute_force(items, image_hash, max_distance):
+    return sorted((hamming_distance(image_hash, stored), path) for path, stored in items
+                  if hamming_distance(image_hash, stored) <= max_distance)
+
+
+def random_hashes(rng, count, around=None):
+    """Random hashes, or hashes a few bits from around, as (path, hash) pairs"""
+    items = []
+    for number in range(count):
+        if around is None:
+            image_hash = rng.getrandbits(64)
+        else:
+            image_hash = flipped(around, rng.sample(range(64), rng.randint(0, 20)))
+        items.append((f"/captures/{number:04d}.png", image_hash))
+    return items
+
+
+def test_band_probes():
+    assert band_probes(0) == [0]
+    assert len(band_probes(2)) == BAND_BITS * (BAND_BITS - 1) // 2
+    assert all(bin(probe).count("1") == 2 for probe in band_probes(2))
+
+
+@pytest.mark.parametrize("seed, max_distance", [(0, 3), (1, 8), (2, 15)])
+def test_nearest_matches_brute_force(seed, max_distance):
+    rng = random.Random(seed)
+    query = rng.getrandbits(64)
+    items = random_hashes(rng, 300, around=query) + random_hashes(rng, 300)
+    index = SimilarityIndex()
+    index.extend(items)
+    expected = brute_force(items, query, max_distance)
+    assert index.nearest(query, limit=1000, max_distance=max_distance) == expected
+    assert index.nearest(query, limit=5, max_distance=max_distance) == expected[:5]
+
+
+def test_nearest_after_set_and_discard():
+    rng = random.Random(7)
+    query = rng.getrandbits(64)
+    items = random_hashes(rng, 100, around=query)
+    index = SimilarityIndex()
+    for path, image_hash in items:
+        index.set(path, image_hash)
+    removed = {path for path, _hash in items[::3]}
+    for path in removed:
+        index.discard(path)
+    moved = items[1][0]
+    index.set(moved, query)                  # Replaced by a copy of the query
+    remaining = [(path, query if path == moved else image_hash)
+                 for path, image_hash in items if path not in removed]
+    assert len(index) == len(remaining)
+    assert index.nearest(query, limit=1000, max_distance=15) == brute_force(remaining, query, 15)
+
+    index.discard_directory("/captures")
+    assert len(index) == 0
+
+
+def test_archive_search_skips_deleted_files(qapp, tmp_path):
+    rng = random.Random(11)
+    query = rng.getrandbits(64)
+    index = ImageHashIndex(path=str(tmp_path / "hashes.sqlite3"))
+    items = []
+    for folder in ("one", "two"):
+        (tmp_path / folder).mkdir()
+        for number, bits in enumerate([1, 4, 9]):
+            path = tmp_path / folder / f"{number}.png"
+            path.write_bytes(b"")
+            image_hash = flipped(query, rng.sample(range(64), bits))
+            index.add(str(path), image_hash)
+            items.append((str(path), image_hash))
+    assert index.nearest(query, max_distance=10) == brute_force(items, query, 10)
+
+    (tmp_path / "two" / "0.png").unlink()
+    added = tmp_path / "one" / "copy.png"
+    added.write_bytes(b"")
+    index.add(str(added), query)             # Added after the first search
+    expected = brute_force([item for item in items if not item[0].endswith("two/0.png")]
+                           + [(str(added), query)], query, 10)
+    assert index.nearest(query, max_distance=10) == expected
+    assert index.nearest(None) == []
+    index.connection.close()
@@ -0,0 +1,92 @@
+"""Thumbnails: decoding at thumbnail size, the LRU disk cache and the service"""
+
+import os
+
+from PyQt5.QtCore import QSize
+from PyQt5.QtGui import QColor, QImage
+
+from src.core import thumbnails
+from src.core.thumbnails import ThumbnailCache, ThumbnailService, read_thumbnail, thumbnail_key
+
+
+def small_image(color):
+    image = QImage(32, 32, QImage.Format_RGB32)
+    image.fill(QColor(color))
+    return image
+
+
+def test_thumbnail_fits_and_key_follows_the_file(qapp, image_file):
+    path = image_file("wide.png", "navy", 1000, 400)
+    assert read_thumbnail(path, 100).size() == QSize(100, 40)
+    assert read_thumbnail(image_file("tiny.png", "navy", 20, 10), 100).size() == QSize(20, 10)
+    assert read_thumbnail(path + ".missing").isNull()
+
+    key = thumbnail_key(path, os.stat(path))
+    assert thumbnail_key(path, os.stat(path), 128) != key
+    stat = os.stat(path)
+    os.utime(path, ns=(stat.st_atime_ns, stat.st_mtime_ns + 1))
+    assert thumbnail_key(path, os.stat(path)) != key      # Overwritten capture
+
+
+def test_cache_evicts_least_recently_used(qapp, tmp_path):
+    cache = ThumbnailCache(str(tmp_path / "thumbs"), 10 ** 9)
+    keys = [f"{number:02d}" + "0" * 38 for number in range(6)]
+    for number, key in enumerate(keys):
+        cache.put(key, small_image(QColor.fromHsv(number * 50, 200, 200)))
+        os.utime(cache.path_for(key), ns=(number * 10 ** 9, number * 10 ** 9))
+    assert cache.get(keys[0]).size() == QSize(32, 32)     # Now the most recently used
+    assert cache.get("ff" + "0" * 38) is None
+
+    sizes = [os.path.getsize(cache.path_for(key)) for key in keys]
+    cache.max_bytes = sum(sizes)          # One more put goes over the cap
+    cache.put("aa" + "0" * 38, small_image("white"))
+    kept = [os.path.exists(cache.path_for(key)) for key in keys]
+    assert kept[0] and not kept[1]
+    assert kept[1:] == sorted(kept[1:])                  # Oldest went first
+    assert cache._disk_usage() <= cache.max_bytes * thumbnails.EVICT_TO
+
+
+def test_service_serves_from_memory_then_disk(qapp, tmp_path, image_file, wait_until,
+                                              monkeypatch):
+    ready = []
+    service = ThumbnailService(str(tmp_path / "thumbs"), size=64)
+    service.thumbnail_ready.connect(lambda path, image: ready.append((path, image)))
+    path = image_file("capture.png", "orange", 640, 480)
+    assert service.request(path) is None
+    assert wait_until(lambda: ready)
+    assert ready[0][0] == path and ready[0][1].size() == QSize(64, 48)
+    assert service.request(path).size() == QSize(64, 48)
+
+    decoded = []
+    monkeypatch.setattr(thumbnails, "read_thumbnail",
+                        lambda *args: decoded.append(args) or QImage())
+    fresh = ThumbnailService(str(tmp_path / "thumbs"), size=64)
+    fresh.thumbnail_ready.connect(lambda path, image: ready.append((path, image)))
+    fresh.request(path)
+    assert wait_until(lambda: len(ready) == 2)
+    assert not ready[1][1].isNull() and decoded == []     # From the disk cache
+
+
+def test_memory_cache_is_bounded(qapp, tmp_path, image_file, wait_until, monkeypatch):
+    monkeypatch.setattr(thumbnails, "MEMORY_THUMBNAILS", 2)
+    service = ThumbnailService(str(tmp_path / "thumbs"), size=16)
+    paths = [image_file(f"{number}.png", "teal") for number in range(3)]
+    for path in paths:
+        service.request(path)
+        assert wait_until(lambda: service.request(path) is not None)
+    assert list(service._memory) == paths[1:]
+
+
+def test_cancel_drops_only_unshared_requests(qapp, tmp_path, image_file):
+    service = ThumbnailService(str(tmp_path / "thumbs"))
+    service.pool.setMaxThreadCount(1)
+    blocker = image_file("blocker.png", "red", 4000, 3000)
+    paths = [image_file(f"{number}.png", "blue") for number in range(4)]
+    view, other = object(), object()
+    service.request(blocker, requester=other)
+    for path in paths:
+        service.request(path, requester=view)
+    service.request(paths[3], requester=other)
+    service.cancel_pending(view)
+    assert paths[3] in service._pending and paths[0] not in service._pending
+    service.pool.waitForDone()